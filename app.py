@@ -54,9 +54,9 @@ def can_access_module(module_name):
     
     # Get enabled modules for the current company
     enabled_modules = []
-    if session.get('company_id'):
-        enabled_modules_data = CompanyModuleService.get_enabled_modules_for_company(session['company_id'])
-        enabled_modules = [cm.module_definition for cm in enabled_modules_data] if enabled_modules_data else []
+    entitlements = EntitlementService.current()
+    if entitlements and entitlements.company_id:
+        enabled_modules = entitlements.enabled_module_definitions
     
     return dict(can_access_module=can_access_module, enabled_modules=enabled_modules)
 
@@ -82,8 +82,7 @@ def inject_permission_helpers():
         from services.tender_workflow_service import TenderWorkflowService
         
         if PermissionsService.user_has_permission(session['user_id'], 'approve_tenders', session.get('company_id')):
-            pending_tenders = TenderWorkflowService.get_pending_approvals(session['company_id'])
-            pending_approvals_count = len(pending_tenders) if pending_tenders else 0
+            pending_approvals_count = TenderWorkflowService.count_pending_approvals(session['company_id'])
     
     return dict(
         has_permission=has_permission,
@@ -99,9 +98,38 @@ def inject_permission_helpers():
 
 # Initialize database
 db.init_app(app)
+CacheService.init_app(app)
+ExportJobService.init_app(app)
 
 migrate = Migrate(app, db)
 
+
+@app.cli.command('check-query-plans')
+def check_query_plans():
+    """EXPLAIN the hot tenant-scoped queries and fail on full table scans"""
+    success, failures, message = QueryPlanService.check()
+    print(message)
+    if not success:
+        raise SystemExit(1)
+
+
+@app.cli.command('rebuild-tender-stats')
+def rebuild_tender_stats():
+    """Rebuild the tender stats rollup for every company from the tenders table"""
+    success, bucket_count, message = TenderStatsRollupService.rebuild()
+    print(message)
+    if not success:
+        raise SystemExit(1)
+
+
+@app.cli.command('backfill-revenue-snapshots')
+def backfill_revenue_snapshots():
+    """Record every billed month missing from the revenue history from its bills"""
+    success, row_count, message = RevenueSnapshotService.backfill()
+    print(message)
+    if not success:
+        raise SystemExit(1)
+
 @app.route('/admin/modules')
 def test_modules():
     if not session.get('is_super_admin'):
@@ -149,6 +177,10 @@ def user_can_access_module(module_name):
     if not company_id:
         return False
     
+    entitlements = EntitlementService.current()
+    if entitlements:
+        return module_name in entitlements.enabled_modules
+    
     return CompanyModuleService.is_module_enabled_for_company(company_id, module_name)
 
 def login_required(f):
@@ -520,38 +552,12 @@ def dashboard():
         'permissions': permissions  # Add permissions for template use
     }
     
+    # Tiles are filled in by the page from /api/dashboard/stats
     if user.is_super_admin:
-        # Use direct database queries instead of service methods
-        context['total_companies'] = Company.query.count()
-        context['total_users'] = User.query.count()
-        
-        # Calculate tender stats manually
-        total_tenders = Tender.query.count()
-        active_tenders = Tender.query.count()  # For now, assume all are active
-        
-        # Try to get closed status for better active count
-        try:
-            closed_status = TenderStatus.query.filter_by(name='Closed').first()
-            if closed_status:
-                active_tenders = Tender.query.filter(Tender.status_id != closed_status.id).count()
-        except:
-            pass
-        
-        context['tender_stats'] = {
-            'total': total_tenders,
-            'active': active_tenders,
-            'closed': total_tenders - active_tenders
-        }
+        context['stats_scope'] = 'system'
         
     elif user.company_id and permissions and permissions['is_company_admin']:
-        # Company admin stats - use direct queries
-        user_count = User.query.filter_by(company_id=user.company_id, is_active=True).count()
-        tender_count = Tender.query.filter_by(company_id=user.company_id).count()
-        
-        context['company_stats'] = {
-            'user_count': user_count,
-            'tender_count': tender_count
-        }
+        context['stats_scope'] = 'company'
         
         # Only show users if user management module is enabled
         if permissions and permissions['can_manage_users']:
@@ -559,30 +565,25 @@ def dashboard():
                 company_id=user.company_id, 
                 is_active=True
             ).all()
-        
-        # Company tender stats
-        total_tenders = Tender.query.filter_by(company_id=user.company_id).count()
-        active_tenders = total_tenders
-        
-        # Try to get closed status for better active count
-        try:
-            closed_status = TenderStatus.query.filter_by(name='Closed').first()
-            if closed_status:
-                active_tenders = Tender.query.filter(
-                    Tender.company_id == user.company_id,
-                    Tender.status_id != closed_status.id
-                ).count()
-        except:
-            pass
-        
-        context['tender_stats'] = {
-            'total': total_tenders,
-            'active': active_tenders,
-            'closed': total_tenders - active_tenders
-        }
     
     return render_template('dashboard.html', **context)
 
+@app.route('/api/dashboard/stats')
+@login_required
+def api_dashboard_stats():
+    """API endpoint for the dashboard tiles"""
+    user = AuthService.get_user_by_id(session['user_id'])
+    permissions = ModulePermissions.get_user_permissions(session['user_id'])
+    
+    if user.is_super_admin:
+        stats = DashboardStatsService.get_stats()
+    elif user.company_id and permissions and permissions['is_company_admin']:
+        stats = DashboardStatsService.get_stats(user.company_id)
+    else:
+        return jsonify({'success': False, 'message': 'Access denied'}), 403
+    
+    return jsonify({'success': True, 'stats': stats})
+
 # NEW TENDER ROUTES
 @app.route('/tenders', methods=['GET', 'POST'])
 @login_required
@@ -594,8 +595,9 @@ def tenders():
     user = AuthService.get_user_by_id(session['user_id'])
     permissions = ModulePermissions.get_user_permissions(session['user_id'])
     
-    # Get parameters with defaults
-    page = request.args.get('page', 1, type=int)
+    # Get parameters with defaults (page only numbers the page; cursor picks it)
+    page = max(request.args.get('page', 1, type=int), 1)
+    cursor = request.args.get('cursor')
     per_page = request.args.get('per_page', 10, type=int)
     status_filter = request.args.get('status', type=int)
     category_filter = request.args.get('category', type=int)
@@ -636,14 +638,10 @@ def tenders():
     # Apply advanced search if available
     search_query = request.args.get('search', '').strip()
     if search_query and permissions and permissions['can_advanced_search']:
-        query = query.filter(
-            Tender.title.contains(search_query) | 
-            Tender.description.contains(search_query) |
-            Tender.reference_number.contains(search_query)
-        )
+        query = TenderSearchService.filter_query(query, search_query)
     elif search_query:
         # Basic search if advanced search not available
-        query = query.filter(Tender.title.contains(search_query))
+        query = TenderSearchService.filter_query(query, search_query, title_only=True)
     
     # Apply filters
     if status_filter:
@@ -651,25 +649,31 @@ def tenders():
     if category_filter:
         query = query.filter_by(category_id=category_filter)
     
-    # Order by newest first
-    query = query.order_by(Tender.created_at.desc())
+    # Total for the page header, cached briefly rather than counted on every page
+    total = PaginationService.cached_count(
+        'tender_list_count', None if user.is_super_admin else user.company_id,
+        (user.id, view_filter, status_filter, category_filter, search_query), query
+    )
     
-    # Get paginated results
-    pagination_result = query.paginate(
-        page=page,
-        per_page=per_page,
-        error_out=False
+    # Newest first, continuing from the cursor (old page-number links still work by offset),
+    # loading what each row renders with the page
+    result = PaginationService.seek(
+        query.options(*TenderQueryOptions.for_list()), Tender.created_at, Tender.id,
+        cursor=cursor, limit=per_page, offset=0 if cursor else (page - 1) * per_page
     )
     
     # Create simple pagination object
+    page_items = len(result['items'])
     pagination = {
         'current_page': page,
-        'total_pages': pagination_result.pages,
-        'total': pagination_result.total,
-        'has_prev': pagination_result.has_prev,
-        'has_next': pagination_result.has_next,
-        'start_item': ((page - 1) * per_page) + 1 if pagination_result.total > 0 else 0,
-        'end_item': min(page * per_page, pagination_result.total)
+        'total_pages': PaginationService.total_pages(total, per_page),
+        'total': total,
+        'has_prev': result['has_prev'],
+        'has_next': result['has_next'],
+        'prev_cursor': result['prev_cursor'],
+        'next_cursor': result['next_cursor'],
+        'start_item': ((page - 1) * per_page) + 1 if page_items else 0,
+        'end_item': (page - 1) * per_page + page_items
     }
     
     # Get filter options
@@ -677,7 +681,7 @@ def tenders():
     statuses = TenderStatusService.get_all_statuses()
     
     return render_template('tenders/list.html', 
-                         tenders=pagination_result.items,
+                         tenders=result['items'],
                          pagination=pagination,
                          categories=categories, 
                          statuses=statuses,
@@ -1576,58 +1580,55 @@ def tender_reports():
     # Get date filters
     start_date = request.args.get('start_date')
     end_date = request.args.get('end_date')
+    page = request.args.get('page', 1, type=int)
+    per_page = request.args.get('per_page', 20, type=int)
+    
+    if per_page not in [10, 20, 50, 100]:
+        per_page = 20
     
     # Check if user can view all tenders or only assigned ones
     from services.permissions_service import PermissionsService
     can_view_all = PermissionsService.user_has_permission(user.id, 'view_all_tenders', user.company_id)
     
     if user.is_super_admin:
-        tenders = TenderService.get_all_tenders()
+        company_id, assigned_to_id = None, None
     elif can_view_all:
-        tenders = TenderService.get_tenders_by_company(user.company_id)
+        company_id, assigned_to_id = user.company_id, None
     else:
         # Non-admin users see only assigned tenders
-        tenders = Tender.query.join(TenderAssignment).filter(
-            TenderAssignment.assigned_to_id == user.id,
-            Tender.company_id == user.company_id
-        ).all()
-    
-    # Apply date filters if provided
-    if start_date:
-        start_date = datetime.strptime(start_date, '%Y-%m-%d')
-        tenders = [t for t in tenders if t.created_at.date() >= start_date.date()]
+        company_id, assigned_to_id = user.company_id, user.id
     
-    if end_date:
-        end_date = datetime.strptime(end_date, '%Y-%m-%d')
-        tenders = [t for t in tenders if t.created_at.date() <= end_date.date()]
-    
-    # Calculate statistics
-    total_tenders = len(tenders)
-    status_breakdown = {}
-    category_breakdown = {}
-    monthly_breakdown = {}
+    # Date range, grouping and paging are applied in SQL
+    report = TenderReportService.get_report(
+        company_id=company_id,
+        assigned_to_id=assigned_to_id,
+        start_date=datetime.strptime(start_date, '%Y-%m-%d') if start_date else None,
+        end_date=datetime.strptime(end_date, '%Y-%m-%d') if end_date else None,
+        page=page,
+        per_page=per_page
+    )
+    page_result = report['page']
     
-    for tender in tenders:
-        # Status breakdown
-        status_name = tender.status.name
-        status_breakdown[status_name] = status_breakdown.get(status_name, 0) + 1
-        
-        # Category breakdown
-        category_name = tender.category.name
-        category_breakdown[category_name] = category_breakdown.get(category_name, 0) + 1
-        
-        # Monthly breakdown
-        month_key = tender.created_at.strftime('%Y-%m')
-        monthly_breakdown[month_key] = monthly_breakdown.get(month_key, 0) + 1
+    pagination = {
+        'current_page': page_result.page,
+        'per_page': per_page,
+        'total_pages': page_result.pages,
+        'total': page_result.total,
+        'has_prev': page_result.has_prev,
+        'has_next': page_result.has_next,
+        'start_item': ((page - 1) * per_page) + 1 if page_result.total > 0 else 0,
+        'end_item': min(page * per_page, page_result.total)
+    }
     
     return render_template('reports/tenders.html',
-                         tenders=tenders,
-                         total_tenders=total_tenders,
-                         status_breakdown=status_breakdown,
-                         category_breakdown=category_breakdown,
-                         monthly_breakdown=monthly_breakdown,
-                         start_date=request.args.get('start_date'),
-                         end_date=request.args.get('end_date'))
+                         tenders=page_result.items,
+                         pagination=pagination,
+                         total_tenders=report['total_tenders'],
+                         status_breakdown=report['status_breakdown'],
+                         category_breakdown=report['category_breakdown'],
+                         monthly_breakdown=report['monthly_breakdown'],
+                         start_date=start_date,
+                         end_date=end_date)
 # Update your report routes to include current_date in the context
 
 @app.route('/active_tenders_report')
@@ -1635,171 +1636,126 @@ def tender_reports():
 @require_module('reporting')
 def active_tenders_report():
     """Report of all active (non-closed) tenders"""
-        
-
-    user = AuthService.get_user_by_id(session['user_id'])
-    current_date = datetime.utcnow()
-    
-    # Get closed status ID to exclude
-    closed_status = TenderStatus.query.filter_by(name='Closed').first()
-    closed_status_id = closed_status.id if closed_status else None
-    
-    # Check if user can view all tenders
-    from services.permissions_service import PermissionsService
-    can_view_all = PermissionsService.user_has_permission(user.id, 'view_all_tenders', user.company_id)
-    
-    if user.is_super_admin:
-        # Super admin sees all active tenders
-        if closed_status_id:
-            tenders = Tender.query.filter(Tender.status_id != closed_status_id).order_by(Tender.created_at.desc()).all()
-        else:
-            tenders = Tender.query.order_by(Tender.created_at.desc()).all()
-    elif can_view_all:
-        # Company admins see all company's active tenders
-        if closed_status_id:
-            tenders = Tender.query.filter(
-                Tender.company_id == user.company_id,
-                Tender.status_id != closed_status_id
-            ).order_by(Tender.created_at.desc()).all()
-        else:
-            tenders = Tender.query.filter_by(company_id=user.company_id).order_by(Tender.created_at.desc()).all()
-    else:
-        # Regular users see only assigned active tenders
-        if closed_status_id:
-            tenders = Tender.query.join(TenderAssignment).filter(
-                TenderAssignment.assigned_to_id == user.id,
-                Tender.company_id == user.company_id,
-                Tender.status_id != closed_status_id
-            ).order_by(Tender.created_at.desc()).all()
-        else:
-            tenders = Tender.query.join(TenderAssignment).filter(
-                TenderAssignment.assigned_to_id == user.id,
-                Tender.company_id == user.company_id
-            ).order_by(Tender.created_at.desc()).all()
-    
-    # Handle export
-    export_format = request.args.get('export')
-    if export_format == 'pdf':
-        return export_tenders_pdf(tenders, 'Active Tenders Report', user)
-    elif export_format == 'excel':
-        return export_tenders_excel(tenders, 'Active Tenders Report', user)
-    
-    context = {
-        'tenders': tenders,
-        'report_title': 'Active Tenders Report',
-        'report_description': 'All tenders that are not closed',
-        'user': user,
-        'is_super_admin': user.is_super_admin,
-        'current_date': current_date
-    }
-    
-    return render_template('reports/tender_list.html', **context)
+    return render_tender_list_report(
+        'active', 'Active Tenders Report', 'All tenders that are not closed'
+    )
 
 @app.route('/closed_tenders_report')
 @login_required
 @require_module('reporting') 
 def closed_tenders_report():
     """Report of all closed tenders"""
+    return render_tender_list_report(
+        'closed', 'Closed Tenders Report', 'All tenders with closed status'
+    )
+
+@app.route('/overdue_tenders_report')
+@login_required
+@require_module('reporting') 
+def overdue_tenders_report():
+    """Report of overdue tenders (past submission deadline)"""
+    return render_tender_list_report(
+        'overdue', 'Overdue Tenders Report', 'Tenders past their submission deadline',
+        show_overdue_info=True
+    )
+
+def render_tender_list_report(report, report_title, report_description, **extra_context):
+    """Render a tender list report, or queue its export when ?export= is given"""
     user = AuthService.get_user_by_id(session['user_id'])
     current_date = datetime.utcnow()
     
-    # Get closed status
-    closed_status = TenderStatus.query.filter_by(name='Closed').first()
-    if not closed_status:
-        flash('No closed status found in system', 'warning')
-        return redirect(url_for('reports'))
-    
     # Check if user can view all tenders
     from services.permissions_service import PermissionsService
     can_view_all = PermissionsService.user_has_permission(user.id, 'view_all_tenders', user.company_id)
     
-    if user.is_super_admin:
-        # Super admin sees all closed tenders
-        tenders = Tender.query.filter_by(status_id=closed_status.id).order_by(Tender.updated_at.desc()).all()
-    elif can_view_all:
-        # Company admins see all company's closed tenders
-        tenders = Tender.query.filter(
-            Tender.company_id == user.company_id,
-            Tender.status_id == closed_status.id
-        ).order_by(Tender.updated_at.desc()).all()
-    else:
-        # Regular users see only assigned closed tenders
-        tenders = Tender.query.join(TenderAssignment).filter(
-            TenderAssignment.assigned_to_id == user.id,
-            Tender.company_id == user.company_id,
-            Tender.status_id == closed_status.id
-        ).order_by(Tender.updated_at.desc()).all()
-    
-    # Handle export
+    # Exports are rendered by a background worker
     export_format = request.args.get('export')
-    if export_format == 'pdf':
-        return export_tenders_pdf(tenders, 'Closed Tenders Report', user)
-    elif export_format == 'excel':
-        return export_tenders_excel(tenders, 'Closed Tenders Report', user)
+    if export_format in ('pdf', 'excel'):
+        return queue_export('tender_list', {
+            'report': report,
+            'format': export_format,
+            'user_id': user.id,
+            'can_view_all': can_view_all,
+            'as_of': current_date.isoformat()
+        }, fallback_url=request.path)
+    
+    query = TenderReportService.list_report_query(report, user, can_view_all, as_of=current_date)
+    if query is None:
+        flash('No closed status found in system', 'warning')
+        return redirect(url_for('reports'))
+    
+    tenders = query.options(*TenderQueryOptions.for_report()).all()
     
     context = {
         'tenders': tenders,
-        'report_title': 'Closed Tenders Report',
-        'report_description': 'All tenders with closed status',
+        'report_title': report_title,
+        'report_description': report_description,
         'user': user,
         'is_super_admin': user.is_super_admin,
         'current_date': current_date
     }
+    context.update(extra_context)
     
     return render_template('reports/tender_list.html', **context)
 
-@app.route('/overdue_tenders_report')
+# =====================================================
+# BACKGROUND EXPORTS
+# =====================================================
+
+def queue_export(job_type, params, fallback_url):
+    """Queue a background export and send the user to its status page"""
+    success, job, message = ExportJobService.enqueue(
+        job_type, params, session['user_id'], session.get('company_id')
+    )
+    if not success:
+        flash(message, 'error')
+        return redirect(fallback_url)
+    
+    return redirect(url_for('export_job_status', job_id=job.id))
+
+@app.route('/exports/<int:job_id>')
 @login_required
-@require_module('reporting') 
-def overdue_tenders_report():
-    """Report of overdue tenders (past submission deadline)"""
+def export_job_status(job_id):
+    """Progress page for a background export"""
     user = AuthService.get_user_by_id(session['user_id'])
-    current_date = datetime.utcnow()
+    job = ExportJobService.get_job_for_user(job_id, user)
+    if not job:
+        flash('Export not found', 'error')
+        return redirect(url_for('dashboard'))
     
-    # Check if user can view all tenders
-    from services.permissions_service import PermissionsService
-    can_view_all = PermissionsService.user_has_permission(user.id, 'view_all_tenders', user.company_id)
+    return render_template('exports/status.html', job=job, status=ExportJobService.get_status(job))
+
+@app.route('/api/exports/<int:job_id>')
+@login_required
+def api_export_job_status(job_id):
+    """API endpoint polled for a background export's progress"""
+    user = AuthService.get_user_by_id(session['user_id'])
+    job = ExportJobService.get_job_for_user(job_id, user)
+    if not job:
+        return jsonify({'success': False, 'message': 'Export not found'}), 404
     
-    if user.is_super_admin:
-        # Super admin sees all overdue tenders
-        tenders = Tender.query.filter(
-            Tender.submission_deadline < current_date,
-            Tender.submission_deadline.isnot(None)
-        ).order_by(Tender.submission_deadline.desc()).all()
-    elif can_view_all:
-        # Company admins see all company's overdue tenders
-        tenders = Tender.query.filter(
-            Tender.company_id == user.company_id,
-            Tender.submission_deadline < current_date,
-            Tender.submission_deadline.isnot(None)
-        ).order_by(Tender.submission_deadline.desc()).all()
-    else:
-        # Regular users see only assigned overdue tenders
-        tenders = Tender.query.join(TenderAssignment).filter(
-            TenderAssignment.assigned_to_id == user.id,
-            Tender.company_id == user.company_id,
-            Tender.submission_deadline < current_date,
-            Tender.submission_deadline.isnot(None)
-        ).order_by(Tender.submission_deadline.desc()).all()
+    status = ExportJobService.get_status(job)
+    if job.status == 'completed':
+        status['download_url'] = url_for('download_export', job_id=job.id)
     
-    # Handle export
-    export_format = request.args.get('export')
-    if export_format == 'pdf':
-        return export_tenders_pdf(tenders, 'Overdue Tenders Report', user)
-    elif export_format == 'excel':
-        return export_tenders_excel(tenders, 'Overdue Tenders Report', user)
+    return jsonify({'success': True, 'job': status})
+
+@app.route('/exports/<int:job_id>/download')
+@login_required
+def download_export(job_id):
+    """Download a finished background export"""
+    user = AuthService.get_user_by_id(session['user_id'])
+    job = ExportJobService.get_job_for_user(job_id, user)
+    if not job:
+        flash('Export not found', 'error')
+        return redirect(url_for('dashboard'))
     
-    context = {
-        'tenders': tenders,
-        'report_title': 'Overdue Tenders Report',
-        'report_description': 'Tenders past their submission deadline',
-        'user': user,
-        'is_super_admin': user.is_super_admin,
-        'show_overdue_info': True,
-        'current_date': current_date
-    }
+    file_path = ExportJobService.artifact_path(job)
+    if not file_path:
+        flash('This export is not available for download', 'warning')
+        return redirect(url_for('export_job_status', job_id=job.id))
     
-    return render_template('reports/tender_list.html', **context)
+    return send_file(file_path, mimetype=job.mime_type, as_attachment=True, download_name=job.file_name)
 
 @app.route('/tenders_by_category_report')
 @login_required
@@ -1815,16 +1771,20 @@ def tenders_by_category_report():
     
     if user.is_super_admin:
         # Super admin sees all tenders
-        tenders = Tender.query.order_by(Tender.category_id, Tender.created_at.desc()).all()
+        query = Tender.query
     elif can_view_all:
         # Company admins see all company's tenders
-        tenders = Tender.query.filter_by(company_id=user.company_id).order_by(Tender.category_id, Tender.created_at.desc()).all()
+        query = Tender.query.filter_by(company_id=user.company_id)
     else:
         # Regular users see only assigned tenders
-        tenders = Tender.query.join(TenderAssignment).filter(
+        query = Tender.query.join(TenderAssignment).filter(
             TenderAssignment.assigned_to_id == user.id,
             Tender.company_id == user.company_id
-        ).order_by(Tender.category_id, Tender.created_at.desc()).all()
+        )
+    
+    tenders = query.options(*TenderQueryOptions.for_report()).order_by(
+        Tender.category_id, Tender.created_at.desc()
+    ).all()
     
     # Group tenders by category
     categories = {}
@@ -1919,262 +1879,9 @@ def edit_profile():
     return render_template('user/edit_profile.html', user=user)
 
 # Export helper functions
-def export_tenders_pdf(tenders, title, user):
-    """Export tenders to PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.black,
-        spaceAfter=30,
-        alignment=1  # Center alignment
-    )
-    story.append(Paragraph(title, title_style))
-    
-    # Company info
-    if not user.is_super_admin:
-        company_info = f"Company: {user.company.name}"
-        story.append(Paragraph(company_info, styles['Normal']))
-    
-    # Export date
-    export_date = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    story.append(Paragraph(export_date, styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    if not tenders:
-        story.append(Paragraph("No tenders found for this report.", styles['Normal']))
-    else:
-        # Table headers
-        headers = ['Reference', 'Title', 'Category', 'Status', 'Created Date', 'Deadline']
-        data = [headers]
-        
-        # Table data
-        for tender in tenders:
-            row = [
-                tender.reference_number,
-                tender.title[:30] + '...' if len(tender.title) > 30 else tender.title,
-                tender.category.name if tender.category else 'N/A',
-                tender.status.name if tender.status else 'N/A',
-                tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A',
-                tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A'
-            ]
-            data.append(row)
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-    
-    doc.build(story)
-    buffer.seek(0)
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename="{title.replace(" ", "_")}.pdf"'
-    return response
-
-def export_tenders_excel(tenders, title, user):
-    """Export tenders to Excel"""
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    worksheet = workbook.add_worksheet(title[:31])  # Excel sheet name limit
-    
-    # Formats
-    header_format = workbook.add_format({
-        'bold': True,
-        'font_color': 'white',
-        'bg_color': '#366092',
-        'border': 1
-    })
-    
-    cell_format = workbook.add_format({
-        'border': 1,
-        'text_wrap': True
-    })
-    
-    # Headers
-    headers = ['Reference Number', 'Title', 'Category', 'Status', 'Company', 'Created Date', 'Deadline', 'Days Overdue']
-    for col, header in enumerate(headers):
-        worksheet.write(0, col, header, header_format)
-    
-    # Data
-    for row, tender in enumerate(tenders, 1):
-        days_overdue = ''
-        if tender.submission_deadline and tender.submission_deadline < datetime.utcnow():
-            days_overdue = (datetime.utcnow() - tender.submission_deadline).days
-        
-        worksheet.write(row, 0, tender.reference_number, cell_format)
-        worksheet.write(row, 1, tender.title, cell_format)
-        worksheet.write(row, 2, tender.category.name if tender.category else 'N/A', cell_format)
-        worksheet.write(row, 3, tender.status.name if tender.status else 'N/A', cell_format)
-        worksheet.write(row, 4, tender.company.name if tender.company else 'N/A', cell_format)
-        worksheet.write(row, 5, tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A', cell_format)
-        worksheet.write(row, 6, tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A', cell_format)
-        worksheet.write(row, 7, str(days_overdue) if days_overdue else 'N/A', cell_format)
-    
-    # Adjust column widths
-    worksheet.set_column('A:A', 15)  # Reference
-    worksheet.set_column('B:B', 30)  # Title
-    worksheet.set_column('C:C', 15)  # Category
-    worksheet.set_column('D:D', 12)  # Status
-    worksheet.set_column('E:E', 20)  # Company
-    worksheet.set_column('F:F', 12)  # Created
-    worksheet.set_column('G:G', 12)  # Deadline
-    worksheet.set_column('H:H', 12)  # Days Overdue
-    
-    workbook.close()
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename="{title.replace(" ", "_")}.xlsx"'
-    return response
-
-def export_tenders_by_category_pdf(categories, user):
-    """Export tenders by category to PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
-    styles = getSampleStyleSheet()
-    story = []
-    
-    # Title
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        textColor=colors.black,
-        spaceAfter=30,
-        alignment=1
-    )
-    story.append(Paragraph("Tenders by Category Report", title_style))
-    
-    # Company info
-    if not user.is_super_admin:
-        company_info = f"Company: {user.company.name}"
-        story.append(Paragraph(company_info, styles['Normal']))
-    
-    # Export date
-    export_date = f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}"
-    story.append(Paragraph(export_date, styles['Normal']))
-    story.append(Spacer(1, 20))
-    
-    for category_name, tenders in categories.items():
-        # Category header
-        story.append(Paragraph(f"Category: {category_name} ({len(tenders)} tenders)", styles['Heading2']))
-        
-        # Table for this category
-        headers = ['Reference', 'Title', 'Status', 'Created Date']
-        data = [headers]
-        
-        for tender in tenders:
-            row = [
-                tender.reference_number,
-                tender.title[:40] + '...' if len(tender.title) > 40 else tender.title,
-                tender.status.name if tender.status else 'N/A',
-                tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A'
-            ]
-            data.append(row)
-        
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.lightblue),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.black),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.white),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
-        story.append(table)
-        story.append(Spacer(1, 20))
-    
-    doc.build(story)
-    buffer.seek(0)
-    
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = 'attachment; filename="Tenders_by_Category_Report.pdf"'
-    return response
-
-def export_tenders_by_category_excel(categories, user):
-    """Export tenders by category to Excel"""
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
-    
-    # Formats
-    header_format = workbook.add_format({
-        'bold': True,
-        'font_color': 'white',
-        'bg_color': '#366092',
-        'border': 1
-    })
-    
-    category_format = workbook.add_format({
-        'bold': True,
-        'font_color': 'white',
-        'bg_color': '#5B9BD5',
-        'border': 1
-    })
-    
-    cell_format = workbook.add_format({
-        'border': 1,
-        'text_wrap': True
-    })
-    
-    # Create a worksheet for each category
-    for category_name, tenders in categories.items():
-        # Clean sheet name (Excel limitations)
-        sheet_name = category_name[:31].replace('/', '_').replace('\\', '_')
-        worksheet = workbook.add_worksheet(sheet_name)
-        
-        # Category header
-        worksheet.merge_range('A1:E1', f'Category: {category_name}', category_format)
-        
-        # Headers
-        headers = ['Reference Number', 'Title', 'Status', 'Created Date', 'Deadline']
-        for col, header in enumerate(headers):
-            worksheet.write(2, col, header, header_format)
-        
-        # Data
-        for row, tender in enumerate(tenders, 3):
-            worksheet.write(row, 0, tender.reference_number, cell_format)
-            worksheet.write(row, 1, tender.title, cell_format)
-            worksheet.write(row, 2, tender.status.name if tender.status else 'N/A', cell_format)
-            worksheet.write(row, 3, tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A', cell_format)
-            worksheet.write(row, 4, tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A', cell_format)
-        
-        # Adjust column widths
-        worksheet.set_column('A:A', 15)
-        worksheet.set_column('B:B', 40)
-        worksheet.set_column('C:C', 15)
-        worksheet.set_column('D:D', 12)
-        worksheet.set_column('E:E', 12)
-    
-    workbook.close()
-    output.seek(0)
-    
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = 'attachment; filename="Tenders_by_Category_Report.xlsx"'
-    return response
+from utils.export_helpers import (
+    export_tenders_by_category_pdf, export_tenders_by_category_excel
+)
 
 # SUPER ADMIN CUSTOM FIELDS MANAGEMENT
 @app.route('/admin/custom-fields')
@@ -2870,6 +2577,9 @@ def update_company_modules(company_id):
                 'message': f'Database error: {str(e)}'
             }), 500
         
+        # Cached module/permission lookups for this company are now stale
+        CacheService.bump_company_version(company_id)
+        
         # Get updated status using JOIN
         enabled_company_modules = db.session.query(CompanyModule, ModuleDefinition).join(ModuleDefinition).filter(
             CompanyModule.company_id == company_id,
@@ -4607,36 +4317,34 @@ def accounting_dashboard():
             return redirect(url_for('dashboard'))
         
         # Get summary data
-        from models import Account, JournalEntry, Transaction, AccountType
+        from models import JournalEntry, AccountType
+        from sqlalchemy.orm import selectinload
         
-        # Get account balances by type
-        account_types = AccountType.query.all()
-        balances_by_type = {}
+        # Get account balances by type (one aggregate over the ledger)
+        account_balances = AccountBalanceService.get_account_balances(company_id)
+        balances_by_type, category_totals = AccountBalanceService.summarize(account_balances)
         
-        for acc_type in account_types:
-            accounts = Account.query.filter_by(
-                company_id=company_id,
-                account_type_id=acc_type.id,
-                is_active=True
-            ).all()
-            total = sum([acc.get_balance() for acc in accounts])
-            balances_by_type[acc_type.name] = {
-                'total': total,
+        # Types without accounts are still listed
+        for acc_type in AccountType.query.all():
+            balances_by_type.setdefault(acc_type.name, {
+                'total': 0,
                 'category': acc_type.category
-            }
+            })
         
         # Calculate financial metrics
-        revenue = sum([v['total'] for k, v in balances_by_type.items() if v['category'] == 'revenue'])
-        expenses = sum([v['total'] for k, v in balances_by_type.items() if v['category'] == 'expense'])
-        assets = sum([v['total'] for k, v in balances_by_type.items() if v['category'] == 'asset'])
-        liabilities = sum([v['total'] for k, v in balances_by_type.items() if v['category'] == 'liability'])
-        equity = sum([v['total'] for k, v in balances_by_type.items() if v['category'] == 'equity'])
+        revenue = category_totals['revenue']
+        expenses = category_totals['expense']
+        assets = category_totals['asset']
+        liabilities = category_totals['liability']
+        equity = category_totals['equity']
         
         net_income = revenue - expenses
         
-        # Get recent journal entries
+        # Get recent journal entries (with their lines for the debit/credit totals)
         recent_entries = JournalEntry.query.filter_by(
             company_id=company_id
+        ).options(
+            selectinload(JournalEntry.transactions)
         ).order_by(JournalEntry.entry_date.desc()).limit(10).all()
         
         return render_template('accounting/dashboard.html',
@@ -4665,13 +4373,16 @@ def chart_of_accounts():
             flash('No company associated with your account.', 'error')
             return redirect(url_for('dashboard'))
         
-        from models import Account, AccountType
+        from models import AccountType
         
-        accounts = Account.query.filter_by(company_id=company_id).order_by(Account.account_number).all()
+        account_balances = AccountBalanceService.get_account_balances(company_id, active_only=False)
+        accounts = [row['account'] for row in account_balances]
+        balances = {row['account'].id: row['balance'] for row in account_balances}
         account_types = AccountType.query.all()
         
         return render_template('accounting/chart_of_accounts.html',
                              accounts=accounts,
+                             balances=balances,
                              account_types=account_types)
     
     except Exception as e:
@@ -4756,11 +4467,16 @@ def create_journal_entry():
         
         from models import Account, JournalEntry, Transaction
         
+        # Entry numbers come from the company's sequence, continuing from
+        # numbers issued before it existed
+        seed = lambda: SequenceService.highest_suffix(
+            JournalEntry.entry_number, 'JE-', JournalEntry.company_id == company_id
+        )
+        
         if request.method == 'POST':
-            # Create journal entry
+            # Build journal entry
             entry = JournalEntry(
                 company_id=company_id,
-                entry_number=request.form.get('entry_number'),
                 entry_date=datetime.strptime(request.form.get('entry_date'), '%Y-%m-%d').date(),
                 description=request.form.get('description'),
                 reference=request.form.get('reference'),
@@ -4768,10 +4484,7 @@ def create_journal_entry():
                 is_posted=False
             )
             
-            db.session.add(entry)
-            db.session.flush()
-            
-            # Create transactions
+            # Build transactions
             account_ids = request.form.getlist('account_id[]')
             debits = request.form.getlist('debit[]')
             credits = request.form.getlist('credit[]')
@@ -4779,24 +4492,27 @@ def create_journal_entry():
             
             for i in range(len(account_ids)):
                 if account_ids[i]:
-                    transaction = Transaction(
-                        journal_entry_id=entry.id,
+                    entry.transactions.append(Transaction(
                         account_id=account_ids[i],
                         debit_amount=Decimal(debits[i]) if debits[i] else 0,
                         credit_amount=Decimal(credits[i]) if credits[i] else 0,
                         description=descriptions[i] if i < len(descriptions) else ''
-                    )
-                    db.session.add(transaction)
+                    ))
             
-            # Check if balanced
-            if entry.is_balanced():
-                db.session.commit()
-                flash('Journal entry created successfully!', 'success')
-                return redirect(url_for('journal_entries'))
-            else:
-                db.session.rollback()
+            # Check if balanced before numbering it
+            if not entry.is_balanced():
                 flash('Journal entry is not balanced. Debits must equal credits.', 'error')
                 return redirect(url_for('create_journal_entry'))
+            
+            # Number it in this transaction, so a failed save hands the number
+            # back (the number shown on the form is only a preview)
+            entry_number = SequenceService.next_value(company_id, 'journal_entry', seed=seed, block_size=1)
+            entry.entry_number = f"JE-{entry_number:05d}"
+            
+            db.session.add(entry)
+            db.session.commit()
+            flash('Journal entry created successfully!', 'success')
+            return redirect(url_for('journal_entries'))
         
         # GET request
         accounts = Account.query.filter_by(
@@ -4804,9 +4520,8 @@ def create_journal_entry():
             is_active=True
         ).order_by(Account.account_number).all()
         
-        # Generate next entry number
-        last_entry = JournalEntry.query.filter_by(company_id=company_id).order_by(JournalEntry.id.desc()).first()
-        next_number = f"JE-{(last_entry.id + 1) if last_entry else 1:05d}"
+        # Preview the next entry number
+        next_number = f"JE-{SequenceService.peek(company_id, 'journal_entry', seed=seed):05d}"
         
         return render_template('accounting/create_journal_entry.html',
                              accounts=accounts,
@@ -4818,6 +4533,18 @@ def create_journal_entry():
         return redirect(url_for('journal_entries'))
 
 
+def parse_accounting_report_dates():
+    """Read optional start_date and as_of (YYYY-MM-DD) report arguments"""
+    dates = []
+    for arg in ('start_date', 'as_of'):
+        value = request.args.get(arg)
+        try:
+            dates.append(datetime.strptime(value, '%Y-%m-%d').date() if value else None)
+        except ValueError:
+            flash(f'Invalid {arg.replace("_", " ")}, expected YYYY-MM-DD', 'warning')
+            dates.append(None)
+    return tuple(dates)
+
 @app.route('/accounting/reports/income-statement')
 @login_required
 @module_required('accounting')
@@ -4829,31 +4556,21 @@ def income_statement():
             flash('No company associated with your account.', 'error')
             return redirect(url_for('dashboard'))
         
-        from models import Account, AccountType
-        
-        # Get revenue accounts
-        revenue_type = AccountType.query.filter_by(category='revenue').first()
-        revenue_accounts = Account.query.filter_by(
-            company_id=company_id,
-            account_type_id=revenue_type.id,
-            is_active=True
-        ).all() if revenue_type else []
+        start_date, as_of = parse_accounting_report_dates()
         
-        # Get expense accounts
-        expense_type = AccountType.query.filter_by(category='expense').first()
-        expense_accounts = Account.query.filter_by(
-            company_id=company_id,
-            account_type_id=expense_type.id,
-            is_active=True
-        ).all() if expense_type else []
+        # Revenue and expense balances in one aggregate over the ledger
+        account_balances = AccountBalanceService.get_account_balances(
+            company_id, categories=['revenue', 'expense'], as_of=as_of, start_date=start_date
+        )
+        revenue_accounts = [row for row in account_balances if row['account_type'].category == 'revenue']
+        expense_accounts = [row for row in account_balances if row['account_type'].category == 'expense']
         
-        total_revenue = sum([acc.get_balance() for acc in revenue_accounts])
-        total_expenses = sum([acc.get_balance() for acc in expense_accounts])
+        total_revenue = sum(row['balance'] for row in revenue_accounts)
+        total_expenses = sum(row['balance'] for row in expense_accounts)
         net_income = total_revenue - total_expenses
         
-        # Get current date for report
-        from datetime import datetime
-        report_date = datetime.now()
+        # Report date is the as-of date when one was given
+        report_date = as_of or datetime.now()
         
         return render_template('accounting/income_statement.html',
                              revenue_accounts=revenue_accounts,
@@ -4861,7 +4578,8 @@ def income_statement():
                              total_revenue=total_revenue,
                              total_expenses=total_expenses,
                              net_income=net_income,
-                             report_date=report_date)
+                             report_date=report_date,
+                             start_date=start_date)
     
     except Exception as e:
         flash(f'Error generating income statement: {str(e)}', 'error')
@@ -4879,56 +4597,22 @@ def balance_sheet():
             flash('No company associated with your account.', 'error')
             return redirect(url_for('dashboard'))
         
-        from models import Account, AccountType
+        _, as_of = parse_accounting_report_dates()
         
-        # Get assets
-        asset_types = AccountType.query.filter_by(category='asset').all()
-        assets = []
-        total_assets = 0
-        for acc_type in asset_types:
-            accts = Account.query.filter_by(
-                company_id=company_id,
-                account_type_id=acc_type.id,
-                is_active=True
-            ).all()
-            for acc in accts:
-                balance = acc.get_balance()
-                assets.append({'account': acc, 'balance': balance})
-                total_assets += balance
-        
-        # Get liabilities
-        liability_types = AccountType.query.filter_by(category='liability').all()
-        liabilities = []
-        total_liabilities = 0
-        for acc_type in liability_types:
-            accts = Account.query.filter_by(
-                company_id=company_id,
-                account_type_id=acc_type.id,
-                is_active=True
-            ).all()
-            for acc in accts:
-                balance = acc.get_balance()
-                liabilities.append({'account': acc, 'balance': balance})
-                total_liabilities += balance
-        
-        # Get equity
-        equity_types = AccountType.query.filter_by(category='equity').all()
-        equity_accounts = []
-        total_equity = 0
-        for acc_type in equity_types:
-            accts = Account.query.filter_by(
-                company_id=company_id,
-                account_type_id=acc_type.id,
-                is_active=True
-            ).all()
-            for acc in accts:
-                balance = acc.get_balance()
-                equity_accounts.append({'account': acc, 'balance': balance})
-                total_equity += balance
+        # Balance sheet accounts in one aggregate over the ledger
+        account_balances = AccountBalanceService.get_account_balances(
+            company_id, categories=['asset', 'liability', 'equity'], as_of=as_of
+        )
+        assets = [row for row in account_balances if row['account_type'].category == 'asset']
+        liabilities = [row for row in account_balances if row['account_type'].category == 'liability']
+        equity_accounts = [row for row in account_balances if row['account_type'].category == 'equity']
         
-        # Get current date for report
-        from datetime import datetime
-        report_date = datetime.now()
+        total_assets = sum(row['balance'] for row in assets)
+        total_liabilities = sum(row['balance'] for row in liabilities)
+        total_equity = sum(row['balance'] for row in equity_accounts)
+        
+        # Report date is the as-of date when one was given
+        report_date = as_of or datetime.now()
         
         return render_template('accounting/balance_sheet.html',
                              assets=assets,
@@ -4955,31 +4639,17 @@ def accounting_help():
 @app.route('/admin/billing/bills/export')
 @super_admin_required
 def export_bills():
-    """Export bills to PDF or Excel"""
+    """Export bills to PDF or Excel (rendered in the background)"""
     export_format = request.args.get('format', 'excel')
     
-    # Get same filters as billing_bills
-    company_id = request.args.get('company_id', type=int)
-    start_date = request.args.get('start_date')
-    end_date = request.args.get('end_date')
-    status = request.args.get('status')
-    
-    # Parse dates
-    start_date_obj = datetime.strptime(start_date, '%Y-%m-%d') if start_date else None
-    end_date_obj = datetime.strptime(end_date, '%Y-%m-%d') if end_date else None
-    
-    # Get bills
-    bills_data = BillingService.get_bills_with_filters(
-        company_id=company_id,
-        start_date=start_date_obj,
-        end_date=end_date_obj,
-        status=status
-    )
-    
-    if export_format == 'pdf':
-        return export_bills_pdf(bills_data)
-    else:
-        return export_bills_excel(bills_data)
+    # Same filters as billing_bills
+    return queue_export('bills', {
+        'format': 'pdf' if export_format == 'pdf' else 'excel',
+        'company_id': request.args.get('company_id', type=int),
+        'start_date': request.args.get('start_date') or None,
+        'end_date': request.args.get('end_date') or None,
+        'status': request.args.get('status') or None
+    }, fallback_url=url_for('billing_bills'))
 
 
 @app.route('/admin/billing/bills/<int:bill_id>/view')
@@ -5287,207 +4957,6 @@ def company_billing_details(company_id):
         flash('Error loading company billing details', 'error')
         return redirect(url_for('billing_dashboard'))
 
-# Updated utility functions
-def calculate_company_monthly_cost(company_id):
-    """Calculate the total monthly cost for a company including custom pricing"""
-    try:
-        total_cost = 0
-        
-        # Get all enabled modules for the company
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
-        
-        for company_module, module_def in enabled_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_id,
-                module_id=module_def.id,
-                is_active=True
-            ).order_by(CompanyModulePricing.effective_date.desc()).first()
-            
-            if custom_pricing:
-                total_cost += float(custom_pricing.custom_price)
-            else:
-                total_cost += float(module_def.monthly_price or 0)
-        
-        return total_cost
-        
-    except Exception as e:
-        print(f"Error calculating company monthly cost: {str(e)}")
-        return 0
-
-def calculate_module_revenue_breakdown():
-    """Calculate revenue breakdown by module - returns float values"""
-    try:
-        module_revenue = {}
-        
-        # Get all active modules
-        modules = ModuleDefinition.query.filter_by(is_active=True).all()
-        
-        for module in modules:
-            total_revenue = 0.0  # Use float
-            
-            # Get all companies using this module
-            company_modules = CompanyModule.query.filter_by(
-                module_id=module.id,
-                is_enabled=True
-            ).all()
-            
-            for company_module in company_modules:
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company_module.company_id,
-                        module_id=module.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        total_revenue += float(custom_pricing.custom_price or 0)
-                    else:
-                        total_revenue += float(module.monthly_price or 0)
-                except:
-                    total_revenue += float(module.monthly_price or 0)
-            
-            if total_revenue > 0:
-                module_revenue[module.display_name] = total_revenue
-        
-        # Format for Chart.js - ensure all values are float
-        if module_revenue:
-            return {
-                'labels': list(module_revenue.keys()),
-                'data': [float(x) for x in module_revenue.values()]  # Convert to float
-            }
-        else:
-            return {
-                'labels': ['No Revenue Data'],
-                'data': [0.0]
-            }
-            
-    except Exception as e:
-        print(f"Error calculating module revenue breakdown: {str(e)}")
-        return {'labels': ['Error'], 'data': [0.0]}
-
-def calculate_module_monthly_revenue(module_id):
-    """Calculate monthly revenue for a specific module"""
-    try:
-        total_revenue = 0
-        
-        # Get all companies using this module
-        company_modules = CompanyModule.query.filter_by(
-            module_id=module_id,
-            is_enabled=True
-        ).all()
-        
-        for company_module in company_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_module.company_id,
-                module_id=module_id,
-                is_active=True
-            ).order_by(CompanyModulePricing.effective_date.desc()).first()
-            
-            if custom_pricing:
-                total_revenue += float(custom_pricing.custom_price)
-            else:
-                module_def = ModuleDefinition.query.get(module_id)
-                if module_def:
-                    total_revenue += float(module_def.monthly_price or 0)
-        
-        return total_revenue
-        
-    except Exception as e:
-        print(f"Error calculating module monthly revenue: {str(e)}")
-        return 0
-
-def get_companies_with_custom_pricing():
-    """Get companies that have custom pricing - returns float values"""
-    try:
-        companies_data = []
-        
-        # Get companies with custom pricing (if table exists)
-        try:
-            companies_with_custom = db.session.query(CompanyModulePricing.company_id).filter_by(
-                is_active=True
-            ).distinct().all()
-            
-            company_ids = [c[0] for c in companies_with_custom]
-            companies = Company.query.filter(Company.id.in_(company_ids)).all()
-        except:
-            # If CompanyModulePricing table doesn't exist, return empty list
-            return []
-        
-        for company in companies:
-            # Calculate default cost
-            default_cost = 0.0  # Use float
-            custom_cost = 0.0   # Use float
-            
-            enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-            ).filter(
-                CompanyModule.company_id == company.id,
-                CompanyModule.is_enabled == True
-            ).all()
-            
-            for company_module, module_def in enabled_modules:
-                module_price = float(module_def.monthly_price or 0)
-                default_cost += module_price
-                
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company.id,
-                        module_id=module_def.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        custom_cost += float(custom_pricing.custom_price or 0)
-                    else:
-                        custom_cost += module_price
-                except:
-                    custom_cost += module_price
-            
-            companies_data.append({
-                'company': company,
-                'default_cost': default_cost,  # Already float
-                'custom_cost': custom_cost     # Already float
-            })
-        
-        return companies_data
-        
-    except Exception as e:
-        print(f"Error getting companies with custom pricing: {str(e)}")
-        return []
-
-
-def calculate_company_default_cost(company_id):
-    """Calculate what the company cost would be without custom pricing"""
-    try:
-        total_cost = 0
-        
-        # Get all enabled modules for the company
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
-        
-        for company_module, module_def in enabled_modules:
-            total_cost += float(module_def.monthly_price or 0)
-        
-        return total_cost
-        
-    except Exception as e:
-        print(f"Error calculating company default cost: {str(e)}")
-        return 0
-
-
 @app.route('/admin/billing/modules/add', methods=['POST'])
 @login_required
 @super_admin_required
@@ -5782,60 +5251,23 @@ def billing_dashboard():
         }
         
         # Get active companies and their monthly costs
-        active_companies = Company.query.filter_by(is_active=True).all()
-        billing_stats['active_companies'] = len(active_companies)
-        
-        total_revenue = 0.0  # Use float instead of Decimal
-        for company in active_companies:
-            # Calculate each company's monthly cost
-            enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-            ).filter(
-                CompanyModule.company_id == company.id,
-                CompanyModule.is_enabled == True
-            ).all()
-            
-            for company_module, module_def in enabled_modules:
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company.id,
-                        module_id=module_def.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        total_revenue += float(custom_pricing.custom_price or 0)
-                    else:
-                        total_revenue += float(module_def.monthly_price or 0)
-                except:
-                    # If CompanyModulePricing table doesn't exist, just use default price
-                    total_revenue += float(module_def.monthly_price or 0)
+        active_companies = Company.query.filter_by(is_active=True).count()
+        billing_stats['active_companies'] = active_companies
         
-        billing_stats['total_monthly_revenue'] = total_revenue
-        
-        # Count custom pricing entries (if table exists)
-        try:
-            custom_pricing_count = CompanyModulePricing.query.filter_by(is_active=True).count()
-            billing_stats['custom_pricing_count'] = custom_pricing_count
-        except:
-            billing_stats['custom_pricing_count'] = 0
+        # Company x module prices in three bulk queries
+        matrix = RevenueMatrixService.load()
+        billing_stats['total_monthly_revenue'] = matrix.total_revenue()
+        billing_stats['custom_pricing_count'] = matrix.custom_pricing_count
         
         # Get recent bills (mock data for now since MonthlyBill might not exist)
         recent_bills = []
         billing_stats['pending_bills'] = 0
         
-        # Module revenue breakdown - convert all Decimal to float
-        module_revenue = calculate_module_revenue_breakdown()
-        if module_revenue and 'data' in module_revenue:
-            # Ensure all values are float, not Decimal
-            module_revenue['data'] = [float(x) for x in module_revenue['data']]
+        # Module revenue breakdown
+        module_revenue = calculate_module_revenue_breakdown(matrix)
         
-        # Companies with custom pricing - convert all Decimal to float
-        custom_pricing_companies = get_companies_with_custom_pricing()
-        for company_data in custom_pricing_companies:
-            company_data['default_cost'] = float(company_data['default_cost'])
-            company_data['custom_cost'] = float(company_data['custom_cost'])
+        # Companies with custom pricing
+        custom_pricing_companies = get_companies_with_custom_pricing(matrix)
         
         # Calculate some additional stats
         try:
@@ -5896,35 +5328,27 @@ def process_generate_bill():
         
         company = Company.query.get_or_404(company_id)
         
-        # Calculate the bill amount
-        total_amount = 0
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
+        success, message = BillingService.generate_monthly_bill(
+            company.id, bill_year, bill_month, session['user_id']
+        )
+        if not success:
+            return jsonify({
+                'success': False,
+                'message': message
+            }), 400
         
-        for company_module, module_def in enabled_modules:
-            try:
-                custom_pricing = CompanyModulePricing.query.filter_by(
-                    company_id=company_id,
-                    module_id=module_def.id,
-                    is_active=True
-                ).first()
-                
-                if custom_pricing:
-                    total_amount += float(custom_pricing.custom_price or 0)
-                else:
-                    total_amount += float(module_def.monthly_price or 0)
-            except:
-                total_amount += float(module_def.monthly_price or 0)
+        bill = MonthlyBill.query.filter_by(
+            company_id=company.id,
+            bill_year=bill_year,
+            bill_month=bill_month
+        ).first()
+        total_amount = float(bill.total_amount)
         
-        # For now, just return success (you can implement actual bill creation later)
         return jsonify({
             'success': True,
             'message': f'Bill generated for {company.name} for {bill_month:02d}/{bill_year}. Total: R{total_amount:.2f}',
-            'total_amount': total_amount
+            'total_amount': total_amount,
+            'bill_id': bill.id
         })
         
     except Exception as e:
@@ -5944,39 +5368,10 @@ def manage_modules():
         modules = ModuleDefinition.query.order_by(ModuleDefinition.sort_order, ModuleDefinition.display_name).all()
         
         # Add usage statistics to each module
+        matrix = RevenueMatrixService.load()
         for module in modules:
-            try:
-                module.usage_count = CompanyModule.query.filter_by(
-                    module_id=module.id, 
-                    is_enabled=True
-                ).count()
-                
-                # Calculate monthly revenue for this module
-                total_revenue = 0
-                company_modules = CompanyModule.query.filter_by(
-                    module_id=module.id,
-                    is_enabled=True
-                ).all()
-                
-                for cm in company_modules:
-                    try:
-                        custom_pricing = CompanyModulePricing.query.filter_by(
-                            company_id=cm.company_id,
-                            module_id=module.id,
-                            is_active=True
-                        ).first()
-                        
-                        if custom_pricing:
-                            total_revenue += float(custom_pricing.custom_price or 0)
-                        else:
-                            total_revenue += float(module.monthly_price or 0)
-                    except:
-                        total_revenue += float(module.monthly_price or 0)
-                
-                module.monthly_revenue = total_revenue
-            except:
-                module.usage_count = 0
-                module.monthly_revenue = 0
+            module.usage_count = matrix.module_usage_count(module.id)
+            module.monthly_revenue = matrix.module_revenue(module.id)
         
         return render_template('billing/manage_modules.html', modules=modules)
         
@@ -6006,21 +5401,16 @@ def view_module_usage(module_id):
             'companies': []
         }
         
+        matrix = RevenueMatrixService.load(module_ids=[module_id])
+        
         for company_module, company in company_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company.id,
-                module_id=module_id,
-                is_active=True
-            ).first()
-            
-            price = float(custom_pricing.custom_price) if custom_pricing else float(module.monthly_price or 0)
+            price = matrix.price(company.id, module_id) or 0.0
             usage_stats['total_revenue'] += price
             
             usage_stats['companies'].append({
                 'name': company.name,
                 'price': price,
-                'is_custom_pricing': bool(custom_pricing),
+                'is_custom_pricing': matrix.is_custom(company.id, module_id),
                 'enabled_date': company_module.enabled_at
             })
         
@@ -6041,51 +5431,18 @@ def billing_pricing():
     """Company pricing overview page - accessible via url_for('billing_pricing')"""
     try:
         companies = Company.query.filter_by(is_active=True).all()
+        matrix = RevenueMatrixService.load()
         pricing_data = []
         
         for company in companies:
-            # Calculate default cost (without custom pricing)
-            default_cost = 0
-            custom_cost = 0
-            
-            enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-            ).filter(
-                CompanyModule.company_id == company.id,
-                CompanyModule.is_enabled == True
-            ).all()
-            
-            has_custom = False
-            custom_modules_count = 0
-            
-            for company_module, module_def in enabled_modules:
-                module_price = float(module_def.monthly_price or 0)
-                default_cost += module_price
-                
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company.id,
-                        module_id=module_def.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        custom_cost += float(custom_pricing.custom_price or 0)
-                        has_custom = True
-                        custom_modules_count += 1
-                    else:
-                        custom_cost += module_price
-                except:
-                    custom_cost += module_price
-            
+            summary = matrix.company_summary(company.id)
             pricing_data.append({
                 'company': company,
-                'default_cost': default_cost,
-                'custom_cost': custom_cost,
-                'has_custom_pricing': has_custom,
-                'difference': custom_cost - default_cost,
-                'custom_modules_count': custom_modules_count
+                'default_cost': summary['default_cost'],
+                'custom_cost': summary['custom_cost'],
+                'has_custom_pricing': summary['has_custom_pricing'],
+                'difference': summary['difference'],
+                'custom_modules_count': summary['custom_modules_count']
             })
         
         return render_template('billing/pricing.html', pricing_data=pricing_data)
@@ -6095,120 +5452,6 @@ def billing_pricing():
         flash('Error loading pricing data', 'error')
         return redirect(url_for('billing_dashboard'))
 
-# Utility functions for billing
-def calculate_module_revenue_breakdown():
-    """Calculate revenue breakdown by module"""
-    try:
-        module_revenue = {}
-        
-        # Get all active modules
-        modules = ModuleDefinition.query.filter_by(is_active=True).all()
-        
-        for module in modules:
-            total_revenue = 0
-            
-            # Get all companies using this module
-            company_modules = CompanyModule.query.filter_by(
-                module_id=module.id,
-                is_enabled=True
-            ).all()
-            
-            for company_module in company_modules:
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company_module.company_id,
-                        module_id=module.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        total_revenue += float(custom_pricing.custom_price or 0)
-                    else:
-                        total_revenue += float(module.monthly_price or 0)
-                except:
-                    total_revenue += float(module.monthly_price or 0)
-            
-            if total_revenue > 0:
-                module_revenue[module.display_name] = total_revenue
-        
-        # Format for Chart.js
-        if module_revenue:
-            return {
-                'labels': list(module_revenue.keys()),
-                'data': list(module_revenue.values())
-            }
-        else:
-            return {
-                'labels': ['No Revenue Data'],
-                'data': [0]
-            }
-            
-    except Exception as e:
-        print(f"Error calculating module revenue breakdown: {str(e)}")
-        return {'labels': ['Error'], 'data': [0]}
-
-def get_companies_with_custom_pricing():
-    """Get companies that have custom pricing"""
-    try:
-        companies_data = []
-        
-        # Get companies with custom pricing (if table exists)
-        try:
-            companies_with_custom = db.session.query(CompanyModulePricing.company_id).filter_by(
-                is_active=True
-            ).distinct().all()
-            
-            company_ids = [c[0] for c in companies_with_custom]
-            companies = Company.query.filter(Company.id.in_(company_ids)).all()
-        except:
-            # If CompanyModulePricing table doesn't exist, return empty list
-            return []
-        
-        for company in companies:
-            # Calculate default cost
-            default_cost = 0
-            custom_cost = 0
-            
-            enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-            ).filter(
-                CompanyModule.company_id == company.id,
-                CompanyModule.is_enabled == True
-            ).all()
-            
-            for company_module, module_def in enabled_modules:
-                module_price = float(module_def.monthly_price or 0)
-                default_cost += module_price
-                
-                # Check for custom pricing
-                try:
-                    custom_pricing = CompanyModulePricing.query.filter_by(
-                        company_id=company.id,
-                        module_id=module_def.id,
-                        is_active=True
-                    ).first()
-                    
-                    if custom_pricing:
-                        custom_cost += float(custom_pricing.custom_price or 0)
-                    else:
-                        custom_cost += module_price
-                except:
-                    custom_cost += module_price
-            
-            companies_data.append({
-                'company': company,
-                'default_cost': default_cost,
-                'custom_cost': custom_cost
-            })
-        
-        return companies_data
-        
-    except Exception as e:
-        print(f"Error getting companies with custom pricing: {str(e)}")
-        return []
-
-
 # ===== BILL MANAGEMENT =====
 @app.route('/admin/billing/bills')
 @login_required
@@ -6273,30 +5516,7 @@ def billing_bills():
 def calculate_company_monthly_cost(company_id):
     """Calculate the total monthly cost for a company including custom pricing"""
     try:
-        total_cost = 0
-        
-        # Get all enabled modules for the company
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
-        
-        for company_module, module_def in enabled_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_id,
-                module_id=module_def.id,
-                is_active=True
-            ).first()
-            
-            if custom_pricing:
-                total_cost += custom_pricing.custom_price
-            else:
-                total_cost += module_def.monthly_price or 0
-        
-        return total_cost
+        return RevenueMatrixService.load(company_ids=[company_id]).company_total(company_id)
         
     except Exception as e:
         app.logger.error(f"Error calculating company monthly cost: {str(e)}")
@@ -6305,37 +5525,21 @@ def calculate_company_monthly_cost(company_id):
 def calculate_company_default_cost(company_id):
     """Calculate what the company cost would be without custom pricing"""
     try:
-        total_cost = 0
-        
-        # Get all enabled modules for the company
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
-        
-        for company_module, module_def in enabled_modules:
-            total_cost += module_def.monthly_price or 0
-        
-        return total_cost
+        return RevenueMatrixService.load(company_ids=[company_id]).company_default_total(company_id)
         
     except Exception as e:
         app.logger.error(f"Error calculating company default cost: {str(e)}")
         return 0
 
-def calculate_module_revenue_breakdown():
+def calculate_module_revenue_breakdown(matrix=None):
     """Calculate revenue breakdown by module"""
     try:
-        module_revenue = {}
-        
-        # Get all active modules
-        modules = ModuleDefinition.query.filter_by(is_active=True).all()
-        
-        for module in modules:
-            revenue = calculate_module_monthly_revenue(module.id)
-            if revenue > 0:
-                module_revenue[module.display_name] = revenue
+        matrix = matrix or RevenueMatrixService.load()
+        module_revenue = {
+            stat['module'].display_name: stat['revenue']
+            for stat in matrix.module_stats()
+            if stat['revenue'] > 0
+        }
         
         # Format for Chart.js
         if module_revenue:
@@ -6353,58 +5557,30 @@ def calculate_module_revenue_breakdown():
 def calculate_module_monthly_revenue(module_id):
     """Calculate monthly revenue for a specific module"""
     try:
-        total_revenue = 0
-        
-        # Get all companies using this module
-        company_modules = CompanyModule.query.filter_by(
-            module_id=module_id,
-            is_enabled=True
-        ).all()
-        
-        for company_module in company_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_module.company_id,
-                module_id=module_id,
-                is_active=True
-            ).first()
-            
-            if custom_pricing:
-                total_revenue += custom_pricing.custom_price
-            else:
-                module_def = ModuleDefinition.query.get(module_id)
-                total_revenue += module_def.monthly_price or 0
-        
-        return total_revenue
+        return RevenueMatrixService.load(module_ids=[module_id]).module_revenue(module_id)
         
     except Exception as e:
         app.logger.error(f"Error calculating module monthly revenue: {str(e)}")
         return 0
 
-def get_companies_with_custom_pricing():
+def get_companies_with_custom_pricing(matrix=None):
     """Get companies that have custom pricing"""
     try:
-        companies_data = []
-        
-        # Get companies with custom pricing
-        companies_with_custom = db.session.query(CompanyModulePricing.company_id).filter_by(
-            is_active=True
-        ).distinct().all()
+        matrix = matrix or RevenueMatrixService.load()
+        company_ids = list(matrix.custom_pricing_counts)
+        if not company_ids:
+            return []
         
-        company_ids = [c[0] for c in companies_with_custom]
         companies = Company.query.filter(Company.id.in_(company_ids)).all()
         
-        for company in companies:
-            default_cost = calculate_company_default_cost(company.id)
-            custom_cost = calculate_company_monthly_cost(company.id)
-            
-            companies_data.append({
+        return [
+            {
                 'company': company,
-                'default_cost': default_cost,
-                'custom_cost': custom_cost
-            })
-        
-        return companies_data
+                'default_cost': matrix.company_default_total(company.id),
+                'custom_cost': matrix.company_total(company.id)
+            }
+            for company in companies
+        ]
         
     except Exception as e:
         app.logger.error(f"Error getting companies with custom pricing: {str(e)}")
@@ -6564,136 +5740,45 @@ def billing_reports():
         companies = Company.query.filter_by(is_active=True).all()
         total_companies = len(companies)
         
+        # Company x module prices in three bulk queries
+        matrix = RevenueMatrixService.load()
+        
         # Calculate total revenue
-        total_revenue = 0
-        for company in companies:
-            # Calculate each company's monthly cost
-            try:
-                enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                    ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-                ).filter(
-                    CompanyModule.company_id == company.id,
-                    CompanyModule.is_enabled == True
-                ).all()
-                
-                for company_module, module_def in enabled_modules:
-                    try:
-                        # Check for custom pricing
-                        custom_pricing = CompanyModulePricing.query.filter_by(
-                            company_id=company.id,
-                            module_id=module_def.id,
-                            is_active=True
-                        ).first()
-                        
-                        if custom_pricing:
-                            total_revenue += float(custom_pricing.custom_price or 0)
-                        else:
-                            total_revenue += float(module_def.monthly_price or 0)
-                    except:
-                        # Fallback if CompanyModulePricing doesn't exist
-                        total_revenue += float(module_def.monthly_price or 0)
-            except Exception as e:
-                print(f"Error calculating revenue for company {company.name}: {e}")
-                continue
+        total_revenue = matrix.total_revenue()
         
-        # Monthly revenue trend (last 12 months)
-        monthly_revenue = []
-        for i in range(12):
-            date = datetime.now() - timedelta(days=30*i)
-            # For simplicity, use current total revenue for each month
-            # In a real system, you'd query historical data
-            monthly_revenue.append({
-                'month': date.strftime('%b %Y'),
-                'revenue': total_revenue + (i * 500)  # Add some variation
-            })
-        monthly_revenue.reverse()
+        # Monthly revenue trend (last 12 months) from the revenue history
+        current_period = RevenueSnapshotService.month_start(datetime.now())
+        monthly_revenue = RevenueSnapshotService.trend(
+            RevenueSnapshotService.add_months(current_period, -11), current_period
+        )
+        if not monthly_revenue[-1]['has_history']:
+            # Tonight's snapshot has not run yet this month
+            monthly_revenue[-1]['revenue'] = total_revenue
         
         # Module usage statistics
-        module_stats = []
-        try:
-            modules = ModuleDefinition.query.filter_by(is_active=True).all()
-            for module in modules:
-                usage_count = CompanyModule.query.filter_by(
-                    module_id=module.id,
-                    is_enabled=True
-                ).count()
-                
-                # Calculate revenue for this module
-                module_revenue = 0
-                company_modules = CompanyModule.query.filter_by(
-                    module_id=module.id,
-                    is_enabled=True
-                ).all()
-                
-                for cm in company_modules:
-                    try:
-                        custom_pricing = CompanyModulePricing.query.filter_by(
-                            company_id=cm.company_id,
-                            module_id=module.id,
-                            is_active=True
-                        ).first()
-                        
-                        if custom_pricing:
-                            module_revenue += float(custom_pricing.custom_price or 0)
-                        else:
-                            module_revenue += float(module.monthly_price or 0)
-                    except:
-                        module_revenue += float(module.monthly_price or 0)
-                
-                module_stats.append({
-                    'name': module.display_name,
-                    'usage_count': usage_count,
-                    'revenue': module_revenue,
-                    'category': module.category,
-                    'price': float(module.monthly_price or 0)
-                })
-        except Exception as e:
-            print(f"Error getting module stats: {e}")
-            module_stats = []
+        module_stats = [
+            {
+                'name': stat['module'].display_name,
+                'usage_count': stat['usage_count'],
+                'revenue': stat['revenue'],
+                'category': stat['module'].category,
+                'price': float(stat['module'].monthly_price or 0)
+            }
+            for stat in matrix.module_stats()
+        ]
         
         # Company breakdown (top companies by revenue)
         company_breakdown = []
-        try:
-            for company in companies:
-                company_cost = 0
-                module_count = 0
-                
-                try:
-                    enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-                        ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-                    ).filter(
-                        CompanyModule.company_id == company.id,
-                        CompanyModule.is_enabled == True
-                    ).all()
-                    
-                    module_count = len(enabled_modules)
-                    
-                    for company_module, module_def in enabled_modules:
-                        try:
-                            custom_pricing = CompanyModulePricing.query.filter_by(
-                                company_id=company.id,
-                                module_id=module_def.id,
-                                is_active=True
-                            ).first()
-                            
-                            if custom_pricing:
-                                company_cost += float(custom_pricing.custom_price or 0)
-                            else:
-                                company_cost += float(module_def.monthly_price or 0)
-                        except:
-                            company_cost += float(module_def.monthly_price or 0)
-                except Exception as e:
-                    print(f"Error calculating cost for company {company.name}: {e}")
-                
-                if company_cost > 0 or module_count > 0:  # Only include companies with data
-                    company_breakdown.append({
-                        'name': company.name,
-                        'monthly_cost': company_cost,
-                        'module_count': module_count
-                    })
-        except Exception as e:
-            print(f"Error getting company breakdown: {e}")
-            company_breakdown = []
+        for company in companies:
+            company_cost = matrix.company_total(company.id)
+            module_count = matrix.company_module_count(company.id)
+            
+            if company_cost > 0 or module_count > 0:  # Only include companies with data
+                company_breakdown.append({
+                    'name': company.name,
+                    'monthly_cost': company_cost,
+                    'module_count': module_count
+                })
         
         # Sort company breakdown by revenue (highest first)
         company_breakdown.sort(key=lambda x: x['monthly_cost'], reverse=True)
@@ -6705,164 +5790,72 @@ def billing_reports():
         print(f"Reports data: {total_companies} companies, {len(module_stats)} modules, R{total_revenue:.2f} revenue")
         
         return render_template('billing/reports.html',
-                             monthly_revenue=monthly_revenue,
-                             module_stats=module_stats,
-                             company_breakdown=company_breakdown,
-                             total_revenue=total_revenue,
-                             total_companies=total_companies,
-                             active_modules_count=active_modules_count,
-                             avg_revenue_per_company=avg_revenue_per_company)
-        
-    except Exception as e:
-        print(f"Error in billing reports: {str(e)}")
-        import traceback
-        traceback.print_exc()
-        flash('Error loading billing reports', 'error')
-        return redirect(url_for('billing_dashboard'))
-
-@app.route('/admin/billing/export-report')
-@login_required
-@super_admin_required
-def export_billing_report():
-    """Export billing report to Excel"""
-    try:
-        output = io.BytesIO()
-        workbook = xlsxwriter.Workbook(output)
-        
-        # Billing Summary Sheet
-        summary_sheet = workbook.add_worksheet('Billing Summary')
-        
-        # Formats
-        header_format = workbook.add_format({
-            'bold': True,
-            'font_color': 'white',
-            'bg_color': '#366092',
-            'border': 1
-        })
-        
-        cell_format = workbook.add_format({
-            'border': 1
-        })
-        
-        # Summary headers
-        summary_headers = ['Company', 'Active Modules', 'Monthly Cost', 'Has Custom Pricing']
-        for col, header in enumerate(summary_headers):
-            summary_sheet.write(0, col, header, header_format)
-        
-        # Summary data
-        companies = Company.query.filter_by(is_active=True).all()
-        for row, company in enumerate(companies, 1):
-            monthly_cost = calculate_company_monthly_cost(company.id)
-            module_count = CompanyModule.query.filter_by(
-                company_id=company.id, 
-                is_enabled=True
-            ).count()
-            has_custom = CompanyModulePricing.query.filter_by(
-                company_id=company.id, 
-                is_active=True
-            ).first() is not None
-            
-            summary_sheet.write(row, 0, company.name, cell_format)
-            summary_sheet.write(row, 1, module_count, cell_format)
-            summary_sheet.write(row, 2, f'R {monthly_cost:.2f}', cell_format)
-            summary_sheet.write(row, 3, 'Yes' if has_custom else 'No', cell_format)
-        
-        # Module Revenue Sheet
-        module_sheet = workbook.add_worksheet('Module Revenue')
-        
-        module_headers = ['Module Name', 'Category', 'Base Price', 'Usage Count', 'Total Revenue']
-        for col, header in enumerate(module_headers):
-            module_sheet.write(0, col, header, header_format)
-        
-        modules = ModuleDefinition.query.filter_by(is_active=True).all()
-        for row, module in enumerate(modules, 1):
-            usage_count = CompanyModule.query.filter_by(
-                module_id=module.id,
-                is_enabled=True
-            ).count()
-            
-            # Calculate total revenue
-            total_revenue = 0
-            company_modules = CompanyModule.query.filter_by(
-                module_id=module.id,
-                is_enabled=True
-            ).all()
-            
-            for cm in company_modules:
-                custom_pricing = CompanyModulePricing.query.filter_by(
-                    company_id=cm.company_id,
-                    module_id=module.id,
-                    is_active=True
-                ).first()
-                
-                if custom_pricing:
-                    total_revenue += float(custom_pricing.custom_price or 0)
-                else:
-                    total_revenue += float(module.monthly_price or 0)
-            
-            module_sheet.write(row, 0, module.display_name, cell_format)
-            module_sheet.write(row, 1, module.category.title(), cell_format)
-            module_sheet.write(row, 2, f'R {float(module.monthly_price or 0):.2f}', cell_format)
-            module_sheet.write(row, 3, usage_count, cell_format)
-            module_sheet.write(row, 4, f'R {total_revenue:.2f}', cell_format)
-        
-        # Adjust column widths
-        summary_sheet.set_column('A:A', 25)  # Company name
-        summary_sheet.set_column('B:B', 15)  # Module count
-        summary_sheet.set_column('C:C', 15)  # Monthly cost
-        summary_sheet.set_column('D:D', 18)  # Has custom pricing
-        
-        module_sheet.set_column('A:A', 25)   # Module name
-        module_sheet.set_column('B:B', 12)   # Category
-        module_sheet.set_column('C:C', 12)   # Base price
-        module_sheet.set_column('D:D', 12)   # Usage count
-        module_sheet.set_column('E:E', 15)   # Total revenue
-        
-        workbook.close()
-        output.seek(0)
-        
-        response = make_response(output.getvalue())
-        response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        response.headers['Content-Disposition'] = f'attachment; filename="Billing_Report_{datetime.now().strftime("%Y%m%d")}.xlsx"'
-        return response
+                             monthly_revenue=monthly_revenue,
+                             module_stats=module_stats,
+                             company_breakdown=company_breakdown,
+                             total_revenue=total_revenue,
+                             total_companies=total_companies,
+                             active_modules_count=active_modules_count,
+                             avg_revenue_per_company=avg_revenue_per_company)
         
     except Exception as e:
-        print(f"Error exporting billing report: {str(e)}")
-        flash('Error exporting report', 'error')
+        print(f"Error in billing reports: {str(e)}")
+        import traceback
+        traceback.print_exc()
+        flash('Error loading billing reports', 'error')
         return redirect(url_for('billing_dashboard'))
 
-# Helper function to calculate company monthly cost (if not already defined)
-def calculate_company_monthly_cost(company_id):
-    """Calculate the total monthly cost for a company including custom pricing"""
+@app.route('/admin/billing/reports/revenue-trend')
+@login_required
+@super_admin_required
+def billing_revenue_trend():
+    """Revenue history as JSON: ?start=YYYY-MM&end=YYYY-MM&breakdown=module|company|cohort"""
     try:
-        total_cost = 0
-        
-        # Get all enabled modules for the company
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(
-            ModuleDefinition, CompanyModule.module_id == ModuleDefinition.id
-        ).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
+        current_period = RevenueSnapshotService.month_start(datetime.now())
+        try:
+            end = datetime.strptime(request.args['end'], '%Y-%m').date() if request.args.get('end') else current_period
+            start = (datetime.strptime(request.args['start'], '%Y-%m').date() if request.args.get('start')
+                     else RevenueSnapshotService.add_months(end, -11))
+        except ValueError:
+            return jsonify({'success': False, 'message': 'start and end must be months in YYYY-MM format'}), 400
+        company_ids = request.args.getlist('company_id', type=int) or None
+        module_ids = request.args.getlist('module_id', type=int) or None
+        
+        if start > end:
+            return jsonify({'success': False, 'message': 'start must not be after end'}), 400
+        
+        trend = RevenueSnapshotService.month_over_month(start, end, company_ids, module_ids)
+        data = {
+            'success': True,
+            'trend': [dict(row, period=row['period'].isoformat()) for row in trend]
+        }
         
-        for company_module, module_def in enabled_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_id,
-                module_id=module_def.id,
-                is_active=True
-            ).first()
-            
-            if custom_pricing:
-                total_cost += float(custom_pricing.custom_price or 0)
-            else:
-                total_cost += float(module_def.monthly_price or 0)
+        breakdown_by = request.args.get('breakdown')
+        if breakdown_by:
+            breakdown = RevenueSnapshotService.breakdown(start, end, breakdown_by, company_ids, module_ids)
+            data['breakdown'] = {
+                'by': breakdown_by,
+                'periods': [period.isoformat() for period in breakdown['periods']],
+                'series': [
+                    dict(entry, key=entry['key'].isoformat() if hasattr(entry['key'], 'isoformat') else entry['key'])
+                    for entry in breakdown['series']
+                ]
+            }
         
-        return total_cost
+        return jsonify(data)
         
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
     except Exception as e:
-        print(f"Error calculating company monthly cost: {str(e)}")
-        return 0
+        print(f"Error loading revenue trend: {str(e)}")
+        return jsonify({'success': False, 'message': 'Error loading revenue trend'}), 500
+
+@app.route('/admin/billing/export-report')
+@login_required
+@super_admin_required
+def export_billing_report():
+    """Export billing report to Excel (rendered in the background)"""
+    return queue_export('billing_report', {'format': 'excel'}, fallback_url=url_for('billing_dashboard'))
 
 # Test route to initialize some sample billing data
 @app.route('/admin/billing/init-sample-data')
@@ -7793,11 +6786,16 @@ def get_notifications():
             logger.error("No company_id in session")
             return jsonify({'notifications': []})
         
-        # Get unprocessed notifications for this company
-        notifications = TenderNotification.query.filter_by(
-            company_id=company_id,
-            is_processed=False
-        ).order_by(TenderNotification.created_at.desc()).limit(20).all()
+        # Get unprocessed notifications for this company, newest first from the cursor
+        limit = min(request.args.get('limit', 20, type=int), 100)
+        page = PaginationService.seek(
+            TenderNotification.query.filter_by(company_id=company_id, is_processed=False).options(
+                joinedload(TenderNotification.tender)
+            ),
+            TenderNotification.created_at, TenderNotification.id,
+            cursor=request.args.get('cursor'), limit=limit
+        )
+        notifications = page['items']
         
         logger.info(f"Found {len(notifications)} notifications for company {company_id}")
         
@@ -7838,7 +6836,11 @@ def get_notifications():
                     'error': 'Error loading details'
                 })
         
-        return jsonify({'notifications': notification_data})
+        return jsonify({
+            'notifications': notification_data,
+            'next_cursor': page['next_cursor'],
+            'prev_cursor': page['prev_cursor']
+        })
         
     except Exception as e:
         logger.error(f"Error getting notifications: {str(e)}", exc_info=True)
@@ -8012,59 +7014,18 @@ def process_all_notifications():
         return jsonify({'success': False, 'error': f'Database error: {str(e)}'})
 
 # Helper function to create notifications for tenders approaching deadline
-def create_notifications_for_company(company_id, notification_days=7):
-    """Create notifications for tenders approaching submission deadline"""
-    try:
-        today = datetime.now()
-        cutoff_datetime = today + timedelta(days=notification_days)
-        
-        # Find tenders approaching submission deadline
-        tenders_approaching = Tender.query.filter(
-            Tender.submission_deadline.isnot(None),
-            Tender.submission_deadline >= today,
-            Tender.submission_deadline <= cutoff_datetime,
-            ~Tender.status_id.in_([3, 6])  # Not closed or cancelled
-        ).all()
-        
-        # Get existing notifications for these tenders
-        existing_tender_ids = set()
-        if tenders_approaching:
-            existing_notifications = TenderNotification.query.filter(
-                TenderNotification.company_id == company_id,
-                TenderNotification.tender_id.in_([t.id for t in tenders_approaching])
-            ).all()
-            existing_tender_ids = {n.tender_id for n in existing_notifications}
-        
-        # Create notifications for tenders without them
-        new_count = 0
-        for tender in tenders_approaching:
-            if tender.id not in existing_tender_ids:
-                days_remaining = (tender.submission_deadline.date() - today.date()).days
-                
-                notification = TenderNotification(
-                    tender_id=tender.id,
-                    company_id=company_id,
-                    notification_type='deadline_approaching',
-                    message=f"Tender '{tender.title}' submission deadline in {days_remaining} day{'s' if days_remaining != 1 else ''}",
-                    days_remaining=days_remaining,
-                    is_read=False,
-                    is_processed=False,
-                    created_at=datetime.utcnow()
-                )
-                
-                db.session.add(notification)
-                new_count += 1
-        
-        if new_count > 0:
-            db.session.commit()
-            logger.info(f"Created {new_count} new notifications for company {company_id}")
-        
-        return new_count
-        
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error creating notifications: {str(e)}", exc_info=True)
-        return 0
+def create_notifications_for_company(company_id, notification_days=None):
+    """Create notifications for the company's tenders approaching submission deadline"""
+    success, new_count, message = DeadlineNotificationService.generate(
+        company_ids=[company_id], notification_days=notification_days
+    )
+    
+    if not success:
+        logger.error(f"Error creating notifications: {message}")
+    elif new_count > 0:
+        logger.info(f"Created {new_count} new notifications for company {company_id}")
+    
+    return new_count
 
 @app.route('/notifications/create-for-deadlines', methods=['POST'])
 @login_required
@@ -8134,50 +7095,10 @@ def company_notification_settings(company_id):
 def manual_generate_notifications():
     """Manually trigger notification generation (for testing)"""
     try:
-        generated_count = 0
-        
-        # Get all active companies
-        companies = Company.query.filter_by(is_active=True).all()
-        
-        for company in companies:
-            # Get company notification days setting
-            settings = CompanySettings.query.filter_by(company_id=company.id).first()
-            notification_days = settings.notification_days if settings else 7
-            
-            # Calculate cutoff date
-            cutoff_date = datetime.now() + timedelta(days=notification_days)
-            
-            # Find tenders approaching deadline (not closed/cancelled)
-            approaching_tenders = Tender.query.filter(
-                Tender.company_id == company.id,
-                Tender.submission_deadline <= cutoff_date,
-                Tender.submission_deadline >= datetime.now(),
-                ~Tender.status_id.in_([3, 6])  # Not closed or cancelled
-            ).all()
-            
-            for tender in approaching_tenders:
-                # Check if notification already exists
-                existing = TenderNotification.query.filter_by(
-                    tender_id=tender.id,
-                    company_id=company.id,
-                    notification_type='deadline_approaching'
-                ).first()
-                
-                if not existing:
-                    days_remaining = (tender.submission_deadline - datetime.now()).days
-                    
-                    # Create notification
-                    notification = TenderNotification(
-                        tender_id=tender.id,
-                        company_id=company.id,
-                        notification_type='deadline_approaching',
-                        message=f"Tender '{tender.title}' (#{tender.reference_number}) deadline in {days_remaining} days",
-                        days_remaining=days_remaining
-                    )
-                    db.session.add(notification)
-                    generated_count += 1
-        
-        db.session.commit()
+        # Every active company's tenders inside its notification window, in one pass
+        success, generated_count, message = DeadlineNotificationService.generate()
+        if not success:
+            raise Exception(message)
         
         flash(f'Generated {generated_count} notifications successfully.', 'success')
         return redirect(url_for('admin_companies'))
@@ -8194,68 +7115,9 @@ def manual_generate_notifications():
 
 # Add this function to your app.py file
 
-def create_notifications_for_company_tenders(company_id, notification_days=7):
+def create_notifications_for_company_tenders(company_id, notification_days=None):
     """Create notifications for tenders owned by the company approaching submission deadline"""
-    try:
-        today = datetime.now()
-        cutoff_datetime = today + timedelta(days=notification_days)
-        
-        logger.info(f"Creating notifications for company {company_id}, checking tenders until {cutoff_datetime}")
-        
-        # Find company's own tenders approaching deadline
-        company_tenders = Tender.query.filter(
-            Tender.company_id == company_id,  # Only company's own tenders
-            Tender.submission_deadline.isnot(None),
-            Tender.submission_deadline >= today,
-            Tender.submission_deadline <= cutoff_datetime,
-            ~Tender.status_id.in_([3, 6])  # Not closed or cancelled
-        ).all()
-        
-        logger.info(f"Found {len(company_tenders)} tenders approaching deadline for company {company_id}")
-        
-        # Check which ones already have notifications
-        existing_tender_ids = set()
-        if company_tenders:
-            existing_notifications = TenderNotification.query.filter(
-                TenderNotification.company_id == company_id,
-                TenderNotification.tender_id.in_([t.id for t in company_tenders])
-            ).all()
-            existing_tender_ids = {n.tender_id for n in existing_notifications}
-            logger.info(f"Found {len(existing_notifications)} existing notifications for company {company_id}")
-        
-        # Create notifications for tenders without them
-        new_count = 0
-        for tender in company_tenders:
-            if tender.id not in existing_tender_ids:
-                days_remaining = (tender.submission_deadline.date() - today.date()).days
-                
-                notification = TenderNotification(
-                    tender_id=tender.id,
-                    company_id=company_id,
-                    notification_type='deadline_approaching',
-                    message=f"Tender '{tender.title}' submission deadline in {days_remaining} day{'s' if days_remaining != 1 else ''}",
-                    days_remaining=days_remaining,
-                    is_read=False,
-                    is_processed=False,
-                    created_at=datetime.utcnow()
-                )
-                
-                db.session.add(notification)
-                new_count += 1
-                logger.info(f"Created notification for tender {tender.id} ({tender.title}) - {days_remaining} days remaining")
-        
-        if new_count > 0:
-            db.session.commit()
-            logger.info(f"Successfully created {new_count} notifications for company {company_id}")
-        else:
-            logger.info(f"No new notifications needed for company {company_id}")
-        
-        return new_count
-        
-    except Exception as e:
-        db.session.rollback()
-        logger.error(f"Error creating notifications for company {company_id}: {str(e)}", exc_info=True)
-        return 0
+    return create_notifications_for_company(company_id, notification_days)
     
 # Also update your auto_generate_notifications function to use the correct function name:
 def auto_generate_notifications_main():
@@ -8264,42 +7126,25 @@ def auto_generate_notifications_main():
     start_time = datetime.now()
     
     # Log job start
-    log_job_execution(job_id, 'running')
+    run_id = log_job_execution(job_id, 'running')
     
     try:
         logger.info(f"Starting daily notification generation at {start_time}")
         
-        # Get all active companies
-        companies = Company.query.filter_by(is_active=True).all()
-        
-        total_created = 0
-        total_companies = len(companies)
-        
-        logger.info(f"Processing {total_companies} active companies")
-        
-        for company in companies:
-            try:
-                # Use the correct function name
-                count = create_notifications_for_company_tenders(company.id, 7)
-                total_created += count
-                
-                if count > 0:
-                    logger.info(f"Created {count} notifications for company {company.id} ({getattr(company, 'name', 'Unknown')})")
-                
-            except Exception as company_error:
-                logger.error(f"Error creating notifications for company {company.id}: {str(company_error)}")
-                continue
+        # All active companies in one pass, each within its own notification window
+        success, total_created, message = DeadlineNotificationService.generate()
+        if not success:
+            raise Exception(message)
         
         end_time = datetime.now()
         duration = (end_time - start_time).total_seconds()
         
         logger.info(f"Daily notification generation completed:")
-        logger.info(f"- Processed {total_companies} companies")
         logger.info(f"- Created {total_created} notifications")
         logger.info(f"- Duration: {duration:.2f} seconds")
         
         # Log successful completion
-        log_job_execution(job_id, 'success', duration, total_created)
+        log_job_execution(job_id, 'success', duration, total_created, run_id=run_id)
         
         return total_created
         
@@ -8311,45 +7156,122 @@ def auto_generate_notifications_main():
         logger.error(f"Error in daily notification generation: {error_msg}", exc_info=True)
         
         # Log error
-        log_job_execution(job_id, 'error', duration, 0, error_msg)
+        log_job_execution(job_id, 'error', duration, 0, error_msg, run_id=run_id)
         
         return 0
 
-# Make sure you also have the logging function:
-job_execution_history = []
+def log_job_execution(job_id, status, duration=None, created_count=None, error=None, run_id=None):
+    """
+    Log job execution for history tracking (persisted, so every worker sees every run)
+
+    Logging 'running' returns the run ID to pass back when the run ends.
+    """
+    return JobRunService.record(job_id, status, duration, created_count, error, run_id)
 
-def log_job_execution(job_id, status, duration=None, created_count=None, error=None):
-    """Log job execution for history tracking"""
-    global job_execution_history
-    
-    execution_log = {
-        'job_id': job_id,
-        'timestamp': datetime.now(),
-        'status': status,  # 'success', 'error', 'running'
-        'duration': duration,
-        'created_count': created_count,
-        'error': error
-    }
-    
-    job_execution_history.append(execution_log)
-    
-    # Keep only last 50 executions
-    if len(job_execution_history) > 50:
-        job_execution_history = job_execution_history[-50:]
 # =====================================================
 # SCHEDULER SETUP (for automatic notifications)
 # =====================================================
 
-# Create scheduler
-scheduler = BackgroundScheduler()
-
 # Wrapper function to run with app context
 def auto_generate_notifications_with_context():
     """Wrapper to run notifications with Flask app context"""
     with app.app_context():
         return auto_generate_notifications_main()
 
-# Add job to run every hour
+def rebuild_tender_stats_rollup_with_context():
+    """Rebuild the tender stats rollup so incremental drift never outlives a day"""
+    with app.app_context():
+        job_id = 'nightly_tender_stats_rollup'
+        start_time = datetime.now()
+        run_id = log_job_execution(job_id, 'running')
+        
+        success, bucket_count, message = TenderStatsRollupService.rebuild()
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        if success:
+            logger.info(f"Tender stats rollup rebuilt: {bucket_count} buckets in {duration:.2f}s")
+            log_job_execution(job_id, 'success', duration, bucket_count, run_id=run_id)
+        else:
+            logger.error(f"Error rebuilding tender stats rollup: {message}")
+            log_job_execution(job_id, 'error', duration, 0, message, run_id=run_id)
+        
+        return bucket_count
+
+def cleanup_expired_exports_with_context():
+    """Fail abandoned export jobs, and delete export files (and their jobs) past their expiry"""
+    with app.app_context():
+        job_id = 'hourly_export_cleanup'
+        start_time = datetime.now()
+        
+        failed_count = ExportJobService.fail_abandoned()
+        removed_count = ExportJobService.cleanup_expired()
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        if failed_count:
+            logger.info(f"Marked {failed_count} abandoned exports as failed")
+        if removed_count:
+            logger.info(f"Removed {removed_count} expired exports in {duration:.2f}s")
+        log_job_execution(job_id, 'success', duration, removed_count)
+        
+        return removed_count
+
+def capture_revenue_snapshot_with_context():
+    """Record last month's bills and this month's revenue in the revenue history"""
+    with app.app_context():
+        job_id = 'nightly_revenue_snapshot'
+        start_time = datetime.now()
+        run_id = log_job_execution(job_id, 'running')
+        
+        success, row_count, message = RevenueSnapshotService.capture_recent()
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        if success:
+            logger.info(f"Revenue snapshot: {message} in {duration:.2f}s")
+            log_job_execution(job_id, 'success', duration, row_count, run_id=run_id)
+        else:
+            logger.error(f"Error capturing revenue snapshot: {message}")
+            log_job_execution(job_id, 'error', duration, 0, message, run_id=run_id)
+        
+        return row_count
+
+def prune_job_runs_with_context():
+    """Delete scheduler job runs older than JOB_RUN_RETENTION_DAYS"""
+    with app.app_context():
+        job_id = 'daily_job_run_prune'
+        start_time = datetime.now()
+        
+        deleted_count = JobRunService.prune(app.config.get('JOB_RUN_RETENTION_DAYS', 90))
+        duration = (datetime.now() - start_time).total_seconds()
+        
+        if deleted_count:
+            logger.info(f"Pruned {deleted_count} scheduler job runs in {duration:.2f}s")
+        log_job_execution(job_id, 'success', duration, deleted_count)
+        
+        return deleted_count
+
+def run_monthly_billing_cycle_with_context():
+    """Bill every active company for the current month (skips companies already billed)"""
+    with app.app_context():
+        job_id = 'monthly_billing_cycle'
+        run_id = log_job_execution(job_id, 'running')
+        
+        today = datetime.now()
+        success, stats, message = BillingService.run_billing_cycle(today.year, today.month)
+        timings = stats['timings']
+        
+        if success:
+            logger.info(
+                f"{message} (load {timings['load']:.2f}s, insert {timings['insert']:.2f}s, "
+                f"{stats['chunks']} chunks, {stats['line_items']} line items)"
+            )
+            log_job_execution(job_id, 'success', timings['total'], stats['created'], run_id=run_id)
+        else:
+            logger.error(message)
+            log_job_execution(job_id, 'error', timings['total'], stats['created'], message, run_id=run_id)
+        
+        return stats['created']
+
+# Every process builds the same scheduler; only the lease holder runs it
 scheduler = BackgroundScheduler(timezone='Africa/Johannesburg')
 scheduler.add_job(
     func=auto_generate_notifications_with_context,
@@ -8360,89 +7282,78 @@ def auto_generate_notifications_with_context():
     coalesce=True,
     misfire_grace_time=3600
 )
+scheduler.add_job(
+    func=rebuild_tender_stats_rollup_with_context,
+    trigger=CronTrigger(hour=1, minute=0),
+    id='nightly_tender_stats_rollup',
+    name='Nightly Tender Stats Rollup Rebuild',
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=3600
+)
+scheduler.add_job(
+    func=capture_revenue_snapshot_with_context,
+    trigger=CronTrigger(hour=2, minute=30),
+    id='nightly_revenue_snapshot',
+    name='Nightly Revenue Snapshot',
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=3600
+)
+scheduler.add_job(
+    func=run_monthly_billing_cycle_with_context,
+    trigger=CronTrigger(day=1, hour=2, minute=0),
+    id='monthly_billing_cycle',
+    name='Monthly Billing Cycle',
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=3600
+)
+scheduler.add_job(
+    func=prune_job_runs_with_context,
+    trigger=CronTrigger(hour=3, minute=0),
+    id='daily_job_run_prune',
+    name='Daily Scheduler History Pruning',
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=3600
+)
+scheduler.add_job(
+    func=cleanup_expired_exports_with_context,
+    trigger=CronTrigger(minute=15),
+    id='hourly_export_cleanup',
+    name='Hourly Expired Export Cleanup',
+    max_instances=1,
+    coalesce=True,
+    misfire_grace_time=3600
+)
 
-# Start scheduler
-scheduler.start()
+# Municipal scraping runs on the same scheduler, so it is covered by the lease too
+tender_scraping_manager.init_app(app, scheduler)
+tender_scraping_manager.start_scheduled_scraping()
 
-# Shut down the scheduler when exiting the app
-atexit.register(lambda: scheduler.shutdown())
+# The coordinator starts the scheduler paused and competes for the lease. It is
+# only started by serving processes (wsgi.py, `python app.py`), so CLI commands,
+# one-off scripts and tests that import app never run jobs
+scheduler_coordinator = SchedulerCoordinator(scheduler, app)
 
 
+def start_embedded_scheduler():
+    """Join the scheduler election from a web process, unless SCHEDULER_MODE is 'standalone' (see scheduler.py)"""
+    if app.testing or app.config.get('SCHEDULER_MODE', 'embedded') != 'embedded':
+        return
+    scheduler_coordinator.start()
+
+# Hand the lease back and shut the scheduler down when exiting the app
+atexit.register(scheduler_coordinator.stop)
 
 
-# Global variable to track job execution history
-job_execution_history = []
 
-def log_job_execution(job_id, status, duration=None, created_count=None, error=None):
-    """Log job execution for history tracking"""
-    global job_execution_history
-    
-    execution_log = {
-        'job_id': job_id,
-        'timestamp': datetime.now(),
-        'status': status,  # 'success', 'error', 'running'
-        'duration': duration,
-        'created_count': created_count,
-        'error': error
-    }
-    
-    job_execution_history.append(execution_log)
-    
-    # Keep only last 50 executions
-    if len(job_execution_history) > 50:
-        job_execution_history = job_execution_history[-50:]
 
 # Updated notification function with logging
 def auto_generate_notifications():
     """Auto-generate notifications with execution logging"""
-    job_id = 'daily_notifications'
-    start_time = datetime.now()
-    
-    # Log job start
-    log_job_execution(job_id, 'running')
-    
-    try:
-        logger.info(f"Starting daily notification generation at {start_time}")
-        
-        # Get all active companies
-        companies = Company.query.filter_by(is_active=True).all()
-        
-        total_created = 0
-        total_companies = len(companies)
-        
-        for company in companies:
-            try:
-                count = create_notifications_for_company_tenders(company.id, 7)
-                total_created += count
-                
-                if count > 0:
-                    logger.info(f"Created {count} notifications for company {company.id}")
-                
-            except Exception as company_error:
-                logger.error(f"Error creating notifications for company {company.id}: {str(company_error)}")
-                continue
-        
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        
-        logger.info(f"Daily notification generation completed: {total_created} notifications in {duration:.2f}s")
-        
-        # Log successful completion
-        log_job_execution(job_id, 'success', duration, total_created)
-        
-        return total_created
-        
-    except Exception as e:
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds()
-        error_msg = str(e)
-        
-        logger.error(f"Error in daily notification generation: {error_msg}", exc_info=True)
-        
-        # Log error
-        log_job_execution(job_id, 'error', duration, 0, error_msg)
-        
-        return 0
+    return auto_generate_notifications_main()
 
 @app.route('/admin/scheduler')
 @login_required
@@ -8475,7 +7386,8 @@ def get_scheduler_status():
                 'status': 'stopped',
                 'running': False,
                 'jobs': [],
-                'execution_history': []
+                'execution_history': [],
+                'coordinator': scheduler_coordinator.status()
             })
         
         jobs = []
@@ -8499,16 +7411,8 @@ def get_scheduler_status():
             })
         
         # Get recent execution history
-        recent_history = []
-        for log in job_execution_history[-10:]:  # Last 10 executions
-            recent_history.append({
-                'job_id': log['job_id'],
-                'timestamp': log['timestamp'].isoformat(),
-                'status': log['status'],
-                'duration': log['duration'],
-                'created_count': log['created_count'],
-                'error': log['error']
-            })
+        recent_runs, _ = JobRunService.history(per_page=10)  # Last 10 executions
+        recent_history = [run.to_dict() for run in recent_runs]
         
         return jsonify({
             'status': 'running',
@@ -8516,7 +7420,8 @@ def get_scheduler_status():
             'jobs': jobs,
             'execution_history': recent_history,
             'total_jobs': len(jobs),
-            'current_time': datetime.now().isoformat()
+            'current_time': datetime.now().isoformat(),
+            'coordinator': scheduler_coordinator.status()
         })
         
     except Exception as e:
@@ -8582,8 +7487,8 @@ def control_scheduler(action):
             return jsonify({'error': 'Super admin access required'}), 403
         
         if action == 'start':
-            if not scheduler.running:
-                scheduler.start()
+            if not scheduler_coordinator.running:
+                scheduler_coordinator.start()
                 return jsonify({
                     'success': True,
                     'message': 'Scheduler started successfully',
@@ -8597,8 +7502,8 @@ def control_scheduler(action):
                 })
         
         elif action == 'stop':
-            if scheduler.running:
-                scheduler.shutdown(wait=False)
+            if scheduler_coordinator.running:
+                scheduler_coordinator.stop()
                 return jsonify({
                     'success': True,
                     'message': 'Scheduler stopped successfully',
@@ -8629,31 +7534,20 @@ def get_scheduler_history():
         
         # Get execution history with pagination
         page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 20, type=int)
-        
-        # Convert history to serializable format
-        history = []
-        for log in reversed(job_execution_history):  # Most recent first
-            history.append({
-                'job_id': log['job_id'],
-                'timestamp': log['timestamp'].isoformat(),
-                'status': log['status'],
-                'duration': log['duration'],
-                'created_count': log['created_count'],
-                'error': log['error']
-            })
+        per_page = min(request.args.get('per_page', 20, type=int), 100)
+        job_id = request.args.get('job_id')
+        status = request.args.get('status')
+        days = request.args.get('days', type=int)
+        since = datetime.now() - timedelta(days=days) if days else None
         
-        # Simple pagination
-        start = (page - 1) * per_page
-        end = start + per_page
-        paginated_history = history[start:end]
+        runs, total = JobRunService.history(job_id, status, since, page, per_page)
         
         return jsonify({
-            'history': paginated_history,
-            'total': len(history),
+            'history': [run.to_dict() for run in runs],
+            'total': total,
             'page': page,
             'per_page': per_page,
-            'pages': (len(history) + per_page - 1) // per_page
+            'pages': (total + per_page - 1) // per_page
         })
         
     except Exception as e:
@@ -8669,35 +7563,25 @@ def get_scheduler_stats():
         if not user or not getattr(user, 'is_super_admin', False):
             return jsonify({'error': 'Super admin access required'}), 403
         
-        # Calculate statistics from execution history
-        total_executions = len(job_execution_history)
-        successful_executions = len([log for log in job_execution_history if log['status'] == 'success'])
-        failed_executions = len([log for log in job_execution_history if log['status'] == 'error'])
-        
-        # Calculate average duration and total notifications created
-        durations = [log['duration'] for log in job_execution_history if log['duration']]
-        avg_duration = sum(durations) / len(durations) if durations else 0
-        
-        total_notifications = sum([log['created_count'] or 0 for log in job_execution_history])
-        
-        # Get last execution info
-        last_execution = None
-        if job_execution_history:
-            last_log = job_execution_history[-1]
-            last_execution = {
-                'timestamp': last_log['timestamp'].isoformat(),
-                'status': last_log['status'],
-                'created_count': last_log['created_count']
-            }
+        # Calculate statistics from the persisted run history (default: last 30 days)
+        days = request.args.get('days', 30, type=int)
+        since = datetime.now() - timedelta(days=days) if days else None
+        run_stats = JobRunService.stats(request.args.get('job_id'), since)
+        notification_stats = run_stats['jobs'].get('daily_notifications', {})
         
         stats = {
-            'total_executions': total_executions,
-            'successful_executions': successful_executions,
-            'failed_executions': failed_executions,
-            'success_rate': (successful_executions / total_executions * 100) if total_executions > 0 else 0.0,
-            'average_duration': avg_duration if avg_duration else 0.0,
-            'total_notifications_created': total_notifications,
-            'last_execution': last_execution
+            'total_executions': run_stats['total_runs'],
+            'successful_executions': run_stats['successful_runs'],
+            'failed_executions': run_stats['failed_runs'],
+            'success_rate': (100.0 - run_stats['failure_rate']) if run_stats['total_runs'] > run_stats['running'] else 0.0,
+            'failure_rate': run_stats['failure_rate'],
+            'average_duration': run_stats['average_duration'],
+            'p50_duration': run_stats['p50_duration'],
+            'p95_duration': run_stats['p95_duration'],
+            'total_notifications_created': notification_stats.get('rows_affected', 0),
+            'last_execution': run_stats['last_run'],
+            'jobs': run_stats['jobs'],
+            'window_days': days
         }
         
         logger.info(f"Scheduler stats: {stats}")
@@ -8757,6 +7641,49 @@ def chatbot_suggestions():
     except Exception as e:
         return jsonify({'success': False, 'error': 'Could not load suggestions'}), 500
 
+@app.route('/api/tenders/<int:tender_id>/history')
+@login_required
+@require_module('tender_management')
+def tender_history_api(tender_id):
+    """A tender's audit history, newest first, one cursor page at a time"""
+    user = AuthService.get_user_by_id(session['user_id'])
+    tender = TenderService.get_tender_by_id(tender_id)
+    if not tender:
+        return jsonify({'success': False, 'error': 'Tender not found'}), 404
+    if not user.is_super_admin and tender.company_id != user.company_id:
+        return jsonify({'success': False, 'error': 'Access denied'}), 403
+    
+    limit = min(request.args.get('limit', 50, type=int), 200)
+    page = TenderHistoryService.get_tender_history_page(tender_id, request.args.get('cursor'), limit)
+    return jsonify({
+        'success': True,
+        'history': [entry.to_dict() for entry in page['items']],
+        'next_cursor': page['next_cursor'],
+        'prev_cursor': page['prev_cursor']
+    })
+
+@app.route('/api/tenders/autocomplete')
+@login_required
+@require_module('tender_management')
+def tender_autocomplete():
+    """Search-box suggestions (titles, reference numbers, categories) for the user's company"""
+    try:
+        company_id = session.get('company_id')
+        if not company_id:
+            return jsonify({'success': False, 'error': 'No company'}), 400
+        
+        prefix = request.args.get('q', '').strip()
+        limit = min(request.args.get('limit', 10, type=int), 50)
+        
+        # Users without 'view_all_tenders' only get suggestions from their assigned tenders
+        suggestions = TenderAutocompleteService.suggest(
+            company_id, prefix, limit, entitlements=EntitlementService.current()
+        )
+        return jsonify({'success': True, 'suggestions': suggestions})
+    except Exception as e:
+        logger.error(f"Tender autocomplete error: {str(e)}")
+        return jsonify({'success': False, 'error': 'Could not load suggestions'}), 500
+
 @app.route('/api/chatbot/quick-stats')
 @login_required
 def chatbot_quick_stats():
@@ -9505,6 +8432,21 @@ def api_municipal_tenders():
         page = int(request.args.get('page', 1))
         limit = int(request.args.get('limit', 12))
         
+        # Cursor requests page through the scraped tenders on (closing_date, id)
+        if 'cursor' in request.args:
+            result = municipal_tender_service.get_municipal_tenders_page(
+                company_id, search=search, province=province, category=category,
+                value_range=value_range, cursor=request.args.get('cursor'), limit=min(limit, 100)
+            )
+            return jsonify({
+                'success': True,
+                'tenders': result['tenders'],
+                'next_cursor': result['next_cursor'],
+                'prev_cursor': result['prev_cursor'],
+                'has_next': result['has_next'],
+                'limit': limit
+            })
+        
         # Get filtered tenders
         tenders = get_municipal_tenders(
             company_id=company_id,
@@ -10020,6 +8962,9 @@ def create_municipal_tender_tables():
                 contact_phone VARCHAR(50),
                 estimated_duration VARCHAR(100),
                 documents JSON,
+                source_url VARCHAR(500),
+                scraped_at DATETIME,
+                content_hash CHAR(64),
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
                 INDEX idx_municipality (municipality),
@@ -10027,7 +8972,9 @@ def create_municipal_tender_tables():
                 INDEX idx_category (category),
                 INDEX idx_closing_date (closing_date),
                 INDEX idx_status (status),
-                INDEX idx_value (value)
+                INDEX idx_value (value),
+                INDEX idx_scraped_at (scraped_at),
+                FULLTEXT INDEX ft_municipal_tenders_search (title, municipality, description)
             )
         """))
         
@@ -10327,4 +9274,5 @@ def get_municipal_scraping_status():
     print("="*50 + "\n")
     
     #init_database()
+    start_embedded_scheduler()
     app.run(debug=True, host='0.0.0.0', port=5001)
@@ -56,6 +56,61 @@ class Config:
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
 
+    # Cache (memory per worker, or redis to share invalidation across workers; with
+    # memory, other workers only see tender changes in autocomplete once its index ages out)
+    CACHE_BACKEND = os.environ.get('CACHE_BACKEND', 'memory')
+    CACHE_REDIS_URL = os.environ.get('CACHE_REDIS_URL', 'redis://localhost:6379/0')
+    CACHE_DEFAULT_TTL = int(os.environ.get('CACHE_DEFAULT_TTL', 300))
+    CACHE_MAX_ENTRIES = int(os.environ.get('CACHE_MAX_ENTRIES', 10000))
+
+    # Background exports (files kept under UPLOAD_FOLDER/exports until they expire)
+    EXPORT_JOB_WORKERS = int(os.environ.get('EXPORT_JOB_WORKERS', 2))
+    EXPORT_JOB_TTL_HOURS = int(os.environ.get('EXPORT_JOB_TTL_HOURS', 24))
+    # Jobs queued this long, or running without a worker heartbeat for this long,
+    # are marked failed by the hourly cleanup
+    EXPORT_JOB_TIMEOUT_MINUTES = int(os.environ.get('EXPORT_JOB_TIMEOUT_MINUTES', 60))
+    EXPORT_JOB_HEARTBEAT_SECONDS = int(os.environ.get('EXPORT_JOB_HEARTBEAT_SECONDS', 60))
+
+    # Monthly billing cycle (bills inserted and committed per chunk of companies)
+    BILLING_CYCLE_CHUNK_SIZE = int(os.environ.get('BILLING_CYCLE_CHUNK_SIZE', 500))
+
+    # Scheduler job history (runs older than this are pruned nightly; runs
+    # still 'running' after the timeout are marked failed)
+    JOB_RUN_RETENTION_DAYS = int(os.environ.get('JOB_RUN_RETENTION_DAYS', 90))
+    JOB_RUN_TIMEOUT_MINUTES = int(os.environ.get('JOB_RUN_TIMEOUT_MINUTES', 360))
+
+    # Scheduler leader election: 'embedded' lets web workers elect one of them
+    # to run jobs, 'standalone' leaves jobs to `python scheduler.py`
+    SCHEDULER_MODE = os.environ.get('SCHEDULER_MODE', 'embedded')
+    SCHEDULER_LEASE_SECONDS = int(os.environ.get('SCHEDULER_LEASE_SECONDS', 60))
+    SCHEDULER_HEARTBEAT_SECONDS = int(os.environ.get('SCHEDULER_HEARTBEAT_SECONDS', 15))
+
+    # Scraped municipal tenders saved per chunk (one upsert and commit each)
+    MUNICIPAL_INGEST_CHUNK_SIZE = int(os.environ.get('MUNICIPAL_INGEST_CHUNK_SIZE', 500))
+
+    # Municipal scraper (sources JSON described in services/municipal_scraper_service.py)
+    MUNICIPAL_SCRAPER_SOURCES = os.environ.get('MUNICIPAL_SCRAPER_SOURCES', os.path.join(basedir, 'municipal_sources.json'))
+    MUNICIPAL_SCRAPER_WORKERS = int(os.environ.get('MUNICIPAL_SCRAPER_WORKERS', 8))
+    MUNICIPAL_SCRAPER_PER_HOST = int(os.environ.get('MUNICIPAL_SCRAPER_PER_HOST', 2))
+    MUNICIPAL_SCRAPER_DELAY_SECONDS = float(os.environ.get('MUNICIPAL_SCRAPER_DELAY_SECONDS', 1.0))
+    MUNICIPAL_SCRAPER_RETRIES = int(os.environ.get('MUNICIPAL_SCRAPER_RETRIES', 3))
+    MUNICIPAL_SCRAPER_TIMEOUT = int(os.environ.get('MUNICIPAL_SCRAPER_TIMEOUT', 30))
+    MUNICIPAL_SCRAPER_MAX_SWEEP_MINUTES = int(os.environ.get('MUNICIPAL_SCRAPER_MAX_SWEEP_MINUTES', 110))
+
+    # An interrupted scraping sweep younger than this is resumed instead of restarted
+    SCRAPE_RESUME_HOURS = int(os.environ.get('SCRAPE_RESUME_HOURS', 12))
+
+    # Tender search backend: 'auto' (FULLTEXT on MySQL, FTS5 on SQLite), 'fulltext', 'fts5' or 'python'
+    TENDER_SEARCH_BACKEND = os.environ.get('TENDER_SEARCH_BACKEND', 'auto')
+
+    # Tender autocomplete: prefix index entries kept in memory per worker (least recently used companies evicted)
+    TENDER_AUTOCOMPLETE_MAX_ENTRIES = int(os.environ.get('TENDER_AUTOCOMPLETE_MAX_ENTRIES', 500000))
+    # Seconds a company's index is used before it is reloaded, picking up writes other workers made
+    TENDER_AUTOCOMPLETE_MAX_AGE = int(os.environ.get('TENDER_AUTOCOMPLETE_MAX_AGE', CACHE_DEFAULT_TTL))
+
+    # Document numbering: numbers each worker reserves per database round trip (unused ones are skipped)
+    SEQUENCE_BLOCK_SIZE = int(os.environ.get('SEQUENCE_BLOCK_SIZE', 10))
+
     # Tender Configuration
     TENDER_REFERENCE_PREFIX = os.environ.get('TENDER_REFERENCE_PREFIX', 'TND')
 
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Shared pytest fixtures
+
+Tests that touch the database run against a throwaway SQLite file built
+from the models, so they never see (or change) the configured database.
+"""
+
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+# Tests never take part in the scheduler election
+os.environ['SCHEDULER_MODE'] = 'standalone'
+
+from app import app  # noqa: E402
+from models import db  # noqa: E402
+
+
+@contextmanager
+def temporary_database(seed=None):
+    """
+    Point the app at a temporary SQLite database built from the models
+
+    Args:
+        seed: Optional function filling the database, called inside the app
+              context after the tables are created (its changes are committed)
+
+    Yields:
+        The seed function's return value (None without one), inside the app context
+    """
+    db_fd, db_path = tempfile.mkstemp(suffix='.sqlite')
+    original_uri = app.config['SQLALCHEMY_DATABASE_URI']
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{db_path}'
+
+    try:
+        with app.app_context():
+            db.create_all()
+            seeded = seed() if seed else None
+            db.session.commit()
+            yield seeded
+            db.session.remove()
+            db.get_engine().dispose()
+    finally:
+        app.config['SQLALCHEMY_DATABASE_URI'] = original_uri
+        os.close(db_fd)
+        os.remove(db_path)
+
+
+@pytest.fixture()
+def temp_db():
+    """Point the app at an empty temporary database built from the models"""
+    with temporary_database():
+        yield
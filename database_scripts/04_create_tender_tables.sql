@@ -11,6 +11,15 @@ USE tms_db;
 -- =====================================================
 -- TENDERS TABLE
 -- =====================================================
+-- Tender search uses the FULLTEXT indexes (see services/tender_search_service.py).
+-- Existing installs:
+--   ALTER TABLE tenders
+--       ADD FULLTEXT INDEX ft_tenders_search (title, description, reference_number),
+--       ADD FULLTEXT INDEX ft_tenders_title (title);
+--   ALTER TABLE tenders ADD INDEX idx_tenders_company_created (company_id, created_at, id);
+--   ALTER TABLE tenders
+--       ADD INDEX idx_tenders_company_status_created (company_id, status_id, created_at),
+--       ADD INDEX idx_tenders_company_deadline (company_id, submission_deadline);
 CREATE TABLE IF NOT EXISTS tenders (
     id INT AUTO_INCREMENT PRIMARY KEY,
     title VARCHAR(200) NOT NULL,
@@ -41,7 +50,12 @@ CREATE TABLE IF NOT EXISTS tenders (
     INDEX idx_tender_status (status_id),
     INDEX idx_tender_category (category_id),
     INDEX idx_tender_deadline (submission_deadline),
-    INDEX idx_tender_reference (reference_number)
+    INDEX idx_tender_reference (reference_number),
+    INDEX idx_tenders_company_created (company_id, created_at, id),
+    INDEX idx_tenders_company_status_created (company_id, status_id, created_at),
+    INDEX idx_tenders_company_deadline (company_id, submission_deadline),
+    FULLTEXT INDEX ft_tenders_search (title, description, reference_number),
+    FULLTEXT INDEX ft_tenders_title (title)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -89,6 +103,8 @@ CREATE TABLE IF NOT EXISTS tender_notes (
 -- =====================================================
 -- TENDER HISTORY TABLE
 -- =====================================================
+-- Existing installs:
+--   ALTER TABLE tender_history ADD INDEX idx_tender_history_tender_created (tender_id, created_at, id);
 CREATE TABLE IF NOT EXISTS tender_history (
     id INT AUTO_INCREMENT PRIMARY KEY,
     tender_id INT NOT NULL,
@@ -104,7 +120,8 @@ CREATE TABLE IF NOT EXISTS tender_history (
     
     INDEX idx_tender_history_tender (tender_id),
     INDEX idx_tender_history_type (action_type),
-    INDEX idx_tender_history_date (created_at)
+    INDEX idx_tender_history_date (created_at),
+    INDEX idx_tender_history_tender_created (tender_id, created_at, id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -177,5 +194,168 @@ CREATE TABLE IF NOT EXISTS company_documents (
     INDEX idx_company_doc_category (document_category)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =====================================================
+-- TENDER STATS ROLLUP TABLE
+-- =====================================================
+-- One row per company / status / category / creation month.
+-- Maintained by TenderStatsRollupService on tender writes and
+-- rebuilt nightly by the nightly_tender_stats_rollup job.
+CREATE TABLE IF NOT EXISTS tender_stats_rollup (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    company_id INT NOT NULL,
+    status_id INT NOT NULL,
+    category_id INT NOT NULL,
+    period_month DATE NOT NULL,
+    
+    tender_count INT NOT NULL DEFAULT 0,
+    won_count INT NOT NULL DEFAULT 0,
+    lost_count INT NOT NULL DEFAULT 0,
+    
+    valued_count INT NOT NULL DEFAULT 0,
+    value_sum DECIMAL(18, 2) NOT NULL DEFAULT 0,
+    value_min DECIMAL(15, 2),
+    value_max DECIMAL(15, 2),
+    
+    duration_days_sum INT NOT NULL DEFAULT 0,
+    duration_count INT NOT NULL DEFAULT 0,
+    
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
+    FOREIGN KEY (status_id) REFERENCES tender_statuses(id) ON DELETE CASCADE,
+    FOREIGN KEY (category_id) REFERENCES tender_categories(id) ON DELETE CASCADE,
+    
+    UNIQUE KEY unique_tender_stats_bucket (company_id, status_id, category_id, period_month),
+    INDEX idx_tender_stats_company_month (company_id, period_month)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- MUNICIPAL TENDERS TABLE (scraped from municipal sites)
+-- =====================================================
+-- content_hash is a SHA-256 of the scraped fields; re-scraped tenders whose
+-- hash has not changed are skipped. Existing installs:
+--   ALTER TABLE municipal_tenders
+--       ADD COLUMN source_url VARCHAR(500), ADD COLUMN scraped_at DATETIME,
+--       ADD COLUMN content_hash CHAR(64);
+--   ALTER TABLE municipal_tenders ADD INDEX idx_scraped_at (scraped_at);
+--   ALTER TABLE municipal_tenders ADD FULLTEXT INDEX ft_municipal_tenders_search (title, municipality, description);
+CREATE TABLE IF NOT EXISTS municipal_tenders (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    municipality VARCHAR(255) NOT NULL,
+    province VARCHAR(100) NOT NULL,
+    title VARCHAR(500) NOT NULL,
+    description TEXT,
+    category VARCHAR(100),
+    value BIGINT,
+    tender_number VARCHAR(100) UNIQUE,
+    published_date DATE,
+    closing_date DATETIME,
+    status ENUM('new', 'closing', 'urgent', 'closed') DEFAULT 'new',
+    requirements JSON,
+    contact_person VARCHAR(255),
+    contact_email VARCHAR(255),
+    contact_phone VARCHAR(50),
+    estimated_duration VARCHAR(100),
+    documents JSON,
+    source_url VARCHAR(500),
+    scraped_at DATETIME,
+    content_hash CHAR(64),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    INDEX idx_municipality (municipality),
+    INDEX idx_province (province),
+    INDEX idx_category (category),
+    INDEX idx_closing_date (closing_date),
+    INDEX idx_status (status),
+    INDEX idx_value (value),
+    INDEX idx_scraped_at (scraped_at),
+    FULLTEXT INDEX ft_municipal_tenders_search (title, municipality, description)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- Live urgency, for reads that must not wait for the next status run
+-- (status itself is moved along by MunicipalTenderStatusService)
+CREATE OR REPLACE VIEW municipal_tender_urgency AS
+SELECT
+    id,
+    tender_number,
+    closing_date,
+    status,
+    CASE
+        WHEN status = 'closed' OR closing_date < NOW() THEN 'closed'
+        WHEN closing_date <= NOW() + INTERVAL 2 DAY THEN 'urgent'
+        WHEN closing_date <= NOW() + INTERVAL 7 DAY THEN 'closing'
+        ELSE status
+    END AS live_status
+FROM municipal_tenders;
+
+-- =====================================================
+-- TENDER SCRAPING LOG TABLE (one row per scraping run)
+-- =====================================================
+-- Existing installs: ALTER TABLE tender_scraping_log ADD COLUMN unchanged_tenders INT DEFAULT 0;
+CREATE TABLE IF NOT EXISTS tender_scraping_log (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    scrape_started_at DATETIME NOT NULL,
+    scrape_completed_at DATETIME,
+    status VARCHAR(20) NOT NULL DEFAULT 'completed',
+    tenders_found INT DEFAULT 0,
+    new_tenders INT DEFAULT 0,
+    updated_tenders INT DEFAULT 0,
+    unchanged_tenders INT DEFAULT 0,
+    errors_encountered INT DEFAULT 0,
+    
+    INDEX idx_scraping_log_started (scrape_started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- SCRAPE RUNS / CHECKPOINTS TABLES (incremental scraping)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS scrape_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    started_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    completed_at DATETIME,
+    municipalities_total INT DEFAULT 0,
+    municipalities_done INT DEFAULT 0,
+    errors INT DEFAULT 0,
+    
+    INDEX idx_scrape_runs_status_started (status, started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+CREATE TABLE IF NOT EXISTS scrape_checkpoints (
+    municipality VARCHAR(255) PRIMARY KEY,
+    run_id INT,
+    last_success_at DATETIME NOT NULL,
+    listing_fingerprint CHAR(64),
+    tender_hashes MEDIUMTEXT,
+    page_validators TEXT,
+    tender_count INT DEFAULT 0,
+    
+    FOREIGN KEY (run_id) REFERENCES scrape_runs(id) ON DELETE SET NULL
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- PROCESSING WATERMARKS TABLE (how far set-based jobs have got)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS processing_watermarks (
+    name VARCHAR(100) PRIMARY KEY,
+    watermark_at DATETIME NOT NULL,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- DOCUMENT SEQUENCES TABLE (per-company tender reference and journal entry numbers)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS document_sequences (
+    company_id INT NOT NULL,
+    kind VARCHAR(50) NOT NULL,
+    year INT NOT NULL DEFAULT 0,
+    next_value INT NOT NULL DEFAULT 1,
+    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    
+    PRIMARY KEY (company_id, kind, year),
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- Display confirmation
 SELECT 'Tender tables created successfully' AS Status;
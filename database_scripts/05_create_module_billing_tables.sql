@@ -31,6 +31,8 @@ CREATE TABLE IF NOT EXISTS module_definitions (
 -- =====================================================
 -- COMPANY MODULES TABLE
 -- =====================================================
+-- Existing installs:
+--   ALTER TABLE company_modules ADD INDEX idx_company_module_company_enabled (company_id, is_enabled);
 CREATE TABLE IF NOT EXISTS company_modules (
     id INT AUTO_INCREMENT PRIMARY KEY,
     company_id INT NOT NULL,
@@ -54,12 +56,15 @@ CREATE TABLE IF NOT EXISTS company_modules (
     
     UNIQUE KEY unique_company_module (company_id, module_id),
     INDEX idx_company_module_enabled (is_enabled),
-    INDEX idx_company_module_company (company_id)
+    INDEX idx_company_module_company (company_id),
+    INDEX idx_company_module_company_enabled (company_id, is_enabled)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
 -- COMPANY MODULE PRICING TABLE
 -- =====================================================
+-- Existing installs:
+--   ALTER TABLE company_module_pricing ADD INDEX idx_custom_pricing_company_module_active (company_id, module_id, is_active);
 CREATE TABLE IF NOT EXISTS company_module_pricing (
     id INT AUTO_INCREMENT PRIMARY KEY,
     company_id INT NOT NULL,
@@ -77,12 +82,16 @@ CREATE TABLE IF NOT EXISTS company_module_pricing (
     
     INDEX idx_custom_pricing_company (company_id),
     INDEX idx_custom_pricing_module (module_id),
-    INDEX idx_custom_pricing_active (is_active)
+    INDEX idx_custom_pricing_active (is_active),
+    INDEX idx_custom_pricing_company_module_active (company_id, module_id, is_active)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
 -- MONTHLY BILLS TABLE
 -- =====================================================
+-- Existing installs (remove duplicate bills for a period first, or run
+-- `flask db upgrade`, which does both):
+--   ALTER TABLE monthly_bills ADD UNIQUE KEY unique_company_bill_period (company_id, bill_year, bill_month);
 CREATE TABLE IF NOT EXISTS monthly_bills (
     id INT AUTO_INCREMENT PRIMARY KEY,
     company_id INT NOT NULL,
@@ -100,6 +109,7 @@ CREATE TABLE IF NOT EXISTS monthly_bills (
     FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
     FOREIGN KEY (generated_by) REFERENCES users(id) ON DELETE RESTRICT,
     
+    UNIQUE KEY unique_company_bill_period (company_id, bill_year, bill_month),
     INDEX idx_bill_company (company_id),
     INDEX idx_bill_period (bill_year, bill_month),
     INDEX idx_bill_status (status)
@@ -127,6 +137,25 @@ CREATE TABLE IF NOT EXISTS bill_line_items (
     INDEX idx_bill_line_module (module_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
+-- =====================================================
+-- REVENUE SNAPSHOTS TABLE (monthly revenue history)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS revenue_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    period_month DATE NOT NULL,
+    company_id INT NOT NULL,
+    module_id INT NOT NULL,
+    amount DECIMAL(10, 2) NOT NULL,
+    is_custom_price BOOLEAN DEFAULT FALSE NOT NULL,
+    source VARCHAR(20) NOT NULL,
+    captured_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
+    FOREIGN KEY (module_id) REFERENCES module_definitions(id) ON DELETE RESTRICT,
+    
+    UNIQUE KEY unique_revenue_snapshot (period_month, company_id, module_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
 -- =====================================================
 -- LEGACY FEATURES TABLE (for backward compatibility)
 -- =====================================================
@@ -84,6 +84,8 @@ CREATE TABLE IF NOT EXISTS user_company_roles (
 -- =====================================================
 -- TENDER ASSIGNMENTS TABLE
 -- =====================================================
+-- Existing installs:
+--   ALTER TABLE tender_assignments ADD INDEX idx_assignment_user_active (assigned_to_id, is_active);
 CREATE TABLE IF NOT EXISTS tender_assignments (
     id INT AUTO_INCREMENT PRIMARY KEY,
     tender_id INT NOT NULL,
@@ -100,7 +102,8 @@ CREATE TABLE IF NOT EXISTS tender_assignments (
     
     INDEX idx_assignment_tender (tender_id),
     INDEX idx_assignment_user (assigned_to_id),
-    INDEX idx_assignment_active (is_active)
+    INDEX idx_assignment_active (is_active),
+    INDEX idx_assignment_user_active (assigned_to_id, is_active)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
@@ -26,6 +26,9 @@ CREATE TABLE IF NOT EXISTS company_settings (
 -- =====================================================
 -- TENDER NOTIFICATIONS TABLE
 -- =====================================================
+-- Existing installs:
+--   ALTER TABLE tender_notifications
+--       ADD INDEX idx_notifications_company_processed_created (company_id, is_processed, created_at, id);
 CREATE TABLE IF NOT EXISTS tender_notifications (
     id INT AUTO_INCREMENT PRIMARY KEY,
     tender_id INT NOT NULL,
@@ -47,7 +50,68 @@ CREATE TABLE IF NOT EXISTS tender_notifications (
     INDEX idx_notification_tender (tender_id),
     INDEX idx_notification_company (company_id),
     INDEX idx_notification_read (is_read),
-    INDEX idx_notification_processed (is_processed)
+    INDEX idx_notification_processed (is_processed),
+    INDEX idx_notifications_company_processed_created (company_id, is_processed, created_at, id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- EXPORT JOBS TABLE (background report exports)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS export_jobs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    job_type VARCHAR(50) NOT NULL,
+    params TEXT,
+    status VARCHAR(20) NOT NULL DEFAULT 'queued',
+    progress INT NOT NULL DEFAULT 0,
+    message VARCHAR(255),
+    file_path VARCHAR(500),
+    file_name VARCHAR(255),
+    mime_type VARCHAR(100),
+    file_size INT,
+    created_by INT NOT NULL,
+    company_id INT,
+    created_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    started_at DATETIME,
+    heartbeat_at DATETIME,
+    completed_at DATETIME,
+    expires_at DATETIME,
+    
+    FOREIGN KEY (created_by) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (company_id) REFERENCES companies(id) ON DELETE CASCADE,
+    
+    INDEX idx_export_jobs_user_created (created_by, created_at),
+    INDEX idx_export_jobs_expires (expires_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+-- Existing installs: ALTER TABLE export_jobs ADD COLUMN heartbeat_at DATETIME AFTER started_at;
+
+-- =====================================================
+-- SCHEDULER JOB RUNS TABLE (persistent job history)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS scheduler_job_runs (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    job_id VARCHAR(100) NOT NULL,
+    status VARCHAR(20) NOT NULL DEFAULT 'running',
+    started_at DATETIME NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    finished_at DATETIME,
+    duration DOUBLE,
+    rows_affected INT,
+    error TEXT,
+    worker_pid INT,
+    hostname VARCHAR(255),
+    
+    INDEX idx_job_runs_job_started (job_id, started_at),
+    INDEX idx_job_runs_started (started_at)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
+
+-- =====================================================
+-- SCHEDULER LEASES TABLE (single scheduler leader)
+-- =====================================================
+CREATE TABLE IF NOT EXISTS scheduler_leases (
+    name VARCHAR(100) PRIMARY KEY,
+    holder VARCHAR(255) NOT NULL,
+    acquired_at DATETIME NOT NULL,
+    renewed_at DATETIME NOT NULL,
+    expires_at DATETIME NOT NULL
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_unicode_ci;
 
 -- =====================================================
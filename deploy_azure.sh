@@ -86,7 +86,7 @@ User=www-data
 Group=www-data
 WorkingDirectory=$APP_DIR
 Environment="PATH=$APP_DIR/venv/bin"
-ExecStart=$APP_DIR/venv/bin/gunicorn --workers 3 --bind 0.0.0.0:5001 app:app
+ExecStart=$APP_DIR/venv/bin/gunicorn --workers 3 --bind 0.0.0.0:5001 wsgi:app
 
 [Install]
 WantedBy=multi-user.target
@@ -41,6 +41,7 @@ def ZoneInfo(key):
 
 # SQLAlchemy
 from sqlalchemy import func, and_, or_
+from sqlalchemy.orm import joinedload
 
 # Configuration and models
 from config import Config
@@ -59,6 +60,24 @@ def ZoneInfo(key):
 from services.billing_service import BillingService
 from services.module_service import ModuleService
 from services.company_module_service import CompanyModuleService, require_company_module
+from services.entitlement_service import EntitlementService
+from services.cache_service import CacheService
+from services.dashboard_stats_service import DashboardStatsService
+from services.tender_stats_rollup_service import TenderStatsRollupService
+from services.tender_report_service import TenderReportService
+from services.tender_query_options import TenderQueryOptions
+from services.account_balance_service import AccountBalanceService
+from services.revenue_matrix_service import RevenueMatrixService
+from services.revenue_snapshot_service import RevenueSnapshotService
+from services.deadline_notification_service import DeadlineNotificationService
+from services.job_run_service import JobRunService
+from services.scheduler_lease_service import SchedulerCoordinator
+from services.export_job_service import ExportJobService
+from services.tender_search_service import TenderSearchService
+from services.tender_autocomplete_service import TenderAutocompleteService
+from services.pagination_service import PaginationService
+from services.query_plan_service import QueryPlanService
+from services.sequence_service import SequenceService
 
 # Permissions
 from permissions import (
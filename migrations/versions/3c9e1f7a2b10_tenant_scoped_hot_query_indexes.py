@@ -0,0 +1,54 @@
+"""Composite indexes for tenant-scoped hot queries
+
+Databases created from database_scripts/ (or by db.create_all()) already
+have these indexes, so each one is only created when it is missing.
+
+Revision ID: 3c9e1f7a2b10
+Revises:
+Create Date: 2026-10-18 12:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e1f7a2b10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+# (index name, table, columns)
+INDEXES = [
+    ('idx_tenders_company_created', 'tenders', ['company_id', 'created_at', 'id']),
+    ('idx_tenders_company_status_created', 'tenders', ['company_id', 'status_id', 'created_at']),
+    ('idx_tenders_company_deadline', 'tenders', ['company_id', 'submission_deadline']),
+    ('idx_tender_history_tender_created', 'tender_history', ['tender_id', 'created_at', 'id']),
+    ('idx_notifications_company_processed_created', 'tender_notifications',
+     ['company_id', 'is_processed', 'created_at', 'id']),
+    ('idx_assignment_user_active', 'tender_assignments', ['assigned_to_id', 'is_active']),
+    ('idx_company_module_company_enabled', 'company_modules', ['company_id', 'is_enabled']),
+    ('idx_custom_pricing_company_module_active', 'company_module_pricing',
+     ['company_id', 'module_id', 'is_active']),
+    ('idx_user_role_user', 'user_company_roles', ['user_id']),
+]
+
+
+def existing_indexes(table):
+    inspector = sa.inspect(op.get_bind())
+    return {index['name'] for index in inspector.get_indexes(table)}
+
+
+def upgrade():
+    for name, table, columns in INDEXES:
+        if name not in existing_indexes(table):
+            op.create_index(name, table, columns)
+
+
+def downgrade():
+    # idx_user_role_user predates this revision in database_scripts/ and
+    # backs the user_id foreign key on MySQL, so it is left in place
+    for name, table, columns in reversed(INDEXES):
+        if name != 'idx_user_role_user' and name in existing_indexes(table):
+            op.drop_index(name, table_name=table)
@@ -0,0 +1,75 @@
+"""One monthly bill per company and period
+
+Databases created before the batch billing cycle have no unique key on
+monthly_bills, so repeated or concurrent cycles could bill a company twice
+for the same month. Duplicate bills are removed first: the bill kept for a
+period is the one already past 'draft' (sent, paid, ...), else the oldest.
+
+Revision ID: 5e8a1c3f7b92
+Revises: 9b4e6c2d1a57
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8a1c3f7b92'
+down_revision = '9b4e6c2d1a57'
+branch_labels = None
+depends_on = None
+
+
+CONSTRAINT = 'unique_company_bill_period'
+COLUMNS = ['company_id', 'bill_year', 'bill_month']
+
+
+def has_constraint():
+    inspector = sa.inspect(op.get_bind())
+    # MySQL reports unique keys as unique indexes
+    names = {constraint['name'] for constraint in inspector.get_unique_constraints('monthly_bills')}
+    names |= {index['name'] for index in inspector.get_indexes('monthly_bills') if index.get('unique')}
+    return CONSTRAINT in names
+
+
+def duplicate_bill_ids():
+    """Ids of the bills to drop so each (company, year, month) keeps one"""
+    rows = op.get_bind().execute(sa.text(
+        "SELECT id, company_id, bill_year, bill_month, status FROM monthly_bills "
+        "WHERE (company_id, bill_year, bill_month) IN ("
+        "    SELECT company_id, bill_year, bill_month FROM monthly_bills "
+        "    GROUP BY company_id, bill_year, bill_month HAVING COUNT(*) > 1"
+        ") ORDER BY id"
+    ))
+
+    periods = {}
+    for bill_id, company_id, bill_year, bill_month, status in rows:
+        periods.setdefault((company_id, bill_year, bill_month), []).append((status == 'draft', bill_id))
+
+    duplicates = []
+    for bills in periods.values():
+        bills.sort()
+        duplicates.extend(bill_id for is_draft, bill_id in bills[1:])
+    return duplicates
+
+
+def upgrade():
+    if has_constraint():
+        return
+
+    duplicates = duplicate_bill_ids()
+    for start in range(0, len(duplicates), 500):
+        chunk = duplicates[start:start + 500]
+        params = {f'id{i}': bill_id for i, bill_id in enumerate(chunk)}
+        placeholders = ', '.join(f':{name}' for name in params)
+        op.execute(sa.text(f"DELETE FROM bill_line_items WHERE bill_id IN ({placeholders})").bindparams(**params))
+        op.execute(sa.text(f"DELETE FROM monthly_bills WHERE id IN ({placeholders})").bindparams(**params))
+
+    with op.batch_alter_table('monthly_bills') as batch_op:
+        batch_op.create_unique_constraint(CONSTRAINT, COLUMNS)
+
+
+def downgrade():
+    with op.batch_alter_table('monthly_bills') as batch_op:
+        batch_op.drop_constraint(CONSTRAINT, type_='unique')
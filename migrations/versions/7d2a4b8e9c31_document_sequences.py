@@ -0,0 +1,34 @@
+"""Per-company document numbering sequences
+
+Revision ID: 7d2a4b8e9c31
+Revises: 3c9e1f7a2b10
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7d2a4b8e9c31'
+down_revision = '3c9e1f7a2b10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'document_sequences' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'document_sequences',
+        sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.id'), nullable=False),
+        sa.Column('kind', sa.String(length=50), nullable=False),
+        sa.Column('year', sa.Integer(), nullable=False),
+        sa.Column('next_value', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.PrimaryKeyConstraint('company_id', 'kind', 'year')
+    )
+
+
+def downgrade():
+    op.drop_table('document_sequences')
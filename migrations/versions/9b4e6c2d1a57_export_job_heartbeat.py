@@ -0,0 +1,61 @@
+"""Export jobs table and worker heartbeat
+
+Databases from before background exports have no export_jobs table, so it
+is created (with heartbeat_at) when missing; databases that have the table
+without heartbeat_at get the column.
+
+Revision ID: 9b4e6c2d1a57
+Revises: 7d2a4b8e9c31
+Create Date: 2026-10-18 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e6c2d1a57'
+down_revision = '7d2a4b8e9c31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    if 'export_jobs' not in inspector.get_table_names():
+        op.create_table(
+            'export_jobs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('job_type', sa.String(length=50), nullable=False),
+            sa.Column('params', sa.Text()),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('progress', sa.Integer(), nullable=False),
+            sa.Column('message', sa.String(length=255)),
+            sa.Column('file_path', sa.String(length=500)),
+            sa.Column('file_name', sa.String(length=255)),
+            sa.Column('mime_type', sa.String(length=100)),
+            sa.Column('file_size', sa.Integer()),
+            sa.Column('created_by', sa.Integer(), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+            sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.id', ondelete='CASCADE')),
+            sa.Column('created_at', sa.DateTime(), nullable=False),
+            sa.Column('started_at', sa.DateTime()),
+            sa.Column('heartbeat_at', sa.DateTime()),
+            sa.Column('completed_at', sa.DateTime()),
+            sa.Column('expires_at', sa.DateTime())
+        )
+        op.create_index('idx_export_jobs_user_created', 'export_jobs', ['created_by', 'created_at'])
+        op.create_index('idx_export_jobs_expires', 'export_jobs', ['expires_at'])
+        return
+
+    columns = {column['name'] for column in inspector.get_columns('export_jobs')}
+    if 'heartbeat_at' in columns:
+        return
+    with op.batch_alter_table('export_jobs') as batch_op:
+        batch_op.add_column(sa.Column('heartbeat_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    # export_jobs predates migrations on databases built from database_scripts/,
+    # so only the column is removed
+    with op.batch_alter_table('export_jobs') as batch_op:
+        batch_op.drop_column('heartbeat_at')
@@ -0,0 +1,52 @@
+"""Scrape run and per-municipality checkpoint tables
+
+Created when missing; each table is checked separately so a database that
+already has scrape_runs still gets scrape_checkpoints.
+
+Revision ID: a7c3e5f1d928
+Revises: f52b8e1d4c36
+Create Date: 2026-10-18 20:40:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c3e5f1d928'
+down_revision = 'f52b8e1d4c36'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    tables = sa.inspect(op.get_bind()).get_table_names()
+    if 'scrape_runs' not in tables:
+        op.create_table(
+            'scrape_runs',
+            sa.Column('id', sa.Integer(), primary_key=True),
+            sa.Column('status', sa.String(length=20), nullable=False),
+            sa.Column('started_at', sa.DateTime(), nullable=False),
+            sa.Column('completed_at', sa.DateTime()),
+            sa.Column('municipalities_total', sa.Integer()),
+            sa.Column('municipalities_done', sa.Integer()),
+            sa.Column('errors', sa.Integer())
+        )
+        op.create_index('idx_scrape_runs_status_started', 'scrape_runs', ['status', 'started_at'])
+
+    if 'scrape_checkpoints' not in tables:
+        op.create_table(
+            'scrape_checkpoints',
+            sa.Column('municipality', sa.String(length=255), primary_key=True),
+            sa.Column('run_id', sa.Integer(), sa.ForeignKey('scrape_runs.id', ondelete='SET NULL')),
+            sa.Column('last_success_at', sa.DateTime(), nullable=False),
+            sa.Column('listing_fingerprint', sa.String(length=64)),
+            sa.Column('tender_hashes', sa.Text(16777215)),
+            sa.Column('page_validators', sa.Text()),
+            sa.Column('tender_count', sa.Integer())
+        )
+
+
+def downgrade():
+    op.drop_table('scrape_checkpoints')
+    op.drop_table('scrape_runs')
@@ -0,0 +1,34 @@
+"""Processing watermarks table
+
+Created when missing; set-based jobs and the tender stats rollup record
+their progress here.
+
+Revision ID: b6d2f8a4c157
+Revises: a7c3e5f1d928
+Create Date: 2026-10-18 20:50:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6d2f8a4c157'
+down_revision = 'a7c3e5f1d928'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'processing_watermarks' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'processing_watermarks',
+        sa.Column('name', sa.String(length=100), primary_key=True),
+        sa.Column('watermark_at', sa.DateTime(), nullable=False),
+        sa.Column('updated_at', sa.DateTime())
+    )
+
+
+def downgrade():
+    op.drop_table('processing_watermarks')
@@ -0,0 +1,50 @@
+"""Tender statistics rollup table
+
+Created when missing; `flask rebuild-tender-stats` (or the first read of
+each company's statistics) fills it.
+
+Revision ID: c4d7e2a9f013
+Revises: 5e8a1c3f7b92
+Create Date: 2026-10-18 20:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d7e2a9f013'
+down_revision = '5e8a1c3f7b92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'tender_stats_rollup' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'tender_stats_rollup',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('status_id', sa.Integer(), sa.ForeignKey('tender_statuses.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('category_id', sa.Integer(), sa.ForeignKey('tender_categories.id', ondelete='CASCADE'),
+                  nullable=False),
+        sa.Column('period_month', sa.Date(), nullable=False),
+        sa.Column('tender_count', sa.Integer(), nullable=False),
+        sa.Column('won_count', sa.Integer(), nullable=False),
+        sa.Column('lost_count', sa.Integer(), nullable=False),
+        sa.Column('valued_count', sa.Integer(), nullable=False),
+        sa.Column('value_sum', sa.Numeric(18, 2), nullable=False),
+        sa.Column('value_min', sa.Numeric(15, 2)),
+        sa.Column('value_max', sa.Numeric(15, 2)),
+        sa.Column('duration_days_sum', sa.Integer(), nullable=False),
+        sa.Column('duration_count', sa.Integer(), nullable=False),
+        sa.Column('updated_at', sa.DateTime()),
+        sa.UniqueConstraint('company_id', 'status_id', 'category_id', 'period_month',
+                            name='unique_tender_stats_bucket')
+    )
+    op.create_index('idx_tender_stats_company_month', 'tender_stats_rollup', ['company_id', 'period_month'])
+
+
+def downgrade():
+    op.drop_table('tender_stats_rollup')
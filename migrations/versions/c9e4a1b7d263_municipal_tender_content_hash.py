@@ -0,0 +1,60 @@
+"""Municipal tender content hashes and unchanged-tender counts
+
+municipal_tenders and tender_scraping_log are created with raw SQL (by
+create_municipal_tender_tables() or database_scripts/), so older databases
+lack the columns the incremental scraper writes. Tables that do not exist
+yet are left alone; the scraper creates them with every column.
+
+Revision ID: c9e4a1b7d263
+Revises: b6d2f8a4c157
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c9e4a1b7d263'
+down_revision = 'b6d2f8a4c157'
+branch_labels = None
+depends_on = None
+
+
+MUNICIPAL_TENDER_COLUMNS = {
+    'source_url': sa.String(length=500),
+    'scraped_at': sa.DateTime(),
+    'content_hash': sa.CHAR(length=64),
+}
+
+
+def upgrade():
+    inspector = sa.inspect(op.get_bind())
+    tables = inspector.get_table_names()
+
+    if 'municipal_tenders' in tables:
+        columns = {column['name'] for column in inspector.get_columns('municipal_tenders')}
+        missing = [name for name in MUNICIPAL_TENDER_COLUMNS if name not in columns]
+        if missing:
+            with op.batch_alter_table('municipal_tenders') as batch_op:
+                for name in missing:
+                    batch_op.add_column(sa.Column(name, MUNICIPAL_TENDER_COLUMNS[name], nullable=True))
+        indexes = {index['name'] for index in inspector.get_indexes('municipal_tenders')}
+        if 'idx_scraped_at' not in indexes:
+            op.create_index('idx_scraped_at', 'municipal_tenders', ['scraped_at'])
+
+    if 'tender_scraping_log' in tables:
+        columns = {column['name'] for column in inspector.get_columns('tender_scraping_log')}
+        if 'unchanged_tenders' not in columns:
+            with op.batch_alter_table('tender_scraping_log') as batch_op:
+                batch_op.add_column(sa.Column('unchanged_tenders', sa.Integer(), server_default='0'))
+
+
+def downgrade():
+    # source_url and scraped_at were written by the scraper before this
+    # revision, so only what the incremental scraper added is removed
+    with op.batch_alter_table('tender_scraping_log') as batch_op:
+        batch_op.drop_column('unchanged_tenders')
+    op.drop_index('idx_scraped_at', table_name='municipal_tenders')
+    with op.batch_alter_table('municipal_tenders') as batch_op:
+        batch_op.drop_column('content_hash')
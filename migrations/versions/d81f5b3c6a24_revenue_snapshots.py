@@ -0,0 +1,41 @@
+"""Revenue history table
+
+Created when missing; `flask backfill-revenue-snapshots` records the months
+already billed.
+
+Revision ID: d81f5b3c6a24
+Revises: c4d7e2a9f013
+Create Date: 2026-10-18 20:10:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd81f5b3c6a24'
+down_revision = 'c4d7e2a9f013'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'revenue_snapshots' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'revenue_snapshots',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('period_month', sa.Date(), nullable=False),
+        sa.Column('company_id', sa.Integer(), sa.ForeignKey('companies.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('module_id', sa.Integer(), sa.ForeignKey('module_definitions.id', ondelete='RESTRICT'),
+                  nullable=False),
+        sa.Column('amount', sa.Numeric(10, 2), nullable=False),
+        sa.Column('is_custom_price', sa.Boolean(), nullable=False),
+        sa.Column('source', sa.String(length=20), nullable=False),
+        sa.Column('captured_at', sa.DateTime(), nullable=False),
+        sa.UniqueConstraint('period_month', 'company_id', 'module_id', name='unique_revenue_snapshot')
+    )
+
+
+def downgrade():
+    op.drop_table('revenue_snapshots')
@@ -0,0 +1,42 @@
+"""Scheduler job history table
+
+Created when missing.
+
+Revision ID: e3a6c9d2b715
+Revises: d81f5b3c6a24
+Create Date: 2026-10-18 20:20:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3a6c9d2b715'
+down_revision = 'd81f5b3c6a24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'scheduler_job_runs' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'scheduler_job_runs',
+        sa.Column('id', sa.Integer(), primary_key=True),
+        sa.Column('job_id', sa.String(length=100), nullable=False),
+        sa.Column('status', sa.String(length=20), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.Column('finished_at', sa.DateTime()),
+        sa.Column('duration', sa.Float()),
+        sa.Column('rows_affected', sa.Integer()),
+        sa.Column('error', sa.Text()),
+        sa.Column('worker_pid', sa.Integer()),
+        sa.Column('hostname', sa.String(length=255))
+    )
+    op.create_index('idx_job_runs_job_started', 'scheduler_job_runs', ['job_id', 'started_at'])
+    op.create_index('idx_job_runs_started', 'scheduler_job_runs', ['started_at'])
+
+
+def downgrade():
+    op.drop_table('scheduler_job_runs')
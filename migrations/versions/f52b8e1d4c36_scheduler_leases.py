@@ -0,0 +1,35 @@
+"""Scheduler leader lease table
+
+Created when missing.
+
+Revision ID: f52b8e1d4c36
+Revises: e3a6c9d2b715
+Create Date: 2026-10-18 20:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f52b8e1d4c36'
+down_revision = 'e3a6c9d2b715'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if 'scheduler_leases' in sa.inspect(op.get_bind()).get_table_names():
+        return
+    op.create_table(
+        'scheduler_leases',
+        sa.Column('name', sa.String(length=100), primary_key=True),
+        sa.Column('holder', sa.String(length=255), nullable=False),
+        sa.Column('acquired_at', sa.DateTime(), nullable=False),
+        sa.Column('renewed_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False)
+    )
+
+
+def downgrade():
+    op.drop_table('scheduler_leases')
@@ -196,6 +196,14 @@ class Tender(db.Model):
     # Relationships
     documents = db.relationship('TenderDocument', backref='tender', lazy=True, cascade='all, delete-orphan')
     
+    # Keyset pagination of a company's tenders, newest first; status
+    # filters and deadline ranges within a company
+    __table_args__ = (
+        db.Index('idx_tenders_company_created', 'company_id', 'created_at', 'id'),
+        db.Index('idx_tenders_company_status_created', 'company_id', 'status_id', 'created_at'),
+        db.Index('idx_tenders_company_deadline', 'company_id', 'submission_deadline'),
+    )
+    
     def get_custom_fields(self):
         """Get custom fields as dictionary"""
         if self.custom_fields:
@@ -357,6 +365,11 @@ class TenderHistory(db.Model):
     tender = db.relationship('Tender', backref=db.backref('history_entries', lazy=True, order_by='TenderHistory.created_at.desc()'))
     performed_by = db.relationship('User', foreign_keys=[performed_by_id], backref='performed_actions')
     
+    # Keyset pagination of a tender's history, newest first
+    __table_args__ = (
+        db.Index('idx_tender_history_tender_created', 'tender_id', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         """Convert history entry to dictionary for JSON serialization"""
         return {
@@ -377,6 +390,47 @@ def __repr__(self):
     def __str__(self):
         return f"History #{self.id}"
 
+class TenderStatsRollup(db.Model):
+    """Precomputed tender counts and values per company, status, category and month"""
+    __tablename__ = 'tender_stats_rollup'
+
+    id = db.Column(db.Integer, primary_key=True)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    status_id = db.Column(db.Integer, db.ForeignKey('tender_statuses.id'), nullable=False)
+    category_id = db.Column(db.Integer, db.ForeignKey('tender_categories.id'), nullable=False)
+    period_month = db.Column(db.Date, nullable=False)  # First day of the month the tenders were created
+
+    tender_count = db.Column(db.Integer, default=0, nullable=False)
+    won_count = db.Column(db.Integer, default=0, nullable=False)
+    lost_count = db.Column(db.Integer, default=0, nullable=False)
+
+    # Estimated value aggregates (only tenders with an estimated value are counted)
+    valued_count = db.Column(db.Integer, default=0, nullable=False)
+    value_sum = db.Column(Numeric(18, 2), default=0, nullable=False)
+    value_min = db.Column(Numeric(15, 2))
+    value_max = db.Column(Numeric(15, 2))
+
+    # Days from creation to submission deadline (tenders with a positive duration)
+    duration_days_sum = db.Column(db.Integer, default=0, nullable=False)
+    duration_count = db.Column(db.Integer, default=0, nullable=False)
+
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'status_id', 'category_id', 'period_month', name='unique_tender_stats_bucket'),
+        db.Index('idx_tender_stats_company_month', 'company_id', 'period_month'),
+    )
+
+    @property
+    def value_avg(self):
+        """Average estimated value of the bucket's valued tenders"""
+        if not self.valued_count:
+            return None
+        return Decimal(self.value_sum) / self.valued_count
+
+    def __repr__(self):
+        return f'<TenderStatsRollup {self.company_id}/{self.status_id}/{self.category_id}/{self.period_month}>'
+
 # =====================================================
 # MODULE SYSTEM MODELS
 # =====================================================
@@ -442,8 +496,11 @@ class CompanyModule(db.Model):
     enabled_by_user = db.relationship('User', foreign_keys=[enabled_by])
     disabled_by_user = db.relationship('User', foreign_keys=[disabled_by])
     
-    # Unique constraint
-    __table_args__ = (db.UniqueConstraint('company_id', 'module_id', name='unique_company_module'),)
+    # Unique constraint; a company's enabled modules
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'module_id', name='unique_company_module'),
+        db.Index('idx_company_module_company_enabled', 'company_id', 'is_enabled'),
+    )
     
     def get_effective_price(self):
         """Get the effective price for this company module (custom or default)"""
@@ -474,36 +531,24 @@ def has_custom_pricing(self):
     @staticmethod
     def get_enabled_modules(company_id):
         """Get list of enabled module names for a company"""
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(ModuleDefinition).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
+        from services.cache_service import CacheService
         
-        return [module_def.module_name for cm, module_def in enabled_modules]
+        def load():
+            rows = db.session.query(ModuleDefinition.module_name).join(
+                CompanyModule, CompanyModule.module_id == ModuleDefinition.id
+            ).filter(
+                CompanyModule.company_id == company_id,
+                CompanyModule.is_enabled == True
+            ).all()
+            return [row[0] for row in rows]
+        
+        return list(CacheService.get_or_load('enabled_module_names', company_id, 'names', load))
     
     @staticmethod
     def get_monthly_cost(company_id):
-        """Get total monthly cost for a company"""
-        enabled_modules = db.session.query(CompanyModule, ModuleDefinition).join(ModuleDefinition).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).all()
-        
-        total_cost = 0.0
-        for cm, module_def in enabled_modules:
-            # Check for custom pricing
-            custom_pricing = CompanyModulePricing.query.filter_by(
-                company_id=company_id,
-                module_id=module_def.id,
-                is_active=True
-            ).order_by(CompanyModulePricing.effective_date.desc()).first()
-            
-            if custom_pricing:
-                total_cost += float(custom_pricing.custom_price)
-            else:
-                total_cost += float(module_def.monthly_price) if module_def.monthly_price else 0.0
-        
-        return total_cost
+        """Get total monthly cost for a company (custom prices applied)"""
+        from services.revenue_matrix_service import RevenueMatrixService
+        return RevenueMatrixService.load(company_ids=[company_id]).company_total(company_id)
     
     @staticmethod
     def is_module_enabled(company_id, module_name):
@@ -559,6 +604,11 @@ class CompanyModulePricing(db.Model):
     module = db.relationship('ModuleDefinition', backref='custom_pricing')
     created_by_user = db.relationship('User')
     
+    # Active custom price of one module for a company
+    __table_args__ = (
+        db.Index('idx_custom_pricing_company_module_active', 'company_id', 'module_id', 'is_active'),
+    )
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -582,6 +632,9 @@ def __repr__(self):
 class MonthlyBill(db.Model):
     """Monthly bills for companies"""
     __tablename__ = 'monthly_bills'
+    __table_args__ = (
+        db.UniqueConstraint('company_id', 'bill_year', 'bill_month', name='unique_company_bill_period'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
@@ -672,6 +725,27 @@ def __repr__(self):
     def __str__(self):
         return f"BillItem {self.id} - {self.module_display_name}"
 
+class RevenueSnapshot(db.Model):
+    """Monthly revenue per company and module, kept as billing history"""
+    __tablename__ = 'revenue_snapshots'
+    
+    id = db.Column(db.Integer, primary_key=True)
+    period_month = db.Column(db.Date, nullable=False)  # First day of the month the revenue belongs to
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('module_definitions.id'), nullable=False)
+    amount = db.Column(Numeric(10, 2), nullable=False)
+    is_custom_price = db.Column(db.Boolean, default=False, nullable=False)
+    source = db.Column(db.String(20), nullable=False)  # bill, pricing
+    captured_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    
+    # Period first so window queries are a range scan of the unique index
+    __table_args__ = (
+        db.UniqueConstraint('period_month', 'company_id', 'module_id', name='unique_revenue_snapshot'),
+    )
+    
+    def __repr__(self):
+        return f'<RevenueSnapshot {self.period_month} {self.company_id}/{self.module_id}>'
+
 # Add this alias for backward compatibility
 Bill = MonthlyBill  # This allows existing code to use Bill instead of MonthlyBill
 
@@ -788,6 +862,11 @@ class TenderNotification(db.Model):
     company = db.relationship('Company')
     processor = db.relationship('User', foreign_keys=[processed_by])
     
+    # Keyset pagination of a company's open notifications, newest first
+    __table_args__ = (
+        db.Index('idx_notifications_company_processed_created', 'company_id', 'is_processed', 'created_at', 'id'),
+    )
+    
     def to_dict(self):
         """Convert notification to dictionary for JSON serialization"""
         return {
@@ -811,6 +890,241 @@ def __repr__(self):
     def __str__(self):
         return f"Notification #{self.id}"
 
+# =====================================================
+# EXPORT JOB MODELS
+# =====================================================
+
+class ExportJob(db.Model):
+    """Report export rendered in the background, with its downloadable artifact"""
+    __tablename__ = 'export_jobs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_type = db.Column(db.String(50), nullable=False)  # e.g., 'tender_list', 'billing_report', 'bills'
+    params = db.Column(db.Text)  # JSON arguments for the job handler
+    status = db.Column(db.String(20), default='queued', nullable=False)  # queued, running, completed, failed
+    progress = db.Column(db.Integer, default=0, nullable=False)  # Percent complete (0-100)
+    message = db.Column(db.String(255))
+
+    # Artifact (stored under UPLOAD_FOLDER)
+    file_path = db.Column(db.String(500))
+    file_name = db.Column(db.String(255))
+    mime_type = db.Column(db.String(100))
+    file_size = db.Column(db.Integer)
+
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    started_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)  # Refreshed by the worker while it renders
+    completed_at = db.Column(db.DateTime, nullable=True)
+    expires_at = db.Column(db.DateTime, nullable=True)
+
+    # Relationships
+    user = db.relationship('User')
+    company = db.relationship('Company')
+
+    __table_args__ = (
+        db.Index('idx_export_jobs_user_created', 'created_by', 'created_at'),
+        db.Index('idx_export_jobs_expires', 'expires_at'),
+    )
+
+    @property
+    def is_finished(self):
+        return self.status in ('completed', 'failed')
+
+    def get_params(self):
+        """Parse params JSON"""
+        if self.params:
+            try:
+                return json.loads(self.params)
+            except ValueError:
+                return {}
+        return {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_type': self.job_type,
+            'status': self.status,
+            'progress': self.progress,
+            'message': self.message,
+            'file_name': self.file_name,
+            'file_size': self.file_size,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+    def __repr__(self):
+        return f'<ExportJob {self.id}: {self.job_type} {self.status}>'
+
+# =====================================================
+# SCHEDULER MODELS
+# =====================================================
+
+class SchedulerJobRun(db.Model):
+    """One execution of a scheduled job, shared by every worker process"""
+    __tablename__ = 'scheduler_job_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    job_id = db.Column(db.String(100), nullable=False)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, success, error
+    started_at = db.Column(db.DateTime, default=datetime.now, nullable=False)  # Server local time, like the scheduler
+    finished_at = db.Column(db.DateTime, nullable=True)
+    duration = db.Column(db.Float, nullable=True)  # Seconds
+    rows_affected = db.Column(db.Integer, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    worker_pid = db.Column(db.Integer, nullable=True)
+    hostname = db.Column(db.String(255), nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_job_runs_job_started', 'job_id', 'started_at'),
+        db.Index('idx_job_runs_started', 'started_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'job_id': self.job_id,
+            'status': self.status,
+            'timestamp': self.started_at.isoformat() if self.started_at else None,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None,
+            'duration': self.duration,
+            'created_count': self.rows_affected,
+            'rows_affected': self.rows_affected,
+            'error': self.error,
+            'worker_pid': self.worker_pid,
+            'hostname': self.hostname
+        }
+
+    def __repr__(self):
+        return f'<SchedulerJobRun {self.id}: {self.job_id} {self.status}>'
+
+
+class SchedulerLease(db.Model):
+    """Time-limited lease naming the one process allowed to run scheduled jobs"""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(100), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)  # hostname:pid:token of the leader
+    acquired_at = db.Column(db.DateTime, nullable=False)
+    renewed_at = db.Column(db.DateTime, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)  # UTC; free for takeover after this
+
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'holder': self.holder,
+            'acquired_at': self.acquired_at.isoformat() if self.acquired_at else None,
+            'renewed_at': self.renewed_at.isoformat() if self.renewed_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
+
+    def __repr__(self):
+        return f'<SchedulerLease {self.name}: {self.holder}>'
+
+# =====================================================
+# SCRAPING MODELS
+# =====================================================
+
+class ScrapeRun(db.Model):
+    """One municipal scraping sweep; a 'running' sweep is resumed after a crash"""
+    __tablename__ = 'scrape_runs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), default='running', nullable=False)  # running, completed
+    started_at = db.Column(db.DateTime, default=datetime.now, nullable=False)
+    completed_at = db.Column(db.DateTime, nullable=True)
+    municipalities_total = db.Column(db.Integer, default=0)
+    municipalities_done = db.Column(db.Integer, default=0)
+    errors = db.Column(db.Integer, default=0)
+
+    __table_args__ = (
+        db.Index('idx_scrape_runs_status_started', 'status', 'started_at'),
+    )
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'status': self.status,
+            'started_at': self.started_at.isoformat() if self.started_at else None,
+            'completed_at': self.completed_at.isoformat() if self.completed_at else None,
+            'municipalities_total': self.municipalities_total,
+            'municipalities_done': self.municipalities_done,
+            'errors': self.errors
+        }
+
+    def __repr__(self):
+        return f'<ScrapeRun {self.id}: {self.status}>'
+
+
+class ScrapeCheckpoint(db.Model):
+    """Last successful scrape of one municipality's listing"""
+    __tablename__ = 'scrape_checkpoints'
+
+    municipality = db.Column(db.String(255), primary_key=True)
+    run_id = db.Column(db.Integer, db.ForeignKey('scrape_runs.id', ondelete='SET NULL'), nullable=True)
+    last_success_at = db.Column(db.DateTime, nullable=False)
+    listing_fingerprint = db.Column(db.String(64), nullable=True)  # SHA-256 of the listing's tender hashes
+    tender_hashes = db.Column(db.Text(16777215), nullable=True)  # JSON: tender_number -> content hash (MEDIUMTEXT)
+    page_validators = db.Column(db.Text, nullable=True)  # JSON: url -> {etag, last_modified}
+    tender_count = db.Column(db.Integer, default=0)
+
+    def get_tender_hashes(self):
+        """Get tender content hashes as dictionary"""
+        if self.tender_hashes:
+            try:
+                return json.loads(self.tender_hashes)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+
+    def set_tender_hashes(self, hashes):
+        """Set tender content hashes from dictionary"""
+        self.tender_hashes = json.dumps(hashes, sort_keys=True) if hashes else None
+
+    def get_page_validators(self):
+        """Get listing page ETag/Last-Modified validators as dictionary"""
+        if self.page_validators:
+            try:
+                return json.loads(self.page_validators)
+            except json.JSONDecodeError:
+                return {}
+        return {}
+
+    def set_page_validators(self, validators):
+        """Set listing page validators from dictionary"""
+        self.page_validators = json.dumps(validators, sort_keys=True) if validators else None
+
+    def __repr__(self):
+        return f'<ScrapeCheckpoint {self.municipality}>'
+
+class ProcessingWatermark(db.Model):
+    """How far a set-based job has processed (e.g. the time of its last run)"""
+    __tablename__ = 'processing_watermarks'
+
+    name = db.Column(db.String(100), primary_key=True)
+    watermark_at = db.Column(db.DateTime, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<ProcessingWatermark {self.name}: {self.watermark_at}>'
+
+class DocumentSequence(db.Model):
+    """Next unallocated number of a per-company document numbering (e.g. tender references per year)"""
+    __tablename__ = 'document_sequences'
+
+    company_id = db.Column(db.Integer, db.ForeignKey('companies.id'), primary_key=True)
+    kind = db.Column(db.String(50), primary_key=True)
+    year = db.Column(db.Integer, primary_key=True, default=0)  # 0 for numberings that never reset
+    next_value = db.Column(db.Integer, nullable=False, default=1)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
+
+    def __repr__(self):
+        return f'<DocumentSequence {self.company_id}/{self.kind}/{self.year}: {self.next_value}>'
+
 # =====================================================
 # LEGACY MODELS (for backward compatibility)
 # =====================================================
@@ -1017,17 +1331,10 @@ class Account(db.Model):
     # Relationships
     transactions = db.relationship('Transaction', backref='account', lazy=True)
     
-    def get_balance(self):
-        """Calculate account balance"""
-        debits = sum([t.debit_amount for t in self.transactions if t.debit_amount])
-        credits = sum([t.credit_amount for t in self.transactions if t.credit_amount])
-        
-        # For normal debit balance accounts (assets, expenses)
-        if self.account_type.normal_balance == 'debit':
-            return debits - credits
-        # For normal credit balance accounts (liabilities, equity, revenue)
-        else:
-            return credits - debits
+    def get_balance(self, as_of=None):
+        """Calculate account balance (summed in SQL rather than loading every transaction)"""
+        from services.account_balance_service import AccountBalanceService
+        return AccountBalanceService.get_balance(self, as_of=as_of)
     
     def __repr__(self):
         return f'<Account {self.account_number} - {self.account_name}>'
@@ -1190,6 +1497,11 @@ class UserCompanyRole(db.Model):
     role = db.relationship('CompanyRole', overlaps="company_roles,users")
     assigner = db.relationship('User', foreign_keys=[assigned_by])
     
+    # Roles of a user, looked up on every permission check
+    __table_args__ = (
+        db.Index('idx_user_role_user', 'user_id'),
+    )
+    
     def __repr__(self):
         return f'<UserCompanyRole User:{self.user_id} Role:{self.role_id}>'
 
@@ -1219,6 +1531,11 @@ class TenderAssignment(db.Model):
     assigned_to = db.relationship('User', foreign_keys=[assigned_to_id], backref='tender_assignments')
     assigned_by = db.relationship('User', foreign_keys=[assigned_by_id])
     
+    # A user's active assignments
+    __table_args__ = (
+        db.Index('idx_assignment_user_active', 'assigned_to_id', 'is_active'),
+    )
+    
     def __repr__(self):
         return f'<TenderAssignment Tender:{self.tender_id} AssignedTo:{self.assigned_to_id}>'
 
@@ -2,7 +2,8 @@
 
 from functools import wraps
 from flask import session, request, jsonify, flash, redirect, url_for, abort
-from models import User, Company, CompanyModule, ModuleDefinition, Role
+from models import ModuleDefinition, Role
+from services.entitlement_service import EntitlementService
 
 from functools import wraps
 from flask import session, flash, redirect, url_for, jsonify, request
@@ -107,79 +108,9 @@ class ModulePermissions:
     def get_user_permissions(user_id):
         """Get comprehensive permissions for a user"""
         try:
-            user = User.query.get(user_id)
-            if not user:
-                return None
-            
-            # SUPER ADMIN BYPASS - Super admins get all permissions
-            if user.is_super_admin:
-                return {
-                    'user': user,
-                    'company': user.company if user.company_id else None,
-                    'user_role': user.role.name if user.role else 'Super Admin',
-                    'is_company_admin': True,  # Super admin is also company admin
-                    'is_super_admin': True,
-                    'enabled_modules': ['all'],  # Super admin has access to all modules
-                    'can_delete': True,
-                    'can_manage_users': True,
-                    'can_view_analytics': True,
-                    'can_use_api': True,
-                    'has_notifications': True,
-                    'has_white_label': True,
-                    'can_manage_company': True,
-                    'can_upload_documents': True,
-                    'can_create_custom_fields': True,
-                    'can_add_notes': True,
-                    'can_view_audit_log': True,
-                    'can_advanced_search': True
-                }
-            
-            # Regular users need company
-            if not user.company_id:
-                return None
-                
-            company = Company.query.get(user.company_id)
-            if not company:
-                return None
-            
-            # Get enabled modules for the company
-            try:
-                enabled_modules = company.get_enabled_modules()
-            except:
-                # Fallback if method doesn't exist
-                enabled_modules = CompanyModule.get_enabled_modules(user.company_id)
-            
-            # Determine user role permissions
-            user_role = user.role.name if user.role else 'user'
-            
-            # Check if user is company admin (handle different role name formats)
-            admin_roles = ['company_admin', 'admin', 'Company Admin', 'Admin', 'Super Admin']
-            is_company_admin = user_role in admin_roles
-            
-            # Additional check with case insensitive comparison
-            if not is_company_admin:
-                is_company_admin = user_role.lower() in [role.lower() for role in admin_roles]
-            
-            return {
-                'user': user,
-                'company': company,
-                'user_role': user_role,
-                'is_company_admin': is_company_admin,
-                'is_super_admin': False,
-                'enabled_modules': enabled_modules,
-                'can_delete': is_company_admin,
-                'can_manage_users': 'user_management' in enabled_modules and is_company_admin,
-                'can_view_analytics': 'reporting' in enabled_modules,
-                'can_use_api': 'api_access' in enabled_modules,
-                'has_notifications': 'notifications' in enabled_modules,
-                'has_white_label': 'white_labeling' in enabled_modules,
-                'can_manage_company': 'company_management' in enabled_modules and is_company_admin,
-                'can_upload_documents': 'document_management' in enabled_modules,
-                'can_create_custom_fields': 'custom_fields' in enabled_modules and is_company_admin,
-                'can_add_notes': 'notes_comments' in enabled_modules,
-                'can_view_audit_log': 'audit_tracking' in enabled_modules and is_company_admin,
-                'can_advanced_search': 'advanced_search' in enabled_modules
-            }
+            # Served from the request's entitlement snapshot when it is for this user
+            snapshot = EntitlementService.resolve(user_id)
+            return snapshot.module_permissions
             
         except Exception as e:
             print(f"Error getting user permissions: {str(e)}")
@@ -195,7 +126,8 @@ def check_module_access(module_name, user_id=None):
             return False
         
         try:
-            user = User.query.get(user_id)
+            snapshot = EntitlementService.resolve(user_id)
+            user = snapshot.user
             if not user:
                 return False
             
@@ -207,7 +139,7 @@ def check_module_access(module_name, user_id=None):
             if not user.company_id:
                 return False
             
-            permissions = ModulePermissions.get_user_permissions(user_id)
+            permissions = snapshot.module_permissions
             if not permissions:
                 return False
                 
@@ -256,7 +188,7 @@ def decorated_function(*args, **kwargs):
                 return redirect(url_for('login'))
             
             user_id = session['user_id']
-            user = User.query.get(user_id)
+            user = EntitlementService.resolve(user_id).user
             
             # SUPER ADMIN BYPASS - Super admins can access everything
             if user and user.is_super_admin:
@@ -430,8 +362,7 @@ def decorated_function(*args, **kwargs):
                 flash('Please log in to access this page.', 'warning')
                 return redirect(url_for('login'))
             
-            from models import User
-            user = User.query.get(session['user_id'])
+            user = EntitlementService.resolve(session['user_id']).user
             
             if not user:
                 flash('User not found.', 'error')
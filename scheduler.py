@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Standalone scheduler process
+
+Runs the scheduled jobs (notifications, rollups, billing, scraping, ...)
+outside the web workers. Set SCHEDULER_MODE=standalone for the web app so
+its workers stay out of the scheduler election, then run:
+
+    python scheduler.py
+
+More than one copy can run (e.g. one per host): they elect a leader through
+the scheduler_leases table and the others stand by until it stops renewing.
+"""
+
+import logging
+import signal
+import threading
+
+from app import scheduler_coordinator
+
+logger = logging.getLogger('scheduler')
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(name)s: %(message)s')
+
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+
+    scheduler_coordinator.start()
+    logger.info(f"Scheduler process {scheduler_coordinator.holder} started")
+
+    while not stop.wait(60):
+        pass
+
+    logger.info("Scheduler process stopping")
+    scheduler_coordinator.stop()
+
+
+if __name__ == '__main__':
+    main()
@@ -6,8 +6,15 @@
 import json
 from werkzeug.utils import secure_filename
 from models import db, TenderHistory
+from sqlalchemy.orm import joinedload
 
 from services.module_service import ModuleService
+from services.dashboard_stats_service import DashboardStatsService
+from services.tender_stats_rollup_service import TenderStatsRollupService
+from services.tender_search_service import TenderSearchService
+from services.tender_autocomplete_service import TenderAutocompleteService
+from services.pagination_service import PaginationService
+from services.sequence_service import SequenceService
 
 
 
@@ -463,20 +470,43 @@ class TenderService:
     
     @staticmethod
     def generate_reference_number(company_id):
-        """Generate unique reference number for tender"""
+        """
+        Generate unique reference number for tender
+
+        Reference numbers are unique across companies, and companies whose
+        names start with the same three letters share a prefix, so the
+        sequence is per prefix: its row belongs to the lowest-numbered
+        company with that prefix and it continues from every tender
+        already numbered with it.
+        """
         company = Company.query.get(company_id)
         company_code = company.name[:3].upper() if company else "TND"
         
         # Get current year
         year = datetime.now().year
+        prefix = f"{company_code}-{year}-"
         
-        # Count existing tenders for this company this year
-        count = Tender.query.filter(
-            Tender.company_id == company_id,
-            db.extract('year', Tender.created_at) == year
-        ).count() + 1
+        # Next number of the prefix's sequence for this year (continuing
+        # from references issued before the sequence existed)
+        number = SequenceService.next_value(
+            TenderService._reference_sequence_owner(company, company_code) if company else company_id,
+            f'tender_reference:{company_code}', year,
+            seed=lambda: SequenceService.highest_suffix(Tender.reference_number, prefix)
+        )
         
-        return f"{company_code}-{year}-{count:04d}"
+        return f"{prefix}{number:04d}"
+    
+    @staticmethod
+    def _reference_sequence_owner(company, company_code):
+        """ID of the lowest-numbered company whose reference numbers start with company_code"""
+        # LIKE narrows the candidates; the exact match is the one used for the code
+        candidates = db.session.query(Company.id, Company.name).filter(
+            Company.name.like(f"{company.name[:3]}%")
+        ).order_by(Company.id)
+        for candidate_id, name in candidates:
+            if name[:3].upper() == company_code:
+                return candidate_id
+        return company.id
     
     @staticmethod
     def create_tender(title, description, company_id, category_id, status_id, created_by, 
@@ -503,6 +533,10 @@ def create_tender(title, description, company_id, category_id, status_id, create
             
             db.session.add(tender)
             db.session.commit()
+            DashboardStatsService.invalidate(company_id)
+            TenderStatsRollupService.refresh_buckets(TenderStatsRollupService.bucket_key(tender))
+            TenderSearchService.index_tender(tender)
+            TenderAutocompleteService.index_tender(tender)
             return tender, "Tender created successfully"
         except Exception as e:
             db.session.rollback()
@@ -517,6 +551,8 @@ def update_tender(tender_id, title, description, category_id, status_id,
             if not tender:
                 return False, "Tender not found"
             
+            previous_bucket = TenderStatsRollupService.bucket_key(tender)
+            
             tender.title = title
             tender.description = description
             tender.category_id = category_id
@@ -529,6 +565,12 @@ def update_tender(tender_id, title, description, category_id, status_id,
                 tender.set_custom_fields(custom_fields)
             
             db.session.commit()
+            DashboardStatsService.invalidate(tender.company_id)
+            TenderStatsRollupService.refresh_buckets(
+                previous_bucket, TenderStatsRollupService.bucket_key(tender)
+            )
+            TenderSearchService.index_tender(tender)
+            TenderAutocompleteService.index_tender(tender)
             return True, "Tender updated successfully"
         except Exception as e:
             db.session.rollback()
@@ -565,8 +607,14 @@ def delete_tender(tender_id):
             if not tender:
                 return False, "Tender not found"
             
+            company_id = tender.company_id
+            bucket = TenderStatsRollupService.bucket_key(tender)
             db.session.delete(tender)
             db.session.commit()
+            DashboardStatsService.invalidate(company_id)
+            TenderStatsRollupService.refresh_buckets(bucket)
+            TenderSearchService.remove_tender(tender_id)
+            TenderAutocompleteService.remove_tender(tender_id, company_id)
             return True, "Tender deleted successfully"
         except Exception as e:
             db.session.rollback()
@@ -575,37 +623,17 @@ def delete_tender(tender_id):
     def get_tender_stats(company_id=None):
         """Get tender statistics"""
         try:
-            if company_id:
-                # Company-specific stats
-                total_tenders = Tender.query.filter_by(company_id=company_id).count()
-                
-                # Get status breakdown for company
-                stats = db.session.query(
-                    TenderStatus.name,
-                    TenderStatus.color,
-                    db.func.count(Tender.id).label('count')
-                ).join(Tender).filter(
-                    Tender.company_id == company_id
-                ).group_by(TenderStatus.name, TenderStatus.color).all()
-                
-            else:
-                # System-wide stats (for super admin)
-                total_tenders = Tender.query.count()
-                
-                # Get status breakdown for all tenders
-                stats = db.session.query(
-                    TenderStatus.name,
-                    TenderStatus.color,
-                    db.func.count(Tender.id).label('count')
-                ).join(Tender).group_by(TenderStatus.name, TenderStatus.color).all()
+            # Read from the rollup (one row per status/category/month bucket)
+            stats = TenderStatsRollupService.get_status_breakdown(company_id)
+            total_tenders = sum(stat['count'] for stat in stats)
             
             # Format the status breakdown
             status_breakdown = []
             for stat in stats:
                 status_breakdown.append({
-                    'name': stat.name,
-                    'color': stat.color,
-                    'count': stat.count
+                    'name': stat['name'],
+                    'color': stat['color'],
+                    'count': stat['count']
                 })
             
             # Sort by count (highest first)
@@ -974,14 +1002,11 @@ def generate_tender_summary_report(company_id=None, start_date=None, end_date=No
     def get_tender_analytics(company_id=None):
         """Get tender analytics data for charts and graphs"""
         try:
-            # Base query for tenders
-            if company_id:
-                tenders = Tender.query.filter_by(company_id=company_id).all()
-            else:
-                tenders = Tender.query.all()
+            # Read from the rollup (one row per status/category group)
+            groups = TenderStatsRollupService.get_status_category_breakdown(company_id)
             
             # Calculate completion rates
-            total_tenders = len(tenders)
+            total_tenders = sum(group['count'] for group in groups)
             if total_tenders == 0:
                 return {
                     'completion_rate': 0,
@@ -992,19 +1017,19 @@ def get_tender_analytics(company_id=None):
             
             # Status distribution for pie charts
             status_distribution = {}
-            for tender in tenders:
-                status = tender.status.name
+            for group in groups:
+                status = group['status_name']
                 if status not in status_distribution:
                     status_distribution[status] = {
                         'count': 0,
-                        'color': tender.status.color
+                        'color': group['status_color']
                     }
-                status_distribution[status]['count'] += 1
+                status_distribution[status]['count'] += group['count']
             
             # Category performance
             category_performance = {}
-            for tender in tenders:
-                category = tender.category.name
+            for group in groups:
+                category = group['category']
                 if category not in category_performance:
                     category_performance[category] = {
                         'total': 0,
@@ -1012,31 +1037,23 @@ def get_tender_analytics(company_id=None):
                         'in_progress': 0
                     }
                 
-                category_performance[category]['total'] += 1
+                category_performance[category]['total'] += group['count']
                 
-                if tender.status.name in ['Awarded', 'Completed']:
-                    category_performance[category]['completed'] += 1
-                elif tender.status.name in ['Published', 'Under Review']:
-                    category_performance[category]['in_progress'] += 1
+                if group['status_name'] in ['Awarded', 'Completed']:
+                    category_performance[category]['completed'] += group['count']
+                elif group['status_name'] in ['Published', 'Under Review']:
+                    category_performance[category]['in_progress'] += group['count']
             
             # Calculate average tender duration (for completed tenders)
-            completed_tenders = [t for t in tenders if t.status.name in ['Awarded', 'Completed']]
+            completed_groups = [g for g in groups if g['status_name'] in ['Awarded', 'Completed']]
             average_duration = 0
-            if completed_tenders:
-                total_duration = 0
-                count = 0
-                for tender in completed_tenders:
-                    if tender.submission_deadline and tender.created_at:
-                        duration = (tender.submission_deadline - tender.created_at).days
-                        if duration > 0:
-                            total_duration += duration
-                            count += 1
-                
-                if count > 0:
-                    average_duration = total_duration / count
+            total_duration = sum(g['duration_days_sum'] for g in completed_groups)
+            count = sum(g['duration_count'] for g in completed_groups)
+            if count > 0:
+                average_duration = total_duration / count
             
             # Completion rate
-            completed_count = len([t for t in tenders if t.status.name in ['Awarded', 'Completed']])
+            completed_count = sum(g['count'] for g in completed_groups)
             completion_rate = (completed_count / total_tenders) * 100 if total_tenders > 0 else 0
             
             return {
@@ -1170,18 +1187,11 @@ def search_tenders(search_term, company_id=None, status_id=None, category_id=Non
             if category_id:
                 query = query.filter(Tender.category_id == category_id)
             
-            # Apply search term if provided
+            # Apply search term if provided (best matches first)
             if search_term:
-                search_pattern = f"%{search_term}%"
-                query = query.filter(
-                    db.or_(
-                        Tender.title.ilike(search_pattern),
-                        Tender.description.ilike(search_pattern),
-                        Tender.reference_number.ilike(search_pattern)
-                    )
-                )
+                query = TenderSearchService.filter_query(query, search_term, ranked=True)
             
-            # Order by creation date (newest first) and limit results
+            # Then newest first, and limit results
             tenders = query.order_by(Tender.created_at.desc()).limit(limit).all()
             
             return tenders
@@ -1190,17 +1200,31 @@ def search_tenders(search_term, company_id=None, status_id=None, category_id=Non
             return []
     
     @staticmethod
-    def get_tender_suggestions(partial_title, company_id=None, limit=10):
-        """Get tender title suggestions for autocomplete"""
+    def get_tender_suggestions(partial_title, company_id=None, limit=10, tender_ids=None):
+        """
+        Get tender title suggestions for autocomplete
+        
+        Pass tender_ids (TenderAutocompleteService.visible_tender_ids(entitlements))
+        for users who may only see some of the company's tenders.
+        """
         try:
+            # A company's titles come from its in-memory prefix index
+            if company_id and partial_title:
+                suggestions = TenderAutocompleteService.suggest(
+                    company_id, partial_title, limit, kinds=('title',), tender_ids=tender_ids
+                )
+                return [suggestion['text'] for suggestion in suggestions]
+            
             query = Tender.query
             
             if company_id:
                 query = query.filter(Tender.company_id == company_id)
             
+            if tender_ids is not None:
+                query = query.filter(Tender.id.in_(tender_ids))
+            
             if partial_title:
-                search_pattern = f"%{partial_title}%"
-                query = query.filter(Tender.title.ilike(search_pattern))
+                query = TenderSearchService.filter_query(query, partial_title, title_only=True)
             
             suggestions = query.with_entities(Tender.title).distinct().limit(limit).all()
             return [suggestion[0] for suggestion in suggestions]
@@ -1356,6 +1380,25 @@ def get_tender_history(tender_id, limit=None):
         
         return query.all()
     
+    @staticmethod
+    def get_tender_history_page(tender_id, cursor=None, limit=50):
+        """
+        One page of a tender's history, newest first
+        
+        Args:
+            tender_id: Tender ID
+            cursor: Cursor from the previous page (None for the newest entries)
+            limit: Entries per page
+        
+        Returns:
+            PaginationService.seek() dictionary of TenderHistory items
+        """
+        return PaginationService.seek(
+            TenderHistory.query.filter_by(tender_id=tender_id).options(joinedload(TenderHistory.performed_by)),
+            TenderHistory.created_at, TenderHistory.id,
+            cursor=cursor, limit=limit
+        )
+    
     @staticmethod
     def get_user_actions(user_id, limit=None):
         """Get all actions performed by a specific user"""
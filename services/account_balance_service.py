@@ -0,0 +1,166 @@
+"""
+Account Balance Service
+Computes general ledger balances with one aggregate query per company
+"""
+
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from models import db, Account, AccountType, JournalEntry, Transaction
+
+
+# Account type categories in statement order
+ACCOUNT_CATEGORIES = ['asset', 'liability', 'equity', 'revenue', 'expense']
+
+
+class AccountBalanceService:
+    """Service for account balances and statement totals"""
+
+    @staticmethod
+    def _totals_subquery(company_id, as_of=None, start_date=None, posted_only=False, account_id=None):
+        """Debit and credit totals per account, filtered through the journal entry"""
+        query = db.session.query(
+            Transaction.account_id.label('account_id'),
+            func.coalesce(func.sum(Transaction.debit_amount), 0).label('debits'),
+            func.coalesce(func.sum(Transaction.credit_amount), 0).label('credits')
+        ).join(
+            JournalEntry, Transaction.journal_entry_id == JournalEntry.id
+        ).filter(JournalEntry.company_id == company_id)
+
+        if account_id:
+            query = query.filter(Transaction.account_id == account_id)
+        if as_of:
+            query = query.filter(JournalEntry.entry_date <= as_of)
+        if start_date:
+            query = query.filter(JournalEntry.entry_date >= start_date)
+        if posted_only:
+            query = query.filter(JournalEntry.is_posted == True)
+
+        return query.group_by(Transaction.account_id).subquery()
+
+    @staticmethod
+    def signed_balance(normal_balance, debits, credits):
+        """
+        Balance in the account's normal direction
+
+        Args:
+            normal_balance: 'debit' (assets, expenses) or 'credit'
+            debits: Total debits
+            credits: Total credits
+
+        Returns:
+            Decimal balance
+        """
+        debits = Decimal(debits or 0)
+        credits = Decimal(credits or 0)
+        if normal_balance == 'debit':
+            return debits - credits
+        return credits - debits
+
+    @staticmethod
+    def get_account_balances(company_id, categories=None, as_of=None, start_date=None,
+                             posted_only=False, active_only=True):
+        """
+        Get accounts with their balances in one query
+
+        Args:
+            company_id: Company ID
+            categories: Optional list of account type categories to include
+            as_of: Only count journal entries dated on or before this date
+            start_date: Only count journal entries dated on or after this date
+            posted_only: Only count posted journal entries
+            active_only: Only include active accounts
+
+        Returns:
+            List of dictionaries with account, account_type and balance,
+            ordered by account number
+        """
+        totals = AccountBalanceService._totals_subquery(company_id, as_of, start_date, posted_only)
+
+        query = db.session.query(
+            Account, AccountType, totals.c.debits, totals.c.credits
+        ).join(
+            AccountType, Account.account_type_id == AccountType.id
+        ).outerjoin(
+            totals, totals.c.account_id == Account.id
+        ).filter(Account.company_id == company_id)
+
+        if categories:
+            query = query.filter(AccountType.category.in_(categories))
+        if active_only:
+            query = query.filter(Account.is_active == True)
+
+        return [
+            {
+                'account': account,
+                'account_type': account_type,
+                'balance': AccountBalanceService.signed_balance(account_type.normal_balance, debits, credits)
+            }
+            for account, account_type, debits, credits in query.order_by(Account.account_number).all()
+        ]
+
+    @staticmethod
+    def get_balance_map(company_id, **filters):
+        """
+        Get balances keyed by account ID
+
+        Args:
+            company_id: Company ID
+            **filters: Same filters as get_account_balances
+
+        Returns:
+            Dictionary {account_id: balance}
+        """
+        return {
+            row['account'].id: row['balance']
+            for row in AccountBalanceService.get_account_balances(company_id, **filters)
+        }
+
+    @staticmethod
+    def get_balance(account, as_of=None, start_date=None, posted_only=False):
+        """
+        Get a single account's balance with one aggregate query
+
+        Args:
+            account: Account
+            as_of: Only count journal entries dated on or before this date
+            start_date: Only count journal entries dated on or after this date
+            posted_only: Only count posted journal entries
+
+        Returns:
+            Decimal balance
+        """
+        totals = AccountBalanceService._totals_subquery(
+            account.company_id, as_of, start_date, posted_only, account_id=account.id
+        )
+        row = db.session.query(totals.c.debits, totals.c.credits).first()
+        debits, credits = row if row else (0, 0)
+        return AccountBalanceService.signed_balance(account.account_type.normal_balance, debits, credits)
+
+    @staticmethod
+    def summarize(account_balances):
+        """
+        Totals per account type and per category for a list of account balances
+
+        Args:
+            account_balances: List from get_account_balances
+
+        Returns:
+            Tuple (type_totals, category_totals): type_totals maps the type
+            name to {'total', 'category'}; category_totals maps every
+            category in ACCOUNT_CATEGORIES to its total
+        """
+        type_totals = {}
+        category_totals = {category: Decimal('0') for category in ACCOUNT_CATEGORIES}
+
+        for row in account_balances:
+            account_type = row['account_type']
+            type_total = type_totals.setdefault(account_type.name, {
+                'total': Decimal('0'),
+                'category': account_type.category
+            })
+            type_total['total'] += row['balance']
+            category_totals[account_type.category] = category_totals.get(account_type.category, Decimal('0')) + row['balance']
+
+        return type_totals, category_totals
@@ -1,6 +1,7 @@
 
 from datetime import datetime
 from models import User, db
+from services.entitlement_service import EntitlementService
 
 class AuthService:
     """Authentication related services"""
@@ -83,6 +84,10 @@ def update_user(user_id, username, email, password, first_name, last_name, compa
     @staticmethod
     def get_user_by_id(user_id):
         """Get user by ID"""
+        # The logged-in user is already loaded by the request's entitlement snapshot
+        snapshot = EntitlementService.current()
+        if snapshot and snapshot.matches(user_id):
+            return snapshot.user
         return User.query.get(user_id)
     
     @staticmethod
@@ -1,9 +1,13 @@
 # Create services/billing_service.py
 
+import time
 from datetime import datetime, timedelta
 from decimal import Decimal
+from flask import current_app
 from sqlalchemy import and_, or_, extract
+from sqlalchemy.exc import IntegrityError
 from models import db, Company, CompanyModule, ModuleDefinition, CompanyModulePricing, MonthlyBill, BillLineItem, User
+from services.revenue_matrix_service import RevenueMatrixService
 import calendar
 
 class BillingService:
@@ -128,59 +132,206 @@ def calculate_monthly_total(company_id, year=None, month=None):
     @staticmethod
     def generate_monthly_bill(company_id, year, month, generated_by, notes=None):
         """Generate a monthly bill for a company"""
+        success, stats, message = BillingService.run_billing_cycle(
+            year, month, generated_by, company_ids=[company_id], notes=notes
+        )
+        
+        if not success:
+            return False, message
+        if stats['skipped_existing']:
+            return False, "Bill already exists for this period"
+        if stats['skipped_empty']:
+            return False, "No enabled modules found for billing"
+        
+        return True, f"Bill generated successfully for {calendar.month_name[month]} {year}"
+    
+    @staticmethod
+    def run_billing_cycle(year, month, generated_by=None, company_ids=None, notes=None, chunk_size=None):
+        """
+        Generate bills for every active company for a period in one pass
+
+        Prices come from the revenue matrix (three bulk queries). Bills and
+        their line items are bulk-inserted and committed per chunk of
+        companies. Companies that already have a bill for the period are
+        skipped, so the cycle is idempotent and a failed run resumes where
+        it stopped when it is run again.
+
+        Args:
+            year: Bill year
+            month: Bill month (1-12)
+            generated_by: User ID recorded on the bills (defaults to the
+                first super admin)
+            company_ids: Optional company IDs to bill instead of every
+                active company
+            notes: Optional notes recorded on each bill
+            chunk_size: Companies per insert/commit (defaults to
+                BILLING_CYCLE_CHUNK_SIZE)
+
+        Returns:
+            Tuple (success: bool, stats: dict, message: str); stats holds
+            counts (companies, created, skipped_existing, skipped_empty,
+            line_items, chunks), total_amount and timings in seconds
+        """
+        started = time.perf_counter()
+        stats = {
+            'year': year,
+            'month': month,
+            'companies': 0,
+            'created': 0,
+            'skipped_existing': 0,
+            'skipped_empty': 0,
+            'line_items': 0,
+            'chunks': 0,
+            'total_amount': 0.0,
+            'timings': {'load': 0.0, 'insert': 0.0, 'total': 0.0}
+        }
+        
         try:
-            # Check if bill already exists
-            existing_bill = MonthlyBill.query.filter_by(
-                company_id=company_id,
-                bill_year=year,
-                bill_month=month
-            ).first()
+            if not 1 <= month <= 12:
+                return False, stats, "Month must be between 1 and 12"
             
-            if existing_bill:
-                return False, "Bill already exists for this period"
+            if chunk_size is None:
+                chunk_size = current_app.config.get('BILLING_CYCLE_CHUNK_SIZE', 500)
             
-            # Get pricing data
-            billing_data = BillingService.calculate_monthly_total(company_id, year, month)
+            if generated_by is None:
+                generated_by = db.session.query(User.id).filter(
+                    User.is_super_admin == True
+                ).order_by(User.id).scalar()
+                if generated_by is None:
+                    return False, stats, "No super admin available to record as the bill generator"
             
-            if not billing_data['line_items']:
-                return False, "No enabled modules found for billing"
+            if company_ids is None:
+                company_ids = [row[0] for row in db.session.query(Company.id).filter(
+                    Company.is_active == True
+                ).order_by(Company.id).all()]
+            stats['companies'] = len(company_ids)
             
-            # Create bill
-            bill = MonthlyBill(
-                company_id=company_id,
-                bill_year=year,
-                bill_month=month,
-                total_amount=Decimal(str(billing_data['total_amount'])),
-                currency=billing_data['currency'],
-                generated_by=generated_by,
-                notes=notes,
-                status='draft'
-            )
+            matrix = RevenueMatrixService.load(company_ids=company_ids)
+            billed = BillingService._billed_company_ids(year, month, company_ids)
             
-            db.session.add(bill)
-            db.session.flush()  # Get the bill ID
+            pending = []
+            for company_id in company_ids:
+                if company_id in billed:
+                    stats['skipped_existing'] += 1
+                elif not matrix.company_module_count(company_id):
+                    stats['skipped_empty'] += 1
+                else:
+                    pending.append(company_id)
             
-            # Create line items
-            for item in billing_data['line_items']:
-                line_item = BillLineItem(
-                    bill_id=bill.id,
-                    module_id=item['module_definition'].id,
-                    module_name=item['module_definition'].module_name,
-                    module_display_name=item['module_definition'].display_name,
-                    unit_price=Decimal(str(item['effective_price'])),
-                    quantity=1,
-                    line_total=Decimal(str(item['effective_price'])),
-                    is_custom_price=item['has_custom_pricing'],
-                    pricing_notes=item['custom_pricing_notes']
-                )
-                db.session.add(line_item)
+            # Plain values, since each chunk's commit expires the loaded modules
+            module_names = {
+                module_id: (module.module_name, module.display_name)
+                for module_id, module in matrix.modules.items()
+            }
+            stats['timings']['load'] = time.perf_counter() - started
             
-            db.session.commit()
-            return True, f"Bill generated successfully for {calendar.month_name[month]} {year}"
+            for start in range(0, len(pending), chunk_size):
+                chunk = pending[start:start + chunk_size]
+                try:
+                    created, line_items, amount = BillingService._insert_bill_chunk(
+                        matrix, module_names, chunk, year, month, generated_by, notes
+                    )
+                except IntegrityError:
+                    # Another run billed some of these companies since the
+                    # chunk was planned; drop them and try the rest once more
+                    db.session.rollback()
+                    billed = BillingService._billed_company_ids(year, month, chunk)
+                    stats['skipped_existing'] += len(billed)
+                    chunk = [company_id for company_id in chunk if company_id not in billed]
+                    created, line_items, amount = BillingService._insert_bill_chunk(
+                        matrix, module_names, chunk, year, month, generated_by, notes
+                    )
+                
+                stats['created'] += created
+                stats['line_items'] += line_items
+                stats['total_amount'] += float(amount)
+                stats['chunks'] += 1
+            
+            stats['timings']['total'] = time.perf_counter() - started
+            stats['timings']['insert'] = stats['timings']['total'] - stats['timings']['load']
+            
+            return True, stats, (
+                f"Billing cycle for {calendar.month_name[month]} {year}: {stats['created']} bills created, "
+                f"{stats['skipped_existing']} already billed, {stats['skipped_empty']} without modules "
+                f"in {stats['timings']['total']:.2f}s"
+            )
         
         except Exception as e:
             db.session.rollback()
-            return False, f"Error generating bill: {str(e)}"
+            stats['timings']['total'] = time.perf_counter() - started
+            return False, stats, f"Error running billing cycle: {str(e)}"
+    
+    @staticmethod
+    def _billed_company_ids(year, month, company_ids):
+        """IDs of the given companies that already have a bill for the period"""
+        if not company_ids:
+            return set()
+        return {row[0] for row in db.session.query(MonthlyBill.company_id).filter(
+            MonthlyBill.bill_year == year,
+            MonthlyBill.bill_month == month,
+            MonthlyBill.company_id.in_(company_ids)
+        ).all()}
+    
+    @staticmethod
+    def _insert_bill_chunk(matrix, module_names, company_ids, year, month, generated_by, notes):
+        """
+        Bulk-insert bills and line items for a chunk of companies and commit
+
+        Returns:
+            Tuple (bills created, line items created, total amount)
+        """
+        if not company_ids:
+            return 0, 0, Decimal('0')
+        
+        now = datetime.utcnow()
+        bill_rows = []
+        line_rows = {}
+        for company_id in company_ids:
+            lines = []
+            for module_id in matrix.company_module_ids(company_id):
+                module_name, display_name = module_names[module_id]
+                price = Decimal(str(round(matrix.price(company_id, module_id), 2)))
+                lines.append({
+                    'module_id': module_id,
+                    'module_name': module_name,
+                    'module_display_name': display_name,
+                    'unit_price': price,
+                    'quantity': 1,
+                    'line_total': price,
+                    'is_custom_price': matrix.is_custom(company_id, module_id),
+                    'pricing_notes': matrix.custom_note(company_id, module_id)
+                })
+            line_rows[company_id] = lines
+            bill_rows.append({
+                'company_id': company_id,
+                'bill_year': year,
+                'bill_month': month,
+                'total_amount': sum((line['line_total'] for line in lines), Decimal('0')),
+                'currency': 'ZAR',
+                'bill_date': now,
+                'status': 'draft',
+                'generated_by': generated_by,
+                'generated_at': now,
+                'notes': notes
+            })
+        
+        db.session.bulk_insert_mappings(MonthlyBill, bill_rows, render_nulls=True)
+        
+        bill_ids = dict(db.session.query(MonthlyBill.company_id, MonthlyBill.id).filter(
+            MonthlyBill.bill_year == year,
+            MonthlyBill.bill_month == month,
+            MonthlyBill.company_id.in_(company_ids)
+        ).all())
+        
+        items = []
+        for company_id, lines in line_rows.items():
+            for line in lines:
+                line['bill_id'] = bill_ids[company_id]
+                items.append(line)
+        db.session.bulk_insert_mappings(BillLineItem, items, render_nulls=True)
+        
+        db.session.commit()
+        return len(bill_rows), len(items), sum((row['total_amount'] for row in bill_rows), Decimal('0'))
     
     @staticmethod
     def get_bills_with_filters(company_id=None, start_date=None, end_date=None, status=None):
@@ -207,6 +358,27 @@ def get_bills_with_filters(company_id=None, start_date=None, end_date=None, stat
             print(f"Error getting bills: {str(e)}")
             return []
     
+    @staticmethod
+    def _latest_bills():
+        """
+        Each company's most recent bill (by bill date), in one grouped query
+
+        Returns:
+            Dictionary of company_id -> MonthlyBill
+        """
+        latest = db.session.query(
+            MonthlyBill.company_id,
+            db.func.max(MonthlyBill.bill_date).label('bill_date')
+        ).group_by(MonthlyBill.company_id).subquery()
+        
+        bills = MonthlyBill.query.join(latest, and_(
+            MonthlyBill.company_id == latest.c.company_id,
+            MonthlyBill.bill_date == latest.c.bill_date
+        )).order_by(MonthlyBill.id).all()
+        
+        # Bills sharing the latest date: the last one created wins
+        return {bill.company_id: bill for bill in bills}
+    
     @staticmethod
     def get_billing_summary():
         """Get billing summary for all companies"""
@@ -217,20 +389,22 @@ def get_billing_summary():
                 Company.name,
                 db.func.count(CompanyModule.id).label('module_count'),
                 db.func.sum(ModuleDefinition.monthly_price).label('default_total')
-            ).join(CompanyModule).join(ModuleDefinition).filter(
+            ).select_from(Company).join(
+                CompanyModule, CompanyModule.company_id == Company.id
+            ).join(
+                ModuleDefinition, ModuleDefinition.id == CompanyModule.module_id
+            ).filter(
                 CompanyModule.is_enabled == True
             ).group_by(Company.id, Company.name).all()
             
+            matrix = RevenueMatrixService.load()
+            latest_bills = BillingService._latest_bills()
+            
             summary = []
             for company_id, company_name, module_count, default_total in companies_with_modules:
-                # Get actual pricing (including custom pricing)
-                pricing_data = BillingService.get_company_pricing(company_id)
-                actual_total = sum(item['effective_price'] for item in pricing_data)
-                
-                # Get latest bill
-                latest_bill = MonthlyBill.query.filter_by(company_id=company_id).order_by(
-                    MonthlyBill.bill_date.desc()
-                ).first()
+                # Actual pricing (including custom pricing) from the revenue matrix
+                actual_total = matrix.company_total(company_id)
+                latest_bill = latest_bills.get(company_id)
                 
                 summary.append({
                     'company_id': company_id,
@@ -249,6 +423,37 @@ def get_billing_summary():
             print(f"Error getting billing summary: {str(e)}")
             return []
     
+    @staticmethod
+    def get_billing_report_data():
+        """
+        Per-company costs and per-module revenue for the billing report
+
+        Answered from the revenue matrix (three bulk queries).
+
+        Returns:
+            Dictionary with 'companies' (name, module_count, monthly_cost,
+            has_custom_pricing) and 'modules' (display_name, category,
+            base_price, usage_count, total_revenue) lists
+        """
+        companies = Company.query.filter_by(is_active=True).order_by(Company.name).all()
+        matrix = RevenueMatrixService.load()
+        
+        return {
+            'companies': [{
+                'name': company.name,
+                'module_count': matrix.company_module_count(company.id),
+                'monthly_cost': matrix.company_total(company.id),
+                'has_custom_pricing': matrix.has_custom_pricing(company.id)
+            } for company in companies],
+            'modules': [{
+                'display_name': stat['module'].display_name,
+                'category': stat['module'].category or '',
+                'base_price': float(stat['module'].monthly_price or 0),
+                'usage_count': stat['usage_count'],
+                'total_revenue': stat['revenue']
+            } for stat in matrix.module_stats()]
+        }
+    
     @staticmethod
     def update_bill_status(bill_id, new_status, updated_by):
         """Update bill status"""
@@ -0,0 +1,259 @@
+"""
+Cache Service
+Process-wide cache with TTL/LRU eviction and per-company version stamps
+"""
+
+import pickle
+import threading
+import time
+from collections import OrderedDict
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
+
+
+class MemoryCacheBackend:
+    """
+    In-process cache backend
+
+    Entries expire after their TTL and the least recently used entry is
+    evicted once ``max_entries`` is reached. Counters (used for version
+    stamps) are kept apart from entries so eviction can never reset them.
+    Each gunicorn worker has its own copy, so invalidation reaches other
+    workers only through TTL expiry; use RedisCacheBackend to share it.
+    """
+
+    def __init__(self, max_entries=10000, default_ttl=300):
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return default
+
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return default
+
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        with self._lock:
+            self._entries[key] = (time.time() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def incr(self, key):
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def get_counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+
+class RedisCacheBackend:
+    """
+    Cache backend on any Redis-protocol server, shared by all workers
+
+    Requires the optional ``redis`` package. Values are pickled; eviction is
+    left to the server's maxmemory policy.
+    """
+
+    def __init__(self, url, default_ttl=300, prefix='tms:'):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.prefix = prefix
+
+    def get(self, key, default=None):
+        raw = self.client.get(self.prefix + key)
+        if raw is None:
+            return default
+        return pickle.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.default_ttl if ttl is None else ttl
+        self.client.setex(self.prefix + key, int(ttl), pickle.dumps(value))
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*[self.prefix + key for key in keys])
+
+    def incr(self, key):
+        return int(self.client.incr(self.prefix + key))
+
+    def get_counter(self, key):
+        raw = self.client.get(self.prefix + key)
+        return int(raw) if raw is not None else 0
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+_MISSING = object()
+
+
+class CacheService:
+    """Service for caching query results across requests"""
+
+    _backend = None
+
+    @staticmethod
+    def init_app(app):
+        """Configure the backend from CACHE_* settings"""
+        backend_name = app.config.get('CACHE_BACKEND', 'memory')
+        default_ttl = app.config.get('CACHE_DEFAULT_TTL', 300)
+
+        if backend_name == 'redis':
+            try:
+                CacheService._backend = RedisCacheBackend(
+                    app.config['CACHE_REDIS_URL'], default_ttl=default_ttl
+                )
+                return
+            except Exception as e:
+                print(f"Error connecting to Redis cache, using memory cache: {e}")
+
+        CacheService._backend = MemoryCacheBackend(
+            max_entries=app.config.get('CACHE_MAX_ENTRIES', 10000),
+            default_ttl=default_ttl
+        )
+
+    @staticmethod
+    def backend():
+        """Get the configured backend (memory with defaults if not configured)"""
+        if CacheService._backend is None:
+            CacheService._backend = MemoryCacheBackend()
+        return CacheService._backend
+
+    @staticmethod
+    def company_version(company_id):
+        """Current version stamp for a company's cached entitlements"""
+        return CacheService.backend().get_counter(f"version:company:{company_id or 'global'}")
+
+    @staticmethod
+    def bump_company_version(company_id):
+        """
+        Invalidate every cached entry for a company
+
+        Args:
+            company_id: Company ID (None for entries not tied to a company)
+        """
+        try:
+            CacheService.backend().incr(f"version:company:{company_id or 'global'}")
+        except Exception as e:
+            print(f"Error bumping cache version: {e}")
+
+        # The request snapshot was built from the old state as well
+        from services.entitlement_service import EntitlementService
+        EntitlementService.invalidate()
+
+    @staticmethod
+    def _key(namespace, company_id, key):
+        version = CacheService.company_version(company_id)
+        return f"{namespace}:{company_id or 'global'}:v{version}:{key}"
+
+    @staticmethod
+    def get_or_load(namespace, company_id, key, loader, ttl=None):
+        """
+        Get a company-scoped value, calling ``loader`` on a miss
+
+        Args:
+            namespace: Kind of value (e.g. 'permissions')
+            company_id: Company whose version stamp guards the entry
+            key: Remaining key parts identifying the value
+            loader: Callable producing the value
+            ttl: Optional TTL in seconds
+
+        Returns:
+            The cached or freshly loaded value
+        """
+        try:
+            backend = CacheService.backend()
+            cache_key = CacheService._key(namespace, company_id, key)
+
+            value = backend.get(cache_key, _MISSING)
+            if value is not _MISSING:
+                return value
+        except Exception as e:
+            print(f"Error reading cache: {e}")
+            return loader()
+
+        value = loader()
+        try:
+            backend.set(cache_key, value, ttl)
+        except Exception as e:
+            print(f"Error writing cache: {e}")
+        return value
+
+    @staticmethod
+    def delete(namespace, company_id, key):
+        """
+        Drop a single company-scoped entry (the rest of the company's cache is kept)
+
+        Args:
+            namespace: Kind of value
+            company_id: Company the entry belongs to
+            key: Remaining key parts identifying the value
+        """
+        try:
+            CacheService.backend().delete(CacheService._key(namespace, company_id, key))
+        except Exception as e:
+            print(f"Error deleting cache entry: {e}")
+
+    @staticmethod
+    def dehydrate(instances):
+        """Turn ORM instances into plain column values that can be cached"""
+        rows = []
+        for instance in instances:
+            mapper = inspect(instance).mapper
+            rows.append((
+                mapper.class_,
+                {attr.key: getattr(instance, attr.key) for attr in mapper.column_attrs}
+            ))
+        return rows
+
+    @staticmethod
+    def rehydrate(session, rows):
+        """
+        Turn cached column values back into persistent instances without SQL
+
+        Instances already in the session's identity map are reused as-is.
+        """
+        instances = []
+        for cls, values in rows:
+            mapper = inspect(cls)
+            pk = tuple(values[col.key] for col in mapper.primary_key)
+            existing = session.identity_map.get(identity_key(cls, pk))
+            if existing is not None:
+                instances.append(existing)
+                continue
+
+            instance = cls()
+            for name, value in values.items():
+                setattr(instance, name, value)
+            make_transient_to_detached(instance)
+            instances.append(session.merge(instance, load=False))
+        return instances
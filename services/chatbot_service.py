@@ -628,8 +628,14 @@ def _search_tenders(self, message, company_id, filters=None):
             params = {"company_id": company_id}
             
             if search_terms:
-                query += " AND (LOWER(title) LIKE :search OR LOWER(description) LIKE :search OR LOWER(category) LIKE :search)"
-                params['search'] = f"%{search_terms}%"
+                from services.tender_search_service import TenderSearchService
+                condition, search_params = TenderSearchService.sql_condition(search_terms)
+                if condition:
+                    query += f" AND {condition}"
+                    params.update(search_params)
+                else:
+                    query += " AND (LOWER(title) LIKE :search OR LOWER(description) LIKE :search OR LOWER(category) LIKE :search)"
+                    params['search'] = f"%{search_terms}%"
             
             # Apply additional filters
             if filters:
@@ -875,37 +881,23 @@ def _get_comprehensive_analytics(self, company_id, filters=None):
     def _get_value_statistics(self, company_id, filters=None):
         """Get value-based statistics"""
         try:
-            db = get_db()
-            if not db:
-                return {}
-            
-            query = """
-                SELECT 
-                    SUM(estimated_value) as total_value,
-                    AVG(estimated_value) as avg_value,
-                    MAX(estimated_value) as max_value,
-                    MIN(estimated_value) as min_value
-                FROM tenders 
-                WHERE company_id = :company_id
-                AND estimated_value IS NOT NULL
-            """
-            params = {"company_id": company_id}
+            from services.tender_stats_rollup_service import TenderStatsRollupService
             
+            start_month = None
             if filters:
                 if 'period' in filters:
                     if filters['period'] == 'this_month':
-                        query += " AND MONTH(created_at) = MONTH(NOW()) AND YEAR(created_at) = YEAR(NOW())"
+                        start_month = datetime.now()
                     elif filters['period'] == 'this_year':
-                        query += " AND YEAR(created_at) = YEAR(NOW())"
+                        start_month = datetime(datetime.now().year, 1, 1)
             
-            result = db.session.execute(text(query), params)
-            row = result.fetchone()
+            stats = TenderStatsRollupService.get_value_statistics(company_id, start_month=start_month)
             
             return {
-                "total_value": f"R{(row[0] or 0):,.0f}",
-                "average_value": f"R{(row[1] or 0):,.0f}",
-                "highest_value": f"R{(row[2] or 0):,.0f}",
-                "lowest_value": f"R{(row[3] or 0):,.0f}"
+                "total_value": f"R{(stats['total_value'] or 0):,.0f}",
+                "average_value": f"R{(stats['average_value'] or 0):,.0f}",
+                "highest_value": f"R{(stats['max_value'] or 0):,.0f}",
+                "lowest_value": f"R{(stats['min_value'] or 0):,.0f}"
             }
         except Exception as e:
             logger.error(f"Error getting value statistics: {e}")
@@ -914,33 +906,18 @@ def _get_value_statistics(self, company_id, filters=None):
     def _get_category_breakdown(self, company_id, filters=None):
         """Get breakdown by category"""
         try:
-            db = get_db()
-            if not db:
-                return []
+            from services.tender_stats_rollup_service import TenderStatsRollupService
             
-            query = """
-                SELECT 
-                    COALESCE(category, 'Uncategorized') as category,
-                    COUNT(*) as count,
-                    SUM(estimated_value) as total_value,
-                    COUNT(CASE WHEN status_id = 3 THEN 1 END) as won
-                FROM tenders 
-                WHERE company_id = :company_id
-                GROUP BY category
-                ORDER BY count DESC
-                LIMIT 10
-            """
-            
-            result = db.session.execute(text(query), {"company_id": company_id})
+            rows = TenderStatsRollupService.get_category_breakdown(company_id, limit=10)
             
             breakdown = []
-            for row in result:
-                success_rate = (row[3] / row[1] * 100) if row[1] > 0 else 0
+            for row in rows:
+                success_rate = (row['won'] / row['count'] * 100) if row['count'] > 0 else 0
                 breakdown.append({
-                    "category": row[0],
-                    "count": row[1],
-                    "value": f"R{(row[2] or 0):,.0f}",
-                    "won": row[3],
+                    "category": row['category'] or 'Uncategorized',
+                    "count": row['count'],
+                    "value": f"R{(row['total_value'] or 0):,.0f}",
+                    "won": row['won'],
                     "success_rate": f"{success_rate:.1f}%"
                 })
             return breakdown
@@ -1194,28 +1171,17 @@ def _get_overdue_tenders(self, company_id):
     def _get_tender_status_summary(self, company_id):
         """Get tender status summary"""
         try:
-            db = get_db()
-            if not db:
-                return {}
-                
-            result = db.session.execute(text("""
-                SELECT 
-                    COUNT(*) as total,
-                    COUNT(CASE WHEN status_id = 1 THEN 1 END) as active,
-                    COUNT(CASE WHEN status_id = 2 THEN 1 END) as submitted,
-                    COUNT(CASE WHEN status_id = 3 THEN 1 END) as won,
-                    COUNT(CASE WHEN status_id = 4 THEN 1 END) as lost
-                FROM tenders 
-                WHERE company_id = :company_id
-            """), {"company_id": company_id})
+            from services.tender_stats_rollup_service import TenderStatsRollupService
+            
+            statuses = TenderStatsRollupService.get_status_breakdown(company_id)
+            counts = {status['id']: status['count'] for status in statuses}
             
-            row = result.fetchone()
             return {
-                "total": row[0],
-                "active": row[1], 
-                "submitted": row[2],
-                "won": row[3],
-                "lost": row[4]
+                "total": sum(counts.values()),
+                "active": counts.get(1, 0),
+                "submitted": counts.get(2, 0),
+                "won": sum(status['won'] for status in statuses),
+                "lost": sum(status['lost'] for status in statuses)
             }
         except Exception as e:
             logger.error(f"Error getting status summary: {e}")
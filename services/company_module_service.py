@@ -1,6 +1,10 @@
 # services/company_module_service.py
 from datetime import datetime
 from models import db, ModuleDefinition, CompanyModule, Company, User
+from services.cache_service import CacheService
+from services.entitlement_service import EntitlementService
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.attributes import set_committed_value
 from functools import wraps
 from decimal import Decimal
 
@@ -152,6 +156,7 @@ def setup_company_modules(company_id, include_premium=False):
                     db.session.add(company_module)
             
             db.session.commit()
+            CacheService.bump_company_version(company_id)
             return True
         except Exception as e:
             db.session.rollback()
@@ -161,13 +166,12 @@ def setup_company_modules(company_id, include_premium=False):
     @staticmethod
     def is_module_enabled_for_company(company_id, module_name):
         """Check if a specific module is enabled for a company"""
-        company_module = db.session.query(CompanyModule).join(ModuleDefinition).filter(
-            CompanyModule.company_id == company_id,
-            ModuleDefinition.module_name == module_name,
-            CompanyModule.is_enabled == True
-        ).first()
+        # The logged-in user's company is answered from the request snapshot
+        snapshot = EntitlementService.current()
+        if snapshot and snapshot.company_id == company_id:
+            return module_name in snapshot.enabled_modules
         
-        return company_module is not None
+        return module_name in CompanyModule.get_enabled_modules(company_id)
     
     @staticmethod
     def get_company_modules(company_id):
@@ -179,10 +183,25 @@ def get_company_modules(company_id):
     @staticmethod
     def get_enabled_modules_for_company(company_id):
         """Get only enabled modules for a company"""
-        return db.session.query(CompanyModule).join(ModuleDefinition).filter(
-            CompanyModule.company_id == company_id,
-            CompanyModule.is_enabled == True
-        ).order_by(ModuleDefinition.sort_order).all()
+        def load():
+            company_modules = db.session.query(CompanyModule).join(ModuleDefinition).options(
+                contains_eager(CompanyModule.module_definition)
+            ).filter(
+                CompanyModule.company_id == company_id,
+                CompanyModule.is_enabled == True
+            ).order_by(ModuleDefinition.sort_order).all()
+            module_defs = [cm.module_definition for cm in company_modules]
+            return CacheService.dehydrate(module_defs), CacheService.dehydrate(company_modules)
+        
+        module_def_rows, company_module_rows = CacheService.get_or_load(
+            'enabled_company_modules', company_id, 'rows', load
+        )
+        
+        module_defs = {md.id: md for md in CacheService.rehydrate(db.session, module_def_rows)}
+        company_modules = CacheService.rehydrate(db.session, company_module_rows)
+        for cm in company_modules:
+            set_committed_value(cm, 'module_definition', module_defs.get(cm.module_id))
+        return company_modules
     
     @staticmethod
     def toggle_company_module(company_id, module_name, enabled, user_id, notes=None):
@@ -233,6 +252,7 @@ def toggle_company_module(company_id, module_name, enabled, user_id, notes=None)
                     company_module.notes = notes
             
             db.session.commit()
+            CacheService.bump_company_version(company_id)
             return True, "Module updated successfully"
         except Exception as e:
             db.session.rollback()
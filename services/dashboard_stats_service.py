@@ -0,0 +1,131 @@
+"""
+Dashboard Stats Service
+Computes the dashboard tiles in a single grouped query per scope
+"""
+
+from sqlalchemy import func
+
+from models import db, Company, User, Tender, TenderStatus
+from services.cache_service import CacheService
+
+
+# Seconds dashboard tiles may be served from cache (user counts are only
+# refreshed by expiry; tender changes invalidate immediately)
+DASHBOARD_STATS_CACHE_TTL = 60
+
+# Status name that counts as closed for the active/closed split
+CLOSED_STATUS_NAME = 'Closed'
+
+
+class DashboardStatsService:
+    """Service for dashboard statistics"""
+
+    @staticmethod
+    def get_stats(company_id=None, use_cache=True):
+        """
+        Get dashboard statistics for a company or the whole system
+
+        Args:
+            company_id: Company ID (None for system-wide stats)
+            use_cache: Whether a recently cached result may be returned
+
+        Returns:
+            Dictionary with total_companies, total_users, active_users,
+            total_tenders, active_tenders, closed_tenders and status_breakdown
+        """
+        try:
+            if not use_cache:
+                return DashboardStatsService._load_stats(company_id)
+
+            return CacheService.get_or_load(
+                'dashboard_stats', company_id, 'tiles',
+                lambda: DashboardStatsService._load_stats(company_id),
+                ttl=DASHBOARD_STATS_CACHE_TTL
+            )
+
+        except Exception as e:
+            print(f"Error getting dashboard stats: {e}")
+            return DashboardStatsService._empty_stats()
+
+    @staticmethod
+    def invalidate(company_id):
+        """
+        Drop cached stats after a company's tenders change
+
+        The system-wide entry is dropped as well since it includes every company.
+
+        Args:
+            company_id: Company whose tenders changed
+        """
+        CacheService.delete('dashboard_stats', company_id, 'tiles')
+        if company_id:
+            CacheService.delete('dashboard_stats', None, 'tiles')
+
+    @staticmethod
+    def _load_stats(company_id):
+        user_query = db.session.query(func.count(User.id))
+        if company_id:
+            user_query = user_query.filter(User.company_id == company_id)
+
+        total_users = user_query.scalar_subquery()
+        active_users = user_query.filter(User.is_active == True).scalar_subquery()
+        total_companies = db.session.query(func.count(Company.id)).scalar_subquery()
+
+        # One row per status; user and company counts ride along as scalar subqueries
+        query = db.session.query(
+            TenderStatus.id,
+            TenderStatus.name,
+            TenderStatus.color,
+            func.count(Tender.id),
+            total_users,
+            active_users,
+            total_companies
+        ).select_from(Tender).outerjoin(
+            TenderStatus, Tender.status_id == TenderStatus.id
+        )
+
+        if company_id:
+            query = query.filter(Tender.company_id == company_id)
+
+        rows = query.group_by(TenderStatus.id, TenderStatus.name, TenderStatus.color).all()
+
+        if rows:
+            user_count, active_user_count, company_count = rows[0][4:]
+        else:
+            # No tenders in scope, so the grouped query returned nothing
+            user_count, active_user_count, company_count = db.session.query(
+                total_users, active_users, total_companies
+            ).one()
+
+        stats = DashboardStatsService._empty_stats()
+        stats['total_companies'] = company_count or 0
+        stats['total_users'] = user_count or 0
+        stats['active_users'] = active_user_count or 0
+
+        for status_id, name, color, count, _, _, _ in rows:
+            stats['total_tenders'] += count
+            if name == CLOSED_STATUS_NAME:
+                stats['closed_tenders'] += count
+            if status_id is not None:
+                stats['status_breakdown'].append({
+                    'id': status_id,
+                    'name': name,
+                    'color': color,
+                    'count': count
+                })
+
+        stats['active_tenders'] = stats['total_tenders'] - stats['closed_tenders']
+        stats['status_breakdown'].sort(key=lambda status: status['name'])
+        return stats
+
+    @staticmethod
+    def _empty_stats():
+        return {
+            'total_companies': 0,
+            'total_users': 0,
+            'active_users': 0,
+            'total_tenders': 0,
+            'active_tenders': 0,
+            'closed_tenders': 0,
+            'status_breakdown': []
+        }
@@ -0,0 +1,139 @@
+"""
+Deadline Notification Service
+Creates 'deadline_approaching' notifications for every company's tenders in
+one set-based pass
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func
+
+from models import db, Company, CompanySettings, Tender, TenderNotification
+
+
+# Days before the deadline to notify when a company has no settings row
+DEFAULT_NOTIFICATION_DAYS = 7
+
+# Tender statuses that never get deadline notifications (Closed, Cancelled)
+CLOSED_STATUS_IDS = [3, 6]
+
+NOTIFICATION_TYPE = 'deadline_approaching'
+
+
+class DeadlineNotificationService:
+    """Service for generating deadline notifications"""
+
+    @staticmethod
+    def pending_query(now, company_ids=None, notification_days=None):
+        """
+        Tenders inside their company's notification window that have no
+        deadline notification yet
+
+        The window upper bound is each company's CompanySettings.notification_days,
+        checked per row by the caller; the query is bounded by the widest
+        window so it stays a single range scan on the deadline.
+
+        Args:
+            now: Current time
+            company_ids: Optional company IDs to restrict to
+            notification_days: Window for every company instead of their settings
+
+        Returns:
+            Query of (tender_id, company_id, title, submission_deadline, notification_days)
+        """
+        days_column = func.coalesce(CompanySettings.notification_days, DEFAULT_NOTIFICATION_DAYS)
+
+        if notification_days is not None:
+            widest = notification_days
+        else:
+            widest_query = db.session.query(func.max(CompanySettings.notification_days))
+            if company_ids is not None:
+                widest_query = widest_query.filter(CompanySettings.company_id.in_(company_ids))
+            widest = max(widest_query.scalar() or 0, DEFAULT_NOTIFICATION_DAYS)
+
+        query = db.session.query(
+            Tender.id,
+            Tender.company_id,
+            Tender.title,
+            Tender.submission_deadline,
+            days_column
+        ).join(
+            Company, Tender.company_id == Company.id
+        ).outerjoin(
+            CompanySettings, CompanySettings.company_id == Tender.company_id
+        ).outerjoin(
+            TenderNotification, and_(
+                TenderNotification.tender_id == Tender.id,
+                TenderNotification.company_id == Tender.company_id,
+                TenderNotification.notification_type == NOTIFICATION_TYPE
+            )
+        ).filter(
+            Company.is_active == True,
+            Tender.submission_deadline.isnot(None),
+            Tender.submission_deadline >= now,
+            Tender.submission_deadline <= now + timedelta(days=widest),
+            ~Tender.status_id.in_(CLOSED_STATUS_IDS),
+            TenderNotification.id.is_(None)
+        )
+
+        if company_ids is not None:
+            query = query.filter(Tender.company_id.in_(company_ids))
+
+        return query
+
+    @staticmethod
+    def generate(company_ids=None, notification_days=None, now=None, chunk_size=1000):
+        """
+        Create missing deadline notifications for tenders approaching their
+        submission deadline
+
+        Args:
+            company_ids: Optional company IDs (defaults to every active company)
+            notification_days: Window for every company instead of their
+                CompanySettings.notification_days
+            now: Current time (defaults to now)
+            chunk_size: Notifications per bulk insert
+
+        Returns:
+            Tuple (success: bool, created_count: int, message: str)
+        """
+        try:
+            now = now or datetime.now()
+            created_at = datetime.utcnow()
+            created_count = 0
+            rows = []
+
+            query = DeadlineNotificationService.pending_query(now, company_ids, notification_days)
+            for tender_id, company_id, title, deadline, company_days in query.all():
+                window = notification_days if notification_days is not None else company_days
+                if deadline > now + timedelta(days=window):
+                    continue
+
+                days_remaining = (deadline.date() - now.date()).days
+                rows.append({
+                    'tender_id': tender_id,
+                    'company_id': company_id,
+                    'notification_type': NOTIFICATION_TYPE,
+                    'message': f"Tender '{title}' submission deadline in {days_remaining} day{'s' if days_remaining != 1 else ''}",
+                    'days_remaining': days_remaining,
+                    'is_read': False,
+                    'is_processed': False,
+                    'created_at': created_at
+                })
+
+                if len(rows) >= chunk_size:
+                    db.session.bulk_insert_mappings(TenderNotification, rows)
+                    created_count += len(rows)
+                    rows = []
+
+            if rows:
+                db.session.bulk_insert_mappings(TenderNotification, rows)
+                created_count += len(rows)
+
+            db.session.commit()
+            return True, created_count, f"Created {created_count} deadline notifications"
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error generating deadline notifications: {e}")
+            return False, 0, str(e)
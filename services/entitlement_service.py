@@ -0,0 +1,262 @@
+"""
+Entitlement Service
+Resolves a user's company, enabled modules and permissions once per request
+"""
+
+from flask import g, session, has_request_context
+from sqlalchemy import and_
+from sqlalchemy.orm import joinedload
+
+from models import (
+    db, User, Company, Permission, RolePermission, CompanyRole, UserCompanyRole
+)
+from services.cache_service import CacheService
+
+
+# Role names treated as company administrators (compared case-insensitively)
+ADMIN_ROLE_NAMES = ['company_admin', 'admin', 'Company Admin', 'Admin', 'Super Admin']
+
+
+class EntitlementSnapshot:
+    """
+    Resolved entitlements for one user within one company
+
+    The user (with role and company) is loaded up front; enabled modules and
+    the flattened permission set are loaded the first time they are needed
+    (from CacheService when another request already loaded them) and reused
+    afterwards.
+    """
+
+    def __init__(self, user_id, company_id=None):
+        self.user_id = int(user_id)
+        self.user = User.query.options(
+            joinedload(User.role),
+            joinedload(User.company)
+        ).get(self.user_id)
+
+        self.company_id = company_id or (self.user.company_id if self.user else None)
+        self._company = None
+        self._module_rows = None
+        self._permissions = None
+        self._role_permissions = None
+        self._module_permissions = None
+
+    @property
+    def is_super_admin(self):
+        return bool(self.user and self.user.is_super_admin)
+
+    @property
+    def company(self):
+        """Company the snapshot is scoped to"""
+        if self._company is None and self.company_id:
+            if self.user and self.user.company_id == self.company_id:
+                self._company = self.user.company
+            else:
+                self._company = Company.query.get(self.company_id)
+        return self._company
+
+    @property
+    def enabled_module_definitions(self):
+        """ModuleDefinition rows enabled for the company, in display order"""
+        if self._module_rows is None:
+            if self.company_id:
+                from services.company_module_service import CompanyModuleService
+                company_modules = CompanyModuleService.get_enabled_modules_for_company(self.company_id)
+                self._module_rows = [cm.module_definition for cm in company_modules]
+            else:
+                self._module_rows = []
+        return self._module_rows
+
+    @property
+    def enabled_modules(self):
+        """Names of modules enabled for the company"""
+        return [module_def.module_name for module_def in self.enabled_module_definitions]
+
+    def has_module(self, module_name):
+        """Check if a module is enabled for the company (super admins have all)"""
+        if self.is_super_admin:
+            return True
+        return module_name in self.enabled_modules
+
+    @property
+    def permissions(self):
+        """Workflow permission names granted through the user's company roles"""
+        if self._permissions is None:
+            if not self.user:
+                names = []
+            elif self.user.is_super_admin:
+                names = CacheService.get_or_load(
+                    'permissions', None, 'all', EntitlementSnapshot._load_all_permission_names
+                )
+            elif not self.company_id:
+                names = []
+            else:
+                names = CacheService.get_or_load(
+                    'permissions', self.company_id, f"user:{self.user_id}",
+                    lambda: EntitlementSnapshot._load_permission_names(self.user_id, self.company_id)
+                )
+            self._permissions = names
+        return self._permissions
+
+    @staticmethod
+    def _load_all_permission_names():
+        return [p.name for p in Permission.query.filter_by(is_active=True).all()]
+
+    @staticmethod
+    def _load_permission_names(user_id, company_id):
+        rows = db.session.query(Permission.name).join(RolePermission).join(CompanyRole).join(
+            UserCompanyRole
+        ).filter(
+            and_(
+                UserCompanyRole.user_id == user_id,
+                CompanyRole.company_id == company_id,
+                CompanyRole.is_active == True,
+                Permission.is_active == True
+            )
+        ).distinct().all()
+        return [row[0] for row in rows]
+
+    def has_permission(self, permission_name):
+        """Check a workflow permission (super admins have all)"""
+        if self.is_super_admin:
+            return True
+        return permission_name in self.permissions
+
+    @property
+    def role_permissions(self):
+        """Legacy permissions stored on the user's Role"""
+        if self._role_permissions is None:
+            from services.role_service import RoleService
+            if self.user and self.user.role:
+                self._role_permissions = RoleService.get_role_permissions(self.user.role_id)
+            else:
+                self._role_permissions = []
+        return self._role_permissions
+
+    @property
+    def module_permissions(self):
+        """
+        Module-based capability flags in the shape returned by
+        ModulePermissions.get_user_permissions (None if the user has no company)
+        """
+        if self._module_permissions is None:
+            self._module_permissions = self._build_module_permissions()
+        return self._module_permissions
+
+    def _build_module_permissions(self):
+        user = self.user
+        if not user:
+            return None
+
+        # SUPER ADMIN BYPASS - Super admins get all permissions
+        if user.is_super_admin:
+            return {
+                'user': user,
+                'company': user.company if user.company_id else None,
+                'user_role': user.role.name if user.role else 'Super Admin',
+                'is_company_admin': True,  # Super admin is also company admin
+                'is_super_admin': True,
+                'enabled_modules': ['all'],  # Super admin has access to all modules
+                'can_delete': True,
+                'can_manage_users': True,
+                'can_view_analytics': True,
+                'can_use_api': True,
+                'has_notifications': True,
+                'has_white_label': True,
+                'can_manage_company': True,
+                'can_upload_documents': True,
+                'can_create_custom_fields': True,
+                'can_add_notes': True,
+                'can_view_audit_log': True,
+                'can_advanced_search': True
+            }
+
+        # Regular users need company
+        if not user.company_id or not self.company:
+            return None
+
+        enabled_modules = self.enabled_modules
+
+        # Determine user role permissions
+        user_role = user.role.name if user.role else 'user'
+        is_company_admin = user_role.lower() in [role.lower() for role in ADMIN_ROLE_NAMES]
+
+        return {
+            'user': user,
+            'company': self.company,
+            'user_role': user_role,
+            'is_company_admin': is_company_admin,
+            'is_super_admin': False,
+            'enabled_modules': enabled_modules,
+            'can_delete': is_company_admin,
+            'can_manage_users': 'user_management' in enabled_modules and is_company_admin,
+            'can_view_analytics': 'reporting' in enabled_modules,
+            'can_use_api': 'api_access' in enabled_modules,
+            'has_notifications': 'notifications' in enabled_modules,
+            'has_white_label': 'white_labeling' in enabled_modules,
+            'can_manage_company': 'company_management' in enabled_modules and is_company_admin,
+            'can_upload_documents': 'document_management' in enabled_modules,
+            'can_create_custom_fields': 'custom_fields' in enabled_modules and is_company_admin,
+            'can_add_notes': 'notes_comments' in enabled_modules,
+            'can_view_audit_log': 'audit_tracking' in enabled_modules and is_company_admin,
+            'can_advanced_search': 'advanced_search' in enabled_modules
+        }
+
+    def matches(self, user_id, company_id=None):
+        """Check if this snapshot answers questions about (user_id, company_id)"""
+        try:
+            user_id = int(user_id)
+        except (TypeError, ValueError):
+            return False
+        if user_id != self.user_id:
+            return False
+        return company_id is None or company_id == self.company_id
+
+
+class EntitlementService:
+    """Service for reading the current request's entitlement snapshot"""
+
+    @staticmethod
+    def current():
+        """
+        Get the snapshot for the logged-in user, building it on first use
+
+        Returns:
+            EntitlementSnapshot or None outside a request or when logged out
+        """
+        if not has_request_context() or 'user_id' not in session:
+            return None
+        return EntitlementService.resolve(session['user_id'], session.get('company_id'))
+
+    @staticmethod
+    def resolve(user_id, company_id=None):
+        """
+        Get entitlements for a user, reusing the request snapshot when it matches
+
+        Args:
+            user_id: User ID
+            company_id: Optional company ID (defaults to the user's company)
+
+        Returns:
+            EntitlementSnapshot (its ``user`` is None if the user does not exist)
+        """
+        in_request = has_request_context()
+
+        if in_request:
+            snapshot = g.get('entitlements')
+            if snapshot is not None and snapshot.matches(user_id, company_id):
+                return snapshot
+
+        snapshot = EntitlementSnapshot(user_id, company_id)
+
+        # Only the logged-in user's entitlements are kept for the request
+        if in_request and snapshot.matches(session.get('user_id'), session.get('company_id')):
+            g.entitlements = snapshot
+
+        return snapshot
+
+    @staticmethod
+    def invalidate():
+        """Drop the request snapshot so the next check reloads from the database"""
+        if has_request_context():
+            g.pop('entitlements', None)
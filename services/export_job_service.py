@@ -0,0 +1,439 @@
+"""
+Export Job Service
+Renders report exports on a background worker pool and keeps the finished
+files under UPLOAD_FOLDER until they expire
+"""
+
+import glob
+import json
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, func, or_
+
+from models import db, ExportJob, User
+from services.cache_service import CacheService
+
+
+# Seconds live progress is kept in the cache after the last update
+EXPORT_PROGRESS_CACHE_TTL = 3600
+
+# Report titles for the tender list exports
+TENDER_LIST_TITLES = {
+    'active': 'Active Tenders Report',
+    'closed': 'Closed Tenders Report',
+    'overdue': 'Overdue Tenders Report'
+}
+
+PDF_MIMETYPE = 'application/pdf'
+
+
+class ExportJobService:
+    """Service for queueing, running and serving background exports"""
+
+    _app = None
+    _executor = None
+
+    @staticmethod
+    def init_app(app):
+        """Create the worker pool from EXPORT_JOB_* settings"""
+        ExportJobService._app = app
+        ExportJobService._executor = ThreadPoolExecutor(
+            max_workers=app.config.get('EXPORT_JOB_WORKERS', 2),
+            thread_name_prefix='export-job'
+        )
+
+    @staticmethod
+    def export_folder():
+        """Directory finished export files are written to"""
+        app = ExportJobService._app
+        upload_folder = app.config.get('UPLOAD_FOLDER', 'uploads') if app else 'uploads'
+        folder = os.path.join(os.path.abspath(upload_folder), 'exports')
+        os.makedirs(folder, exist_ok=True)
+        return folder
+
+    @staticmethod
+    def enqueue(job_type, params, user_id, company_id=None):
+        """
+        Record an export job and hand it to the worker pool
+
+        Args:
+            job_type: Handler name ('tender_list', 'billing_report' or 'bills')
+            params: JSON-serialisable handler arguments
+            user_id: User requesting the export (only they can download it)
+            company_id: Company the export belongs to
+
+        Returns:
+            Tuple (success, job or None, message)
+        """
+        if job_type not in EXPORT_JOB_HANDLERS:
+            return False, None, f"Unknown export type: {job_type}"
+
+        try:
+            job = ExportJob(
+                job_type=job_type,
+                params=json.dumps(params or {}),
+                status='queued',
+                progress=0,
+                message='Waiting for a worker',
+                created_by=user_id,
+                company_id=company_id
+            )
+            db.session.add(job)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error creating export job: {e}")
+            return False, None, f"Error creating export job: {str(e)}"
+
+        if ExportJobService._executor is None:
+            ExportJobService._fail(job.id, 'Export workers are not running')
+            return False, job, 'Export workers are not running'
+
+        ExportJobService._executor.submit(ExportJobService._run_with_context, job.id)
+        return True, job, 'Export queued'
+
+    @staticmethod
+    def get_job_for_user(job_id, user):
+        """
+        Get an export job if the user may see it (its owner or a super admin)
+
+        Args:
+            job_id: ExportJob ID
+            user: User asking
+
+        Returns:
+            ExportJob or None
+        """
+        job = ExportJob.query.get(job_id)
+        if not job or not user:
+            return None
+        if job.created_by != user.id and not user.is_super_admin:
+            return None
+        return job
+
+    @staticmethod
+    def get_status(job):
+        """
+        Job state for polling, with live progress from the running worker
+
+        Args:
+            job: ExportJob
+
+        Returns:
+            Dictionary from ExportJob.to_dict
+        """
+        status = job.to_dict()
+        if job.status == 'running':
+            live_progress = CacheService.backend().get(ExportJobService._progress_key(job.id))
+            if live_progress is not None:
+                status['progress'] = max(status['progress'], live_progress)
+        return status
+
+    @staticmethod
+    def artifact_path(job):
+        """Path of a finished job's file, or None if it is gone or expired"""
+        if job.status != 'completed' or not job.file_path:
+            return None
+        if job.expires_at and job.expires_at < datetime.utcnow():
+            return None
+        if not os.path.exists(job.file_path):
+            return None
+        return job.file_path
+
+    @staticmethod
+    def cleanup_expired(now=None):
+        """
+        Delete expired export files and their job rows
+
+        Args:
+            now: Time to compare expiry against (default now)
+
+        Returns:
+            Number of jobs removed
+        """
+        now = now or datetime.utcnow()
+        try:
+            expired_jobs = ExportJob.query.filter(
+                ExportJob.expires_at.isnot(None),
+                ExportJob.expires_at < now
+            ).all()
+
+            for job in expired_jobs:
+                if job.file_path and os.path.exists(job.file_path):
+                    try:
+                        os.remove(job.file_path)
+                    except OSError as e:
+                        print(f"Error removing export file {job.file_path}: {e}")
+                db.session.delete(job)
+
+            db.session.commit()
+            return len(expired_jobs)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error cleaning up export jobs: {e}")
+            return 0
+
+    @staticmethod
+    def fail_abandoned(now=None):
+        """
+        Mark queued or running jobs that no worker will finish as failed
+
+        A job is abandoned when it has been queued for longer than
+        EXPORT_JOB_TIMEOUT_MINUTES, or when it is running and its worker
+        (in any process) has not refreshed heartbeat_at for that long.
+        Partial files are deleted, and expires_at is set so
+        cleanup_expired() removes the job later.
+
+        Args:
+            now: Time to compare against (default now)
+
+        Returns:
+            Number of jobs marked failed
+        """
+        now = now or datetime.utcnow()
+        app = ExportJobService._app
+        timeout_minutes = app.config.get('EXPORT_JOB_TIMEOUT_MINUTES', 60) if app else 60
+        ttl_hours = app.config.get('EXPORT_JOB_TTL_HOURS', 24) if app else 24
+
+        stale_before = now - timedelta(minutes=timeout_minutes)
+
+        try:
+            abandoned_jobs = ExportJob.query.filter(or_(
+                and_(ExportJob.status == 'queued', ExportJob.created_at < stale_before),
+                and_(ExportJob.status == 'running',
+                     func.coalesce(ExportJob.heartbeat_at, ExportJob.started_at) < stale_before)
+            )).all()
+
+            for job in abandoned_jobs:
+                ExportJobService._remove_partial_files(job)
+                if job.status == 'running':
+                    job.message = 'Export worker stopped responding'
+                else:
+                    job.message = 'Export was never started'
+                job.status = 'failed'
+                job.file_path = None
+                job.completed_at = now
+                job.expires_at = now + timedelta(hours=ttl_hours)
+
+            db.session.commit()
+            return len(abandoned_jobs)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error failing abandoned export jobs: {e}")
+            return 0
+
+    @staticmethod
+    def _remove_partial_files(job):
+        """Delete files a job's worker started writing (named '<job id>_<token>.<ext>')"""
+        pattern = os.path.join(ExportJobService.export_folder(), f"{job.id}_*")
+        for path in glob.glob(pattern):
+            try:
+                os.remove(path)
+            except OSError as e:
+                print(f"Error removing export file {path}: {e}")
+
+    @staticmethod
+    def _heartbeat(job_id, stopped):
+        """Refresh a running job's heartbeat_at every EXPORT_JOB_HEARTBEAT_SECONDS until ``stopped`` is set"""
+        app = ExportJobService._app
+        interval = app.config.get('EXPORT_JOB_HEARTBEAT_SECONDS', 60)
+        with app.app_context():
+            while not stopped.wait(interval):
+                try:
+                    # Own transaction, since the render keeps the session's open
+                    with db.engine.begin() as connection:
+                        connection.execute(
+                            ExportJob.__table__.update()
+                            .where(ExportJob.id == job_id, ExportJob.status == 'running')
+                            .values(heartbeat_at=datetime.utcnow())
+                        )
+                except Exception as e:
+                    print(f"Error refreshing export job {job_id} heartbeat: {e}")
+
+    @staticmethod
+    def _progress_key(job_id):
+        return f"export_job:{job_id}:progress"
+
+    @staticmethod
+    def _run_with_context(job_id):
+        with ExportJobService._app.app_context():
+            ExportJobService.run(job_id)
+
+    @staticmethod
+    def run(job_id):
+        """
+        Render a queued export job (called on a worker thread inside an app context)
+
+        Live progress goes to the cache rather than the job row, since the
+        render holds a streaming query open on the session. A heartbeat
+        thread keeps heartbeat_at fresh meanwhile, so fail_abandoned() can
+        tell a slow render from one whose worker died.
+
+        Args:
+            job_id: ExportJob ID
+        """
+        job = ExportJob.query.get(job_id)
+        if not job or job.status != 'queued':
+            return
+
+        job.status = 'running'
+        job.started_at = datetime.utcnow()
+        job.heartbeat_at = job.started_at
+        job.message = 'Rendering export'
+        db.session.commit()
+
+        progress_key = ExportJobService._progress_key(job_id)
+        handler = EXPORT_JOB_HANDLERS[job.job_type]
+        file_path = None
+        stop_heartbeat = threading.Event()
+        threading.Thread(
+            target=ExportJobService._heartbeat, args=(job_id, stop_heartbeat),
+            name=f'export-job-{job_id}-heartbeat', daemon=True
+        ).start()
+
+        try:
+            params = job.get_params()
+            extension = 'pdf' if params.get('format') == 'pdf' else 'xlsx'
+            file_path = os.path.join(
+                ExportJobService.export_folder(),
+                f"{job_id}_{uuid.uuid4().hex}.{extension}"
+            )
+
+            def set_progress(percent):
+                CacheService.backend().set(progress_key, min(int(percent), 99), EXPORT_PROGRESS_CACHE_TTL)
+
+            with open(file_path, 'wb') as export_file:
+                file_name, mime_type = handler(export_file, params, set_progress)
+
+            db.session.rollback()  # End the read transaction used by the render
+            job = ExportJob.query.get(job_id)
+            if job.status != 'running':
+                # Given up on by fail_abandoned() while rendering
+                if os.path.exists(file_path):
+                    os.remove(file_path)
+                return
+            ttl_hours = ExportJobService._app.config.get('EXPORT_JOB_TTL_HOURS', 24)
+            job.status = 'completed'
+            job.progress = 100
+            job.message = 'Export ready'
+            job.file_path = file_path
+            job.file_name = file_name
+            job.mime_type = mime_type
+            job.file_size = os.path.getsize(file_path)
+            job.completed_at = datetime.utcnow()
+            job.expires_at = job.completed_at + timedelta(hours=ttl_hours)
+            db.session.commit()
+
+        except Exception as e:
+            print(f"Error running export job {job_id}: {e}")
+            if file_path and os.path.exists(file_path):
+                os.remove(file_path)
+            ExportJobService._fail(job_id, f"Export failed: {str(e)}")
+
+        finally:
+            stop_heartbeat.set()
+            CacheService.backend().delete(progress_key)
+
+    @staticmethod
+    def _fail(job_id, message):
+        try:
+            db.session.rollback()
+            job = ExportJob.query.get(job_id)
+            if job:
+                job.status = 'failed'
+                job.message = message[:255]
+                job.completed_at = datetime.utcnow()
+                ttl_hours = ExportJobService._app.config.get('EXPORT_JOB_TTL_HOURS', 24) if ExportJobService._app else 24
+                job.expires_at = job.completed_at + timedelta(hours=ttl_hours)
+                db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error marking export job {job_id} as failed: {e}")
+
+
+# =====================================================
+# JOB HANDLERS
+# Each writes the export to an open binary file and returns
+# (download file name, mime type); progress takes a percentage
+# =====================================================
+
+def _row_progress(progress, total):
+    """Adapt a percentage callback to the writers' rows-written callback"""
+    def report(rows_written):
+        if total:
+            progress(rows_written * 100 / total)
+    return report
+
+
+def _export_tender_list(export_file, params, progress):
+    from services.tender_report_service import TenderReportService
+    from utils.export_helpers import write_tenders_pdf, write_tenders_excel, XLSX_MIMETYPE
+
+    user = User.query.get(params['user_id'])
+    report = params['report']
+    title = TENDER_LIST_TITLES[report]
+    as_of = datetime.fromisoformat(params['as_of']) if params.get('as_of') else None
+
+    query = TenderReportService.list_report_query(
+        report, user, can_view_all=params.get('can_view_all', False), as_of=as_of
+    )
+    if query is None:
+        raise ValueError('No closed status found in system')
+
+    row_progress = _row_progress(progress, query.order_by(None).count())
+    file_stem = title.replace(' ', '_')
+
+    if params.get('format') == 'pdf':
+        write_tenders_pdf(export_file, query, title, user, row_progress)
+        return f'{file_stem}.pdf', PDF_MIMETYPE
+
+    write_tenders_excel(export_file, query, title, user, row_progress)
+    return f'{file_stem}.xlsx', XLSX_MIMETYPE
+
+
+def _export_billing_report(export_file, params, progress):
+    from services.billing_service import BillingService
+    from utils.export_helpers import write_billing_report_excel, XLSX_MIMETYPE
+
+    report_data = BillingService.get_billing_report_data()
+    total = len(report_data['companies']) + len(report_data['modules'])
+
+    write_billing_report_excel(export_file, report_data, _row_progress(progress, total))
+    return f"Billing_Report_{datetime.now().strftime('%Y%m%d')}.xlsx", XLSX_MIMETYPE
+
+
+def _export_bills(export_file, params, progress):
+    from services.billing_service import BillingService
+    from utils.export_helpers import write_bills_pdf, write_bills_excel, XLSX_MIMETYPE
+
+    start_date = datetime.strptime(params['start_date'], '%Y-%m-%d') if params.get('start_date') else None
+    end_date = datetime.strptime(params['end_date'], '%Y-%m-%d') if params.get('end_date') else None
+
+    bills = BillingService.get_bills_with_filters(
+        company_id=params.get('company_id'),
+        start_date=start_date,
+        end_date=end_date,
+        status=params.get('status')
+    )
+    row_progress = _row_progress(progress, len(bills))
+    file_stem = f"Bills_{datetime.now().strftime('%Y%m%d')}"
+
+    if params.get('format') == 'pdf':
+        write_bills_pdf(export_file, bills, row_progress)
+        return f'{file_stem}.pdf', PDF_MIMETYPE
+
+    write_bills_excel(export_file, bills, row_progress)
+    return f'{file_stem}.xlsx', XLSX_MIMETYPE
+
+
+EXPORT_JOB_HANDLERS = {
+    'tender_list': _export_tender_list,
+    'billing_report': _export_billing_report,
+    'bills': _export_bills
+}
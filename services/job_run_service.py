@@ -0,0 +1,298 @@
+"""
+Job Run Service
+Persists scheduler job executions in scheduler_job_runs so every worker
+reports the same history and run metrics
+"""
+
+import math
+import os
+import socket
+from datetime import datetime, timedelta
+
+from flask import current_app, has_app_context
+from sqlalchemy import func
+
+from models import db, SchedulerJobRun
+
+
+class JobRunService:
+    """Service for scheduler job history and run metrics"""
+
+    @staticmethod
+    def _timeout_minutes():
+        if has_app_context():
+            return current_app.config.get('JOB_RUN_TIMEOUT_MINUTES', 360)
+        return 360
+
+    # ------------------------------------------------------------------
+    # Recording
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def start(job_id):
+        """
+        Record that a job has started
+
+        Args:
+            job_id: Scheduler job ID
+
+        Returns:
+            Run ID to pass to finish(), or None if the run could not be recorded
+        """
+        try:
+            run = SchedulerJobRun(
+                job_id=job_id,
+                status='running',
+                started_at=datetime.now(),
+                worker_pid=os.getpid(),
+                hostname=socket.gethostname()
+            )
+            db.session.add(run)
+            db.session.commit()
+            return run.id
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error recording start of job {job_id}: {e}")
+            return None
+
+    @staticmethod
+    def finish(job_id, status, duration=None, rows_affected=None, error=None, run_id=None):
+        """
+        Record how a job run ended
+
+        Completes the run start() returned ``run_id`` for; a job run
+        without one gets a complete row of its own.
+
+        Args:
+            job_id: Scheduler job ID
+            status: 'success' or 'error'
+            duration: Run time in seconds
+            rows_affected: Rows the job created or changed
+            error: Error message for failed runs
+            run_id: Run ID returned by start()
+
+        Returns:
+            Run ID, or None if the run could not be recorded
+        """
+        try:
+            now = datetime.now()
+            run = SchedulerJobRun.query.get(run_id) if run_id else None
+            if run is None:
+                run = SchedulerJobRun(
+                    job_id=job_id,
+                    started_at=now - timedelta(seconds=duration or 0),
+                    worker_pid=os.getpid(),
+                    hostname=socket.gethostname()
+                )
+                db.session.add(run)
+
+            run.status = status
+            run.finished_at = now
+            run.duration = duration if duration is not None else (now - run.started_at).total_seconds()
+            run.rows_affected = rows_affected
+            run.error = error
+
+            db.session.commit()
+            return run.id
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error recording end of job {job_id}: {e}")
+            return None
+
+    @staticmethod
+    def record(job_id, status, duration=None, rows_affected=None, error=None, run_id=None):
+        """
+        Record a status change: 'running' starts a run (returning its ID),
+        anything else finishes the run ``run_id``
+        """
+        if status == 'running':
+            return JobRunService.start(job_id)
+        return JobRunService.finish(job_id, status, duration, rows_affected, error, run_id)
+
+    @staticmethod
+    def fail_abandoned(now=None):
+        """
+        Mark runs still 'running' after JOB_RUN_TIMEOUT_MINUTES as failed
+
+        A process that dies mid-job never finishes its run; without this
+        the run would stay out of the failure rate for good.
+
+        Args:
+            now: Time to compare against (default now)
+
+        Returns:
+            Number of runs marked failed
+        """
+        now = now or datetime.now()
+        stale_before = now - timedelta(minutes=JobRunService._timeout_minutes())
+        try:
+            failed = SchedulerJobRun.query.filter(
+                SchedulerJobRun.status == 'running',
+                SchedulerJobRun.started_at < stale_before
+            ).update({
+                'status': 'error',
+                'finished_at': now,
+                'error': 'Run did not finish (its worker stopped or timed out)'
+            }, synchronize_session=False)
+            db.session.commit()
+            return failed
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error failing abandoned job runs: {e}")
+            return 0
+
+    @staticmethod
+    def prune(retention_days):
+        """
+        Fail abandoned runs and delete runs older than the retention period
+
+        Args:
+            retention_days: Days of history to keep
+
+        Returns:
+            Number of runs deleted
+        """
+        JobRunService.fail_abandoned()
+        try:
+            cutoff = datetime.now() - timedelta(days=retention_days)
+            deleted = SchedulerJobRun.query.filter(
+                SchedulerJobRun.started_at < cutoff
+            ).delete(synchronize_session=False)
+            db.session.commit()
+            return deleted
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error pruning job runs: {e}")
+            return 0
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _filtered(job_id=None, status=None, since=None):
+        query = SchedulerJobRun.query
+        if job_id:
+            query = query.filter(SchedulerJobRun.job_id == job_id)
+        if status:
+            query = query.filter(SchedulerJobRun.status == status)
+        if since:
+            query = query.filter(SchedulerJobRun.started_at >= since)
+        return query
+
+    @staticmethod
+    def history(job_id=None, status=None, since=None, page=1, per_page=20):
+        """
+        Job runs, most recent first
+
+        Args:
+            job_id: Optional job ID
+            status: Optional status
+            since: Optional earliest start time
+            page: Page number (1-based)
+            per_page: Runs per page
+
+        Returns:
+            Tuple (runs: list of SchedulerJobRun, total: int)
+        """
+        query = JobRunService._filtered(job_id, status, since)
+        total = query.count()
+        runs = query.order_by(
+            SchedulerJobRun.started_at.desc(), SchedulerJobRun.id.desc()
+        ).offset((page - 1) * per_page).limit(per_page).all()
+        return runs, total
+
+    @staticmethod
+    def last_started(job_ids):
+        """
+        Start time of each job's most recent run
+
+        Args:
+            job_ids: Scheduler job IDs
+
+        Returns:
+            Dictionary of job_id -> started_at (jobs that never ran are left out)
+        """
+        if not job_ids:
+            return {}
+        rows = db.session.query(
+            SchedulerJobRun.job_id, func.max(SchedulerJobRun.started_at)
+        ).filter(
+            SchedulerJobRun.job_id.in_(job_ids)
+        ).group_by(SchedulerJobRun.job_id).all()
+        return {job_id: started_at for job_id, started_at in rows}
+
+    @staticmethod
+    def percentile(values, pct):
+        """Nearest-rank percentile of a list of numbers (None when empty)"""
+        if not values:
+            return None
+        ordered = sorted(values)
+        rank = max(1, math.ceil(pct / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    @staticmethod
+    def _summarize(runs):
+        finished = [run for run in runs if run.status != 'running']
+        failed = [run for run in finished if run.status == 'error']
+        durations = [run.duration for run in finished if run.duration is not None]
+        last = max(runs, key=lambda run: (run.started_at, run.id)) if runs else None
+
+        return {
+            'total_runs': len(runs),
+            'successful_runs': len(finished) - len(failed),
+            'failed_runs': len(failed),
+            'running': len(runs) - len(finished),
+            'failure_rate': (len(failed) / len(finished) * 100) if finished else 0.0,
+            'average_duration': (sum(durations) / len(durations)) if durations else 0.0,
+            'p50_duration': JobRunService.percentile(durations, 50),
+            'p95_duration': JobRunService.percentile(durations, 95),
+            'max_duration': max(durations) if durations else None,
+            'rows_affected': sum(run.rows_affected or 0 for run in finished),
+            'last_run': {
+                'job_id': last.job_id,
+                'timestamp': last.started_at.isoformat() if last.started_at else None,
+                'status': last.status,
+                'duration': last.duration,
+                'created_count': last.rows_affected
+            } if last else None
+        }
+
+    @staticmethod
+    def stats(job_id=None, since=None):
+        """
+        Run metrics overall and per job, from one query over the window
+
+        Args:
+            job_id: Optional job ID
+            since: Optional earliest start time
+
+        Returns:
+            Dictionary of overall metrics (counts, failure_rate, average,
+            p50 and p95 durations in seconds, rows_affected, last_run) with
+            the same metrics per job under 'jobs'
+        """
+        JobRunService.fail_abandoned()
+        runs = JobRunService._filtered(job_id, since=since).with_entities(
+            SchedulerJobRun.id,
+            SchedulerJobRun.job_id,
+            SchedulerJobRun.status,
+            SchedulerJobRun.started_at,
+            SchedulerJobRun.duration,
+            SchedulerJobRun.rows_affected
+        ).all()
+
+        by_job = {}
+        for run in runs:
+            by_job.setdefault(run.job_id, []).append(run)
+
+        stats = JobRunService._summarize(runs)
+        stats['jobs'] = {
+            run_job_id: JobRunService._summarize(job_runs)
+            for run_job_id, job_runs in sorted(by_job.items())
+        }
+        return stats
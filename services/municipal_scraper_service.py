@@ -0,0 +1,418 @@
+"""
+Municipal Scraper Service
+Fetches municipal tender listings concurrently on a bounded thread pool,
+with per-host concurrency limits and politeness delays, retries with
+backoff and conditional requests, and parses them into scraper records
+
+Municipalities are configured in the JSON file named by
+MUNICIPAL_SCRAPER_SOURCES, keyed by municipality name:
+
+    {
+        "City of Cape Town": {
+            "province": "western-cape",
+            "urls": ["https://.../tenders?page=1", "https://.../tenders?page=2"],
+            "format": "html",
+            "items": "table.tenders tbody tr",
+            "fields": {"tenderNumber": "td.ref", "title": "td.title", "closingDate": "td.closing",
+                       "value": "td.value", "category": "td.category"},
+            "link": "a"
+        },
+        "eThekwini": {
+            "province": "kwazulu-natal",
+            "url": "https://.../api/tenders",
+            "format": "json",
+            "items": "data.tenders",
+            "fields": {"tenderNumber": "reference", "title": "name", "closingDate": "closes"}
+        }
+    }
+
+For html sources "items" and "fields" are CSS selectors (fields relative to
+an item); for json sources they are dotted keys. Closing dates are read
+as ISO dates or with DATE_FORMATS (day first); a source can list its own
+strptime formats instead under "date_formats". Tenders whose closing date
+cannot be read are counted as invalid and not saved.
+"""
+
+import json
+import os
+import random
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from urllib.parse import urljoin, urlparse
+
+import requests
+from bs4 import BeautifulSoup
+
+
+# Responses worth retrying (rate limited or temporarily unavailable)
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+# Closing date formats tried after ISO 8601 (South African listings put the day first)
+DATE_FORMATS = (
+    '%d/%m/%Y', '%d/%m/%Y %H:%M', '%d-%m-%Y', '%d-%m-%Y %H:%M', '%Y/%m/%d',
+    '%d %B %Y', '%d %B %Y %H:%M', '%d %b %Y', '%d %b %Y %H:%M', '%A, %d %B %Y', '%A, %d %B %Y %H:%M'
+)
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'TMS-TenderScraper/1.0 (municipal tender monitoring)',
+    'Accept': 'text/html,application/json;q=0.9,*/*;q=0.8'
+}
+
+
+class HostLimiter:
+    """
+    Per-host concurrency limit and politeness delay
+
+    At most ``max_per_host`` requests run against a host at once, and
+    request starts to the same host are spaced at least ``delay`` seconds
+    apart, however many workers are free.
+    """
+
+    def __init__(self, max_per_host=2, delay=1.0):
+        self.max_per_host = max_per_host
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._semaphores = {}
+        self._next_start = {}
+
+    @contextmanager
+    def slot(self, url):
+        """Hold one of the host's request slots, waiting out its politeness delay"""
+        host = urlparse(url).netloc
+        with self._lock:
+            semaphore = self._semaphores.setdefault(host, threading.BoundedSemaphore(self.max_per_host))
+
+        with semaphore:
+            with self._lock:
+                now = time.monotonic()
+                start = max(now, self._next_start.get(host, now))
+                self._next_start[host] = start + self.delay
+            if start > now:
+                time.sleep(start - now)
+            yield
+
+
+class MunicipalScraper:
+    """Concurrent scraper for the configured municipal tender listings"""
+
+    def __init__(self, municipal_configs=None):
+        self.municipal_configs = municipal_configs or {}
+        self.max_workers = 8
+        self.retries = 3
+        self.backoff = 1.0
+        self.timeout = 30
+        self.max_sweep_minutes = 110
+        self.limiter = HostLimiter()
+        # url -> {'etag', 'last_modified'} of the last listing that was saved
+        self.validators = {}
+        self._validators_lock = threading.Lock()
+        self._local = threading.local()
+        self._sleep = time.sleep
+
+    def init_app(self, app):
+        """Read the MUNICIPAL_SCRAPER_* settings and the configured sources"""
+        self.max_workers = app.config.get('MUNICIPAL_SCRAPER_WORKERS', 8)
+        self.retries = app.config.get('MUNICIPAL_SCRAPER_RETRIES', 3)
+        self.timeout = app.config.get('MUNICIPAL_SCRAPER_TIMEOUT', 30)
+        self.max_sweep_minutes = app.config.get('MUNICIPAL_SCRAPER_MAX_SWEEP_MINUTES', 110)
+        self.limiter = HostLimiter(
+            app.config.get('MUNICIPAL_SCRAPER_PER_HOST', 2),
+            app.config.get('MUNICIPAL_SCRAPER_DELAY_SECONDS', 1.0)
+        )
+
+        sources = app.config.get('MUNICIPAL_SCRAPER_SOURCES')
+        if sources and os.path.exists(sources):
+            try:
+                with open(sources) as f:
+                    self.municipal_configs = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Error loading municipal scraper sources from {sources}: {e}")
+
+    # ------------------------------------------------------------------
+    # Fetching
+    # ------------------------------------------------------------------
+
+    def _session(self):
+        """requests session for the current worker thread (sessions are not thread safe)"""
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            self._local.session = session
+        return session
+
+    def _retry_delay(self, attempt, response=None):
+        """Exponential backoff with jitter, or the server's Retry-After if longer"""
+        delay = self.backoff * (2 ** (attempt - 1)) + random.uniform(0, self.backoff)
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            delay = max(delay, int(retry_after))
+        return delay
+
+    def fetch(self, url, deadline=None):
+        """
+        GET a listing page, conditionally on its last saved ETag/Last-Modified
+
+        Args:
+            url: Listing URL
+            deadline: Optional datetime after which no new attempt is made
+
+        Returns:
+            Dictionary with url, status ('ok', 'not_modified' or 'error'),
+            body, etag, last_modified, attempts and error
+        """
+        headers = {}
+        with self._validators_lock:
+            validators = self.validators.get(url) or {}
+        if validators.get('etag'):
+            headers['If-None-Match'] = validators['etag']
+        if validators.get('last_modified'):
+            headers['If-Modified-Since'] = validators['last_modified']
+
+        result = {'url': url, 'status': 'error', 'body': None, 'etag': None,
+                  'last_modified': None, 'attempts': 0, 'error': None}
+
+        for attempt in range(1, self.retries + 2):
+            if deadline and datetime.now() >= deadline:
+                result['error'] = result['error'] or 'Sweep deadline passed'
+                return result
+
+            result['attempts'] = attempt
+            response = None
+            try:
+                with self.limiter.slot(url):
+                    response = self._session().get(url, headers=headers, timeout=self.timeout)
+
+                if response.status_code == 304:
+                    result['status'] = 'not_modified'
+                    return result
+
+                if response.status_code not in RETRY_STATUS_CODES:
+                    response.raise_for_status()
+                    result.update(
+                        status='ok',
+                        body=response.text,
+                        etag=response.headers.get('ETag'),
+                        last_modified=response.headers.get('Last-Modified')
+                    )
+                    return result
+
+                result['error'] = f"HTTP {response.status_code}"
+
+            except (requests.ConnectionError, requests.Timeout) as e:
+                result['error'] = str(e)
+
+            except requests.RequestException as e:
+                # Client errors (404, 403, ...) will not get better on retry
+                result['error'] = str(e)
+                return result
+
+            if attempt <= self.retries:
+                self._sleep(self._retry_delay(attempt, response))
+
+        return result
+
+    def remember(self, pages):
+        """
+        Keep the validators of fetched pages so the next sweep can skip them
+        if unchanged; call once their tenders are saved
+
+        Args:
+            pages: fetch() results
+        """
+        with self._validators_lock:
+            for page in pages:
+                if page['status'] == 'ok' and (page['etag'] or page['last_modified']):
+                    self.validators[page['url']] = {'etag': page['etag'], 'last_modified': page['last_modified']}
+
+    # ------------------------------------------------------------------
+    # Parsing
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _parse_value(raw):
+        """Rand amount from text such as 'R 1,250,000.00' (0 when absent)"""
+        if raw is None or raw == '':
+            return 0
+        if isinstance(raw, (int, float)):
+            return int(raw)
+        digits = re.sub(r'[^\d.]', '', str(raw))
+        try:
+            return int(float(digits)) if digits else 0
+        except ValueError:
+            return 0
+
+    @staticmethod
+    def _parse_date(raw, formats=DATE_FORMATS):
+        """
+        Datetime from a listed date such as '2026-03-15', '15/03/2026' or
+        '15 March 2026 12:00' (None when absent)
+
+        Raises:
+            ValueError: The date matches none of the formats
+        """
+        if raw is None or raw == '':
+            return None
+        if isinstance(raw, datetime):
+            return raw
+        if not isinstance(raw, str):
+            raise ValueError(f"Unreadable date: {raw!r}")
+
+        text = ' '.join(raw.split())
+        try:
+            return datetime.fromisoformat(text)
+        except ValueError:
+            pass
+        for date_format in formats:
+            try:
+                return datetime.strptime(text, date_format)
+            except ValueError:
+                continue
+        raise ValueError(f"Unreadable date: {raw!r}")
+
+    @staticmethod
+    def _dig(item, path):
+        """Value at a dotted key path in parsed JSON (None if missing)"""
+        for key in [part for part in (path or '').split('.') if part]:
+            if not isinstance(item, dict):
+                return None
+            item = item.get(key)
+        return item
+
+    def parse(self, municipality_name, config, page):
+        """
+        Scraper records from one fetched listing page
+
+        Args:
+            municipality_name: Configured municipality name
+            config: Municipality config
+            page: fetch() result with status 'ok'
+
+        Returns:
+            List of scraper dictionaries (tenderNumber, title, closingDate, ...);
+            records whose closing date cannot be read are left out and
+            counted in page['invalid']
+        """
+        fields = config.get('fields', {})
+        records = []
+
+        if config.get('format') == 'json':
+            items = self._dig(json.loads(page['body']), config.get('items')) or []
+            for item in items:
+                record = {field: self._dig(item, key) for field, key in fields.items()}
+                link = self._dig(item, config['link']) if config.get('link') else None
+                record['sourceUrl'] = urljoin(page['url'], link) if link else page['url']
+                records.append(record)
+        else:
+            soup = BeautifulSoup(page['body'], 'lxml')
+            for item in soup.select(config.get('items', 'tr')):
+                record = {}
+                for field, selector in fields.items():
+                    element = item.select_one(selector)
+                    record[field] = element.get_text(' ', strip=True) if element else None
+                link = item.select_one(config['link']) if config.get('link') else None
+                record['sourceUrl'] = urljoin(page['url'], link['href']) if link and link.get('href') else page['url']
+                records.append(record)
+
+        date_formats = config.get('date_formats') or DATE_FORMATS
+        tenders = []
+        page['invalid'] = 0
+        for record in records:
+            if not record.get('tenderNumber') or not record.get('title'):
+                continue
+            try:
+                record['closingDate'] = self._parse_date(record.get('closingDate'), date_formats)
+            except ValueError:
+                page['invalid'] += 1
+                continue
+            record['municipality'] = municipality_name
+            record['province'] = config.get('province', '')
+            record['value'] = self._parse_value(record.get('value'))
+            tenders.append(record)
+        return tenders
+
+    # ------------------------------------------------------------------
+    # Sweeps
+    # ------------------------------------------------------------------
+
+    def scrape_listing(self, municipality_name, config, deadline=None):
+        """
+        Fetch and parse every listing page of one municipality
+
+        Returns:
+            Dictionary with municipality, tenders (from changed pages only),
+            pages (fetch() results), not_modified (every page unchanged),
+            invalid (tenders left out for an unreadable closing date) and
+            errors
+        """
+        urls = config.get('urls') or ([config['url']] if config.get('url') else [])
+        result = {'municipality': municipality_name, 'tenders': [], 'pages': [], 'not_modified': False,
+                  'invalid': 0, 'errors': []}
+
+        for url in urls:
+            page = self.fetch(url, deadline)
+            result['pages'].append(page)
+            if page['status'] == 'ok':
+                try:
+                    result['tenders'].extend(self.parse(municipality_name, config, page))
+                    result['invalid'] += page['invalid']
+                except Exception as e:
+                    page['status'] = 'error'
+                    page['error'] = f"Parse error: {e}"
+            if page['status'] == 'error':
+                result['errors'].append(f"{url}: {page['error']}")
+
+        result['not_modified'] = bool(urls) and all(page['status'] == 'not_modified' for page in result['pages'])
+        return result
+
+    def iter_sweep(self, municipality_names=None):
+        """
+        Scrape municipalities concurrently, yielding each one's result as
+        soon as it finishes so it can be saved while the rest are fetched
+
+        Args:
+            municipality_names: Optional subset of the configured municipalities
+
+        Yields:
+            scrape_listing() results, in completion order
+        """
+        names = municipality_names if municipality_names is not None else list(self.municipal_configs)
+        configs = {name: self.municipal_configs[name] for name in names if name in self.municipal_configs}
+        if not configs:
+            return
+
+        deadline = datetime.now() + timedelta(minutes=self.max_sweep_minutes) if self.max_sweep_minutes else None
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='municipal-scraper') as executor:
+            futures = {
+                executor.submit(self.scrape_listing, name, config, deadline): name
+                for name, config in configs.items()
+            }
+            for future in as_completed(futures):
+                try:
+                    yield future.result()
+                except Exception as e:
+                    yield {'municipality': futures[future], 'tenders': [], 'pages': [],
+                           'not_modified': False, 'invalid': 0, 'errors': [str(e)]}
+
+    def scrape_municipality(self, municipality_name, config=None):
+        """Tenders currently listed by one municipality (fetched unconditionally)"""
+        config = config or self.municipal_configs.get(municipality_name, {})
+        with self._validators_lock:
+            for url in config.get('urls') or [config.get('url')]:
+                self.validators.pop(url, None)
+        return self.scrape_listing(municipality_name, config)['tenders']
+
+    def scrape_all_municipalities(self):
+        """Tenders from every configured municipality whose listing changed since it was last saved"""
+        tenders = []
+        for result in self.iter_sweep():
+            tenders.extend(result['tenders'])
+        return tenders
+
+
+# Shared scraper used by the scraping manager
+real_tender_scraper = MunicipalScraper()
@@ -0,0 +1,193 @@
+"""
+Municipal Tender Ingest Service
+Writes scraped municipal tenders to municipal_tenders in chunks: records are
+deduplicated by tender number, unchanged tenders are skipped by content hash
+and the rest are upserted with one statement per chunk
+"""
+
+import hashlib
+import json
+from datetime import datetime
+
+from sqlalchemy import bindparam, text
+
+from models import db
+
+
+# Scraped fields that make up a tender's content hash
+HASHED_COLUMNS = [
+    'municipality', 'province', 'title', 'description', 'category', 'value',
+    'closing_date', 'status', 'requirements', 'contact_person', 'contact_email', 'source_url'
+]
+
+# Columns refreshed when a known tender's content changes (contacts and
+# published_date keep their first-scraped values, as before)
+UPDATE_COLUMNS = [
+    'municipality', 'province', 'title', 'description', 'category', 'value',
+    'closing_date', 'status', 'requirements', 'source_url', 'content_hash', 'scraped_at', 'updated_at'
+]
+
+INSERT_COLUMNS = [
+    'municipality', 'province', 'title', 'description', 'category', 'value', 'tender_number',
+    'published_date', 'closing_date', 'status', 'requirements', 'contact_person', 'contact_email',
+    'source_url', 'content_hash', 'scraped_at', 'created_at', 'updated_at'
+]
+
+
+class MunicipalTenderIngestService:
+    """Service for bulk-saving scraped municipal tenders"""
+
+    @staticmethod
+    def normalize(tender_data):
+        """
+        Map a scraper record onto municipal_tenders columns
+
+        Args:
+            tender_data: Scraper dictionary (tenderNumber, municipality, closingDate, ...)
+
+        Returns:
+            Dictionary of column values including content_hash
+        """
+        contact_info = tender_data.get('contactInfo') or {}
+        row = {
+            'tender_number': str(tender_data['tenderNumber']).strip(),
+            'municipality': tender_data['municipality'],
+            'province': tender_data['province'],
+            'title': tender_data['title'],
+            'description': tender_data.get('description', ''),
+            'category': tender_data.get('category', ''),
+            'value': tender_data.get('value', 0),
+            'closing_date': MunicipalTenderIngestService.closing_date(tender_data.get('closingDate')),
+            'status': tender_data.get('status', 'new'),
+            'requirements': str(tender_data.get('requirements', [])),
+            'contact_person': contact_info.get('person', ''),
+            'contact_email': contact_info.get('email', ''),
+            'source_url': tender_data.get('sourceUrl', '')
+        }
+        row['content_hash'] = MunicipalTenderIngestService.content_hash(row)
+        return row
+
+    @staticmethod
+    def closing_date(value):
+        """
+        closing_date column value from a scraper record's closingDate
+
+        Scraped records carry datetimes already; ISO strings (e.g. from
+        sample data) are converted so the column never receives free text.
+
+        Raises:
+            ValueError: The value is not a datetime or ISO date
+        """
+        if value is None or value == '' or isinstance(value, datetime):
+            return value or None
+        if isinstance(value, str):
+            return datetime.fromisoformat(value.strip())
+        raise ValueError(f"Invalid closing date: {value!r}")
+
+    @staticmethod
+    def content_hash(row):
+        """SHA-256 of a row's scraped content (stable across runs and key order)"""
+        content = json.dumps({column: row.get(column) for column in HASHED_COLUMNS}, sort_keys=True, default=str)
+        return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def dedupe(tenders):
+        """
+        Normalize scraper records and keep one per tender number (the last
+        one scraped wins)
+
+        Returns:
+            Tuple (rows: list of normalized rows, invalid: int records
+            without a tender number or required field)
+        """
+        rows = {}
+        invalid = 0
+        for tender_data in tenders:
+            try:
+                row = MunicipalTenderIngestService.normalize(tender_data)
+            except (KeyError, TypeError, ValueError):
+                invalid += 1
+                continue
+            if not row['tender_number']:
+                invalid += 1
+                continue
+            rows[row['tender_number']] = row
+        return list(rows.values()), invalid
+
+    @staticmethod
+    def _upsert_statement():
+        """INSERT ... ON DUPLICATE KEY UPDATE on MySQL, ON CONFLICT elsewhere (SQLite, PostgreSQL)"""
+        columns = ', '.join(INSERT_COLUMNS)
+        values = ', '.join(f':{column}' for column in INSERT_COLUMNS)
+
+        if db.engine.dialect.name == 'mysql':
+            updates = ', '.join(f'{column} = VALUES({column})' for column in UPDATE_COLUMNS)
+            return text(f"INSERT INTO municipal_tenders ({columns}) VALUES ({values}) ON DUPLICATE KEY UPDATE {updates}")
+
+        updates = ', '.join(f'{column} = excluded.{column}' for column in UPDATE_COLUMNS)
+        return text(
+            f"INSERT INTO municipal_tenders ({columns}) VALUES ({values}) "
+            f"ON CONFLICT (tender_number) DO UPDATE SET {updates}"
+        )
+
+    @staticmethod
+    def ingest(tenders, chunk_size=500):
+        """
+        Save scraped tenders, one transaction per chunk
+
+        Each chunk costs one SELECT of the stored content hashes and at most
+        one upsert for its new and changed tenders, so a run of N tenders
+        takes about 2 * N / chunk_size round trips instead of two per tender.
+
+        Args:
+            tenders: Scraper records
+            chunk_size: Tenders per chunk
+
+        Returns:
+            Tuple (success: bool, stats: dict with found, new, updated,
+            unchanged, invalid and chunks, message: str)
+        """
+        stats = {'found': len(tenders), 'new': 0, 'updated': 0, 'unchanged': 0, 'invalid': 0, 'chunks': 0}
+
+        try:
+            rows, stats['invalid'] = MunicipalTenderIngestService.dedupe(tenders)
+            upsert = MunicipalTenderIngestService._upsert_statement()
+            existing_query = text(
+                "SELECT tender_number, content_hash FROM municipal_tenders WHERE tender_number IN :tender_numbers"
+            ).bindparams(bindparam('tender_numbers', expanding=True))
+
+            for start in range(0, len(rows), chunk_size):
+                chunk = rows[start:start + chunk_size]
+                stored_hashes = dict(db.session.execute(
+                    existing_query, {'tender_numbers': [row['tender_number'] for row in chunk]}
+                ).fetchall())
+
+                now = datetime.now()
+                changed = []
+                for row in chunk:
+                    if row['tender_number'] not in stored_hashes:
+                        stats['new'] += 1
+                    elif stored_hashes[row['tender_number']] != row['content_hash']:
+                        stats['updated'] += 1
+                    else:
+                        stats['unchanged'] += 1
+                        continue
+                    changed.append(dict(
+                        row, published_date=now.date(), scraped_at=now, created_at=now, updated_at=now
+                    ))
+
+                if changed:
+                    db.session.execute(upsert, changed)
+                db.session.commit()
+                stats['chunks'] += 1
+
+            message = (
+                f"Saved {stats['new']} new and {stats['updated']} updated municipal tenders "
+                f"({stats['unchanged']} unchanged)"
+            )
+            return True, stats, message
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error ingesting municipal tenders: {e}")
+            return False, stats, str(e)
@@ -3,7 +3,7 @@
 import logging
 import random
 from datetime import datetime, timedelta
-from sqlalchemy import text
+from sqlalchemy import DateTime, text
 import json
 import re
 
@@ -18,6 +18,9 @@
         print("Warning: Could not import database. Using mock mode.")
         db = None
 
+from services.pagination_service import PaginationService
+from services.tender_search_service import TenderSearchService
+
 logger = logging.getLogger(__name__)
 
 class MunicipalTenderService:
@@ -111,102 +114,117 @@ def get_urgent_tender_alerts(self, company_id):
             logger.error(f"Error getting urgent alerts: {e}")
             return None
     
+    def _filter_conditions(self, search='', province='', category='', value_range=''):
+        """WHERE conditions and parameters for the municipal tender filters"""
+        where_conditions = ["status != 'closed'"]
+        params = {}
+        
+        if search:
+            search_query = TenderSearchService.boolean_query(search)
+            if search_query:
+                # Served by the ft_municipal_tenders_search FULLTEXT index
+                where_conditions.append("MATCH (title, municipality, description) AGAINST (:search IN BOOLEAN MODE)")
+                params['search'] = search_query
+            else:
+                where_conditions.append("(title LIKE :search OR municipality LIKE :search OR description LIKE :search)")
+                params['search'] = f"%{search}%"
+        
+        if province:
+            where_conditions.append("province = :province")
+            params['province'] = province
+        
+        if category:
+            where_conditions.append("category = :category")  
+            params['category'] = category
+        
+        if value_range:
+            if value_range == '0-1m':
+                where_conditions.append("value <= 1000000")
+            elif value_range == '1m-10m':
+                where_conditions.append("value > 1000000 AND value <= 10000000")
+            elif value_range == '10m-50m':
+                where_conditions.append("value > 10000000 AND value <= 50000000")
+            elif value_range == '50m+':
+                where_conditions.append("value > 50000000")
+        
+        return where_conditions, params
+    
+    def _table_exists(self):
+        """Whether the municipal_tenders table has been created"""
+        return db.session.execute(text("""
+            SELECT COUNT(*) FROM information_schema.tables 
+            WHERE table_schema = DATABASE() 
+            AND table_name = 'municipal_tenders'
+        """)).scalar() > 0
+    
+    def _fetch_rows(self, where_conditions, params, order_by, limit, offset=0):
+        """Municipal tender rows matching the conditions"""
+        params = dict(params, limit=limit, offset=offset)
+        return db.session.execute(text(f"""
+            SELECT id, municipality, province, title, description, category, value,
+                   tender_number, closing_date, status, requirements, contact_person, 
+                   contact_email, estimated_duration, source_url, scraped_at
+            FROM municipal_tenders
+            WHERE {" AND ".join(where_conditions)}
+            ORDER BY {order_by}
+            LIMIT :limit OFFSET :offset
+        """).columns(closing_date=DateTime, scraped_at=DateTime), params).fetchall()
+    
+    def _row_to_tender(self, row, company_id):
+        """Tender dictionary for the discovery page from a municipal_tenders row"""
+        # Calculate days left
+        closing_date = row[8]
+        days_left = 999
+        if closing_date:
+            delta = closing_date - datetime.now()
+            days_left = max(0, delta.days)
+        
+        return {
+            'id': row[0],
+            'municipality': row[1],
+            'province': row[2],
+            'title': row[3],
+            'description': row[4] or '',
+            'category': row[5] or 'other',
+            'value': row[6] or 0,
+            'valueDisplay': self.format_currency(row[6] or 0),
+            'closingDate': closing_date.strftime('%Y-%m-%d') if closing_date else None,
+            'daysLeft': days_left,
+            'status': row[9] or 'new',
+            'requirements': eval(row[10]) if row[10] else [],
+            'matchScore': self.calculate_match_score(row[0], company_id),
+            'tenderNumber': row[7],
+            'publishedDate': '2024-06-15',  # Could be calculated from created_at
+            'contactPerson': row[11] or 'Municipal Procurement Officer',
+            'contactEmail': row[12] or 'procurement@municipality.gov.za',
+            'estimatedDuration': row[13] or '12 months',
+            'sourceUrl': row[14],
+            'isRealData': True
+        }
+    
     def get_municipal_tenders(self, company_id, search='', province='', category='', value_range='', page=1, limit=12):
         """Get municipal tenders with filtering - now uses real database data"""
         try:
-            # Build WHERE clause based on filters
-            where_conditions = ["status != 'closed'"]
-            params = {}
-            
-            if search:
-                where_conditions.append("(title LIKE :search OR municipality LIKE :search OR description LIKE :search)")
-                params['search'] = f"%{search}%"
-            
-            if province:
-                where_conditions.append("province = :province")
-                params['province'] = province
-            
-            if category:
-                where_conditions.append("category = :category")  
-                params['category'] = category
-            
-            if value_range:
-                if value_range == '0-1m':
-                    where_conditions.append("value <= 1000000")
-                elif value_range == '1m-10m':
-                    where_conditions.append("value > 1000000 AND value <= 10000000")
-                elif value_range == '10m-50m':
-                    where_conditions.append("value > 10000000 AND value <= 50000000")
-                elif value_range == '50m+':
-                    where_conditions.append("value > 50000000")
+            where_conditions, params = self._filter_conditions(search, province, category, value_range)
             
             # Calculate offset for pagination
             offset = (page - 1) * limit
-            params['limit'] = limit
-            params['offset'] = offset
-            
-            # Build final query
-            where_clause = " AND ".join(where_conditions)
             
             # Try to get real data from database first
             if db is not None:
                 try:
                     # Check if table exists first
-                    table_check = db.session.execute(text("""
-                        SELECT COUNT(*) FROM information_schema.tables 
-                        WHERE table_schema = DATABASE() 
-                        AND table_name = 'municipal_tenders'
-                    """)).scalar()
-                    
-                    if table_check > 0:
-                        result = db.session.execute(text(f"""
-                            SELECT id, municipality, province, title, description, category, value,
-                                   tender_number, closing_date, status, requirements, contact_person, 
-                                   contact_email, estimated_duration, source_url, scraped_at
-                            FROM municipal_tenders
-                            WHERE {where_clause}
-                            ORDER BY 
-                                CASE 
-                                    WHEN status = 'urgent' THEN 1
-                                    WHEN status = 'closing' THEN 2
-                                    ELSE 3
-                                END,
-                                closing_date ASC
-                            LIMIT :limit OFFSET :offset
-                        """), params)
+                    if self._table_exists():
+                        rows = self._fetch_rows(where_conditions, params, """
+                            CASE 
+                                WHEN status = 'urgent' THEN 1
+                                WHEN status = 'closing' THEN 2
+                                ELSE 3
+                            END,
+                            closing_date ASC
+                        """, limit, offset)
                         
-                        tenders = []
-                        for row in result:
-                            # Calculate days left
-                            closing_date = row[8]
-                            days_left = 999
-                            if closing_date:
-                                delta = closing_date - datetime.now()
-                                days_left = max(0, delta.days)
-                            
-                            tender = {
-                                'id': row[0],
-                                'municipality': row[1],
-                                'province': row[2],
-                                'title': row[3],
-                                'description': row[4] or '',
-                                'category': row[5] or 'other',
-                                'value': row[6] or 0,
-                                'valueDisplay': self.format_currency(row[6] or 0),
-                                'closingDate': closing_date.strftime('%Y-%m-%d') if closing_date else None,
-                                'daysLeft': days_left,
-                                'status': row[9] or 'new',
-                                'requirements': eval(row[10]) if row[10] else [],
-                                'matchScore': self.calculate_match_score(row[0], company_id),
-                                'tenderNumber': row[7],
-                                'publishedDate': '2024-06-15',  # Could be calculated from created_at
-                                'contactPerson': row[11] or 'Municipal Procurement Officer',
-                                'contactEmail': row[12] or 'procurement@municipality.gov.za',
-                                'estimatedDuration': row[13] or '12 months',
-                                'sourceUrl': row[14],
-                                'isRealData': True
-                            }
-                            tenders.append(tender)
+                        tenders = [self._row_to_tender(row, company_id) for row in rows]
                         
                         # If we found real data, return it
                         if tenders:
@@ -227,6 +245,38 @@ def get_municipal_tenders(self, company_id, search='', province='', category='',
             logger.error(f"Error getting municipal tenders: {e}")
             return self.get_mock_tender_data()
     
+    def get_municipal_tenders_page(self, company_id, search='', province='', category='', value_range='',
+                                   cursor=None, limit=12):
+        """
+        One page of open municipal tenders, soonest closing first, continuing
+        from ``cursor`` on (closing_date, id) instead of an OFFSET
+        
+        Returns:
+            Dictionary with tenders, next_cursor, prev_cursor, has_next and has_prev
+        """
+        try:
+            where_conditions, params = self._filter_conditions(search, province, category, value_range)
+            values, direction = PaginationService.decode_cursor(cursor)
+            ascending = direction == 'next'
+            
+            if values is not None:
+                seek, seek_params = PaginationService.seek_sql('closing_date', 'id', values, descending=not ascending)
+                where_conditions.append(seek)
+                params.update(seek_params)
+            
+            # idx_closing_date ends in the primary key, so it serves this order
+            order = 'ASC' if ascending else 'DESC'
+            rows = self._fetch_rows(where_conditions, params, f"closing_date {order}, id {order}", limit + 1)
+            
+            page = PaginationService.build_page(rows, limit, lambda row: (row[8], row[0]), values, direction)
+            page['tenders'] = [self._row_to_tender(row, company_id) for row in page.pop('items')]
+            return page
+            
+        except Exception as e:
+            db.session.rollback()
+            logger.error(f"Error getting municipal tenders page: {e}")
+            return {'tenders': [], 'next_cursor': None, 'prev_cursor': None, 'has_next': False, 'has_prev': False}
+    
     def get_mock_tender_data(self, search='', province='', category='', value_range=''):
         """Get mock tender data for fallback"""
         mock_tenders = [
@@ -0,0 +1,118 @@
+"""
+Municipal Tender Status Service
+Moves municipal tenders through new -> closing -> urgent -> closed as their
+closing dates approach. Each run only touches the closing_date windows
+crossed since the previous run (kept as a watermark) plus tenders scraped
+since then, so rows whose status is already right are never rewritten
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import db, ProcessingWatermark
+
+
+WATERMARK_NAME = 'municipal_tender_status'
+
+# Tenders closing within these windows are 'urgent' / 'closing'
+URGENT_WINDOW = timedelta(days=2)
+CLOSING_WINDOW = timedelta(days=7)
+
+# Status each tender should move to, and only when it is an earlier status
+# (tenders never move back, e.g. from 'urgent' to 'closing')
+TARGET_STATUS = """
+    CASE
+        WHEN closing_date < :now THEN 'closed'
+        WHEN closing_date <= :urgent_until THEN 'urgent'
+        ELSE 'closing'
+    END
+"""
+
+NEEDS_TRANSITION = """
+    (
+        (closing_date < :now AND status IN ('new', 'closing', 'urgent'))
+        OR (closing_date >= :now AND closing_date <= :urgent_until AND status IN ('new', 'closing'))
+        OR (closing_date > :urgent_until AND closing_date <= :closing_until AND status = 'new')
+    )
+"""
+
+
+class MunicipalTenderStatusService:
+    """Service for closing-date driven municipal tender status transitions"""
+
+    @staticmethod
+    def window_bounds(now):
+        """Closing-date boundaries at a point in time: (closed before, urgent until, closing until)"""
+        return now, now + URGENT_WINDOW, now + CLOSING_WINDOW
+
+    @staticmethod
+    def apply_transitions(now=None):
+        """
+        Move tenders whose closing date crossed a window boundary since the
+        last run, and tenders scraped since then, to their current status
+
+        A boundary that moved from W to ``now`` was crossed by tenders with
+        closing_date in (W, now], so each window is a range on
+        idx_closing_date. Re-scraped tenders (which come back as 'new') are
+        found by scraped_at. The first run has no watermark and classifies
+        every tender closing within the closing window.
+
+        Args:
+            now: Time to classify at (defaults to now)
+
+        Returns:
+            Tuple (success: bool, stats: dict, message: str)
+        """
+        now = now or datetime.now()
+        stats = {'crossed': 0, 'scraped': 0, 'watermark': None}
+
+        try:
+            watermark = ProcessingWatermark.query.get(WATERMARK_NAME)
+            previous = watermark.watermark_at if watermark else None
+            stats['watermark'] = previous
+
+            closed_before, urgent_until, closing_until = MunicipalTenderStatusService.window_bounds(now)
+            params = {'now': closed_before, 'urgent_until': urgent_until, 'closing_until': closing_until}
+
+            if previous is None:
+                crossed = "closing_date <= :closing_until"
+            else:
+                params['was_now'], params['was_urgent_until'], params['was_closing_until'] = \
+                    MunicipalTenderStatusService.window_bounds(previous)
+                crossed = """
+                    (closing_date >= :was_now AND closing_date < :now)
+                    OR (closing_date > :was_urgent_until AND closing_date <= :urgent_until)
+                    OR (closing_date > :was_closing_until AND closing_date <= :closing_until)
+                """
+
+            result = db.session.execute(text(f"""
+                UPDATE municipal_tenders
+                SET status = {TARGET_STATUS}
+                WHERE ({crossed}) AND {NEEDS_TRANSITION}
+            """), params)
+            stats['crossed'] = result.rowcount
+
+            if previous is not None:
+                result = db.session.execute(text(f"""
+                    UPDATE municipal_tenders
+                    SET status = {TARGET_STATUS}
+                    WHERE scraped_at >= :was_now AND closing_date <= :closing_until AND {NEEDS_TRANSITION}
+                """), params)
+                stats['scraped'] = result.rowcount
+
+            if watermark is None:
+                watermark = ProcessingWatermark(name=WATERMARK_NAME, watermark_at=now)
+                db.session.add(watermark)
+            else:
+                watermark.watermark_at = now
+
+            db.session.commit()
+
+            changed = stats['crossed'] + stats['scraped']
+            return True, stats, f"{changed} tender statuses updated"
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error updating municipal tender statuses: {e}")
+            return False, stats, f"Error updating municipal tender statuses: {str(e)}"
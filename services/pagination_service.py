@@ -0,0 +1,240 @@
+"""
+Pagination Service
+Keyset (seek) pagination on a (sort column, id) pair with opaque cursors,
+so page N costs the same as page 1: each page continues from the last row
+of the previous one through an index instead of counting and skipping rows
+
+NULLs in the sort column are treated as the smallest value (as MySQL and
+SQLite sort them): first in ascending order, last in descending order.
+"""
+
+import base64
+import json
+import math
+from datetime import date, datetime
+
+from sqlalchemy import and_, or_
+
+from services.cache_service import CacheService
+
+
+class PaginationService:
+    """Service for cursor-based pagination"""
+
+    # ------------------------------------------------------------------
+    # Cursors
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, datetime):
+            return {'dt': value.isoformat()}
+        if isinstance(value, date):
+            return {'d': value.isoformat()}
+        return value
+
+    @staticmethod
+    def _load(value):
+        if isinstance(value, dict):
+            if 'dt' in value:
+                return datetime.fromisoformat(value['dt'])
+            if 'd' in value:
+                return date.fromisoformat(value['d'])
+            raise ValueError('Unknown cursor value')
+        return value
+
+    @staticmethod
+    def encode_cursor(values, direction='next'):
+        """
+        Opaque cursor for the row with key ``values``
+
+        Args:
+            values: (sort value, id) of the boundary row
+            direction: 'next' for rows after it, 'prev' for rows before it
+
+        Returns:
+            URL-safe cursor string
+        """
+        payload = {'k': [PaginationService._dump(value) for value in values], 'd': direction}
+        raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Key values and direction from a cursor
+
+        Returns:
+            Tuple (values or None, direction); a missing or malformed
+            cursor means the first page
+        """
+        if not cursor:
+            return None, 'next'
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            payload = json.loads(raw)
+            values = tuple(PaginationService._load(value) for value in payload['k'])
+            direction = payload.get('d', 'next')
+            if len(values) != 2 or direction not in ('next', 'prev'):
+                raise ValueError('Malformed cursor')
+            return values, direction
+        except (ValueError, TypeError, KeyError):
+            return None, 'next'
+
+    # ------------------------------------------------------------------
+    # Seek conditions
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def seek_filter(sort_column, id_column, values, descending=True):
+        """
+        Condition selecting rows after ``values`` in (sort_column, id_column) order
+
+        Written as a range on the leading column so it is served by an
+        index on (..., sort_column, id).
+
+        Args:
+            sort_column: Sort column (e.g. Tender.created_at)
+            id_column: Unique tie-breaker column (e.g. Tender.id)
+            values: (sort value, id) of the last row already shown
+            descending: Whether the listing is newest/largest first
+
+        Returns:
+            SQLAlchemy condition
+        """
+        value, row_id = values
+        if descending:
+            if value is None:
+                return and_(sort_column.is_(None), id_column < row_id)
+            return or_(
+                and_(sort_column <= value, or_(sort_column < value, id_column < row_id)),
+                sort_column.is_(None)
+            )
+        if value is None:
+            return or_(and_(sort_column.is_(None), id_column > row_id), sort_column.isnot(None))
+        return and_(sort_column >= value, or_(sort_column > value, id_column > row_id))
+
+    @staticmethod
+    def seek_sql(sort_column, id_column, values, descending=True):
+        """
+        seek_filter() for hand-written SQL
+
+        Args:
+            sort_column: Sort column name
+            id_column: Tie-breaker column name
+            values: (sort value, id) of the last row already shown
+            descending: Whether the listing is newest/largest first
+
+        Returns:
+            Tuple (sql: str, params: dict)
+        """
+        value, row_id = values
+        params = {'seek_value': value, 'seek_id': row_id}
+        if descending:
+            if value is None:
+                return f"({sort_column} IS NULL AND {id_column} < :seek_id)", params
+            return (f"(({sort_column} <= :seek_value AND ({sort_column} < :seek_value OR {id_column} < :seek_id))"
+                    f" OR {sort_column} IS NULL)"), params
+        if value is None:
+            return (f"(({sort_column} IS NULL AND {id_column} > :seek_id) OR {sort_column} IS NOT NULL)"), params
+        return f"({sort_column} >= :seek_value AND ({sort_column} > :seek_value OR {id_column} > :seek_id))", params
+
+    # ------------------------------------------------------------------
+    # Pages
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def build_page(rows, limit, key, values=None, direction='next', offset=0):
+        """
+        Page dictionary from rows fetched with ``limit + 1``
+
+        Args:
+            rows: Rows in fetch order (reversed display order for 'prev')
+            limit: Page size
+            key: Function returning a row's (sort value, id)
+            values: Cursor values the rows were fetched from
+            direction: Cursor direction
+            offset: Rows skipped for legacy page-number links
+
+        Returns:
+            Dictionary with items, next_cursor, prev_cursor, has_next, has_prev
+        """
+        more = len(rows) > limit
+        items = list(rows[:limit])
+        if direction == 'prev':
+            items.reverse()
+            has_prev, has_next = more, True
+        else:
+            has_prev, has_next = values is not None or offset > 0, more
+
+        return {
+            'items': items,
+            'has_next': has_next,
+            'has_prev': has_prev,
+            'next_cursor': PaginationService.encode_cursor(key(items[-1]), 'next') if items and has_next else None,
+            'prev_cursor': PaginationService.encode_cursor(key(items[0]), 'prev') if items and has_prev else None
+        }
+
+    @staticmethod
+    def seek(query, sort_column, id_column, cursor=None, limit=20, descending=True, offset=0):
+        """
+        One page of an ORM query in (sort_column, id_column) order
+
+        Args:
+            query: Filtered query (any ordering is replaced)
+            sort_column: Sort column (e.g. Tender.created_at)
+            id_column: Unique tie-breaker column (e.g. Tender.id)
+            cursor: Cursor from a previous page (None for the first page)
+            limit: Page size
+            descending: Newest/largest first
+            offset: Rows to skip when there is no cursor (legacy page links)
+
+        Returns:
+            build_page() dictionary
+        """
+        values, direction = PaginationService.decode_cursor(cursor)
+        forward = descending if direction == 'next' else not descending
+
+        if values is not None:
+            query = query.filter(PaginationService.seek_filter(sort_column, id_column, values, forward))
+
+        if forward:
+            query = query.order_by(None).order_by(sort_column.desc(), id_column.desc())
+        else:
+            query = query.order_by(None).order_by(sort_column.asc(), id_column.asc())
+
+        if values is None and offset:
+            query = query.offset(offset)
+
+        rows = query.limit(limit + 1).all()
+        key = lambda item: (getattr(item, sort_column.key), getattr(item, id_column.key))
+        return PaginationService.build_page(rows, limit, key, values, direction, offset if values is None else 0)
+
+    # ------------------------------------------------------------------
+    # Totals
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def cached_count(namespace, company_id, key, query, ttl=60):
+        """
+        Row count of a query, cached for ``ttl`` seconds
+
+        Totals are shown for orientation only, so they may trail writes by
+        up to ``ttl`` instead of counting the whole filtered join per page.
+
+        Args:
+            namespace: Kind of listing (e.g. 'tender_list_count')
+            company_id: Company the listing belongs to
+            key: Filters that identify the listing
+            query: Query to count on a miss
+            ttl: Seconds to keep the total
+
+        Returns:
+            Integer count
+        """
+        return CacheService.get_or_load(namespace, company_id, key, lambda: query.order_by(None).count(), ttl=ttl)
+
+    @staticmethod
+    def total_pages(total, per_page):
+        """Number of pages for ``total`` rows"""
+        return max(1, math.ceil(total / per_page)) if per_page else 1
@@ -9,6 +9,8 @@
 )
 from flask import session
 from sqlalchemy import and_
+from services.cache_service import CacheService
+from services.entitlement_service import EntitlementService
 
 
 class PermissionsService:
@@ -28,35 +30,19 @@ def user_has_permission(user_id, permission_name, company_id=None):
             Boolean indicating if user has the permission
         """
         try:
-            # Super admins have all permissions
-            user = User.query.get(user_id)
-            if not user:
+            # Resolved once per request; repeated checks are set lookups
+            snapshot = EntitlementService.resolve(user_id, company_id)
+            if not snapshot.user:
                 return False
             
-            if user.is_super_admin:
+            # Super admins have all permissions
+            if snapshot.is_super_admin:
                 return True
             
-            # Get company ID
-            if not company_id:
-                company_id = user.company_id
-            
-            if not company_id:
+            if not snapshot.company_id:
                 return False
             
-            # Check if user has permission through any of their roles
-            has_perm = db.session.query(Permission).join(RolePermission).join(CompanyRole).join(
-                UserCompanyRole
-            ).filter(
-                and_(
-                    UserCompanyRole.user_id == user_id,
-                    CompanyRole.company_id == company_id,
-                    CompanyRole.is_active == True,
-                    Permission.name == permission_name,
-                    Permission.is_active == True
-                )
-            ).first()
-            
-            return has_perm is not None
+            return snapshot.has_permission(permission_name)
             
         except Exception as e:
             print(f"Error checking permission: {e}")
@@ -75,35 +61,12 @@ def get_user_permissions(user_id, company_id=None):
             List of permission names
         """
         try:
-            user = User.query.get(user_id)
-            if not user:
-                return []
-            
-            # Super admins have all permissions
-            if user.is_super_admin:
-                all_perms = Permission.query.filter_by(is_active=True).all()
-                return [p.name for p in all_perms]
-            
-            # Get company ID
-            if not company_id:
-                company_id = user.company_id
-            
-            if not company_id:
+            snapshot = EntitlementService.resolve(user_id, company_id)
+            if not snapshot.user:
                 return []
             
-            # Get all permissions from user's roles
-            permissions = db.session.query(Permission).join(RolePermission).join(CompanyRole).join(
-                UserCompanyRole
-            ).filter(
-                and_(
-                    UserCompanyRole.user_id == user_id,
-                    CompanyRole.company_id == company_id,
-                    CompanyRole.is_active == True,
-                    Permission.is_active == True
-                )
-            ).distinct().all()
-            
-            return [p.name for p in permissions]
+            # Super admins have all permissions; regular users get those from their roles
+            return list(snapshot.permissions)
             
         except Exception as e:
             print(f"Error getting user permissions: {e}")
@@ -179,6 +142,9 @@ def assign_role_to_user(user_id, role_id, assigned_by_id=None):
             db.session.add(assignment)
             db.session.commit()
             
+            role = CompanyRole.query.get(role_id)
+            CacheService.bump_company_version(role.company_id if role else None)
+            
             return (True, "Role assigned successfully")
             
         except Exception as e:
@@ -207,9 +173,13 @@ def remove_role_from_user(user_id, role_id):
             if not assignment:
                 return (False, "Role assignment not found")
             
+            company_id = assignment.role.company_id if assignment.role else None
+            
             db.session.delete(assignment)
             db.session.commit()
             
+            CacheService.bump_company_version(company_id)
+            
             return (True, "Role removed successfully")
             
         except Exception as e:
@@ -331,6 +301,8 @@ def update_role_permissions(role_id, permission_ids):
             
             db.session.commit()
             
+            CacheService.bump_company_version(role.company_id)
+            
             return (True, "Permissions updated successfully")
             
         except Exception as e:
@@ -421,6 +393,8 @@ def ensure_user_has_company_admin_role(user_id, company_id):
             db.session.add(assignment)
             db.session.commit()
             
+            CacheService.bump_company_version(company_id)
+            
             return True
             
         except Exception as e:
@@ -0,0 +1,145 @@
+"""
+Query Plan Service
+Registry of the hot tenant-scoped queries and an EXPLAIN check that each of
+them is served by an index rather than a full table scan. Run it after
+schema changes (``flask check-query-plans``) and in the test suite, so a
+dropped or mis-declared index is caught before it reaches production
+"""
+
+import re
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from models import db
+
+
+# name -> (SQL, parameters). Written in the shape the services issue them:
+# always scoped to one company (or user / tender) first.
+HOT_QUERIES = {
+    'tender_list': (
+        "SELECT id FROM tenders WHERE company_id = :company_id"
+        " ORDER BY created_at DESC, id DESC LIMIT 21",
+        {'company_id': 1}
+    ),
+    'tenders_by_status': (
+        "SELECT id FROM tenders WHERE company_id = :company_id AND status_id = :status_id"
+        " ORDER BY created_at DESC LIMIT 21",
+        {'company_id': 1, 'status_id': 1}
+    ),
+    'tender_deadlines': (
+        "SELECT id FROM tenders WHERE company_id = :company_id"
+        " AND submission_deadline >= :start AND submission_deadline <= :end"
+        " ORDER BY submission_deadline",
+        {'company_id': 1, 'start': datetime(2026, 1, 1), 'end': datetime(2026, 1, 1) + timedelta(days=7)}
+    ),
+    'tender_history': (
+        "SELECT id FROM tender_history WHERE tender_id = :tender_id"
+        " ORDER BY created_at DESC, id DESC LIMIT 51",
+        {'tender_id': 1}
+    ),
+    'open_notifications': (
+        "SELECT id FROM tender_notifications WHERE company_id = :company_id AND is_processed = :is_processed"
+        " ORDER BY created_at DESC, id DESC LIMIT 21",
+        {'company_id': 1, 'is_processed': False}
+    ),
+    'user_assignments': (
+        "SELECT tender_id FROM tender_assignments WHERE assigned_to_id = :user_id AND is_active = :is_active",
+        {'user_id': 1, 'is_active': True}
+    ),
+    'enabled_modules': (
+        "SELECT module_id FROM company_modules WHERE company_id = :company_id AND is_enabled = :is_enabled",
+        {'company_id': 1, 'is_enabled': True}
+    ),
+    'module_custom_price': (
+        "SELECT custom_price FROM company_module_pricing"
+        " WHERE company_id = :company_id AND module_id = :module_id AND is_active = :is_active",
+        {'company_id': 1, 'module_id': 1, 'is_active': True}
+    ),
+    'user_roles': (
+        "SELECT role_id FROM user_company_roles WHERE user_id = :user_id",
+        {'user_id': 1}
+    ),
+}
+
+# SQLite plan lines for a full pass over a table ("SCAN tenders",
+# "SCAN tenders USING INDEX ..."); searches read "SEARCH tenders USING ..."
+SQLITE_SCAN = re.compile(r'^SCAN (?:TABLE )?(\w+)')
+
+
+class QueryPlanService:
+    """Service for EXPLAIN-based index checks"""
+
+    @staticmethod
+    def explain(sql, params=None):
+        """
+        Execution plan of a query on the current database
+
+        Args:
+            sql: SQL statement
+            params: Bound parameters
+
+        Returns:
+            List of dictionaries, one per plan row
+        """
+        if db.engine.dialect.name == 'sqlite':
+            rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params or {})
+        else:
+            rows = db.session.execute(text(f"EXPLAIN {sql}"), params or {})
+        return [dict(row._mapping) for row in rows]
+
+    @staticmethod
+    def full_scans(plan):
+        """
+        Tables a plan reads in full
+
+        A full index walk counts as a scan too: it reads every row of the
+        table, just in index order.
+
+        Args:
+            plan: Rows from explain()
+
+        Returns:
+            List of table names
+        """
+        tables = []
+        for row in plan:
+            if 'detail' in row:
+                match = SQLITE_SCAN.match(row['detail'] or '')
+                if match:
+                    tables.append(match.group(1))
+            elif row.get('type') in ('ALL', 'index'):
+                tables.append(row.get('table'))
+        return tables
+
+    @staticmethod
+    def check(queries=None):
+        """
+        EXPLAIN every registered hot query
+
+        On MySQL, run this against a database holding representative data:
+        the optimizer may prefer a full scan of a near-empty table.
+
+        Args:
+            queries: name -> (SQL, parameters) (defaults to HOT_QUERIES)
+
+        Returns:
+            Tuple (success: bool, failures: dict of name -> scanned tables, message: str)
+        """
+        queries = HOT_QUERIES if queries is None else queries
+        failures = {}
+
+        for name, (sql, params) in queries.items():
+            try:
+                scans = QueryPlanService.full_scans(QueryPlanService.explain(sql, params))
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error explaining hot query {name}: {e}")
+                scans = ['explain failed']
+            if scans:
+                failures[name] = scans
+
+        if failures:
+            details = ', '.join(f"{name} ({', '.join(scans)})" for name, scans in failures.items())
+            return False, failures, f"Full scans in {len(failures)} hot queries: {details}"
+        return True, failures, f"All {len(queries)} hot queries use an index"
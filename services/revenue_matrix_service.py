@@ -0,0 +1,212 @@
+"""
+Revenue Matrix Service
+Platform-wide module pricing loaded in three bulk queries and answered from
+an in-memory company x module price matrix
+"""
+
+from models import db, Company, CompanyModule, ModuleDefinition, CompanyModulePricing
+
+
+class RevenueMatrix:
+    """
+    Effective monthly price of every enabled module for every company
+
+    Rows are companies, columns are modules and each cell is the price the
+    company pays (its latest active custom price, otherwise the list price).
+    The matrix is sparse (only enabled modules have a cell), so it is kept as
+    nested dicts rather than a dense array. Platform totals (revenue,
+    module revenue, usage) only count active companies.
+    """
+
+    def __init__(self, enabled_rows, modules, custom_pricing_rows):
+        self.modules = {module.id: module for module in modules}
+        self.list_prices = {module.id: float(module.monthly_price or 0) for module in modules}
+
+        # Latest active custom price per cell (rows arrive oldest first)
+        self.custom_prices = {}
+        self.custom_notes = {}
+        self.custom_pricing_counts = {}
+        for company_id, module_id, custom_price, notes in custom_pricing_rows:
+            self.custom_prices[(company_id, module_id)] = float(custom_price or 0)
+            self.custom_notes[(company_id, module_id)] = notes
+        for company_id, _ in self.custom_prices:
+            self.custom_pricing_counts[company_id] = self.custom_pricing_counts.get(company_id, 0) + 1
+
+        self.prices = {}
+        self.active_company_ids = set()
+        for company_id, module_id, company_is_active in enabled_rows:
+            if company_is_active:
+                self.active_company_ids.add(company_id)
+            price = self.custom_prices.get((company_id, module_id), self.list_prices.get(module_id, 0.0))
+            self.prices.setdefault(company_id, {})[module_id] = price
+
+    # ----- Cells -----
+
+    def price(self, company_id, module_id):
+        """Effective price of a module for a company (None if not enabled)"""
+        return self.prices.get(company_id, {}).get(module_id)
+
+    def is_custom(self, company_id, module_id):
+        """Whether the company has an active custom price for the module"""
+        return (company_id, module_id) in self.custom_prices
+
+    def custom_note(self, company_id, module_id):
+        """Notes on the custom price applied to a cell (None for list price)"""
+        return self.custom_notes.get((company_id, module_id))
+
+    # ----- Company rows -----
+
+    def company_total(self, company_id):
+        """Monthly cost of a company's enabled modules, custom prices applied"""
+        return sum(self.prices.get(company_id, {}).values())
+
+    def company_module_ids(self, company_id):
+        """IDs of the modules enabled for a company"""
+        return list(self.prices.get(company_id, {}))
+
+    def company_default_total(self, company_id):
+        """Monthly cost of a company's enabled modules at list price"""
+        return sum(self.list_prices.get(module_id, 0.0) for module_id in self.prices.get(company_id, {}))
+
+    def company_module_count(self, company_id):
+        """Number of modules enabled for a company"""
+        return len(self.prices.get(company_id, {}))
+
+    def company_custom_module_count(self, company_id):
+        """Number of a company's enabled modules billed at a custom price"""
+        return sum(1 for module_id in self.prices.get(company_id, {}) if (company_id, module_id) in self.custom_prices)
+
+    def has_custom_pricing(self, company_id):
+        """Whether the company has any active custom price (enabled module or not)"""
+        return company_id in self.custom_pricing_counts
+
+    def company_summary(self, company_id):
+        """
+        Cost breakdown for one company
+
+        Returns:
+            Dictionary with default_cost, custom_cost, difference,
+            module_count, custom_modules_count and has_custom_pricing
+        """
+        default_cost = self.company_default_total(company_id)
+        custom_cost = self.company_total(company_id)
+        custom_modules_count = self.company_custom_module_count(company_id)
+        return {
+            'default_cost': default_cost,
+            'custom_cost': custom_cost,
+            'difference': custom_cost - default_cost,
+            'module_count': self.company_module_count(company_id),
+            'custom_modules_count': custom_modules_count,
+            'has_custom_pricing': custom_modules_count > 0
+        }
+
+    # ----- Module columns -----
+
+    def module_revenue(self, module_id):
+        """Monthly revenue from a module across active companies"""
+        return sum(
+            modules[module_id] for company_id, modules in self.prices.items()
+            if module_id in modules and company_id in self.active_company_ids
+        )
+
+    def module_usage_count(self, module_id):
+        """Number of active companies with a module enabled"""
+        return sum(
+            1 for company_id, modules in self.prices.items()
+            if module_id in modules and company_id in self.active_company_ids
+        )
+
+    def module_company_prices(self, module_id):
+        """
+        Companies paying for a module
+
+        Returns:
+            List of (company_id, price, is_custom) tuples
+        """
+        return [
+            (company_id, modules[module_id], (company_id, module_id) in self.custom_prices)
+            for company_id, modules in self.prices.items()
+            if module_id in modules
+        ]
+
+    def module_stats(self, active_modules_only=True):
+        """
+        Usage and revenue per module in display order
+
+        Returns:
+            List of dictionaries with module, usage_count and revenue
+        """
+        revenue = {}
+        usage = {}
+        for company_id, modules in self.prices.items():
+            if company_id not in self.active_company_ids:
+                continue
+            for module_id, price in modules.items():
+                revenue[module_id] = revenue.get(module_id, 0.0) + price
+                usage[module_id] = usage.get(module_id, 0) + 1
+
+        modules = sorted(self.modules.values(), key=lambda module: (module.sort_order or 0, module.display_name))
+        return [
+            {
+                'module': module,
+                'usage_count': usage.get(module.id, 0),
+                'revenue': revenue.get(module.id, 0.0)
+            }
+            for module in modules
+            if module.is_active or not active_modules_only
+        ]
+
+    # ----- Platform totals -----
+
+    def total_revenue(self):
+        """Monthly revenue across active companies"""
+        return sum(self.company_total(company_id) for company_id in self.active_company_ids)
+
+    @property
+    def custom_pricing_count(self):
+        """Number of active custom prices"""
+        return len(self.custom_prices)
+
+
+class RevenueMatrixService:
+    """Service for loading the revenue matrix"""
+
+    @staticmethod
+    def load(company_ids=None, module_ids=None):
+        """
+        Load the price matrix with three bulk queries
+
+        Args:
+            company_ids: Optional company IDs to restrict the rows to
+            module_ids: Optional module IDs to restrict the columns to
+
+        Returns:
+            RevenueMatrix
+        """
+        enabled_query = db.session.query(
+            CompanyModule.company_id, CompanyModule.module_id, Company.is_active
+        ).join(Company, CompanyModule.company_id == Company.id).filter(
+            CompanyModule.is_enabled == True
+        )
+
+        module_query = ModuleDefinition.query
+
+        custom_query = db.session.query(
+            CompanyModulePricing.company_id, CompanyModulePricing.module_id,
+            CompanyModulePricing.custom_price, CompanyModulePricing.notes
+        ).filter(CompanyModulePricing.is_active == True)
+
+        if company_ids is not None:
+            enabled_query = enabled_query.filter(CompanyModule.company_id.in_(company_ids))
+            custom_query = custom_query.filter(CompanyModulePricing.company_id.in_(company_ids))
+
+        if module_ids is not None:
+            enabled_query = enabled_query.filter(CompanyModule.module_id.in_(module_ids))
+            module_query = module_query.filter(ModuleDefinition.id.in_(module_ids))
+            custom_query = custom_query.filter(CompanyModulePricing.module_id.in_(module_ids))
+
+        return RevenueMatrix(
+            enabled_query.all(),
+            module_query.all(),
+            custom_query.order_by(CompanyModulePricing.effective_date, CompanyModulePricing.id).all()
+        )
@@ -0,0 +1,335 @@
+"""
+Revenue Snapshot Service
+Records monthly revenue per company and module in revenue_snapshots and
+answers revenue trends from that history
+"""
+
+from datetime import date, datetime
+
+from sqlalchemy import func
+
+from models import db, Company, ModuleDefinition, MonthlyBill, BillLineItem, RevenueSnapshot
+from services.revenue_matrix_service import RevenueMatrixService
+
+
+# Groupings accepted by RevenueSnapshotService.breakdown
+BREAKDOWN_GROUPS = ['module', 'company', 'cohort']
+
+
+class RevenueSnapshotService:
+    """Service for the monthly revenue history"""
+
+    # ------------------------------------------------------------------
+    # Periods
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def month_start(value):
+        """First day of the month containing ``value``"""
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def add_months(period, months):
+        """First day of the month ``months`` after ``period`` (negative goes back)"""
+        index = period.year * 12 + period.month - 1 + months
+        return date(index // 12, index % 12 + 1, 1)
+
+    @staticmethod
+    def months_between(start, end):
+        """Month starts from ``start`` to ``end`` inclusive"""
+        periods = []
+        period = RevenueSnapshotService.month_start(start)
+        while period <= end:
+            periods.append(period)
+            period = RevenueSnapshotService.add_months(period, 1)
+        return periods
+
+    # ------------------------------------------------------------------
+    # Capture
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def capture(period_month=None, include_live=None):
+        """
+        Record a month's revenue per company and module
+
+        Companies billed for the month are recorded from their bill's line
+        items. With include_live, every other active company is recorded
+        from the current pricing state and the month is replaced as a whole;
+        without it only the billed companies' rows are replaced, so earlier
+        live captures of a closed month are kept.
+
+        Args:
+            period_month: Any date in the month (defaults to the current month)
+            include_live: Record unbilled companies from live pricing
+                (defaults to True for the current month only)
+
+        Returns:
+            Tuple (success: bool, row_count: int, message: str)
+        """
+        try:
+            current = RevenueSnapshotService.month_start(date.today())
+            period = RevenueSnapshotService.month_start(period_month or current)
+            if include_live is None:
+                include_live = period == current
+
+            # (company_id, module_id) -> [amount, is_custom_price, source]
+            cells = {}
+            bill_lines = db.session.query(
+                MonthlyBill.company_id, BillLineItem.module_id, BillLineItem.line_total, BillLineItem.is_custom_price
+            ).join(
+                BillLineItem, BillLineItem.bill_id == MonthlyBill.id
+            ).filter(
+                MonthlyBill.bill_year == period.year,
+                MonthlyBill.bill_month == period.month
+            ).all()
+            for company_id, module_id, line_total, is_custom_price in bill_lines:
+                cell = cells.setdefault((company_id, module_id), [0.0, False, 'bill'])
+                cell[0] += float(line_total or 0)
+                cell[1] = cell[1] or bool(is_custom_price)
+            billed_company_ids = {company_id for company_id, _ in cells}
+
+            if include_live:
+                matrix = RevenueMatrixService.load()
+                for company_id in matrix.active_company_ids - billed_company_ids:
+                    for module_id in matrix.company_module_ids(company_id):
+                        cells[(company_id, module_id)] = [
+                            matrix.price(company_id, module_id), matrix.is_custom(company_id, module_id), 'pricing'
+                        ]
+
+            delete_query = RevenueSnapshot.query.filter(RevenueSnapshot.period_month == period)
+            if not include_live:
+                if not billed_company_ids:
+                    return True, 0, f"No bills to record for {period:%B %Y}"
+                delete_query = delete_query.filter(RevenueSnapshot.company_id.in_(billed_company_ids))
+            delete_query.delete(synchronize_session=False)
+
+            now = datetime.utcnow()
+            db.session.bulk_insert_mappings(RevenueSnapshot, [
+                {
+                    'period_month': period,
+                    'company_id': company_id,
+                    'module_id': module_id,
+                    'amount': round(amount, 2),
+                    'is_custom_price': is_custom_price,
+                    'source': source,
+                    'captured_at': now
+                }
+                for (company_id, module_id), (amount, is_custom_price, source) in cells.items()
+            ])
+
+            db.session.commit()
+            return True, len(cells), f"Recorded {len(cells)} revenue rows for {period:%B %Y}"
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error capturing revenue snapshot: {e}")
+            return False, 0, str(e)
+
+    @staticmethod
+    def backfill(missing_only=True):
+        """
+        Record billed months from their bills, so the history covers the
+        months billed before snapshots were taken
+
+        Args:
+            missing_only: Only months without any snapshot rows (False
+                re-records every billed month)
+
+        Returns:
+            Tuple (success: bool, row_count: int, message: str)
+        """
+        try:
+            billed = db.session.query(MonthlyBill.bill_year, MonthlyBill.bill_month).distinct().all()
+            periods = sorted(date(year, month, 1) for year, month in billed)
+            if missing_only:
+                recorded = {
+                    RevenueSnapshotService._period(period)
+                    for (period,) in db.session.query(RevenueSnapshot.period_month).distinct()
+                }
+                periods = [period for period in periods if period not in recorded]
+        except Exception as e:
+            print(f"Error finding billed months: {e}")
+            return False, 0, str(e)
+
+        row_count = 0
+        for period in periods:
+            success, count, message = RevenueSnapshotService.capture(period, include_live=False)
+            if not success:
+                return False, row_count, message
+            row_count += count
+        return True, row_count, f"Recorded {len(periods)} billed months ({row_count} revenue rows)"
+
+    @staticmethod
+    def capture_recent():
+        """
+        Nightly capture: record billed months missing from the history,
+        settle last month from its bills and record the current month from
+        bills and live pricing
+
+        Returns:
+            Tuple (success: bool, row_count: int, message: str)
+        """
+        current = RevenueSnapshotService.month_start(date.today())
+        previous = RevenueSnapshotService.add_months(current, -1)
+
+        success, backfill_count, backfill_message = RevenueSnapshotService.backfill()
+        if not success:
+            return False, 0, backfill_message
+
+        success, previous_count, previous_message = RevenueSnapshotService.capture(previous, include_live=False)
+        if not success:
+            return False, backfill_count, previous_message
+
+        success, current_count, current_message = RevenueSnapshotService.capture(current)
+        return (success, backfill_count + previous_count + current_count,
+                f"{backfill_message}; {previous_message}; {current_message}")
+
+    # ------------------------------------------------------------------
+    # Queries
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _window(query, start, end, company_ids=None, module_ids=None):
+        """Restrict a snapshot query to a window of months (a range on the unique index)"""
+        query = query.filter(
+            RevenueSnapshot.period_month >= RevenueSnapshotService.month_start(start),
+            RevenueSnapshot.period_month <= RevenueSnapshotService.month_start(end)
+        )
+        if company_ids is not None:
+            query = query.filter(RevenueSnapshot.company_id.in_(company_ids))
+        if module_ids is not None:
+            query = query.filter(RevenueSnapshot.module_id.in_(module_ids))
+        return query
+
+    @staticmethod
+    def _period(value):
+        """Period column value as a date (SQLite returns aggregated dates as strings)"""
+        if isinstance(value, str):
+            return date.fromisoformat(value[:10])
+        return value
+
+    @staticmethod
+    def trend(start, end, company_ids=None, module_ids=None):
+        """
+        Revenue per month over a window
+
+        Args:
+            start: Any date in the first month
+            end: Any date in the last month
+            company_ids: Optional company IDs to include
+            module_ids: Optional module IDs to include
+
+        Returns:
+            List of dictionaries with period, month label, revenue and
+            companies (billed company count), one per month with months
+            without history reported as zero
+        """
+        query = RevenueSnapshotService._window(db.session.query(
+            RevenueSnapshot.period_month,
+            func.sum(RevenueSnapshot.amount),
+            func.count(func.distinct(RevenueSnapshot.company_id))
+        ), start, end, company_ids, module_ids).group_by(RevenueSnapshot.period_month)
+
+        totals = {
+            RevenueSnapshotService._period(period): (float(revenue or 0), companies)
+            for period, revenue, companies in query.all()
+        }
+
+        return [
+            {
+                'period': period,
+                'month': period.strftime('%b %Y'),
+                'revenue': totals.get(period, (0.0, 0))[0],
+                'companies': totals.get(period, (0.0, 0))[1],
+                'has_history': period in totals
+            }
+            for period in RevenueSnapshotService.months_between(
+                RevenueSnapshotService.month_start(start), RevenueSnapshotService.month_start(end)
+            )
+        ]
+
+    @staticmethod
+    def month_over_month(start, end, company_ids=None, module_ids=None):
+        """
+        Revenue trend with the change from each previous month
+
+        Returns:
+            trend() rows with delta and delta_pct (None when the previous
+            month had no revenue)
+        """
+        months = RevenueSnapshotService.trend(
+            RevenueSnapshotService.add_months(RevenueSnapshotService.month_start(start), -1),
+            end, company_ids, module_ids
+        )
+
+        rows = []
+        for previous, month in zip(months, months[1:]):
+            delta = month['revenue'] - previous['revenue']
+            rows.append(dict(
+                month,
+                delta=delta,
+                delta_pct=(delta / previous['revenue'] * 100) if previous['revenue'] else None
+            ))
+        return rows
+
+    @staticmethod
+    def breakdown(start, end, by='module', company_ids=None, module_ids=None):
+        """
+        Revenue per month split by module, company or signup cohort
+
+        Args:
+            start: Any date in the first month
+            end: Any date in the last month
+            by: 'module', 'company' or 'cohort' (month the company was created)
+            company_ids: Optional company IDs to include
+            module_ids: Optional module IDs to include
+
+        Returns:
+            Dictionary with periods (list of month starts) and series (list
+            of dictionaries with key, label, values per period and total,
+            largest total first)
+        """
+        if by not in BREAKDOWN_GROUPS:
+            raise ValueError(f"Unknown breakdown '{by}'")
+
+        if by == 'module':
+            columns = (RevenueSnapshot.module_id, ModuleDefinition.display_name)
+            query = db.session.query(RevenueSnapshot.period_month, *columns, func.sum(RevenueSnapshot.amount)).join(
+                ModuleDefinition, RevenueSnapshot.module_id == ModuleDefinition.id
+            )
+        else:
+            columns = (RevenueSnapshot.company_id, Company.name, Company.created_at)
+            query = db.session.query(RevenueSnapshot.period_month, *columns, func.sum(RevenueSnapshot.amount)).join(
+                Company, RevenueSnapshot.company_id == Company.id
+            )
+
+        query = RevenueSnapshotService._window(query, start, end, company_ids, module_ids).group_by(
+            RevenueSnapshot.period_month, *columns
+        )
+
+        periods = RevenueSnapshotService.months_between(
+            RevenueSnapshotService.month_start(start), RevenueSnapshotService.month_start(end)
+        )
+        positions = {period: index for index, period in enumerate(periods)}
+
+        series = {}
+        for row in query.all():
+            period = RevenueSnapshotService._period(row[0])
+            revenue = float(row[-1] or 0)
+            if by == 'cohort':
+                created_at = row[3]
+                cohort = RevenueSnapshotService.month_start(created_at) if created_at else None
+                key, label = cohort, cohort.strftime('%b %Y') if cohort else 'Unknown'
+            else:
+                key, label = row[1], row[2]
+
+            entry = series.setdefault(key, {'key': key, 'label': label, 'values': [0.0] * len(periods), 'total': 0.0})
+            entry['values'][positions[period]] += revenue
+            entry['total'] += revenue
+
+        return {
+            'periods': periods,
+            'series': sorted(series.values(), key=lambda entry: entry['total'], reverse=True)
+        }
+
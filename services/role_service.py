@@ -1,6 +1,7 @@
 # services/role_service.py
 
 from models import Role, User
+from services.entitlement_service import EntitlementService
 from flask import session
 import json
 
@@ -338,7 +339,8 @@ def get_role_permissions(cls, role_id):
     def check_user_permission(cls, user_id, permission):
         """Check if user has a specific permission"""
         try:
-            user = User.query.get(user_id)
+            snapshot = EntitlementService.resolve(user_id)
+            user = snapshot.user
             if not user or not user.role:
                 return False
             
@@ -346,8 +348,7 @@ def check_user_permission(cls, user_id, permission):
             if user.is_super_admin:
                 return True
             
-            user_permissions = cls.get_role_permissions(user.role_id)
-            return permission in user_permissions
+            return permission in snapshot.role_permissions
             
         except Exception as e:
             print(f"Error checking user permission: {e}")
@@ -357,7 +358,8 @@ def check_user_permission(cls, user_id, permission):
     def get_user_permissions(cls, user_id):
         """Get all permissions for a user"""
         try:
-            user = User.query.get(user_id)
+            snapshot = EntitlementService.resolve(user_id)
+            user = snapshot.user
             if not user:
                 return []
             
@@ -368,7 +370,7 @@ def get_user_permissions(cls, user_id):
             if not user.role:
                 return []
             
-            return cls.get_role_permissions(user.role_id)
+            return list(snapshot.role_permissions)
             
         except Exception as e:
             print(f"Error getting user permissions: {e}")
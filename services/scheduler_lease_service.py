@@ -0,0 +1,278 @@
+"""
+Scheduler Lease Service
+Elects one scheduler leader across web workers, hosts and standalone
+scheduler processes through a lease row in scheduler_leases; every other
+process keeps its scheduler paused as a standby
+"""
+
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from models import db, SchedulerLease
+from services.job_run_service import JobRunService
+
+logger = logging.getLogger(__name__)
+
+
+# Lease every scheduler process competes for
+DEFAULT_LEASE_NAME = 'scheduler'
+
+
+class SchedulerLeaseService:
+    """Service for acquiring, renewing and releasing the scheduler lease"""
+
+    @staticmethod
+    def acquire(name, holder, lease_seconds):
+        """
+        Renew the lease if ``holder`` has it, otherwise take it if it is free
+        or expired
+
+        Each step is a single conditional statement, so when several
+        processes race for an expired lease only one of them gets it.
+        Database errors are raised so the caller can tell them apart from
+        losing the lease.
+
+        Args:
+            name: Lease name
+            holder: Unique ID of the calling process
+            lease_seconds: How long the lease lasts without a renewal
+
+        Returns:
+            True if ``holder`` now holds the lease
+        """
+        now = datetime.utcnow()
+        expires_at = now + timedelta(seconds=lease_seconds)
+
+        try:
+            renewed = SchedulerLease.query.filter(
+                SchedulerLease.name == name,
+                SchedulerLease.holder == holder
+            ).update({'renewed_at': now, 'expires_at': expires_at}, synchronize_session=False)
+
+            if not renewed:
+                renewed = SchedulerLease.query.filter(
+                    SchedulerLease.name == name,
+                    SchedulerLease.expires_at < now
+                ).update({
+                    'holder': holder,
+                    'acquired_at': now,
+                    'renewed_at': now,
+                    'expires_at': expires_at
+                }, synchronize_session=False)
+
+            if not renewed and db.session.query(SchedulerLease.name).filter_by(name=name).first() is None:
+                db.session.add(SchedulerLease(
+                    name=name, holder=holder, acquired_at=now, renewed_at=now, expires_at=expires_at
+                ))
+                db.session.flush()
+                renewed = 1
+
+            db.session.commit()
+            return bool(renewed)
+
+        except IntegrityError:
+            # Another process created the lease first
+            db.session.rollback()
+            return False
+
+        except Exception:
+            db.session.rollback()
+            raise
+
+    @staticmethod
+    def release(name, holder):
+        """
+        Give the lease up so a standby can take over without waiting for it
+        to expire
+
+        Returns:
+            True if ``holder`` had the lease
+        """
+        try:
+            released = SchedulerLease.query.filter(
+                SchedulerLease.name == name,
+                SchedulerLease.holder == holder
+            ).update({'expires_at': datetime.utcnow()}, synchronize_session=False)
+            db.session.commit()
+            return bool(released)
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error releasing scheduler lease {name}: {e}")
+            return False
+
+    @staticmethod
+    def current(name):
+        """The lease row, or None if no process has held it yet"""
+        return SchedulerLease.query.get(name)
+
+
+class SchedulerCoordinator:
+    """
+    Runs an APScheduler scheduler only while this process holds the lease
+
+    The scheduler is started paused. A heartbeat thread renews the lease
+    every ``heartbeat_seconds``; the process that holds it resumes its
+    scheduler and every other process stays paused as a standby, taking
+    over once the leader stops renewing.
+    """
+
+    def __init__(self, scheduler, app=None, lease_name=DEFAULT_LEASE_NAME):
+        self.scheduler = scheduler
+        self.lease_name = lease_name
+        self.holder = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.lease_seconds = 60
+        self.heartbeat_seconds = 15
+        self.is_leader = False
+        self.leader_since = None
+        self._lease_expires = None
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.app = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Read the SCHEDULER_LEASE_* settings"""
+        self.app = app
+        self.lease_seconds = app.config.get('SCHEDULER_LEASE_SECONDS', 60)
+        self.heartbeat_seconds = app.config.get('SCHEDULER_HEARTBEAT_SECONDS', 15)
+
+    @property
+    def running(self):
+        """Whether this process takes part in the election"""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self):
+        """Start the scheduler paused and begin competing for the lease"""
+        with self._lock:
+            if self.running:
+                return
+            if not self.scheduler.running:
+                self.scheduler.start(paused=True)
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scheduler-lease', daemon=True)
+            self._thread.start()
+        logger.info(f"Scheduler standing by for lease '{self.lease_name}' as {self.holder}")
+
+    def stop(self):
+        """Stop competing, hand the lease back and shut the scheduler down"""
+        with self._lock:
+            self._stop.set()
+            if self._thread is not None:
+                self._thread.join(timeout=self.heartbeat_seconds)
+                self._thread = None
+
+            if self.is_leader:
+                with self.app.app_context():
+                    SchedulerLeaseService.release(self.lease_name, self.holder)
+                self.is_leader = False
+                self.leader_since = None
+
+            if self.scheduler.running:
+                self.scheduler.shutdown(wait=False)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.heartbeat()
+            self._stop.wait(self.heartbeat_seconds)
+
+    def heartbeat(self):
+        """
+        Renew or try to take the lease once, then resume or pause the
+        scheduler to match
+
+        When the database cannot be reached the leader keeps running until
+        its own lease would have expired, so a brief outage does not pause
+        jobs, and it never runs past the point a standby could take over.
+        """
+        now = datetime.utcnow()
+        try:
+            with self.app.app_context():
+                acquired = SchedulerLeaseService.acquire(self.lease_name, self.holder, self.lease_seconds)
+        except Exception as e:
+            logger.error(f"Error renewing scheduler lease: {e}")
+            acquired = None
+
+        if acquired:
+            self._lease_expires = now + timedelta(seconds=self.lease_seconds)
+            if not self.is_leader:
+                self._become_leader()
+        elif self.is_leader and (acquired is False or self._lease_expires is None or now >= self._lease_expires):
+            self._step_down()
+
+        return self.is_leader
+
+    def _become_leader(self):
+        with self.app.app_context():
+            self._skip_fires_already_run()
+        self.scheduler.resume()
+        self.is_leader = True
+        self.leader_since = datetime.now()
+        logger.info(f"Scheduler lease '{self.lease_name}' acquired by {self.holder}; running jobs")
+
+    def _step_down(self):
+        if self.scheduler.running:
+            self.scheduler.pause()
+        self.is_leader = False
+        self.leader_since = None
+        logger.warning(f"Scheduler lease '{self.lease_name}' lost by {self.holder}; standing by")
+
+    def _skip_fires_already_run(self):
+        """
+        Move past fire times the previous leader already ran
+
+        A standby's paused jobs still point at the fire times it was
+        waiting for. Resuming would run any that are within their misfire
+        grace time again, so those with a recorded run since their fire
+        time are moved to their next fire time; the rest are left to run,
+        which catches up a job the previous leader missed.
+        """
+        jobs = [job for job in self.scheduler.get_jobs() if job.next_run_time is not None]
+        if not jobs:
+            return
+
+        now = datetime.now(jobs[0].next_run_time.tzinfo)
+        due = [job for job in jobs if job.next_run_time <= now]
+        if not due:
+            return
+
+        last_started = JobRunService.last_started([job.id for job in due])
+        for job in due:
+            # Runs are recorded in server local time
+            fire_time = job.next_run_time.astimezone().replace(tzinfo=None)
+            if job.id in last_started and last_started[job.id] >= fire_time:
+                job.modify(next_run_time=job.trigger.get_next_fire_time(None, now))
+
+    def status(self):
+        """
+        Leader election state for this process and the current lease
+
+        Returns:
+            Dictionary with role, holder, leader_since and lease
+        """
+        try:
+            lease = SchedulerLeaseService.current(self.lease_name)
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error reading scheduler lease: {e}")
+            lease = None
+
+        if not self.running:
+            role = 'disabled'
+        else:
+            role = 'leader' if self.is_leader else 'standby'
+
+        return {
+            'role': role,
+            'holder': self.holder,
+            'leader_since': self.leader_since.isoformat() if self.leader_since else None,
+            'lease': lease.to_dict() if lease else None
+        }
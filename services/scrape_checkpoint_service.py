@@ -0,0 +1,186 @@
+"""
+Scrape Checkpoint Service
+Remembers each municipality's last successful scrape (listing fingerprint,
+per-tender content hashes and page validators) so sweeps only save what
+changed and an interrupted sweep resumes where it stopped
+"""
+
+import hashlib
+import json
+from datetime import datetime, timedelta
+
+from models import db, ScrapeRun, ScrapeCheckpoint
+from services.municipal_tender_ingest_service import MunicipalTenderIngestService
+
+
+class ScrapeCheckpointService:
+    """Service for scraping sweeps and per-municipality checkpoints"""
+
+    # ------------------------------------------------------------------
+    # Runs
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def start_run(municipality_names, resume_hours=12):
+        """
+        Resume the latest interrupted sweep, or start a new one
+
+        A sweep still marked 'running' that started within ``resume_hours``
+        was interrupted (only the scheduler leader sweeps), so its
+        checkpointed municipalities are not scraped again. Older
+        interrupted sweeps are marked 'abandoned'.
+
+        Args:
+            municipality_names: Municipalities the sweep covers
+            resume_hours: Age limit for resuming an interrupted sweep
+
+        Returns:
+            Tuple (run: ScrapeRun, done: set of municipality names already
+            scraped by the resumed sweep)
+        """
+        cutoff = datetime.now() - timedelta(hours=resume_hours)
+        run = ScrapeRun.query.filter(
+            ScrapeRun.status == 'running',
+            ScrapeRun.started_at >= cutoff
+        ).order_by(ScrapeRun.started_at.desc()).first()
+
+        ScrapeRun.query.filter(
+            ScrapeRun.status == 'running',
+            ScrapeRun.started_at < cutoff
+        ).update({'status': 'abandoned'}, synchronize_session=False)
+
+        done = set()
+        if run is not None:
+            done = {
+                name for (name,) in db.session.query(ScrapeCheckpoint.municipality).filter(
+                    ScrapeCheckpoint.run_id == run.id
+                )
+            }
+        else:
+            run = ScrapeRun(status='running', started_at=datetime.now())
+            db.session.add(run)
+
+        run.municipalities_total = len(municipality_names)
+        run.municipalities_done = len(done & set(municipality_names))
+        db.session.commit()
+        return run, done
+
+    @staticmethod
+    def finish_run(run, errors=0):
+        """Mark a sweep completed"""
+        try:
+            run.status = 'completed'
+            run.completed_at = datetime.now()
+            run.errors = (run.errors or 0) + errors
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error finishing scrape run {run.id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Checkpoints
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def load(municipality_names):
+        """Checkpoints by municipality name (municipalities never scraped are left out)"""
+        if not municipality_names:
+            return {}
+        checkpoints = ScrapeCheckpoint.query.filter(ScrapeCheckpoint.municipality.in_(municipality_names)).all()
+        return {checkpoint.municipality: checkpoint for checkpoint in checkpoints}
+
+    @staticmethod
+    def page_validators(checkpoints):
+        """ETag/Last-Modified validators of every checkpointed listing page, by URL"""
+        validators = {}
+        for checkpoint in checkpoints.values():
+            validators.update(checkpoint.get_page_validators())
+        return validators
+
+    @staticmethod
+    def fingerprint(tender_hashes):
+        """SHA-256 of a listing's tender hashes (changes when any tender is added, removed or edited)"""
+        return hashlib.sha256(json.dumps(tender_hashes, sort_keys=True).encode('utf-8')).hexdigest()
+
+    @staticmethod
+    def diff(checkpoint, result):
+        """
+        Split a scraped listing into tenders to save and tenders unchanged
+        since the checkpoint
+
+        Args:
+            checkpoint: ScrapeCheckpoint or None
+            result: MunicipalScraper.scrape_listing() result
+
+        Returns:
+            Tuple (changed: list of scraper records, tender_hashes: dict for
+            the new checkpoint, unchanged: int)
+        """
+        previous = checkpoint.get_tender_hashes() if checkpoint else {}
+
+        # Pages that were not re-fetched still list the tenders they had
+        complete = all(page['status'] == 'ok' for page in result['pages'])
+        tender_hashes = {} if complete else dict(previous)
+
+        changed = []
+        unchanged = 0
+        for tender_data in result['tenders']:
+            try:
+                row = MunicipalTenderIngestService.normalize(tender_data)
+            except (KeyError, TypeError):
+                changed.append(tender_data)  # counted as invalid by the ingest step
+                continue
+            tender_hashes[row['tender_number']] = row['content_hash']
+            if previous.get(row['tender_number']) == row['content_hash']:
+                unchanged += 1
+            else:
+                changed.append(tender_data)
+
+        return changed, tender_hashes, unchanged
+
+    @staticmethod
+    def save(run, municipality_name, result, tender_hashes=None):
+        """
+        Checkpoint a municipality once its changed tenders are saved
+
+        Args:
+            run: Current ScrapeRun
+            municipality_name: Municipality scraped
+            result: MunicipalScraper.scrape_listing() result
+            tender_hashes: Tender hashes from diff() (None keeps the stored
+                hashes, for listings that were not modified)
+
+        Returns:
+            True if the checkpoint was saved
+        """
+        try:
+            now = datetime.now()
+            checkpoint = ScrapeCheckpoint.query.get(municipality_name)
+            if checkpoint is None:
+                checkpoint = ScrapeCheckpoint(municipality=municipality_name, last_success_at=now)
+                db.session.add(checkpoint)
+
+            if tender_hashes is not None:
+                checkpoint.set_tender_hashes(tender_hashes)
+                checkpoint.listing_fingerprint = ScrapeCheckpointService.fingerprint(tender_hashes)
+                checkpoint.tender_count = len(tender_hashes)
+
+            validators = checkpoint.get_page_validators()
+            for page in result['pages']:
+                if page['status'] == 'ok':
+                    if page['etag'] or page['last_modified']:
+                        validators[page['url']] = {'etag': page['etag'], 'last_modified': page['last_modified']}
+                    else:
+                        validators.pop(page['url'], None)
+            checkpoint.set_page_validators(validators)
+
+            checkpoint.run_id = run.id
+            checkpoint.last_success_at = now
+            run.municipalities_done = (run.municipalities_done or 0) + 1
+            db.session.commit()
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error saving scrape checkpoint for {municipality_name}: {e}")
+            return False
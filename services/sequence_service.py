@@ -0,0 +1,193 @@
+"""
+Sequence Service
+Per-company document numbers (tender references, journal entries) kept in
+the document_sequences table. Each worker reserves a block of numbers with
+one atomic UPDATE and hands them out from memory, so allocating a number is
+O(1) and two workers are never given the same one. Numbers left in a block
+when a worker exits are skipped, so numberings may have gaps. Numberings
+that must not have gaps (journal entries) take one number at a time in the
+caller's transaction instead, so a rolled back save hands its number back
+"""
+
+import threading
+from datetime import datetime
+
+from flask import current_app, has_app_context
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+
+
+# Atomic increment of one sequence, and reading the new value back
+UPDATE_SEQUENCE = """
+    UPDATE document_sequences
+    SET next_value = next_value + :count, updated_at = :now
+    WHERE company_id = :company_id AND kind = :kind AND year = :year
+"""
+
+SELECT_SEQUENCE = """
+    SELECT next_value FROM document_sequences
+    WHERE company_id = :company_id AND kind = :kind AND year = :year
+"""
+
+
+class SequenceService:
+    """Service for per-company document numbering"""
+
+    # (database URL, company_id, kind, year) -> [next value, end of block (exclusive)]
+    _blocks = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _block_size():
+        if has_app_context():
+            return current_app.config.get('SEQUENCE_BLOCK_SIZE', 10)
+        return 10
+
+    @staticmethod
+    def highest_suffix(column, prefix, *criteria):
+        """
+        Highest number already issued as ``prefix`` + number in a column
+
+        Used once per sequence, to continue numberings issued before the
+        sequence existed.
+
+        Args:
+            column: String column holding the numbers (e.g. Tender.reference_number)
+            prefix: Text before the number (e.g. 'ABC-2026-')
+            criteria: Further filters (e.g. Tender.company_id == 1)
+
+        Returns:
+            Integer (0 when nothing was issued yet)
+        """
+        highest = 0
+        for (value,) in db.session.query(column).filter(column.like(f"{prefix}%"), *criteria):
+            suffix = value[len(prefix):]
+            if suffix.isdigit():
+                highest = max(highest, int(suffix))
+        return highest
+
+    @staticmethod
+    def reserve(company_id, kind, year=0, count=1, seed=None):
+        """
+        Reserve ``count`` consecutive numbers
+
+        Runs in its own short transaction: the UPDATE locks the sequence
+        row (as SELECT ... FOR UPDATE would) only until the new value is
+        read back, not for the rest of the caller's transaction.
+
+        Args:
+            company_id: Company ID
+            kind: Numbering (e.g. 'tender_reference')
+            year: Year the numbering restarts in (0 if it never restarts)
+            count: Numbers to reserve
+            seed: Function returning the highest number already issued,
+                  called when the sequence row is first created
+
+        Returns:
+            Tuple (first, end): numbers first to end - 1
+        """
+        params = {'company_id': company_id, 'kind': kind, 'year': year, 'count': count, 'now': datetime.now()}
+
+        # The first pass finds no row when the sequence is new
+        for attempt in range(2):
+            with db.engine.begin() as connection:
+                updated = connection.execute(text(UPDATE_SEQUENCE), params).rowcount
+                if updated:
+                    end = connection.execute(text(SELECT_SEQUENCE), params).scalar()
+                    return end - count, end
+            SequenceService._create(company_id, kind, year, seed)
+
+        raise RuntimeError(f"Could not reserve {kind} numbers for company {company_id}")
+
+    @staticmethod
+    def _create(company_id, kind, year, seed):
+        """Add a sequence row continuing from ``seed()`` (a no-op if another worker added it first)"""
+        try:
+            with db.engine.begin() as connection:
+                connection.execute(text("""
+                    INSERT INTO document_sequences (company_id, kind, year, next_value, updated_at)
+                    VALUES (:company_id, :kind, :year, :next_value, :now)
+                """), {'company_id': company_id, 'kind': kind, 'year': year,
+                      'next_value': (seed() if seed else 0) + 1, 'now': datetime.now()})
+        except IntegrityError:
+            pass
+
+    @staticmethod
+    def next_in_transaction(company_id, kind, year=0, seed=None):
+        """
+        Allocate one number in the caller's transaction
+
+        The sequence row stays locked until the caller commits or rolls
+        back, and a rollback hands the number back, so numbers are only
+        used up by saved documents.
+
+        Args:
+            company_id: Company ID
+            kind: Numbering (e.g. 'journal_entry')
+            year: Year the numbering restarts in (0 if it never restarts)
+            seed: Function returning the highest number already issued
+
+        Returns:
+            Integer
+        """
+        params = {'company_id': company_id, 'kind': kind, 'year': year, 'count': 1, 'now': datetime.now()}
+        # Create a new sequence's row before this transaction starts writing
+        if db.session.execute(text(SELECT_SEQUENCE), params).scalar() is None:
+            SequenceService._create(company_id, kind, year, seed)
+
+        db.session.execute(text(UPDATE_SEQUENCE), params)
+        return db.session.execute(text(SELECT_SEQUENCE), params).scalar() - 1
+
+    @staticmethod
+    def next_value(company_id, kind, year=0, seed=None, block_size=None):
+        """
+        Allocate the next number of a company's numbering
+
+        Args:
+            company_id: Company ID
+            kind: Numbering (e.g. 'tender_reference')
+            year: Year the numbering restarts in (0 if it never restarts)
+            seed: Function returning the highest number already issued
+            block_size: Numbers reserved per database round trip
+                        (defaults to SEQUENCE_BLOCK_SIZE); a block of one
+                        is taken with next_in_transaction()
+
+        Returns:
+            Integer
+        """
+        block_size = block_size or SequenceService._block_size()
+        if block_size == 1:
+            return SequenceService.next_in_transaction(company_id, kind, year, seed)
+
+        key = (str(db.engine.url), company_id, kind, year)
+        with SequenceService._lock:
+            block = SequenceService._blocks.get(key)
+            if block is None or block[0] >= block[1]:
+                block = list(SequenceService.reserve(company_id, kind, year, block_size, seed))
+                SequenceService._blocks[key] = block
+            value = block[0]
+            block[0] += 1
+            return value
+
+    @staticmethod
+    def peek(company_id, kind, year=0, seed=None):
+        """
+        The number next_value() would most likely return, without allocating it
+
+        For display only (e.g. pre-filling a form); another request may
+        take the number first.
+        """
+        key = (str(db.engine.url), company_id, kind, year)
+        with SequenceService._lock:
+            block = SequenceService._blocks.get(key)
+            if block is not None and block[0] < block[1]:
+                return block[0]
+
+        value = db.session.execute(
+            text(SELECT_SEQUENCE), {'company_id': company_id, 'kind': kind, 'year': year}
+        ).scalar()
+        if value is not None:
+            return value
+        return (seed() if seed else 0) + 1
@@ -0,0 +1,381 @@
+"""
+Tender Autocomplete Service
+Keystroke-rate suggestions for tender titles, reference numbers and
+categories from an in-process prefix index per company, so typing in the
+search box never reaches the database once a company's index is loaded.
+Writes reach other workers' indexes through a version counter in the cache
+backend, which only works across workers with CACHE_BACKEND=redis; with the
+per-worker memory backend they show up once an index reaches
+TENDER_AUTOCOMPLETE_MAX_AGE and is reloaded
+"""
+
+import bisect
+import re
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app, has_app_context
+
+from models import db, Tender, TenderAssignment, TenderCategory
+from services.cache_service import CacheService
+
+
+WORD_START = re.compile(r'\w+', re.UNICODE)
+
+# Suggestion kinds, in the order they are listed for equal matches
+KINDS = ('reference', 'title', 'category')
+
+
+def normalize(value):
+    """Lower-case text with runs of whitespace collapsed"""
+    return ' '.join((value or '').lower().split())
+
+
+class PrefixIndex:
+    """
+    Sorted array of (key, kind, text) entries searched with bisect
+
+    A title or category is entered once per word start, so 'resurf' finds
+    'Road resurfacing'. Reference numbers are matched from the start only.
+    Identical texts share their entries, with the tenders holding them
+    counted in ``owners``.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.owners = {}        # (kind, text) -> set of tender ids
+        self.by_tender = {}     # tender_id -> [(kind, text)]
+
+    def __len__(self):
+        return len(self.keys)
+
+    @staticmethod
+    def _keys(kind, text):
+        normalized = normalize(text)
+        if kind == 'reference':
+            return [normalized]
+        return [normalized[match.start():] for match in WORD_START.finditer(normalized)]
+
+    @classmethod
+    def build(cls, tenders):
+        """
+        Index many tenders at once, sorting the entries a single time
+
+        Args:
+            tenders: (tender_id, items) pairs, as passed to add()
+        """
+        index = cls()
+        for tender_id, items in tenders:
+            index.add(tender_id, items, insert=index.keys.append)
+        index.keys.sort()
+        return index
+
+    def add(self, tender_id, items, insert=None):
+        """
+        Index (or re-index) one tender
+
+        Args:
+            tender_id: Tender id
+            items: (kind, text) pairs for the tender
+            insert: How new entries are added (kept sorted by default)
+        """
+        insert = insert or (lambda entry: bisect.insort(self.keys, entry))
+        self.remove(tender_id)
+        items = [(kind, text) for kind, text in items if text and normalize(text)]
+        for kind, text in items:
+            owners = self.owners.setdefault((kind, text), set())
+            if not owners:
+                for key in self._keys(kind, text):
+                    insert((key, KINDS.index(kind), text))
+            owners.add(tender_id)
+        self.by_tender[tender_id] = items
+
+    def remove(self, tender_id):
+        """Drop one tender's entries (shared texts stay while other tenders hold them)"""
+        for kind, text in self.by_tender.pop(tender_id, []):
+            owners = self.owners.get((kind, text))
+            if owners is None:
+                continue
+            owners.discard(tender_id)
+            if owners:
+                continue
+            del self.owners[(kind, text)]
+            for key in self._keys(kind, text):
+                entry = (key, KINDS.index(kind), text)
+                position = bisect.bisect_left(self.keys, entry)
+                if position < len(self.keys) and self.keys[position] == entry:
+                    del self.keys[position]
+
+    def suggest(self, prefix, limit=10, kinds=KINDS, tender_ids=None):
+        """
+        Distinct suggestions whose text has a word starting with ``prefix``
+
+        Args:
+            prefix: Text typed so far
+            limit: Maximum number of suggestions
+            kinds: Suggestion kinds to include
+            tender_ids: Only texts held by these tenders (None for all)
+
+        Returns:
+            List of dictionaries with text, type and tender_id (the lowest
+            tender id holding the text; None for categories)
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+
+        suggestions = []
+        seen = set()
+        position = bisect.bisect_left(self.keys, (prefix,))
+        while position < len(self.keys) and len(suggestions) < limit:
+            key, kind_order, text = self.keys[position]
+            if not key.startswith(prefix):
+                break
+            position += 1
+
+            kind = KINDS[kind_order]
+            if kind not in kinds or (kind, text) in seen:
+                continue
+            owners = self.owners[(kind, text)]
+            if tender_ids is not None:
+                owners = owners & tender_ids
+                if not owners:
+                    continue
+            seen.add((kind, text))
+            suggestions.append({
+                'text': text,
+                'type': kind,
+                'tender_id': None if kind == 'category' else min(owners)
+            })
+        return suggestions
+
+
+class TenderAutocompleteService:
+    """Service for tender search-box suggestions"""
+
+    # (database URL, company_id) -> [PrefixIndex, version, monotonic load time,
+    # {user_id: visible tender ids}], least recently used first
+    _indexes = OrderedDict()
+    _lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Index lifecycle
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _max_entries():
+        if has_app_context():
+            return current_app.config.get('TENDER_AUTOCOMPLETE_MAX_ENTRIES', 500000)
+        return 500000
+
+    @staticmethod
+    def _max_age():
+        if has_app_context():
+            return current_app.config.get('TENDER_AUTOCOMPLETE_MAX_AGE', 300)
+        return 300
+
+    @staticmethod
+    def _version_key(company_id):
+        return f"version:autocomplete:{company_id}"
+
+    @staticmethod
+    def _version(company_id):
+        """Write counter for a company's tenders, shared by workers through the cache backend"""
+        try:
+            return CacheService.backend().get_counter(TenderAutocompleteService._version_key(company_id))
+        except Exception as e:
+            print(f"Error reading autocomplete version: {e}")
+            return None
+
+    @staticmethod
+    def _tender_items(title, reference_number, category_name):
+        return [('title', title), ('reference', reference_number), ('category', category_name)]
+
+    @staticmethod
+    def _load(company_id):
+        """Build a company's index from its tenders (one query)"""
+        rows = db.session.query(
+            Tender.id, Tender.title, Tender.reference_number, TenderCategory.name
+        ).outerjoin(TenderCategory, TenderCategory.id == Tender.category_id).filter(
+            Tender.company_id == company_id
+        )
+        return PrefixIndex.build(
+            (tender_id, TenderAutocompleteService._tender_items(title, reference_number, category_name))
+            for tender_id, title, reference_number, category_name in rows
+        )
+
+    @staticmethod
+    def _evict():
+        """Drop the least recently used companies until the entry budget is met"""
+        indexes = TenderAutocompleteService._indexes
+        total = sum(len(cached[0]) for cached in indexes.values())
+        max_entries = TenderAutocompleteService._max_entries()
+        while total > max_entries and len(indexes) > 1:
+            key, cached = indexes.popitem(last=False)
+            total -= len(cached[0])
+
+    @staticmethod
+    def _entry(company_id):
+        """A company's cache entry, (re)loading its index when needed (see index_for())"""
+        key = (str(db.engine.url), company_id)
+        version = TenderAutocompleteService._version(company_id)
+        with TenderAutocompleteService._lock:
+            cached = TenderAutocompleteService._indexes.get(key)
+            fresh = cached is not None and time.monotonic() - cached[2] < TenderAutocompleteService._max_age()
+            if fresh and cached[1] == version:
+                TenderAutocompleteService._indexes.move_to_end(key)
+                return cached
+
+        loaded_at = time.monotonic()
+        index = TenderAutocompleteService._load(company_id)
+        cached = [index, version, loaded_at, {}]
+        with TenderAutocompleteService._lock:
+            TenderAutocompleteService._indexes[key] = cached
+            TenderAutocompleteService._indexes.move_to_end(key)
+            TenderAutocompleteService._evict()
+        return cached
+
+    @staticmethod
+    def index_for(company_id):
+        """
+        A company's prefix index, loaded on first use, after another
+        worker changed its tenders, or once it is older than
+        TENDER_AUTOCOMPLETE_MAX_AGE seconds
+
+        Args:
+            company_id: Company ID
+
+        Returns:
+            PrefixIndex
+        """
+        return TenderAutocompleteService._entry(company_id)[0]
+
+    # ------------------------------------------------------------------
+    # Tender writes
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _apply(company_id, change):
+        """Bump the company's version and apply ``change`` to a loaded index"""
+        key = (str(db.engine.url), company_id)
+        try:
+            version = CacheService.backend().incr(TenderAutocompleteService._version_key(company_id))
+        except Exception as e:
+            print(f"Error bumping autocomplete version: {e}")
+            version = None
+
+        with TenderAutocompleteService._lock:
+            cached = TenderAutocompleteService._indexes.get(key)
+            if cached is None:
+                return
+            # Up to date apart from this write: patch it, otherwise reload on next use.
+            # Visible tender sets are worked out again either way
+            if version is not None and cached[1] == version - 1:
+                change(cached[0])
+                cached[1] = version
+                cached[3].clear()
+            else:
+                del TenderAutocompleteService._indexes[key]
+
+    @staticmethod
+    def index_tender(tender):
+        """Add or refresh a saved tender's suggestions"""
+        try:
+            category = TenderCategory.query.get(tender.category_id) if tender.category_id else None
+            items = TenderAutocompleteService._tender_items(
+                tender.title, tender.reference_number, category.name if category else None
+            )
+            TenderAutocompleteService._apply(tender.company_id, lambda index: index.add(tender.id, items))
+        except Exception as e:
+            print(f"Error updating autocomplete for tender {tender.id}: {e}")
+
+    @staticmethod
+    def remove_tender(tender_id, company_id):
+        """Drop a deleted tender's suggestions"""
+        try:
+            TenderAutocompleteService._apply(company_id, lambda index: index.remove(tender_id))
+        except Exception as e:
+            print(f"Error updating autocomplete for tender {tender_id}: {e}")
+
+    @staticmethod
+    def assignments_changed(company_id):
+        """Work out users' visible tenders again after a company's tender assignments changed"""
+        try:
+            TenderAutocompleteService._apply(company_id, lambda index: None)
+        except Exception as e:
+            print(f"Error updating autocomplete assignments for company {company_id}: {e}")
+
+    # ------------------------------------------------------------------
+    # Suggestions
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _visible(cached, entitlements):
+        """Visible tender ids kept in a company's cache entry, loaded on first use per user"""
+        if entitlements.is_super_admin or entitlements.has_permission('view_all_tenders'):
+            return None
+
+        with TenderAutocompleteService._lock:
+            tender_ids = cached[3].get(entitlements.user_id)
+            version = cached[1]
+        if tender_ids is not None:
+            return tender_ids
+
+        rows = db.session.query(TenderAssignment.tender_id).filter(
+            TenderAssignment.assigned_to_id == entitlements.user_id,
+            TenderAssignment.is_active == True
+        )
+        tender_ids = frozenset(tender_id for (tender_id,) in rows)
+        with TenderAutocompleteService._lock:
+            # Not kept when assignments changed while loading
+            if cached[1] == version:
+                cached[3][entitlements.user_id] = tender_ids
+        return tender_ids
+
+    @staticmethod
+    def visible_tender_ids(entitlements):
+        """
+        Tenders a user may see suggestions for, as on the /tenders page
+
+        Kept next to the company's index until its tenders or assignments
+        change, so repeated lookups do not reach the database.
+
+        Args:
+            entitlements: EntitlementSnapshot for the user and company
+
+        Returns:
+            Set of tender ids, or None when the user may see all of their
+            company's tenders
+        """
+        cached = TenderAutocompleteService._entry(entitlements.company_id)
+        return TenderAutocompleteService._visible(cached, entitlements)
+
+    @staticmethod
+    def suggest(company_id, prefix, limit=10, kinds=KINDS, tender_ids=None, entitlements=None):
+        """
+        Titles, reference numbers and categories of a company's tenders
+        with a word starting with ``prefix``
+
+        Args:
+            company_id: Company ID
+            prefix: Text typed so far
+            limit: Maximum number of suggestions
+            kinds: Suggestion kinds to include ('reference', 'title', 'category')
+            tender_ids: Only suggest from these tenders (None for all, see
+                        visible_tender_ids())
+            entitlements: Only suggest from tenders this EntitlementSnapshot's
+                          user may see (instead of tender_ids)
+
+        Returns:
+            List of dictionaries with text, type and tender_id
+        """
+        if not normalize(prefix):
+            return []
+        cached = TenderAutocompleteService._entry(company_id)
+        if entitlements is not None:
+            tender_ids = TenderAutocompleteService._visible(cached, entitlements)
+        if tender_ids is not None and not tender_ids:
+            return []
+        with TenderAutocompleteService._lock:
+            return cached[0].suggest(prefix, limit, kinds, tender_ids)
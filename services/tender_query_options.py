@@ -0,0 +1,63 @@
+"""
+Tender Query Options
+Eager-loading options for the tender relationships each page renders, so
+listing N tenders costs a fixed number of queries instead of N+1
+"""
+
+from sqlalchemy.orm import joinedload, selectinload
+
+from models import Tender
+
+
+class TenderQueryOptions:
+    """Loader options shared by tender list, report and export queries"""
+
+    @staticmethod
+    def for_list():
+        """
+        Options for the paginated tender list (tenders/list.html), which shows
+        each tender's category, status and company
+
+        Returns:
+            Tuple of loader options for ``query.options(*...)``
+        """
+        # Many-to-one, so joined into the page query without multiplying rows
+        return (
+            joinedload(Tender.category),
+            joinedload(Tender.status),
+            joinedload(Tender.company)
+        )
+
+    @staticmethod
+    def for_report():
+        """
+        Options for unpaginated report lists and exports (reports/tender_list.html,
+        the by-category grouping and the PDF/Excel writers)
+
+        Returns:
+            Tuple of loader options for ``query.options(*...)``
+        """
+        # Report lists are long and share a handful of categories, statuses
+        # and companies; one IN query each avoids repeating them on every row
+        return (
+            selectinload(Tender.category),
+            selectinload(Tender.status),
+            selectinload(Tender.company)
+        )
+
+    @staticmethod
+    def for_stream():
+        """
+        Options for exports streamed with ``yield_per`` (the PDF/Excel writers)
+
+        Returns:
+            Tuple of loader options for ``query.options(*...)``
+        """
+        # A selectin load per batch would run while the streaming cursor is
+        # still open, which MySQL's server-side cursors do not allow; these
+        # are many-to-one, so join them into the streamed query instead
+        return (
+            joinedload(Tender.category),
+            joinedload(Tender.status),
+            joinedload(Tender.company)
+        )
@@ -0,0 +1,204 @@
+"""
+Tender Report Service
+Builds tender reports with filtering, grouping and paging done in SQL
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, extract
+
+from models import Tender, TenderStatus, TenderCategory, TenderAssignment
+from services.tender_query_options import TenderQueryOptions
+from services.tender_stats_rollup_service import TenderStatsRollupService
+
+
+class TenderReportService:
+    """Service for tender report queries"""
+
+    @staticmethod
+    def filtered_query(company_id=None, assigned_to_id=None, start_date=None, end_date=None):
+        """
+        Build the tender query for a report scope
+
+        Args:
+            company_id: Company ID (None for all companies)
+            assigned_to_id: Only tenders assigned to this user
+            start_date: Optional first creation date (inclusive)
+            end_date: Optional last creation date (inclusive)
+
+        Returns:
+            Tender query
+        """
+        query = Tender.query
+
+        if company_id:
+            query = query.filter(Tender.company_id == company_id)
+
+        if assigned_to_id:
+            query = query.join(TenderAssignment).filter(
+                TenderAssignment.assigned_to_id == assigned_to_id
+            )
+
+        if start_date:
+            query = query.filter(
+                Tender.created_at >= datetime.combine(start_date.date(), datetime.min.time())
+            )
+
+        if end_date:
+            query = query.filter(
+                Tender.created_at < datetime.combine(end_date.date() + timedelta(days=1), datetime.min.time())
+            )
+
+        return query
+
+    @staticmethod
+    def get_breakdowns(query):
+        """
+        Status, category and monthly counts for a report query via GROUP BY
+
+        Args:
+            query: Query from filtered_query
+
+        Returns:
+            Tuple (status_breakdown, category_breakdown, monthly_breakdown) of
+            dicts keyed by status name, category name and 'YYYY-MM'
+        """
+        status_rows = query.join(
+            TenderStatus, Tender.status_id == TenderStatus.id
+        ).with_entities(
+            TenderStatus.name, func.count(Tender.id)
+        ).group_by(TenderStatus.name).all()
+
+        category_rows = query.join(
+            TenderCategory, Tender.category_id == TenderCategory.id
+        ).with_entities(
+            TenderCategory.name, func.count(Tender.id)
+        ).group_by(TenderCategory.name).all()
+
+        year = extract('year', Tender.created_at)
+        month = extract('month', Tender.created_at)
+        monthly_rows = query.with_entities(
+            year, month, func.count(Tender.id)
+        ).filter(Tender.created_at.isnot(None)).group_by(year, month).order_by(year, month).all()
+
+        status_breakdown = {name: count for name, count in status_rows}
+        category_breakdown = {name: count for name, count in category_rows}
+        monthly_breakdown = {
+            f"{int(row_year)}-{int(row_month):02d}": count
+            for row_year, row_month, count in monthly_rows
+        }
+
+        return status_breakdown, category_breakdown, monthly_breakdown
+
+    @staticmethod
+    def get_rollup_breakdowns(company_id=None):
+        """
+        Status, category and monthly counts for a whole company (or all
+        companies) from the tender stats rollup
+
+        Args:
+            company_id: Company ID (None for all companies)
+
+        Returns:
+            Same tuple as get_breakdowns
+        """
+        status_breakdown = {}
+        category_breakdown = {}
+
+        for group in TenderStatsRollupService.get_status_category_breakdown(company_id):
+            status_breakdown[group['status_name']] = status_breakdown.get(group['status_name'], 0) + group['count']
+            category_breakdown[group['category']] = category_breakdown.get(group['category'], 0) + group['count']
+
+        monthly_breakdown = TenderStatsRollupService.get_monthly_breakdown(company_id)
+
+        return status_breakdown, category_breakdown, monthly_breakdown
+
+    @staticmethod
+    def get_report(company_id=None, assigned_to_id=None, start_date=None, end_date=None,
+                   page=1, per_page=20):
+        """
+        Build a tender report: grouped counts plus one page of tenders
+
+        Args:
+            company_id: Company ID (None for all companies)
+            assigned_to_id: Only tenders assigned to this user
+            start_date: Optional first creation date (inclusive)
+            end_date: Optional last creation date (inclusive)
+            page: Page of the detail table
+            per_page: Rows per page
+
+        Returns:
+            Dictionary with total_tenders, status_breakdown,
+            category_breakdown, monthly_breakdown and page (a Pagination)
+        """
+        query = TenderReportService.filtered_query(company_id, assigned_to_id, start_date, end_date)
+
+        # Whole-company (or system) reports are already grouped in the rollup
+        if not assigned_to_id and not start_date and not end_date:
+            breakdowns = TenderReportService.get_rollup_breakdowns(company_id)
+        else:
+            breakdowns = TenderReportService.get_breakdowns(query)
+
+        status_breakdown, category_breakdown, monthly_breakdown = breakdowns
+
+        page_result = query.options(
+            *TenderQueryOptions.for_list()
+        ).order_by(Tender.created_at.desc(), Tender.id.desc()).paginate(
+            page=page, per_page=per_page, error_out=False
+        )
+
+        return {
+            'total_tenders': page_result.total,
+            'status_breakdown': status_breakdown,
+            'category_breakdown': category_breakdown,
+            'monthly_breakdown': monthly_breakdown,
+            'page': page_result
+        }
+
+    @staticmethod
+    def list_report_query(report, user, can_view_all=False, as_of=None):
+        """
+        Build the tender query behind a list report (active, closed, overdue)
+
+        Args:
+            report: 'active', 'closed' or 'overdue'
+            user: User viewing the report
+            can_view_all: Whether the user may see all of the company's tenders
+                (otherwise only tenders assigned to them)
+            as_of: Time overdue tenders are measured against (default now)
+
+        Returns:
+            Ordered tender query, or None for a closed report when there is
+            no Closed status
+        """
+        closed_status = TenderStatus.query.filter_by(name='Closed').first()
+        closed_status_id = closed_status.id if closed_status else None
+
+        if user.is_super_admin:
+            query = Tender.query
+        elif can_view_all:
+            query = Tender.query.filter(Tender.company_id == user.company_id)
+        else:
+            query = Tender.query.join(TenderAssignment).filter(
+                TenderAssignment.assigned_to_id == user.id,
+                Tender.company_id == user.company_id
+            )
+
+        if report == 'active':
+            if closed_status_id:
+                query = query.filter(Tender.status_id != closed_status_id)
+            return query.order_by(Tender.created_at.desc())
+
+        if report == 'closed':
+            if not closed_status_id:
+                return None
+            return query.filter(Tender.status_id == closed_status_id).order_by(Tender.updated_at.desc())
+
+        if report == 'overdue':
+            as_of = as_of or datetime.utcnow()
+            return query.filter(
+                Tender.submission_deadline < as_of,
+                Tender.submission_deadline.isnot(None)
+            ).order_by(Tender.submission_deadline.desc())
+
+        raise ValueError(f"Unknown tender list report: {report}")
@@ -1,10 +1,8 @@
 # services/tender_scraping_manager.py
 
 import logging
-import schedule
-import time
-import threading
 from datetime import datetime, timedelta
+from apscheduler.triggers.cron import CronTrigger
 from sqlalchemy import text
 
 # Import database using your existing models structure
@@ -18,6 +16,12 @@
         print("Warning: Could not import database. Using mock mode.")
         db = None
 
+from services.job_run_service import JobRunService
+from services.municipal_tender_ingest_service import MunicipalTenderIngestService
+from services.municipal_scraper_service import real_tender_scraper
+from services.municipal_tender_status_service import MunicipalTenderStatusService
+from services.scrape_checkpoint_service import ScrapeCheckpointService
+
 logger = logging.getLogger(__name__)
 
 class TenderScrapingManager:
@@ -28,209 +32,204 @@ def __init__(self, app=None):
         self.scraping_active = False
         self.last_scrape_time = None
         self.total_scraped = 0
+        self.scheduler = None
         
+    def init_app(self, app, scheduler):
+        """Use the app's scheduler, so scraping only runs on the elected scheduler leader"""
+        self.app = app
+        self.scheduler = scheduler
+        real_tender_scraper.init_app(app)
+
     def start_scheduled_scraping(self):
-        """Start the scheduled scraping process"""
+        """Register the scraping jobs on the app scheduler (safe to call again)"""
         try:
-            # Schedule daily scraping at 6 AM
-            schedule.every().day.at("06:00").do(self.daily_tender_scraping)
+            # Daily scraping at 6 AM
+            self.scheduler.add_job(
+                func=self._run_job,
+                args=['daily_municipal_scraping', self.daily_tender_scraping],
+                trigger=CronTrigger(hour=6, minute=0),
+                id='daily_municipal_scraping',
+                name='Daily Municipal Tender Scraping',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=3600
+            )
             
-            # Schedule updates every 4 hours during business hours
-            schedule.every().day.at("08:00").do(self.update_tender_status)
-            schedule.every().day.at("12:00").do(self.update_tender_status)
-            schedule.every().day.at("16:00").do(self.update_tender_status)
+            # Status updates every 4 hours during business hours
+            self.scheduler.add_job(
+                func=self._run_job,
+                args=['municipal_status_update', self.update_tender_status],
+                trigger=CronTrigger(hour='8,12,16', minute=0),
+                id='municipal_status_update',
+                name='Municipal Tender Status Update',
+                replace_existing=True,
+                max_instances=1,
+                coalesce=True,
+                misfire_grace_time=3600
+            )
             
-            # Start scheduler in background thread
-            scheduler_thread = threading.Thread(target=self._run_scheduler)
-            scheduler_thread.daemon = True
-            scheduler_thread.start()
-            
-            logger.info("Tender scraping scheduler started")
+            logger.info("Tender scraping jobs scheduled")
             
         except Exception as e:
-            logger.error(f"Error starting scraping scheduler: {e}")
+            logger.error(f"Error scheduling tender scraping: {e}")
     
-    def _run_scheduler(self):
-        """Run the scheduler continuously"""
-        while True:
+    def _run_job(self, job_id, job):
+        """Run a scraping job in the app context and record it in the job history"""
+        with self.app.app_context():
+            start_time = datetime.now()
+            run_id = JobRunService.record(job_id, 'running')
             try:
-                schedule.run_pending()
-                time.sleep(60)  # Check every minute
+                result = job()
+                duration = (datetime.now() - start_time).total_seconds()
+                JobRunService.record(job_id, 'success', duration, result if isinstance(result, int) else None,
+                                     run_id=run_id)
+                return result
             except Exception as e:
-                logger.error(f"Error in scheduler: {e}")
-                time.sleep(300)  # Wait 5 minutes on error
+                duration = (datetime.now() - start_time).total_seconds()
+                logger.error(f"Error in scheduled job {job_id}: {e}")
+                JobRunService.record(job_id, 'error', duration, 0, str(e), run_id=run_id)
     
     def daily_tender_scraping(self):
         """Run daily tender scraping"""
         try:
             logger.info("Starting daily tender scraping...")
             self.scraping_active = True
+            started_at = datetime.now()
             
-            # Scrape all municipalities
-            tenders = real_tender_scraper.scrape_all_municipalities()
+            # Resume an interrupted sweep, and start from each municipality's checkpoint:
+            # its saved page validators (so unchanged listings come back as not modified)
+            # and tender hashes (so only new or changed tenders are saved)
+            names = list(real_tender_scraper.municipal_configs)
+            run, done = ScrapeCheckpointService.start_run(names, self._config('SCRAPE_RESUME_HOURS', 12))
+            checkpoints = ScrapeCheckpointService.load(names)
+            real_tender_scraper.validators = ScrapeCheckpointService.page_validators(checkpoints)
+            if done:
+                logger.info(f"Resuming scrape run {run.id}: {len(done)} municipalities already done")
             
-            # Save to database
-            saved_count = 0
-            updated_count = 0
+            # Scrape the rest concurrently, saving each listing as it arrives
+            totals = {'found': 0, 'new': 0, 'updated': 0, 'unchanged': 0}
+            errors = 0
+            not_modified = 0
+            chunk_size = self._config('MUNICIPAL_INGEST_CHUNK_SIZE', 500)
+            
+            for result in real_tender_scraper.iter_sweep([name for name in names if name not in done]):
+                municipality = result['municipality']
+                for error in result['errors']:
+                    logger.warning(f"Error scraping {municipality}: {error}")
+                errors += len(result['errors'])
+                if result.get('invalid'):
+                    logger.warning(f"Skipped {result['invalid']} tenders from {municipality} with unreadable closing dates")
+                    errors += result['invalid']
+                
+                if result['not_modified']:
+                    not_modified += 1
+                    ScrapeCheckpointService.save(run, municipality, result)
+                    continue
+                
+                if not any(page['status'] == 'ok' for page in result['pages']):
+                    continue
+                
+                changed, tender_hashes, unchanged = ScrapeCheckpointService.diff(checkpoints.get(municipality), result)
+                totals['found'] += len(result['tenders'])
+                totals['unchanged'] += unchanged
+                
+                if changed:
+                    success, stats, message = MunicipalTenderIngestService.ingest(changed, chunk_size)
+                    errors += stats['invalid']
+                    if not success:
+                        logger.error(f"Error saving tenders from {municipality}: {message}")
+                        errors += 1
+                        continue
+                    for key in ('new', 'updated', 'unchanged'):
+                        totals[key] += stats[key]
+                
+                # Checkpoint only once the tenders are saved, so a crash re-scrapes this listing
+                ScrapeCheckpointService.save(run, municipality, result, tender_hashes)
+                real_tender_scraper.remember(result['pages'])
             
-            for tender in tenders:
-                try:
-                    if self.save_tender_to_database(tender):
-                        saved_count += 1
-                    else:
-                        updated_count += 1
-                except Exception as e:
-                    logger.error(f"Error saving tender {tender.get('tenderNumber', 'Unknown')}: {e}")
+            ScrapeCheckpointService.finish_run(run, errors)
             
             self.last_scrape_time = datetime.now()
-            self.total_scraped = len(tenders)
+            self.total_scraped = totals['found']
             self.scraping_active = False
             
             # Log scraping results
-            self.log_scraping_results(len(tenders), saved_count, updated_count)
+            self.log_scraping_results(
+                totals['found'], totals['new'], totals['updated'], totals['unchanged'],
+                errors=errors, started_at=started_at
+            )
             
-            logger.info(f"Daily scraping completed: {saved_count} new, {updated_count} updated")
+            logger.info(
+                f"Daily scraping completed: {totals['new']} new, {totals['updated']} updated, "
+                f"{totals['unchanged']} unchanged, {not_modified} listings not modified, {errors} errors"
+            )
             
-            return len(tenders)
+            return totals['found']
             
         except Exception as e:
             logger.error(f"Error in daily tender scraping: {e}")
             self.scraping_active = False
             return 0
     
+    def _config(self, key, default):
+        """App setting, or the default when the manager has no app"""
+        if self.app is not None:
+            return self.app.config.get(key, default)
+        return default
+    
     def save_tender_to_database(self, tender_data):
-        """Save scraped tender to database"""
-        try:
-            # Check if tender already exists
-            existing = db.session.execute(text("""
-                SELECT id FROM municipal_tenders 
-                WHERE tender_number = :tender_number
-            """), {'tender_number': tender_data['tenderNumber']}).fetchone()
-            
-            if existing:
-                # Update existing tender
-                db.session.execute(text("""
-                    UPDATE municipal_tenders SET
-                    municipality = :municipality,
-                    province = :province,
-                    title = :title,
-                    description = :description,
-                    category = :category,
-                    value = :value,
-                    closing_date = :closing_date,
-                    status = :status,
-                    requirements = :requirements,
-                    source_url = :source_url,
-                    scraped_at = NOW(),
-                    updated_at = NOW()
-                    WHERE tender_number = :tender_number
-                """), {
-                    'municipality': tender_data['municipality'],
-                    'province': tender_data['province'],
-                    'title': tender_data['title'],
-                    'description': tender_data.get('description', ''),
-                    'category': tender_data.get('category', ''),
-                    'value': tender_data.get('value', 0),
-                    'closing_date': tender_data.get('closingDate'),
-                    'status': tender_data.get('status', 'new'),
-                    'requirements': str(tender_data.get('requirements', [])),
-                    'source_url': tender_data.get('sourceUrl', ''),
-                    'tender_number': tender_data['tenderNumber']
-                })
-                
-                db.session.commit()
-                return False  # Updated existing
-                
-            else:
-                # Insert new tender
-                result = db.session.execute(text("""
-                    INSERT INTO municipal_tenders 
-                    (municipality, province, title, description, category, value, tender_number,
-                     published_date, closing_date, status, requirements, contact_person, 
-                     contact_email, source_url, scraped_at, created_at)
-                    VALUES 
-                    (:municipality, :province, :title, :description, :category, :value, :tender_number,
-                     :published_date, :closing_date, :status, :requirements, :contact_person,
-                     :contact_email, :source_url, NOW(), NOW())
-                """), {
-                    'municipality': tender_data['municipality'],
-                    'province': tender_data['province'],
-                    'title': tender_data['title'],
-                    'description': tender_data.get('description', ''),
-                    'category': tender_data.get('category', ''),
-                    'value': tender_data.get('value', 0),
-                    'tender_number': tender_data['tenderNumber'],
-                    'published_date': datetime.now().date(),
-                    'closing_date': tender_data.get('closingDate'),
-                    'status': tender_data.get('status', 'new'),
-                    'requirements': str(tender_data.get('requirements', [])),
-                    'contact_person': tender_data.get('contactInfo', {}).get('person', ''),
-                    'contact_email': tender_data.get('contactInfo', {}).get('email', ''),
-                    'source_url': tender_data.get('sourceUrl', '')
-                })
-                
-                db.session.commit()
-                return True  # New tender saved
-                
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error saving tender to database: {e}")
-            raise
+        """
+        Save one scraped tender to database
+        
+        Returns:
+            True if the tender is new, False if it already existed
+        """
+        success, stats, message = MunicipalTenderIngestService.ingest([tender_data])
+        if not success:
+            raise Exception(message)
+        if stats['invalid']:
+            raise ValueError(f"Invalid tender record: {tender_data.get('tenderNumber', 'Unknown')}")
+        return stats['new'] > 0
     
     def update_tender_status(self):
-        """Update tender statuses based on closing dates"""
-        try:
-            # Update urgent tenders (closing within 2 days)
-            db.session.execute(text("""
-                UPDATE municipal_tenders 
-                SET status = 'urgent'
-                WHERE closing_date BETWEEN NOW() AND DATE_ADD(NOW(), INTERVAL 2 DAY)
-                AND status != 'closed'
-            """))
-            
-            # Update closing tenders (closing within 7 days)
-            db.session.execute(text("""
-                UPDATE municipal_tenders 
-                SET status = 'closing'
-                WHERE closing_date BETWEEN DATE_ADD(NOW(), INTERVAL 2 DAY) AND DATE_ADD(NOW(), INTERVAL 7 DAY)
-                AND status != 'closed'
-                AND status != 'urgent'
-            """))
-            
-            # Close expired tenders
-            db.session.execute(text("""
-                UPDATE municipal_tenders 
-                SET status = 'closed'
-                WHERE closing_date < NOW()
-                AND status != 'closed'
-            """))
-            
-            db.session.commit()
-            logger.info("Tender statuses updated successfully")
-            
-        except Exception as e:
-            db.session.rollback()
-            logger.error(f"Error updating tender statuses: {e}")
+        """
+        Update tender statuses based on closing dates
+        
+        Returns:
+            Number of tenders whose status changed
+        """
+        success, stats, message = MunicipalTenderStatusService.apply_transitions()
+        if not success:
+            logger.error(message)
+            return 0
+        logger.info(f"Tender statuses updated: {stats['crossed']} crossed a closing window, "
+                    f"{stats['scraped']} newly scraped")
+        return stats['crossed'] + stats['scraped']
     
-    def log_scraping_results(self, total_found, new_saved, updated):
+    def log_scraping_results(self, total_found, new_saved, updated, unchanged=0, errors=0, started_at=None):
         """Log scraping results to database"""
         try:
             db.session.execute(text("""
                 INSERT INTO tender_scraping_log 
                 (scrape_started_at, scrape_completed_at, status, tenders_found, 
-                 new_tenders, updated_tenders, errors_encountered)
+                 new_tenders, updated_tenders, unchanged_tenders, errors_encountered)
                 VALUES 
-                (:started, NOW(), 'completed', :found, :new, :updated, 0)
+                (:started, :completed, 'completed', :found, :new, :updated, :unchanged, :errors)
             """), {
-                'started': self.last_scrape_time or datetime.now(),
+                'started': started_at or self.last_scrape_time or datetime.now(),
+                'completed': datetime.now(),
                 'found': total_found,
                 'new': new_saved,
-                'updated': updated
+                'updated': updated,
+                'unchanged': unchanged,
+                'errors': errors
             })
             
             db.session.commit()
             
         except Exception as e:
+            db.session.rollback()
             logger.error(f"Error logging scraping results: {e}")
     
     def get_scraping_status(self):
@@ -245,10 +244,8 @@ def get_scraping_status(self):
     def get_next_scheduled_scrape(self):
         """Get next scheduled scrape time"""
         try:
-            jobs = schedule.jobs
-            if jobs:
-                return min(job.next_run for job in jobs)
-            return None
+            job = self.scheduler.get_job('daily_municipal_scraping') if self.scheduler else None
+            return job.next_run_time if job else None
         except:
             return None
     
@@ -266,15 +263,16 @@ def manual_scrape_municipality(self, municipality_name):
             tenders = real_tender_scraper.scrape_municipality(municipality_name, config)
             
             # Save to database
-            saved_count = 0
-            for tender in tenders:
-                if self.save_tender_to_database(tender):
-                    saved_count += 1
+            success, stats, message = MunicipalTenderIngestService.ingest(tenders, self._config('MUNICIPAL_INGEST_CHUNK_SIZE', 500))
+            if not success:
+                return {'success': False, 'error': message}
             
             return {
                 'success': True,
                 'tenders_found': len(tenders),
-                'tenders_saved': saved_count
+                'tenders_saved': stats['new'],
+                'tenders_updated': stats['updated'],
+                'tenders_unchanged': stats['unchanged']
             }
             
         except Exception as e:
@@ -0,0 +1,418 @@
+"""
+Tender Search Service
+Full-text tender search served by an index instead of LIKE '%term%' scans:
+MySQL FULLTEXT indexes in production, an SQLite FTS5 table locally and in
+tests, and an in-process inverted index where neither is available
+
+Backends (TENDER_SEARCH_BACKEND):
+    auto      fulltext on MySQL, fts5 on SQLite builds that have it, else python
+    fulltext  MATCH ... AGAINST on the FULLTEXT indexes (see
+              database_scripts/04_create_tender_tables.sql); InnoDB keeps them
+              up to date on every write
+    fts5      tender_search_fts virtual table, created and backfilled on first
+              use and updated by index_tender / remove_tender
+    python    InvertedIndex built on first use and updated by index_tender /
+              remove_tender (one per process, so only for single-worker setups;
+              only the MAX_PYTHON_MATCHES best matches are returned)
+"""
+
+import bisect
+import math
+import re
+import threading
+from collections import defaultdict
+
+from flask import current_app, has_app_context
+from sqlalchemy import case, text
+
+from models import db, Tender
+
+
+# Searchable tender columns, and their weight when ranking
+SEARCH_COLUMNS = ['title', 'description', 'reference_number']
+COLUMN_WEIGHTS = {'title': 10.0, 'description': 1.0, 'reference_number': 5.0}
+
+# InnoDB ignores shorter words (innodb_ft_min_token_size), so they are
+# dropped everywhere to keep the backends consistent
+MIN_TOKEN_LENGTH = 3
+
+TOKEN_PATTERN = re.compile(r'\w+', re.UNICODE)
+
+FTS_TABLE = 'tender_search_fts'
+
+# Best matches the python backend hands to the database as an id list
+MAX_PYTHON_MATCHES = 10000
+
+
+def tokenize(value):
+    """Lower-case search tokens of a string"""
+    return [token for token in TOKEN_PATTERN.findall((value or '').lower()) if len(token) >= MIN_TOKEN_LENGTH]
+
+
+class InvertedIndex:
+    """
+    In-memory inverted index over tender text, ranked by weighted TF-IDF
+
+    Every query token is matched as a prefix, through a sorted vocabulary,
+    so 'resurf' finds 'resurfacing' as the FULLTEXT and FTS5 backends do.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.postings = defaultdict(dict)   # token -> {tender_id: weighted term frequency}
+        self.documents = {}                 # tender_id -> indexed tokens
+        self.vocabulary = []                # sorted tokens, for prefix lookups
+
+    def add(self, tender_id, fields):
+        """Index (or re-index) one tender from {column: text}"""
+        with self._lock:
+            self.remove(tender_id)
+            weights = defaultdict(float)
+            for column, value in fields.items():
+                for token in tokenize(value):
+                    weights[token] += COLUMN_WEIGHTS.get(column, 1.0)
+
+            for token, weight in weights.items():
+                if token not in self.postings:
+                    bisect.insort(self.vocabulary, token)
+                self.postings[token][tender_id] = weight
+            self.documents[tender_id] = set(weights)
+
+    def remove(self, tender_id):
+        """Drop one tender from the index"""
+        with self._lock:
+            document = self.documents.pop(tender_id, None)
+            if document is None:
+                return
+            for token in document:
+                postings = self.postings.get(token)
+                if postings is None:
+                    continue
+                postings.pop(tender_id, None)
+                if not postings:
+                    del self.postings[token]
+                    position = bisect.bisect_left(self.vocabulary, token)
+                    if position < len(self.vocabulary) and self.vocabulary[position] == token:
+                        del self.vocabulary[position]
+
+    def _expand(self, prefix):
+        """Indexed tokens starting with ``prefix``"""
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\uffff')
+        return self.vocabulary[start:end]
+
+    def search(self, tokens):
+        """
+        Tender ids matching every token (as a prefix), best match first
+
+        Args:
+            tokens: Query tokens from tokenize()
+
+        Returns:
+            List of tender ids
+        """
+        with self._lock:
+            total = max(len(self.documents), 1)
+            scores = None
+            for token in tokens:
+                token_scores = defaultdict(float)
+                for term in self._expand(token):
+                    postings = self.postings[term]
+                    idf = math.log(1 + total / len(postings))
+                    for tender_id, weight in postings.items():
+                        token_scores[tender_id] += weight * idf
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {tender_id: score + token_scores[tender_id]
+                              for tender_id, score in scores.items() if tender_id in token_scores}
+                if not scores:
+                    return []
+            return sorted(scores, key=lambda tender_id: (-scores[tender_id], -tender_id))
+
+
+class TenderSearchService:
+    """Service for indexed tender search"""
+
+    # Python backend indexes, per database URL: {'all': InvertedIndex, 'title': InvertedIndex}
+    _indexes = {}
+    # Database URLs whose FTS5 table exists and has been backfilled
+    _fts_ready = set()
+    _lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Backends
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def backend():
+        """Search backend for the current database: 'fulltext', 'fts5' or 'python'"""
+        configured = 'auto'
+        if has_app_context():
+            configured = current_app.config.get('TENDER_SEARCH_BACKEND', 'auto')
+        if configured != 'auto':
+            return configured
+
+        dialect = db.engine.dialect.name
+        if dialect == 'mysql':
+            return 'fulltext'
+        if dialect == 'sqlite' and TenderSearchService._fts5_available():
+            return 'fts5'
+        return 'python'
+
+    @staticmethod
+    def _fts5_available():
+        """Whether this SQLite build has the FTS5 extension"""
+        url = str(db.engine.url)
+        if url in TenderSearchService._fts_ready:
+            return True
+        try:
+            options = db.session.execute(text("PRAGMA compile_options")).fetchall()
+            return any(option[0] == 'ENABLE_FTS5' for option in options)
+        except Exception:
+            return False
+
+    @staticmethod
+    def boolean_query(search_term):
+        """
+        MySQL BOOLEAN MODE query requiring every word as a prefix ('+road* +resurf*')
+
+        Returns:
+            Query string, or None when the term has no indexable words
+        """
+        tokens = tokenize(search_term)
+        return ' '.join(f'+{token}*' for token in tokens) if tokens else None
+
+    @staticmethod
+    def _fts_query(tokens, title_only=False):
+        """FTS5 MATCH expression requiring every token as a prefix"""
+        column = 'title : ' if title_only else ''
+        return ' AND '.join(f'{column}"{token}"*' for token in tokens)
+
+    # ------------------------------------------------------------------
+    # Index maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def ensure_index():
+        """Create and backfill the local index for the fts5 / python backends"""
+        backend = TenderSearchService.backend()
+        if backend == 'fts5':
+            TenderSearchService._ensure_fts()
+        elif backend == 'python':
+            TenderSearchService._python_indexes()
+        return backend
+
+    @staticmethod
+    def _ensure_fts():
+        url = str(db.engine.url)
+        if url in TenderSearchService._fts_ready:
+            return
+        with TenderSearchService._lock:
+            if url in TenderSearchService._fts_ready:
+                return
+            exists = db.session.execute(text(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"
+            ), {'name': FTS_TABLE}).first()
+            if not exists:
+                db.session.execute(text(f"""
+                    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+                        title, description, reference_number,
+                        tokenize = 'unicode61'
+                    )
+                """))
+                db.session.execute(text(f"""
+                    INSERT INTO {FTS_TABLE} (rowid, title, description, reference_number)
+                    SELECT id, title, COALESCE(description, ''), reference_number FROM tenders
+                """))
+                db.session.commit()
+            TenderSearchService._fts_ready.add(url)
+
+    @staticmethod
+    def _python_indexes():
+        url = str(db.engine.url)
+        indexes = TenderSearchService._indexes.get(url)
+        if indexes is not None:
+            return indexes
+        with TenderSearchService._lock:
+            indexes = TenderSearchService._indexes.get(url)
+            if indexes is None:
+                indexes = {'all': InvertedIndex(), 'title': InvertedIndex()}
+                rows = db.session.query(
+                    Tender.id, Tender.title, Tender.description, Tender.reference_number
+                ).yield_per(1000)
+                for row in rows:
+                    TenderSearchService._add_to_indexes(indexes, row)
+                TenderSearchService._indexes[url] = indexes
+        return indexes
+
+    @staticmethod
+    def _add_to_indexes(indexes, tender):
+        indexes['all'].add(tender.id, {column: getattr(tender, column) for column in SEARCH_COLUMNS})
+        indexes['title'].add(tender.id, {'title': tender.title})
+
+    @staticmethod
+    def index_tender(tender):
+        """
+        Add or refresh one tender in the search index after it is saved
+
+        Args:
+            tender: Committed Tender object
+
+        Returns:
+            True if the index is up to date
+        """
+        try:
+            backend = TenderSearchService.backend()
+            if backend == 'fts5':
+                TenderSearchService._ensure_fts()
+                db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': tender.id})
+                db.session.execute(text(f"""
+                    INSERT INTO {FTS_TABLE} (rowid, title, description, reference_number)
+                    VALUES (:id, :title, :description, :reference_number)
+                """), {
+                    'id': tender.id,
+                    'title': tender.title,
+                    'description': tender.description or '',
+                    'reference_number': tender.reference_number
+                })
+                db.session.commit()
+            elif backend == 'python':
+                TenderSearchService._add_to_indexes(TenderSearchService._python_indexes(), tender)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error indexing tender {tender.id} for search: {e}")
+            return False
+
+    @staticmethod
+    def remove_tender(tender_id):
+        """Drop a deleted tender from the search index"""
+        try:
+            backend = TenderSearchService.backend()
+            if backend == 'fts5':
+                TenderSearchService._ensure_fts()
+                db.session.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {'id': tender_id})
+                db.session.commit()
+            elif backend == 'python':
+                for index in TenderSearchService._python_indexes().values():
+                    index.remove(tender_id)
+            return True
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error removing tender {tender_id} from search: {e}")
+            return False
+
+    # ------------------------------------------------------------------
+    # Searching
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def filter_query(query, search_term, title_only=False, ranked=False):
+        """
+        Restrict a Tender query to tenders matching ``search_term``
+
+        Every word must match, as a prefix, in the title, description or
+        reference number (only the title with ``title_only``). Terms with no
+        indexable words (all shorter than MIN_TOKEN_LENGTH) fall back to a
+        LIKE match.
+
+        Args:
+            query: Tender query
+            search_term: Text typed by the user
+            title_only: Search titles only
+            ranked: Also order by relevance, best first
+
+        Returns:
+            Filtered query
+        """
+        tokens = tokenize(search_term)
+        if not tokens:
+            if title_only:
+                return query.filter(Tender.title.contains(search_term))
+            return query.filter(
+                Tender.title.contains(search_term) |
+                Tender.description.contains(search_term) |
+                Tender.reference_number.contains(search_term)
+            )
+
+        backend = TenderSearchService.ensure_index()
+
+        if backend == 'fulltext':
+            columns = 'tenders.title' if title_only else 'tenders.title, tenders.description, tenders.reference_number'
+            match = f"MATCH ({columns}) AGAINST (:search_query IN BOOLEAN MODE)"
+            search_query = TenderSearchService.boolean_query(search_term)
+            query = query.filter(text(match).bindparams(search_query=search_query))
+            if ranked:
+                query = query.order_by(text(f"{match} DESC").bindparams(search_query=search_query))
+            return query
+
+        if backend == 'fts5':
+            weights = ', '.join(str(COLUMN_WEIGHTS[column]) for column in SEARCH_COLUMNS)
+            matches = text(f"""
+                SELECT rowid AS tender_id, bm25({FTS_TABLE}, {weights}) AS search_rank
+                FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :search_query
+            """).bindparams(search_query=TenderSearchService._fts_query(tokens, title_only))
+            matches = matches.columns(tender_id=db.Integer, search_rank=db.Float).subquery()
+            query = query.join(matches, matches.c.tender_id == Tender.id)
+            if ranked:
+                query = query.order_by(matches.c.search_rank, Tender.id.desc())
+            return query
+
+        indexes = TenderSearchService._python_indexes()
+        ids = indexes['title' if title_only else 'all'].search(tokens)[:MAX_PYTHON_MATCHES]
+        query = query.filter(Tender.id.in_(ids))
+        if ranked and ids:
+            query = query.order_by(case({tender_id: position for position, tender_id in enumerate(ids)},
+                                        value=Tender.id))
+        return query
+
+    @staticmethod
+    def sql_condition(search_term, id_column='id'):
+        """
+        Raw-SQL condition on the tenders table for code that builds its own SQL
+
+        Args:
+            search_term: Text typed by the user
+            id_column: Tender id column in the caller's query
+
+        Returns:
+            Tuple (sql: str, params: dict), or (None, {}) when the term has
+            no indexable words
+        """
+        tokens = tokenize(search_term)
+        if not tokens:
+            return None, {}
+
+        backend = TenderSearchService.ensure_index()
+        if backend == 'fulltext':
+            return ("MATCH (title, description, reference_number) AGAINST (:search_query IN BOOLEAN MODE)",
+                    {'search_query': TenderSearchService.boolean_query(search_term)})
+        if backend == 'fts5':
+            return (f"{id_column} IN (SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :search_query)",
+                    {'search_query': TenderSearchService._fts_query(tokens)})
+
+        ids = TenderSearchService._python_indexes()['all'].search(tokens)[:MAX_PYTHON_MATCHES]
+        if not ids:
+            return '1 = 0', {}
+        return f"{id_column} IN ({', '.join(str(int(tender_id)) for tender_id in ids)})", {}
+
+    @staticmethod
+    def search(search_term, company_id=None, limit=50):
+        """
+        Tenders matching ``search_term``, best match first
+
+        Args:
+            search_term: Text typed by the user
+            company_id: Optional company to restrict results to
+            limit: Maximum number of tenders
+
+        Returns:
+            List of Tender objects
+        """
+        query = Tender.query
+        if company_id:
+            query = query.filter(Tender.company_id == company_id)
+        return TenderSearchService.filter_query(query, search_term, ranked=True).limit(limit).all()
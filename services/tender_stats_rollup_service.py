@@ -0,0 +1,505 @@
+"""
+Tender Stats Rollup Service
+Maintains the tender_stats_rollup table and answers tender statistics from it
+"""
+
+import json
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation
+
+from sqlalchemy import func
+
+from models import db, Tender, TenderStatus, TenderCategory, TenderStatsRollup, ProcessingWatermark
+
+
+# Status names counted as won / lost in the rollup
+WON_STATUS_NAMES = ['Awarded', 'Completed', 'Won']
+LOST_STATUS_NAMES = ['Lost', 'Cancelled']
+
+# Custom field holding a tender's estimated value
+ESTIMATED_VALUE_FIELD = 'estimated_value'
+
+# processing_watermarks rows recording that a scope's rollup was built
+WATERMARK_PREFIX = 'tender_stats_rollup'
+
+
+class TenderStatsRollupService:
+    """Service for the per-company tender statistics rollup"""
+
+    # Scopes this process has seen built (see _ensure_built)
+    _built_scopes = set()
+
+    # ------------------------------------------------------------------
+    # Maintenance
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def month_start(value):
+        """First day of the month containing ``value``"""
+        return date(value.year, value.month, 1)
+
+    @staticmethod
+    def bucket_key(tender):
+        """
+        Rollup bucket a tender is counted in
+
+        Args:
+            tender: Tender object
+
+        Returns:
+            Tuple (company_id, status_id, category_id, period_month) or None
+        """
+        if tender is None or not tender.created_at:
+            return None
+        return (
+            tender.company_id,
+            tender.status_id,
+            tender.category_id,
+            TenderStatsRollupService.month_start(tender.created_at)
+        )
+
+    @staticmethod
+    def refresh_buckets(*keys):
+        """
+        Recompute the given buckets from their tenders after a tender write
+
+        Called with the tender's bucket before and after the change, so a
+        status, category or delete moves the tender out of its old bucket.
+
+        Args:
+            keys: Bucket keys from bucket_key (None entries are ignored)
+
+        Returns:
+            Tuple (success: bool, message: str)
+        """
+        try:
+            outcome_ids = TenderStatsRollupService._outcome_status_ids()
+            for key in set(k for k in keys if k):
+                TenderStatsRollupService._refresh_bucket(key, outcome_ids)
+
+            db.session.commit()
+            return True, "Tender stats updated"
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error updating tender stats rollup: {e}")
+            return False, str(e)
+
+    @staticmethod
+    def watermark_name(company_id=None):
+        """Name of the processing watermark recording that a scope (None for all companies) was built"""
+        if company_id:
+            return f"{WATERMARK_PREFIX}:company:{company_id}"
+        return f"{WATERMARK_PREFIX}:all"
+
+    @staticmethod
+    def rebuild(company_id=None):
+        """
+        Rebuild the rollup from the tenders table
+
+        Records the rebuild in processing_watermarks, so the scope is not
+        built again on first read.
+
+        Args:
+            company_id: Company to rebuild (None rebuilds every company)
+
+        Returns:
+            Tuple (success: bool, bucket_count: int, message: str)
+        """
+        try:
+            outcome_ids = TenderStatsRollupService._outcome_status_ids()
+
+            query = db.session.query(
+                Tender.company_id,
+                Tender.status_id,
+                Tender.category_id,
+                Tender.created_at,
+                Tender.submission_deadline,
+                Tender.custom_fields
+            ).filter(Tender.created_at.isnot(None))
+
+            if company_id:
+                query = query.filter(Tender.company_id == company_id)
+
+            buckets = {}
+            for row in query.yield_per(1000):
+                key = (
+                    row.company_id,
+                    row.status_id,
+                    row.category_id,
+                    TenderStatsRollupService.month_start(row.created_at)
+                )
+                if key not in buckets:
+                    buckets[key] = TenderStatsRollupService._empty_totals()
+                TenderStatsRollupService._accumulate(buckets[key], row, outcome_ids)
+
+            delete_query = TenderStatsRollup.query
+            if company_id:
+                delete_query = delete_query.filter(TenderStatsRollup.company_id == company_id)
+            delete_query.delete(synchronize_session=False)
+
+            now = datetime.utcnow()
+            db.session.bulk_insert_mappings(TenderStatsRollup, [
+                dict(
+                    company_id=key[0],
+                    status_id=key[1],
+                    category_id=key[2],
+                    period_month=key[3],
+                    updated_at=now,
+                    **totals
+                )
+                for key, totals in buckets.items()
+            ])
+
+            db.session.merge(ProcessingWatermark(
+                name=TenderStatsRollupService.watermark_name(company_id), watermark_at=now
+            ))
+
+            db.session.commit()
+            TenderStatsRollupService._built_scopes.add((str(db.engine.url), company_id))
+            return True, len(buckets), f"Rebuilt {len(buckets)} tender stats buckets"
+
+        except Exception as e:
+            db.session.rollback()
+            print(f"Error rebuilding tender stats rollup: {e}")
+            return False, 0, str(e)
+
+    @staticmethod
+    def _refresh_bucket(key, outcome_ids):
+        company_id, status_id, category_id, period_month = key
+        start = datetime(period_month.year, period_month.month, 1)
+        if period_month.month == 12:
+            end = datetime(period_month.year + 1, 1, 1)
+        else:
+            end = datetime(period_month.year, period_month.month + 1, 1)
+
+        rows = db.session.query(
+            Tender.submission_deadline,
+            Tender.created_at,
+            Tender.custom_fields,
+            Tender.status_id
+        ).filter(
+            Tender.company_id == company_id,
+            Tender.status_id == status_id,
+            Tender.category_id == category_id,
+            Tender.created_at >= start,
+            Tender.created_at < end
+        ).all()
+
+        bucket = TenderStatsRollup.query.filter_by(
+            company_id=company_id,
+            status_id=status_id,
+            category_id=category_id,
+            period_month=period_month
+        ).first()
+
+        if not rows:
+            if bucket:
+                db.session.delete(bucket)
+            return
+
+        if not bucket:
+            bucket = TenderStatsRollup(
+                company_id=company_id,
+                status_id=status_id,
+                category_id=category_id,
+                period_month=period_month
+            )
+            db.session.add(bucket)
+
+        totals = TenderStatsRollupService._empty_totals()
+        for row in rows:
+            TenderStatsRollupService._accumulate(totals, row, outcome_ids)
+
+        for name, value in totals.items():
+            setattr(bucket, name, value)
+
+    @staticmethod
+    def _outcome_status_ids():
+        won_ids, lost_ids = set(), set()
+        for status_id, name in db.session.query(TenderStatus.id, TenderStatus.name).all():
+            if name in WON_STATUS_NAMES:
+                won_ids.add(status_id)
+            elif name in LOST_STATUS_NAMES:
+                lost_ids.add(status_id)
+        return won_ids, lost_ids
+
+    @staticmethod
+    def _empty_totals():
+        return {
+            'tender_count': 0,
+            'won_count': 0,
+            'lost_count': 0,
+            'valued_count': 0,
+            'value_sum': Decimal('0'),
+            'value_min': None,
+            'value_max': None,
+            'duration_days_sum': 0,
+            'duration_count': 0
+        }
+
+    @staticmethod
+    def _accumulate(totals, row, outcome_ids):
+        won_ids, lost_ids = outcome_ids
+
+        totals['tender_count'] += 1
+        if row.status_id in won_ids:
+            totals['won_count'] += 1
+        elif row.status_id in lost_ids:
+            totals['lost_count'] += 1
+
+        value = TenderStatsRollupService.estimated_value(row.custom_fields)
+        if value is not None:
+            totals['valued_count'] += 1
+            totals['value_sum'] += value
+            if totals['value_min'] is None or value < totals['value_min']:
+                totals['value_min'] = value
+            if totals['value_max'] is None or value > totals['value_max']:
+                totals['value_max'] = value
+
+        if row.submission_deadline and row.created_at:
+            duration = (row.submission_deadline - row.created_at).days
+            if duration > 0:
+                totals['duration_days_sum'] += duration
+                totals['duration_count'] += 1
+
+    @staticmethod
+    def estimated_value(custom_fields):
+        """
+        Parse the estimated value custom field of a tender
+
+        Args:
+            custom_fields: Tender.custom_fields JSON string
+
+        Returns:
+            Decimal or None if the tender has no usable estimated value
+        """
+        if not custom_fields or ESTIMATED_VALUE_FIELD not in custom_fields:
+            return None
+        try:
+            raw = json.loads(custom_fields).get(ESTIMATED_VALUE_FIELD)
+            if raw in (None, ''):
+                return None
+            cleaned = str(raw).replace('R', '').replace(',', '').replace(' ', '')
+            return Decimal(cleaned)
+        except (ValueError, TypeError, AttributeError, InvalidOperation):
+            return None
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _scoped(query, company_id=None, start_month=None, end_month=None):
+        TenderStatsRollupService._ensure_built(company_id)
+
+        if company_id:
+            query = query.filter(TenderStatsRollup.company_id == company_id)
+        if start_month:
+            query = query.filter(TenderStatsRollup.period_month >= TenderStatsRollupService.month_start(start_month))
+        if end_month:
+            query = query.filter(TenderStatsRollup.period_month <= TenderStatsRollupService.month_start(end_month))
+        return query
+
+    @staticmethod
+    def _ensure_built(company_id):
+        """
+        Build the rollup on first use unless a rebuild of the scope (or of
+        every company) is recorded in processing_watermarks
+
+        Buckets alone do not show that a scope was built: on an existing
+        database the first tender write creates a bucket for that tender only.
+        """
+        key = (str(db.engine.url), company_id)
+        if key in TenderStatsRollupService._built_scopes:
+            return
+
+        names = {TenderStatsRollupService.watermark_name(None), TenderStatsRollupService.watermark_name(company_id)}
+        built = db.session.query(ProcessingWatermark.name).filter(
+            ProcessingWatermark.name.in_(names)
+        ).first() is not None
+
+        if built or TenderStatsRollupService.rebuild(company_id)[0]:
+            TenderStatsRollupService._built_scopes.add(key)
+
+    @staticmethod
+    def get_status_breakdown(company_id=None, start_month=None, end_month=None):
+        """
+        Tender counts per status
+
+        Args:
+            company_id: Company ID (None for all companies)
+            start_month: Optional first month (date/datetime) to include
+            end_month: Optional last month (date/datetime) to include
+
+        Returns:
+            List of dicts with id, name, color, count, won and lost
+        """
+        query = db.session.query(
+            TenderStatus.id,
+            TenderStatus.name,
+            TenderStatus.color,
+            func.sum(TenderStatsRollup.tender_count),
+            func.sum(TenderStatsRollup.won_count),
+            func.sum(TenderStatsRollup.lost_count)
+        ).join(TenderStatus, TenderStatsRollup.status_id == TenderStatus.id)
+
+        query = TenderStatsRollupService._scoped(query, company_id, start_month, end_month)
+        rows = query.group_by(TenderStatus.id, TenderStatus.name, TenderStatus.color).all()
+
+        return [
+            {
+                'id': status_id,
+                'name': name,
+                'color': color,
+                'count': int(count or 0),
+                'won': int(won or 0),
+                'lost': int(lost or 0)
+            }
+            for status_id, name, color, count, won, lost in rows
+        ]
+
+    @staticmethod
+    def get_status_category_breakdown(company_id=None, start_month=None, end_month=None):
+        """
+        Tender counts and durations per status and category
+
+        Args:
+            company_id: Company ID (None for all companies)
+            start_month: Optional first month to include
+            end_month: Optional last month to include
+
+        Returns:
+            List of dicts with status_id, status_name, status_color, category,
+            count, won, lost, duration_days_sum and duration_count
+        """
+        query = db.session.query(
+            TenderStatus.id,
+            TenderStatus.name,
+            TenderStatus.color,
+            TenderCategory.name,
+            func.sum(TenderStatsRollup.tender_count),
+            func.sum(TenderStatsRollup.won_count),
+            func.sum(TenderStatsRollup.lost_count),
+            func.sum(TenderStatsRollup.duration_days_sum),
+            func.sum(TenderStatsRollup.duration_count)
+        ).join(
+            TenderStatus, TenderStatsRollup.status_id == TenderStatus.id
+        ).join(
+            TenderCategory, TenderStatsRollup.category_id == TenderCategory.id
+        )
+
+        query = TenderStatsRollupService._scoped(query, company_id, start_month, end_month)
+        rows = query.group_by(
+            TenderStatus.id, TenderStatus.name, TenderStatus.color, TenderCategory.name
+        ).all()
+
+        return [
+            {
+                'status_id': row[0],
+                'status_name': row[1],
+                'status_color': row[2],
+                'category': row[3],
+                'count': int(row[4] or 0),
+                'won': int(row[5] or 0),
+                'lost': int(row[6] or 0),
+                'duration_days_sum': int(row[7] or 0),
+                'duration_count': int(row[8] or 0)
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def get_category_breakdown(company_id=None, start_month=None, end_month=None, limit=None):
+        """
+        Tender counts, values and outcomes per category, largest first
+
+        Args:
+            company_id: Company ID (None for all companies)
+            start_month: Optional first month to include
+            end_month: Optional last month to include
+            limit: Optional maximum number of categories
+
+        Returns:
+            List of dicts with category, count, total_value, won and lost
+        """
+        tender_count = func.sum(TenderStatsRollup.tender_count)
+        query = db.session.query(
+            TenderCategory.name,
+            tender_count,
+            func.sum(TenderStatsRollup.value_sum),
+            func.sum(TenderStatsRollup.won_count),
+            func.sum(TenderStatsRollup.lost_count)
+        ).join(TenderCategory, TenderStatsRollup.category_id == TenderCategory.id)
+
+        query = TenderStatsRollupService._scoped(query, company_id, start_month, end_month)
+        query = query.group_by(TenderCategory.name).order_by(tender_count.desc())
+        if limit:
+            query = query.limit(limit)
+
+        return [
+            {
+                'category': name,
+                'count': int(count or 0),
+                'total_value': Decimal(total_value or 0),
+                'won': int(won or 0),
+                'lost': int(lost or 0)
+            }
+            for name, count, total_value, won, lost in query.all()
+        ]
+
+    @staticmethod
+    def get_monthly_breakdown(company_id=None, start_month=None, end_month=None):
+        """
+        Tender counts per creation month
+
+        Args:
+            company_id: Company ID (None for all companies)
+            start_month: Optional first month to include
+            end_month: Optional last month to include
+
+        Returns:
+            Dictionary {'YYYY-MM': count} in month order
+        """
+        query = db.session.query(
+            TenderStatsRollup.period_month,
+            func.sum(TenderStatsRollup.tender_count)
+        )
+
+        query = TenderStatsRollupService._scoped(query, company_id, start_month, end_month)
+        rows = query.group_by(TenderStatsRollup.period_month).order_by(TenderStatsRollup.period_month).all()
+
+        return {period_month.strftime('%Y-%m'): int(count or 0) for period_month, count in rows}
+
+    @staticmethod
+    def get_value_statistics(company_id=None, start_month=None, end_month=None):
+        """
+        Estimated value totals for tenders that have one
+
+        Args:
+            company_id: Company ID (None for all companies)
+            start_month: Optional first month to include
+            end_month: Optional last month to include
+
+        Returns:
+            Dictionary with total_value, average_value, max_value, min_value
+            and valued_count (values are Decimal or None)
+        """
+        query = db.session.query(
+            func.sum(TenderStatsRollup.value_sum),
+            func.sum(TenderStatsRollup.valued_count),
+            func.max(TenderStatsRollup.value_max),
+            func.min(TenderStatsRollup.value_min)
+        )
+
+        query = TenderStatsRollupService._scoped(query, company_id, start_month, end_month)
+        total_value, valued_count, max_value, min_value = query.one()
+        valued_count = int(valued_count or 0)
+
+        return {
+            'total_value': Decimal(total_value) if valued_count else None,
+            'average_value': Decimal(total_value) / valued_count if valued_count else None,
+            'max_value': Decimal(max_value) if max_value is not None else None,
+            'min_value': Decimal(min_value) if min_value is not None else None,
+            'valued_count': valued_count
+        }
@@ -7,9 +7,16 @@
     db, Tender, TenderAssignment, TenderWorkflow, TenderDocument,
     TenderComment, TenderActivity, User
 )
+from services.cache_service import CacheService
+from services.tender_autocomplete_service import TenderAutocompleteService
 from datetime import datetime
 import json
 from flask import session, request
+from sqlalchemy import func
+
+
+# Seconds the pending-approvals badge count may be served from cache
+PENDING_APPROVALS_CACHE_TTL = 30
 
 
 class TenderWorkflowService:
@@ -67,6 +74,8 @@ def assign_tender(tender_id, assigned_to_id, assigned_by_id, due_date=None, note
             
             db.session.commit()
             
+            TenderAutocompleteService.assignments_changed(tender.company_id)
+            
             return (True, "Tender assigned successfully")
             
         except Exception as e:
@@ -168,6 +177,10 @@ def submit_for_approval(tender_id, user_id):
             
             db.session.commit()
             
+            TenderWorkflowService.invalidate_pending_approvals_count(workflow.tender_id)
+            if current_assignment:
+                TenderWorkflowService.invalidate_visible_tenders(workflow.tender_id)
+            
             return (True, "Tender submitted for approval and reassigned to admin")
             
         except Exception as e:
@@ -214,6 +227,8 @@ def approve_tender(tender_id, user_id, notes=None):
             
             db.session.commit()
             
+            TenderWorkflowService.invalidate_pending_approvals_count(workflow.tender_id)
+            
             return (True, "Tender approved successfully")
             
         except Exception as e:
@@ -280,6 +295,10 @@ def reject_tender(tender_id, user_id, notes=None):
             
             db.session.commit()
             
+            TenderWorkflowService.invalidate_pending_approvals_count(workflow.tender_id)
+            if current_assignment:
+                TenderWorkflowService.invalidate_visible_tenders(workflow.tender_id)
+            
             return (True, "Tender rejected and reassigned to user")
             
         except Exception as e:
@@ -551,6 +570,67 @@ def get_pending_approvals(company_id):
             print(f"Error getting pending approvals: {e}")
             return []
     
+    @staticmethod
+    def count_pending_approvals(company_id, use_cache=True):
+        """
+        Count tenders pending approval for a company without loading them
+        
+        Args:
+            company_id: Company ID
+            use_cache: Whether a recently cached count may be returned
+        
+        Returns:
+            Number of pending tenders
+        """
+        def load_count():
+            return db.session.query(func.count(TenderWorkflow.id)).join(Tender).filter(
+                Tender.company_id == company_id,
+                TenderWorkflow.status == 'pending_approval'
+            ).scalar() or 0
+        
+        try:
+            if not use_cache:
+                return load_count()
+            
+            return CacheService.get_or_load(
+                'pending_approvals', company_id, 'count', load_count,
+                ttl=PENDING_APPROVALS_CACHE_TTL
+            )
+            
+        except Exception as e:
+            print(f"Error counting pending approvals: {e}")
+            return 0
+    
+    @staticmethod
+    def invalidate_pending_approvals_count(tender_id):
+        """
+        Drop the cached pending-approvals count for a tender's company
+        
+        Args:
+            tender_id: Tender whose workflow status changed
+        """
+        try:
+            company_id = db.session.query(Tender.company_id).filter(Tender.id == tender_id).scalar()
+            if company_id:
+                CacheService.delete('pending_approvals', company_id, 'count')
+        except Exception as e:
+            print(f"Error invalidating pending approvals count: {e}")
+    
+    @staticmethod
+    def invalidate_visible_tenders(tender_id):
+        """
+        Refresh the tenders autocomplete suggests to users after a tender's assignments changed
+        
+        Args:
+            tender_id: Tender that was reassigned
+        """
+        try:
+            company_id = db.session.query(Tender.company_id).filter(Tender.id == tender_id).scalar()
+            if company_id:
+                TenderAutocompleteService.assignments_changed(company_id)
+        except Exception as e:
+            print(f"Error invalidating visible tenders: {e}")
+    
     @staticmethod
     def get_workflow_statistics(company_id):
         """
@@ -573,8 +653,6 @@ def get_workflow_statistics(company_id):
             }
             
             # Count tenders by status
-            from sqlalchemy import func
-            
             results = db.session.query(
                 TenderWorkflow.status,
                 func.count(TenderWorkflow.id)
@@ -22,7 +22,7 @@ Group=www-data
 WorkingDirectory=/var/www/tms
 Environment="PATH=/var/www/tms/venv/bin"
 Environment="FLASK_ENV=production"
-ExecStart=/var/www/tms/venv/bin/gunicorn --workers 3 --bind 127.0.0.1:5001 --timeout 120 app:app
+ExecStart=/var/www/tms/venv/bin/gunicorn --workers 3 --bind 127.0.0.1:5001 --timeout 120 wsgi:app
 Restart=always
 RestartSec=10
 
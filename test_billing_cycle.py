@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+Tests for the batch monthly billing cycle
+
+Runs BillingService.run_billing_cycle against a throwaway SQLite database and
+checks bill totals, custom pricing, idempotency and resuming a partial run.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from conftest import temporary_database
+from models import (
+    db, Company, User, Role, ModuleDefinition, CompanyModule, CompanyModulePricing,
+    MonthlyBill, BillLineItem
+)
+from services.billing_service import BillingService
+
+COMPANY_COUNT = 12
+
+
+@pytest.fixture()
+def billing_db():
+    """Point the app at a temporary database with priced modules"""
+    with temporary_database(_seed) as ids:
+        yield ids
+
+
+def _seed():
+    role = Role(name='Super Admin')
+    admin = User(username='root', email='root@example.com', first_name='Root',
+                 last_name='Admin', role=role, is_super_admin=True)
+    admin.set_password('password')
+    db.session.add_all([role, admin])
+
+    modules = [
+        ModuleDefinition(module_name=f'module_{i}', display_name=f'Module {i}', sort_order=i, monthly_price=100 * (i + 1))
+        for i in range(3)
+    ]
+    companies = [Company(name=f'Company {i}', email=f'company{i}@example.com') for i in range(COMPANY_COUNT)]
+    companies.append(Company(name='Dormant', email='dormant@example.com', is_active=False))
+    companies.append(Company(name='No Modules', email='empty@example.com'))
+    db.session.add_all(modules + companies)
+    db.session.flush()
+
+    for company in companies[:COMPANY_COUNT + 1]:
+        for module in modules[:2]:
+            db.session.add(CompanyModule(company_id=company.id, module_id=module.id, is_enabled=True))
+
+    # Company 0 pays a negotiated price for module 1 (the newest price wins)
+    db.session.add(CompanyModulePricing(company_id=companies[0].id, module_id=modules[1].id, custom_price=50,
+                                        created_by=admin.id, notes='Old deal',
+                                        effective_date=datetime.utcnow() - timedelta(days=10)))
+    db.session.add(CompanyModulePricing(company_id=companies[0].id, module_id=modules[1].id, custom_price=75,
+                                        created_by=admin.id, notes='Annual deal'))
+    db.session.commit()
+    return {'admin_id': admin.id, 'company_ids': [company.id for company in companies]}
+
+
+def test_cycle_bills_every_active_company_with_modules(billing_db):
+    success, stats, message = BillingService.run_billing_cycle(2026, 3, chunk_size=5)
+
+    assert success, message
+    assert stats['created'] == COMPANY_COUNT
+    assert stats['skipped_empty'] == 1
+    assert stats['chunks'] == 3
+    assert stats['line_items'] == COMPANY_COUNT * 2
+
+    bills = {bill.company_id: bill for bill in MonthlyBill.query.filter_by(bill_year=2026, bill_month=3)}
+    assert set(bills) == set(billing_db['company_ids'][:COMPANY_COUNT])
+
+    custom_bill = bills[billing_db['company_ids'][0]]
+    assert float(custom_bill.total_amount) == 175.0
+    custom_line = next(line for line in custom_bill.line_items if line.is_custom_price)
+    assert float(custom_line.line_total) == 75.0
+    assert custom_line.pricing_notes == 'Annual deal'
+
+    assert float(bills[billing_db['company_ids'][1]].total_amount) == 300.0
+    assert stats['total_amount'] == pytest.approx(175.0 + 300.0 * (COMPANY_COUNT - 1))
+
+
+def test_cycle_is_idempotent_and_resumes(billing_db):
+    BillingService.run_billing_cycle(2026, 4)
+
+    # Lose the later half of the run, as if it had stopped part way
+    for bill in MonthlyBill.query.filter(MonthlyBill.company_id.in_(billing_db['company_ids'][6:])).all():
+        db.session.delete(bill)
+    db.session.commit()
+
+    success, stats, message = BillingService.run_billing_cycle(2026, 4)
+    assert success, message
+    assert stats['skipped_existing'] == 6
+    assert stats['created'] == COMPANY_COUNT - 6
+
+    success, stats, message = BillingService.run_billing_cycle(2026, 4)
+    assert success, message
+    assert stats['created'] == 0
+    assert MonthlyBill.query.count() == COMPANY_COUNT
+    assert BillLineItem.query.count() == COMPANY_COUNT * 2
+
+
+def test_single_bill_reports_existing_period(billing_db):
+    company_id = billing_db['company_ids'][0]
+    admin_id = billing_db['admin_id']
+
+    assert BillingService.generate_monthly_bill(company_id, 2026, 5, admin_id)[0]
+    assert BillingService.generate_monthly_bill(company_id, 2026, 5, admin_id) == (
+        False, 'Bill already exists for this period'
+    )
+
+
+def test_summary_reports_latest_bills_in_one_query(billing_db):
+    BillingService.run_billing_cycle(2026, 6)
+    BillingService.run_billing_cycle(2026, 7)
+    latest = MonthlyBill.query.filter_by(company_id=billing_db['company_ids'][0], bill_month=7).one()
+    latest.status = 'sent'
+    db.session.commit()
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    event.listen(db.engine, 'before_cursor_execute', record)
+    try:
+        summary = {row['company_id']: row for row in BillingService.get_billing_summary()}
+    finally:
+        event.remove(db.engine, 'before_cursor_execute', record)
+
+    assert summary[billing_db['company_ids'][0]]['latest_bill_status'] == 'sent'
+    assert summary[billing_db['company_ids'][0]]['latest_bill_date'] == latest.bill_date
+    assert summary[billing_db['company_ids'][1]]['latest_bill_status'] == 'draft'
+    assert billing_db['company_ids'][-1] not in summary
+    assert len([statement for statement in statements if 'FROM monthly_bills' in statement]) == 1
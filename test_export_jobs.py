@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Tests for abandoned background exports
+
+Runs ExportJobService against a throwaway SQLite database and export
+folder: jobs no worker will finish are marked failed (and later expire)
+with their partial files removed, while jobs whose worker is still alive,
+in this process or another one, are left alone.
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from app import app
+from models import db, ExportJob
+from services.export_job_service import ExportJobService, EXPORT_JOB_HANDLERS
+
+
+@pytest.fixture()
+def export_db(temp_db):
+    """Point the app at a temporary database and upload folder"""
+    upload_folder = tempfile.mkdtemp()
+    original_upload_folder = app.config.get('UPLOAD_FOLDER')
+    app.config['UPLOAD_FOLDER'] = upload_folder
+
+    try:
+        yield
+    finally:
+        app.config['UPLOAD_FOLDER'] = original_upload_folder
+        app.config.pop('EXPORT_JOB_HEARTBEAT_SECONDS', None)
+        shutil.rmtree(upload_folder)
+
+
+def _job(status, minutes_ago, heartbeat_minutes_ago=None):
+    created_at = datetime.utcnow() - timedelta(minutes=minutes_ago)
+    job = ExportJob(job_type='bills', params='{}', status=status, created_by=1, created_at=created_at)
+    if status != 'queued':
+        job.started_at = created_at
+    if heartbeat_minutes_ago is not None:
+        job.heartbeat_at = datetime.utcnow() - timedelta(minutes=heartbeat_minutes_ago)
+    db.session.add(job)
+    db.session.commit()
+    return job
+
+
+def _partial_file(job):
+    path = os.path.join(ExportJobService.export_folder(), f"{job.id}_partial.xlsx")
+    with open(path, 'wb') as partial:
+        partial.write(b'partial')
+    return path
+
+
+def test_abandoned_jobs_are_failed(export_db):
+    dead_worker = _job('running', 90, heartbeat_minutes_ago=61)
+    dead_worker_file = _partial_file(dead_worker)
+    never_started = _job('queued', 61)
+    long_render = _job('running', 120, heartbeat_minutes_ago=1)
+    long_render_file = _partial_file(long_render)
+    completed = _job('completed', 120)
+
+    assert ExportJobService.fail_abandoned() == 2
+
+    db.session.expire_all()
+    assert (dead_worker.status, dead_worker.message) == ('failed', 'Export worker stopped responding')
+    assert (never_started.status, never_started.message) == ('failed', 'Export was never started')
+    assert dead_worker.expires_at and never_started.expires_at
+    assert not os.path.exists(dead_worker_file)
+
+    assert long_render.status == 'running'
+    assert os.path.exists(long_render_file)
+    assert completed.status == 'completed'
+
+
+def test_failed_jobs_expire(export_db):
+    _job('running', 61)
+
+    assert ExportJobService.fail_abandoned() == 1
+    assert ExportJobService.cleanup_expired() == 0
+
+    ttl_hours = app.config.get('EXPORT_JOB_TTL_HOURS', 24)
+    assert ExportJobService.cleanup_expired(datetime.utcnow() + timedelta(hours=ttl_hours, minutes=1)) == 1
+    assert ExportJob.query.count() == 0
+
+
+def test_jobs_of_other_workers_survive_a_later_process_cleanup(export_db, monkeypatch):
+    app.config['EXPORT_JOB_HEARTBEAT_SECONDS'] = 0.05
+    queued = _job('queued', 5)
+    job = _job('queued', 0)
+    rendering = threading.Event()
+    finish = threading.Event()
+
+    def render(export_file, params, progress):
+        rendering.set()
+        finish.wait(5)
+        return 'bills.xlsx', 'application/octet-stream'
+
+    # The first process's worker renders the job
+    monkeypatch.setitem(EXPORT_JOB_HANDLERS, 'bills', render)
+    worker = threading.Thread(target=ExportJobService._run_with_context, args=(job.id,))
+    worker.start()
+    assert rendering.wait(5)
+
+    # A second process (e.g. the standalone scheduler) starts afterwards and runs the cleanup
+    original_executor = ExportJobService._executor
+    ExportJobService.init_app(app)
+    try:
+        threading.Event().wait(0.2)
+        db.session.expire_all()
+        running = ExportJob.query.get(job.id)
+        assert running.heartbeat_at > running.started_at
+        assert ExportJobService.fail_abandoned() == 0
+    finally:
+        ExportJobService._executor.shutdown()
+        ExportJobService._executor = original_executor
+        finish.set()
+        worker.join()
+
+    db.session.expire_all()
+    assert ExportJob.query.get(queued.id).status == 'queued'
+    assert ExportJob.query.get(job.id).status == 'completed'
+
+
+def test_jobs_failed_while_rendering_keep_no_file(export_db, monkeypatch):
+    job = _job('queued', 0)
+
+    def render(export_file, params, progress):
+        # The worker stalls past the timeout and the hourly cleanup gives up on the job
+        ExportJobService.fail_abandoned(datetime.utcnow() + timedelta(hours=2))
+        return 'bills.xlsx', 'application/octet-stream'
+
+    monkeypatch.setitem(EXPORT_JOB_HANDLERS, 'bills', render)
+    ExportJobService.run(job.id)
+
+    db.session.expire_all()
+    assert (job.status, job.message) == ('failed', 'Export worker stopped responding')
+    assert job.file_path is None
+    assert os.listdir(ExportJobService.export_folder()) == []
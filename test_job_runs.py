@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for the scheduler job history
+
+Runs JobRunService against a throwaway SQLite database and checks that
+overlapping runs of a job are closed separately and that runs left
+'running' by a stopped worker count as failures.
+"""
+
+from datetime import datetime, timedelta
+
+from models import db, SchedulerJobRun
+from services.job_run_service import JobRunService
+
+
+def test_overlapping_runs_finish_their_own_rows(temp_db):
+    first = JobRunService.record('daily_notifications', 'running')
+    second = JobRunService.record('daily_notifications', 'running')
+
+    JobRunService.record('daily_notifications', 'success', 2.0, 5, run_id=second)
+    JobRunService.record('daily_notifications', 'error', 1.0, 0, 'boom', run_id=first)
+
+    runs = {run.id: run for run in SchedulerJobRun.query.all()}
+    assert len(runs) == 2
+    assert (runs[first].status, runs[first].error) == ('error', 'boom')
+    assert (runs[second].status, runs[second].rows_affected) == ('success', 5)
+
+
+def test_abandoned_runs_count_as_failures(temp_db):
+    JobRunService.record('daily_notifications', 'success', 1.0, 3)
+    abandoned = JobRunService.record('daily_notifications', 'running')
+    current = JobRunService.record('daily_notifications', 'running')
+    SchedulerJobRun.query.get(abandoned).started_at = datetime.now() - timedelta(hours=7)
+    db.session.commit()
+
+    stats = JobRunService.stats()
+
+    assert stats['failed_runs'] == 1
+    assert stats['running'] == 1
+    assert stats['failure_rate'] == 50.0
+    assert SchedulerJobRun.query.get(abandoned).status == 'error'
+    assert SchedulerJobRun.query.get(current).status == 'running'
@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for the municipal tender ingest pipeline
+
+Runs MunicipalTenderIngestService.ingest against a throwaway SQLite database
+and checks deduplication, new/updated/unchanged counts and the number of
+statements per chunk.
+"""
+
+import pytest
+from sqlalchemy import event, text
+
+from conftest import temporary_database
+from models import db
+from services.municipal_tender_ingest_service import MunicipalTenderIngestService
+
+TENDER_COUNT = 25
+
+
+@pytest.fixture()
+def ingest_db():
+    """Point the app at a temporary database with a municipal_tenders table"""
+    with temporary_database(_create_municipal_tenders):
+        yield
+
+
+def _create_municipal_tenders():
+    db.session.execute(text("""
+        CREATE TABLE municipal_tenders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            municipality VARCHAR(255) NOT NULL,
+            province VARCHAR(100) NOT NULL,
+            title VARCHAR(500) NOT NULL,
+            description TEXT,
+            category VARCHAR(100),
+            value BIGINT,
+            tender_number VARCHAR(100) UNIQUE,
+            published_date DATE,
+            closing_date DATETIME,
+            status VARCHAR(20) DEFAULT 'new',
+            requirements TEXT,
+            contact_person VARCHAR(255),
+            contact_email VARCHAR(255),
+            source_url VARCHAR(500),
+            scraped_at DATETIME,
+            content_hash CHAR(64),
+            created_at DATETIME,
+            updated_at DATETIME
+        )
+    """))
+
+
+def _tender(i, **overrides):
+    tender = {
+        'tenderNumber': f'MUN/{i:04d}',
+        'municipality': 'City of Cape Town',
+        'province': 'western-cape',
+        'title': f'Tender {i}',
+        'description': 'Road maintenance',
+        'category': 'construction',
+        'value': 1000000 + i,
+        'closingDate': '2026-12-01',
+        'requirements': ['CIDB Grade 5'],
+        'contactInfo': {'person': 'Procurement', 'email': 'tenders@example.com'},
+        'sourceUrl': f'https://example.com/tenders/{i}'
+    }
+    tender.update(overrides)
+    return tender
+
+
+def test_ingest_counts_new_updated_and_unchanged(ingest_db):
+    tenders = [_tender(i) for i in range(TENDER_COUNT)]
+
+    # A record scraped twice is saved once, the later copy winning
+    success, stats, message = MunicipalTenderIngestService.ingest(
+        tenders + [_tender(0, title='Tender 0 (amended)'), {'title': 'No number'},
+                   _tender(TENDER_COUNT + 1, closingDate='15 March 2026')], chunk_size=10
+    )
+    assert success, message
+    assert (stats['new'], stats['updated'], stats['unchanged'], stats['invalid']) == (TENDER_COUNT, 0, 0, 2)
+    assert db.session.execute(text("SELECT COUNT(*) FROM municipal_tenders")).scalar() == TENDER_COUNT
+    closing_date = db.session.execute(
+        text("SELECT closing_date FROM municipal_tenders WHERE tender_number = 'MUN/0000'")
+    ).scalar()
+    assert str(closing_date).startswith('2026-12-01 00:00:00')
+
+    tenders[3] = _tender(3, value=5)
+    tenders.append(_tender(TENDER_COUNT))
+    success, stats, message = MunicipalTenderIngestService.ingest(tenders, chunk_size=10)
+    assert success, message
+    assert (stats['new'], stats['updated'], stats['unchanged']) == (1, 2, TENDER_COUNT - 2)
+
+    values = dict(db.session.execute(text("SELECT tender_number, value FROM municipal_tenders")).fetchall())
+    assert values['MUN/0003'] == 5
+    assert len(values) == TENDER_COUNT + 1
+
+
+def test_ingest_uses_two_statements_per_chunk(ingest_db):
+    statements = []
+
+    def count(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith(('SELECT', 'INSERT')):
+            statements.append(statement)
+
+    engine = db.get_engine()
+    event.listen(engine, 'before_cursor_execute', count)
+    try:
+        success, stats, message = MunicipalTenderIngestService.ingest(
+            [_tender(i) for i in range(TENDER_COUNT)], chunk_size=10
+        )
+    finally:
+        event.remove(engine, 'before_cursor_execute', count)
+
+    assert success, message
+    assert stats['chunks'] == 3
+    assert len(statements) == 2 * stats['chunks']
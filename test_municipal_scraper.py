@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""
+Tests for the concurrent municipal scraper
+
+Runs MunicipalScraper against a local fixture HTTP server and checks
+parsing, retries, conditional requests and the per-host concurrency limit.
+"""
+
+import json
+import threading
+import time
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from services.municipal_scraper_service import HostLimiter, MunicipalScraper
+
+HTML_LISTING = """
+<html><body><table class="tenders"><tbody>
+  <tr><td class="ref">CT/001</td><td class="title"><a href="/tender/1">Road resurfacing</a></td>
+      <td class="closing">2026-12-01</td><td class="value">R 1,250,000.00</td></tr>
+  <tr><td class="ref">CT/002</td><td class="title"><a href="/tender/2">Water meters</a></td>
+      <td class="closing">2026-12-15</td><td class="value"></td></tr>
+  <tr><td class="ref">CT/003</td><td class="title">Fleet tracking</td>
+      <td class="closing">15 March 2026 12:00</td><td class="value">R 80 000</td></tr>
+  <tr><td class="ref">CT/004</td><td class="title">Park benches</td>
+      <td class="closing">Until further notice</td><td class="value"></td></tr>
+  <tr><td class="ref"></td><td class="title">Header row without a number</td></tr>
+</tbody></table></body></html>
+"""
+
+JSON_LISTING = json.dumps({'data': {'tenders': [
+    {'reference': 'ETH/100', 'name': 'Library upgrade', 'closes': '2026-11-30', 'amount': 900000},
+    {'reference': 'ETH/101', 'name': 'Clinic cleaning', 'closes': '15/03/2026', 'amount': 120000}
+]}})
+
+
+class FixtureHandler(BaseHTTPRequestHandler):
+    """Serves fixed listings with ETags; /flaky fails once, /slot/* is slow"""
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] = server.hits.get(self.path, 0) + 1
+            hits = server.hits[self.path]
+            server.active += 1
+            server.max_active = max(server.max_active, server.active)
+
+        try:
+            if self.path.startswith('/slot/'):
+                time.sleep(0.05)
+                body, content_type = HTML_LISTING, 'text/html'
+            elif self.path == '/flaky' and hits == 1:
+                self.send_response(503)
+                self.end_headers()
+                return
+            elif self.path == '/api/tenders':
+                body, content_type = JSON_LISTING, 'application/json'
+            else:
+                body, content_type = HTML_LISTING, 'text/html'
+
+            etag = f'"{hash(body)}"'
+            if self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.end_headers()
+                return
+
+            data = body.encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(data)))
+            self.send_header('ETag', etag)
+            self.end_headers()
+            self.wfile.write(data)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+
+@pytest.fixture()
+def fixture_server():
+    """Local HTTP server for the scraper to fetch from"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FixtureHandler)
+    server.lock = threading.Lock()
+    server.hits = {}
+    server.active = 0
+    server.max_active = 0
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield server, f'http://127.0.0.1:{server.server_address[1]}'
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _scraper(base_url):
+    scraper = MunicipalScraper({
+        'City of Cape Town': {
+            'province': 'western-cape',
+            'url': f'{base_url}/flaky',
+            'items': 'table.tenders tbody tr',
+            'fields': {'tenderNumber': 'td.ref', 'title': 'td.title', 'closingDate': 'td.closing', 'value': 'td.value'},
+            'link': 'a'
+        },
+        'eThekwini': {
+            'province': 'kwazulu-natal',
+            'url': f'{base_url}/api/tenders',
+            'format': 'json',
+            'items': 'data.tenders',
+            'fields': {'tenderNumber': 'reference', 'title': 'name', 'closingDate': 'closes', 'value': 'amount'}
+        }
+    })
+    scraper.backoff = 0
+    scraper.limiter = HostLimiter(max_per_host=2, delay=0)
+    return scraper
+
+
+def test_sweep_parses_listings_and_retries(fixture_server):
+    server, base_url = fixture_server
+    scraper = _scraper(base_url)
+
+    results = {result['municipality']: result for result in scraper.iter_sweep()}
+
+    cape_town = results['City of Cape Town']
+    assert cape_town['pages'][0]['attempts'] == 2
+    assert not cape_town['errors']
+    assert [tender['tenderNumber'] for tender in cape_town['tenders']] == ['CT/001', 'CT/002', 'CT/003']
+    assert [tender['closingDate'] for tender in cape_town['tenders']] == [
+        datetime(2026, 12, 1), datetime(2026, 12, 15), datetime(2026, 3, 15, 12, 0)
+    ]
+    assert cape_town['invalid'] == 1
+    assert cape_town['tenders'][0]['value'] == 1250000
+    assert cape_town['tenders'][0]['sourceUrl'] == f'{base_url}/tender/1'
+    assert cape_town['tenders'][0]['province'] == 'western-cape'
+
+    ethekwini = results['eThekwini']['tenders']
+    assert ethekwini[0] == {
+        'tenderNumber': 'ETH/100', 'title': 'Library upgrade', 'closingDate': datetime(2026, 11, 30),
+        'value': 900000, 'sourceUrl': f'{base_url}/api/tenders', 'municipality': 'eThekwini',
+        'province': 'kwazulu-natal'
+    }
+    assert ethekwini[1]['closingDate'] == datetime(2026, 3, 15)
+
+
+def test_sources_can_set_date_formats():
+    page = {'url': 'https://example.com/tenders', 'body': json.dumps({'tenders': [
+        {'ref': 'A/1', 'name': 'Mowing', 'closes': '03/15/2026'},
+        {'ref': 'A/2', 'name': 'Fencing', 'closes': '15/03/2026'},
+    ]})}
+    config = {'format': 'json', 'items': 'tenders', 'date_formats': ['%m/%d/%Y'],
+              'fields': {'tenderNumber': 'ref', 'title': 'name', 'closingDate': 'closes'}}
+
+    tenders = MunicipalScraper({}).parse('Test', config, page)
+
+    assert [(tender['tenderNumber'], tender['closingDate']) for tender in tenders] == [('A/1', datetime(2026, 3, 15))]
+    assert page['invalid'] == 1
+
+
+def test_saved_listings_are_skipped_until_they_change(fixture_server):
+    server, base_url = fixture_server
+    scraper = _scraper(base_url)
+
+    # Only the Cape Town listing is saved; eThekwini must be fetched in full again
+    for result in scraper.iter_sweep():
+        if result['municipality'] == 'City of Cape Town':
+            scraper.remember(result['pages'])
+
+    results = {result['municipality']: result for result in scraper.iter_sweep()}
+    assert results['City of Cape Town']['not_modified']
+    assert results['City of Cape Town']['tenders'] == []
+    assert not results['eThekwini']['not_modified']
+    assert len(results['eThekwini']['tenders']) == 2
+
+
+def test_per_host_concurrency_limit(fixture_server):
+    server, base_url = fixture_server
+    scraper = MunicipalScraper({
+        f'Municipality {i}': {'url': f'{base_url}/slot/{i}', 'items': 'table.tenders tbody tr',
+                              'fields': {'tenderNumber': 'td.ref', 'title': 'td.title'}}
+        for i in range(8)
+    })
+    scraper.limiter = HostLimiter(max_per_host=2, delay=0)
+
+    results = list(scraper.iter_sweep())
+
+    assert len(results) == 8
+    assert all(len(result['tenders']) == 4 for result in results)
+    assert server.max_active == 2
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for municipal tender status transitions
+
+Runs MunicipalTenderStatusService.apply_transitions against a throwaway
+SQLite database and checks that each run only changes tenders that crossed
+a closing-date window (or were scraped) since the previous run.
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from conftest import temporary_database
+from models import db, ProcessingWatermark
+from services.municipal_tender_status_service import MunicipalTenderStatusService, WATERMARK_NAME
+
+NOW = datetime(2026, 10, 1, 9, 0, 0)
+
+
+@pytest.fixture()
+def status_db():
+    """Point the app at a temporary database with a municipal_tenders table"""
+    with temporary_database(_create_municipal_tenders):
+        yield
+
+
+def _create_municipal_tenders():
+    db.session.execute(text("""
+        CREATE TABLE municipal_tenders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            tender_number VARCHAR(100) UNIQUE,
+            closing_date DATETIME,
+            status VARCHAR(20) DEFAULT 'new',
+            scraped_at DATETIME
+        )
+    """))
+
+
+def _add(tender_number, closes_in, scraped_at=NOW - timedelta(hours=1)):
+    db.session.execute(text("""
+        INSERT INTO municipal_tenders (tender_number, closing_date, status, scraped_at)
+        VALUES (:number, :closing_date, 'new', :scraped_at)
+    """), {'number': tender_number, 'closing_date': NOW + closes_in, 'scraped_at': scraped_at})
+    db.session.commit()
+
+
+def _statuses():
+    rows = db.session.execute(text("SELECT tender_number, status FROM municipal_tenders"))
+    return dict(rows.fetchall())
+
+
+def test_first_run_classifies_and_rerun_changes_nothing(status_db):
+    _add('MUN/1', timedelta(hours=1))
+    _add('MUN/2', timedelta(days=4))
+    _add('MUN/3', timedelta(days=30))
+    _add('MUN/4', timedelta(days=-1))
+
+    success, stats, message = MunicipalTenderStatusService.apply_transitions(NOW)
+    assert success, message
+    assert stats['crossed'] == 3
+    assert _statuses() == {'MUN/1': 'urgent', 'MUN/2': 'closing', 'MUN/3': 'new', 'MUN/4': 'closed'}
+    assert ProcessingWatermark.query.get(WATERMARK_NAME).watermark_at == NOW
+
+    success, stats, message = MunicipalTenderStatusService.apply_transitions(NOW)
+    assert (stats['crossed'], stats['scraped']) == (0, 0)
+
+
+def test_later_runs_only_move_tenders_that_crossed_a_window(status_db):
+    _add('MUN/1', timedelta(hours=1))
+    _add('MUN/2', timedelta(days=4))
+    _add('MUN/3', timedelta(days=2, hours=12))
+    _add('MUN/4', timedelta(days=30))
+    MunicipalTenderStatusService.apply_transitions(NOW)
+
+    success, stats, message = MunicipalTenderStatusService.apply_transitions(NOW + timedelta(days=1))
+    assert stats['crossed'] == 2
+    assert _statuses() == {'MUN/1': 'closed', 'MUN/2': 'closing', 'MUN/3': 'urgent', 'MUN/4': 'new'}
+
+    # Scraped after the last run, and closing inside the closing window without crossing into it
+    _add('MUN/5', timedelta(days=5), scraped_at=NOW + timedelta(days=1, hours=1))
+
+    success, stats, message = MunicipalTenderStatusService.apply_transitions(NOW + timedelta(days=2))
+    assert (stats['crossed'], stats['scraped']) == (1, 1)
+    assert _statuses() == {'MUN/1': 'closed', 'MUN/2': 'urgent', 'MUN/3': 'urgent', 'MUN/4': 'new',
+                           'MUN/5': 'closing'}
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for keyset pagination
+
+Walks tender, notification and municipal tender listings page by page with
+cursors against a throwaway SQLite database, checking that every row is seen
+exactly once, in order, including ties and NULL sort values.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+
+from app import app
+from models import db, Tender, TenderNotification
+from services.municipal_tender_service import municipal_tender_service
+from services.pagination_service import PaginationService
+
+BASE = datetime(2026, 10, 1, 9, 0, 0)
+
+
+def _walk(fetch, cursor=None):
+    """Follow next cursors to the end, returning each page"""
+    pages = []
+    while True:
+        page = fetch(cursor)
+        pages.append(page)
+        if not page['has_next']:
+            return pages
+        cursor = page['next_cursor']
+
+
+def test_cursors_are_opaque_and_tolerate_tampering():
+    cursor = PaginationService.encode_cursor((BASE, 42))
+    assert 'T09' not in cursor
+    assert PaginationService.decode_cursor(cursor) == ((BASE, 42), 'next')
+    assert PaginationService.decode_cursor(PaginationService.encode_cursor((None, 7), 'prev')) == ((None, 7), 'prev')
+    assert PaginationService.decode_cursor('not-a-cursor') == (None, 'next')
+
+
+def test_tender_pages_follow_created_at_then_id(temp_db):
+    # Pairs of tenders share a created_at, so ids break the ties
+    for i in range(23):
+        db.session.add(Tender(title=f'Tender {i}', reference_number=f'TND-{i:04d}', company_id=1, category_id=1,
+                              status_id=1, created_by=1, created_at=BASE + timedelta(hours=i // 2)))
+    db.session.add(Tender(title='Other company', reference_number='OTH-0001', company_id=2, category_id=1,
+                          status_id=1, created_by=1, created_at=BASE))
+    db.session.commit()
+
+    query = Tender.query.filter_by(company_id=1)
+    expected = [tender.id for tender in query.order_by(Tender.created_at.desc(), Tender.id.desc())]
+
+    pages = _walk(lambda cursor: PaginationService.seek(query, Tender.created_at, Tender.id, cursor, limit=5))
+    assert [len(page['items']) for page in pages] == [5, 5, 5, 5, 3]
+    assert [tender.id for page in pages for tender in page['items']] == expected
+    assert not pages[0]['has_prev'] and pages[1]['has_prev']
+
+    # Going back from the third page gives the second page again
+    back = PaginationService.seek(query, Tender.created_at, Tender.id, pages[2]['prev_cursor'], limit=5)
+    assert [tender.id for tender in back['items']] == [tender.id for tender in pages[1]['items']]
+    assert back['has_prev'] and back['has_next']
+
+    # An old page-number link lands on the same rows by offset
+    legacy = PaginationService.seek(query, Tender.created_at, Tender.id, limit=5, offset=10)
+    assert [tender.id for tender in legacy['items']] == expected[10:15]
+    assert PaginationService.cached_count('test_count', 1, 'all', query) == 23
+
+
+def test_notifications_endpoint_pages_with_cursor(temp_db):
+    for i in range(7):
+        db.session.add(TenderNotification(tender_id=1, company_id=1, message=f'Notice {i}',
+                                          created_at=BASE + timedelta(minutes=i)))
+    db.session.add(TenderNotification(tender_id=1, company_id=1, message='Done', is_processed=True))
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['company_id'] = 1
+
+    messages = []
+    cursor = None
+    while True:
+        url = '/api/notifications?limit=3' + (f'&cursor={cursor}' if cursor else '')
+        data = client.get(url).get_json()
+        messages += [notification['message'] for notification in data['notifications']]
+        cursor = data['next_cursor']
+        if not cursor:
+            break
+
+    assert messages == [f'Notice {i}' for i in range(6, -1, -1)]
+
+
+def test_municipal_pages_put_missing_closing_dates_first(temp_db):
+    db.session.execute(text("""
+        CREATE TABLE municipal_tenders (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            municipality VARCHAR(255), province VARCHAR(100), title VARCHAR(500), description TEXT,
+            category VARCHAR(100), value BIGINT, tender_number VARCHAR(100), closing_date DATETIME,
+            status VARCHAR(20) DEFAULT 'new', requirements TEXT, contact_person VARCHAR(255),
+            contact_email VARCHAR(255), estimated_duration VARCHAR(100), source_url VARCHAR(500),
+            scraped_at DATETIME
+        )
+    """))
+    closing_dates = [None, BASE + timedelta(days=3), None, BASE + timedelta(days=1), BASE + timedelta(days=3),
+                     BASE + timedelta(days=2), BASE - timedelta(days=1)]
+    for i, closing_date in enumerate(closing_dates):
+        db.session.execute(text("""
+            INSERT INTO municipal_tenders (municipality, province, title, tender_number, closing_date, status)
+            VALUES ('eThekwini', 'kwazulu-natal', :title, :number, :closing_date, :status)
+        """), {'title': f'Tender {i}', 'number': f'ETH/{i}', 'closing_date': closing_date,
+               'status': 'closed' if i == 6 else 'new'})
+    db.session.commit()
+
+    pages = _walk(lambda cursor: municipal_tender_service.get_municipal_tenders_page(1, cursor=cursor, limit=2))
+    numbers = [tender['tenderNumber'] for page in pages for tender in page['tenders']]
+    assert numbers == ['ETH/0', 'ETH/2', 'ETH/3', 'ETH/5', 'ETH/1', 'ETH/4']
+
+    back = municipal_tender_service.get_municipal_tenders_page(1, cursor=pages[2]['prev_cursor'], limit=2)
+    assert [tender['tenderNumber'] for tender in back['tenders']] == ['ETH/3', 'ETH/5']
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Query-count regression tests for tender list and report pages
+
+Each route is rendered against a throwaway SQLite database holding one page
+of tenders spread over many categories, statuses, creators and companies, and
+must stay within a fixed number of SQL statements however many rows it shows.
+"""
+
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from conftest import temporary_database
+from utils import export_helpers
+from models import (
+    db, Company, User, Role, Tender, TenderCategory, TenderStatus, TenderAssignment,
+    ModuleDefinition, CompanyModule, Permission, CompanyRole, RolePermission, UserCompanyRole
+)
+
+TENDER_COUNT = 50
+
+# Maximum statements per request once caches are warm (the page itself, its
+# eager loads, and the per-request user/permission lookups)
+MAX_QUERIES = {
+    '/tenders?per_page=50': 6,
+    '/active_tenders_report': 8,
+    '/closed_tenders_report': 8,
+    '/overdue_tenders_report': 8,
+    '/tenders_by_category_report': 8,
+    '/reports/tenders?per_page=50': 6,
+}
+
+
+class QueryCounter:
+    """Count SQL statements this thread sends to the engine while active"""
+
+    def __init__(self, engine):
+        self.engine = engine
+        self.statements = []
+        self.thread_id = threading.get_ident()
+
+    def __enter__(self):
+        event.listen(self.engine, 'before_cursor_execute', self._record)
+        return self
+
+    def __exit__(self, *exc_info):
+        event.remove(self.engine, 'before_cursor_execute', self._record)
+
+    def _record(self, conn, cursor, statement, *args):
+        # The scheduler's lease renewal runs on its own thread
+        if threading.get_ident() == self.thread_id:
+            self.statements.append(statement)
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+
+@pytest.fixture(scope='module')
+def seeded_app():
+    """Point the app at a temporary database filled with varied tenders"""
+    with temporary_database(_seed) as ids:
+        yield ids
+
+
+def _seed():
+    admin_role = Role(name='Company Admin')
+    super_role = Role(name='Super Admin')
+    db.session.add_all([admin_role, super_role])
+
+    companies = [Company(name=f'Company {i}', email=f'company{i}@example.com') for i in range(10)]
+    db.session.add_all(companies)
+    db.session.flush()
+    company = companies[0]
+
+    users = []
+    for i in range(5):
+        user = User(username=f'user{i}', email=f'user{i}@example.com', first_name='Test',
+                    last_name=f'User{i}', company_id=company.id, role=admin_role)
+        user.set_password('password')
+        users.append(user)
+    super_admin = User(username='root', email='root@example.com', first_name='Root',
+                       last_name='Admin', role=super_role, is_super_admin=True)
+    super_admin.set_password('password')
+    db.session.add_all(users + [super_admin])
+
+    for i, name in enumerate(['tender_management', 'reporting']):
+        module = ModuleDefinition(module_name=name, display_name=name, sort_order=i)
+        db.session.add(module)
+        db.session.flush()
+        db.session.add(CompanyModule(company_id=company.id, module_id=module.id, is_enabled=True))
+
+    permission = Permission(name='view_all_tenders', display_name='View All Tenders')
+    company_role = CompanyRole(company_id=company.id, name='company_admin', display_name='Admin')
+    db.session.add_all([permission, company_role])
+    db.session.flush()
+    db.session.add(RolePermission(role_id=company_role.id, permission_id=permission.id))
+    db.session.add(UserCompanyRole(user_id=users[0].id, role_id=company_role.id))
+
+    categories = [TenderCategory(name=f'Category {i}') for i in range(25)]
+    statuses = [TenderStatus(name=name, sort_order=i) for i, name in
+                enumerate(['Draft', 'Published', 'Closed', 'Under Review', 'Awarded', 'Cancelled'])]
+    db.session.add_all(categories + statuses)
+    db.session.flush()
+
+    now = datetime.utcnow()
+    for i in range(TENDER_COUNT):
+        tender = Tender(
+            title=f'Tender {i}',
+            reference_number=f'TND-{i:04d}',
+            company_id=company.id if i % 2 == 0 else companies[i % len(companies)].id,
+            category_id=categories[i % len(categories)].id,
+            status_id=statuses[i % len(statuses)].id,
+            created_by=users[i % len(users)].id,
+            submission_deadline=now + timedelta(days=(i % 20) - 10)
+        )
+        db.session.add(tender)
+        db.session.flush()
+        db.session.add(TenderAssignment(tender_id=tender.id, assigned_to_id=users[i % len(users)].id,
+                                        assigned_by_id=users[0].id))
+
+    db.session.commit()
+    return {'user_id': users[0].id, 'company_id': company.id, 'super_admin_id': super_admin.id}
+
+
+def _client(user_id, company_id=None, is_super_admin=False):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['company_id'] = company_id
+        session['is_super_admin'] = is_super_admin
+    return client
+
+
+def _count_queries(client, url):
+    client.get(url)  # Warm per-company caches so only the page's own work is counted
+    with app.app_context():
+        engine = db.get_engine()
+    with QueryCounter(engine) as counter:
+        response = client.get(url)
+    assert response.status_code == 200, f"{url} returned {response.status_code}"
+    return counter
+
+
+@pytest.mark.parametrize('url', sorted(MAX_QUERIES))
+def test_company_admin_query_count(seeded_app, url):
+    """Company admins see every company tender without per-row queries"""
+    client = _client(seeded_app['user_id'], seeded_app['company_id'])
+    counter = _count_queries(client, url)
+    assert counter.count <= MAX_QUERIES[url], (
+        f"{url} issued {counter.count} queries (max {MAX_QUERIES[url]}):\n" + '\n'.join(counter.statements)
+    )
+
+
+@pytest.mark.parametrize('url', sorted(MAX_QUERIES))
+def test_super_admin_query_count(seeded_app, url):
+    """Super admins see tenders from every company without per-row queries"""
+    client = _client(seeded_app['super_admin_id'], is_super_admin=True)
+    counter = _count_queries(client, url)
+    assert counter.count <= MAX_QUERIES[url], (
+        f"{url} issued {counter.count} queries (max {MAX_QUERIES[url]}):\n" + '\n'.join(counter.statements)
+    )
+
+
+def test_streamed_export_is_one_statement(seeded_app, monkeypatch):
+    """Exports stream tenders in batches with their relationships joined in, not loaded per batch"""
+    monkeypatch.setattr(export_helpers, 'EXPORT_FETCH_SIZE', 10)
+    with app.app_context():
+        with QueryCounter(db.get_engine()) as counter:
+            rows = [(tender.category.name, tender.status.name, tender.company.name)
+                    for tender in export_helpers.iter_export_tenders(Tender.query.order_by(Tender.id))]
+
+    assert len(rows) == TENDER_COUNT
+    assert counter.count == 1, '\n'.join(counter.statements)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Query-plan regression tests for the hot tenant-scoped queries
+
+Every query registered in services/query_plan_service.py is EXPLAINed
+against a throwaway SQLite database built from the models, and must be
+served by an index. The index migration is applied to a database that is
+missing the indexes, and to one that already has them. The other
+migrations are applied to databases that predate them.
+"""
+
+import os
+
+from flask_migrate import upgrade
+from sqlalchemy import inspect, text
+
+from models import db, BillLineItem
+from services.query_plan_service import QueryPlanService, HOT_QUERIES
+
+MIGRATIONS = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+MIGRATION_INDEXES = [
+    'idx_tenders_company_created', 'idx_tenders_company_status_created', 'idx_tenders_company_deadline',
+    'idx_tender_history_tender_created', 'idx_notifications_company_processed_created',
+    'idx_assignment_user_active', 'idx_company_module_company_enabled',
+    'idx_custom_pricing_company_module_active', 'idx_user_role_user',
+]
+# Tables created by the migrations when missing (dropped in this order)
+MIGRATION_TABLES = ['document_sequences', 'export_jobs', 'tender_stats_rollup', 'revenue_snapshots',
+                    'scheduler_job_runs', 'scheduler_leases',
+                    'scrape_checkpoints', 'scrape_runs', 'processing_watermarks']
+MIGRATION_TABLE_INDEXES = ['idx_export_jobs_user_created', 'idx_export_jobs_expires', 'idx_tender_stats_company_month',
+                           'idx_job_runs_job_started', 'idx_job_runs_started', 'idx_scrape_runs_status_started']
+
+
+def _index_names():
+    inspector = inspect(db.engine)
+    return {index['name'] for table in inspector.get_table_names() for index in inspector.get_indexes(table)}
+
+
+def test_hot_queries_use_indexes(temp_db):
+    success, failures, message = QueryPlanService.check()
+
+    assert success, message
+    assert message == f"All {len(HOT_QUERIES)} hot queries use an index"
+
+
+def test_dropped_index_is_reported(temp_db):
+    db.session.execute(text("DROP INDEX idx_user_role_user"))
+
+    success, failures, message = QueryPlanService.check()
+
+    assert not success
+    assert failures == {'user_roles': ['user_company_roles']}
+
+
+def test_migration_adds_missing_indexes(temp_db):
+    for name in MIGRATION_INDEXES:
+        db.session.execute(text(f"DROP INDEX {name}"))
+    db.session.commit()
+    assert not QueryPlanService.check()[0]
+    db.session.remove()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert set(MIGRATION_INDEXES) <= _index_names()
+    assert QueryPlanService.check()[0]
+
+
+def test_migration_skips_existing_indexes(temp_db):
+    before = _index_names()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert _index_names() == before
+
+
+def test_migrations_create_missing_tables(temp_db):
+    for table in MIGRATION_TABLES:
+        db.session.execute(text(f"DROP TABLE {table}"))
+    db.session.commit()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert set(MIGRATION_TABLES) <= set(inspect(db.engine).get_table_names())
+    assert set(MIGRATION_TABLE_INDEXES) <= _index_names()
+
+
+def test_migrations_add_missing_columns(temp_db):
+    db.session.execute(text("ALTER TABLE export_jobs DROP COLUMN heartbeat_at"))
+    db.session.commit()
+    db.session.remove()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert 'heartbeat_at' in {column['name'] for column in inspect(db.engine).get_columns('export_jobs')}
+
+
+def test_migrations_add_scraper_columns_to_raw_sql_tables(temp_db):
+    # municipal_tenders and tender_scraping_log as created before incremental scraping
+    db.session.execute(text(
+        "CREATE TABLE municipal_tenders (id INTEGER PRIMARY KEY, tender_number VARCHAR(100), "
+        "title VARCHAR(500) NOT NULL, municipality VARCHAR(255))"
+    ))
+    db.session.execute(text(
+        "CREATE TABLE tender_scraping_log (id INTEGER PRIMARY KEY, municipality VARCHAR(255), "
+        "tenders_found INT DEFAULT 0, new_tenders INT DEFAULT 0)"
+    ))
+    db.session.execute(text("INSERT INTO municipal_tenders (id, title) VALUES (1, 'Road resurfacing')"))
+    db.session.commit()
+    db.session.remove()
+
+    upgrade(directory=MIGRATIONS)
+
+    inspector = inspect(db.engine)
+    assert {'source_url', 'scraped_at', 'content_hash'} <= {
+        column['name'] for column in inspector.get_columns('municipal_tenders')}
+    assert 'idx_scraped_at' in {index['name'] for index in inspector.get_indexes('municipal_tenders')}
+    assert 'unchanged_tenders' in {column['name'] for column in inspector.get_columns('tender_scraping_log')}
+    assert db.session.execute(text("SELECT title FROM municipal_tenders")).scalar() == 'Road resurfacing'
+
+
+def test_migrations_dedupe_monthly_bills_before_adding_unique_key(temp_db):
+    # Rebuild monthly_bills as it was before the unique key
+    db.session.execute(text("DROP TABLE bill_line_items"))
+    db.session.execute(text("ALTER TABLE monthly_bills RENAME TO monthly_bills_old"))
+    db.session.execute(text(
+        "CREATE TABLE monthly_bills (id INTEGER PRIMARY KEY, company_id INTEGER NOT NULL, "
+        "bill_year INTEGER NOT NULL, bill_month INTEGER NOT NULL, total_amount NUMERIC(10, 2) NOT NULL, "
+        "currency VARCHAR(3) NOT NULL, bill_date DATETIME NOT NULL, due_date DATETIME, "
+        "status VARCHAR(20) NOT NULL, generated_by INTEGER NOT NULL, generated_at DATETIME NOT NULL, notes TEXT)"
+    ))
+    db.session.execute(text("DROP TABLE monthly_bills_old"))
+    db.session.commit()
+    BillLineItem.__table__.create(db.engine)
+
+    for bill_id, company_id, month, status in [(1, 1, 9, 'draft'), (2, 1, 9, 'sent'), (3, 1, 9, 'draft'),
+                                                (4, 1, 10, 'draft'), (5, 1, 10, 'draft'), (6, 2, 9, 'draft')]:
+        db.session.execute(text(
+            "INSERT INTO monthly_bills (id, company_id, bill_year, bill_month, total_amount, currency, "
+            "bill_date, status, generated_by, generated_at) "
+            "VALUES (:id, :company_id, 2026, :month, 100, 'ZAR', '2026-10-01', :status, 1, '2026-10-01')"
+        ), {'id': bill_id, 'company_id': company_id, 'month': month, 'status': status})
+        db.session.execute(text(
+            "INSERT INTO bill_line_items (bill_id, module_id, module_name, module_display_name, unit_price, "
+            "quantity, line_total, is_custom_price) VALUES (:id, 1, 'm', 'M', 100, 1, 100, 0)"
+        ), {'id': bill_id})
+    db.session.commit()
+    db.session.remove()
+
+    upgrade(directory=MIGRATIONS)
+
+    assert [row[0] for row in db.session.execute(text("SELECT id FROM monthly_bills ORDER BY id"))] == [2, 4, 6]
+    assert [row[0] for row in db.session.execute(text("SELECT bill_id FROM bill_line_items ORDER BY bill_id"))] == [
+        2, 4, 6
+    ]
+    constraints = {constraint['name'] for constraint in inspect(db.engine).get_unique_constraints('monthly_bills')}
+    assert 'unique_company_bill_period' in constraints
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+Tests for the monthly revenue history
+
+Runs RevenueSnapshotService against a throwaway SQLite database with two
+companies billed over the last few months: capturing billed and live
+months, backfilling billed months, and the trend and month-over-month
+figures the billing reports draw.
+"""
+
+from datetime import date
+
+import pytest
+
+from conftest import temporary_database
+from models import db, Company, ModuleDefinition, CompanyModule, MonthlyBill, BillLineItem, RevenueSnapshot
+from services.revenue_snapshot_service import RevenueSnapshotService
+
+CURRENT = RevenueSnapshotService.month_start(date.today())
+
+
+def _month(offset):
+    return RevenueSnapshotService.add_months(CURRENT, offset)
+
+
+@pytest.fixture()
+def revenue_db():
+    """
+    Point the app at a temporary database where company 1 was billed three
+    and two months ago, and company 2 two months ago at a custom price
+    """
+    with temporary_database(_seed):
+        yield
+
+
+def _seed():
+    db.session.add_all([
+        Company(id=1, name='Acme', email='acme@example.com'),
+        Company(id=2, name='Bravo', email='bravo@example.com'),
+        ModuleDefinition(id=1, module_name='tenders', display_name='Tenders', monthly_price=100),
+        ModuleDefinition(id=2, module_name='reports', display_name='Reports', monthly_price=50),
+        CompanyModule(company_id=1, module_id=1, is_enabled=True),
+        CompanyModule(company_id=1, module_id=2, is_enabled=True),
+        CompanyModule(company_id=2, module_id=1, is_enabled=True),
+    ])
+    _bill(1, _month(-3), [(1, 100), (2, 50)])
+    _bill(1, _month(-2), [(1, 100)])
+    _bill(2, _month(-2), [(1, 80)], is_custom_price=True)
+
+
+def _bill(company_id, period, lines, is_custom_price=False):
+    bill = MonthlyBill(company_id=company_id, bill_year=period.year, bill_month=period.month,
+                       total_amount=sum(amount for module_id, amount in lines), generated_by=1)
+    for module_id, amount in lines:
+        bill.line_items.append(BillLineItem(
+            module_id=module_id, module_name=f'module{module_id}', module_display_name=f'Module {module_id}',
+            unit_price=amount, line_total=amount, is_custom_price=is_custom_price
+        ))
+    db.session.add(bill)
+
+
+def _revenue(months):
+    return [(month['period'], month['revenue'], month['companies'], month['has_history']) for month in months]
+
+
+def test_backfill_records_billed_months(revenue_db):
+    assert all(month['revenue'] == 0 for month in RevenueSnapshotService.trend(_month(-4), CURRENT))
+
+    success, row_count, message = RevenueSnapshotService.backfill()
+    assert success, message
+    assert row_count == 4
+
+    assert _revenue(RevenueSnapshotService.trend(_month(-4), _month(-1))) == [
+        (_month(-4), 0.0, 0, False),
+        (_month(-3), 150.0, 1, True),
+        (_month(-2), 180.0, 2, True),
+        (_month(-1), 0.0, 0, False),
+    ]
+    assert RevenueSnapshot.query.filter_by(company_id=2).one().is_custom_price
+
+    # Months already recorded are left alone
+    assert RevenueSnapshotService.backfill() == (True, 0, "Recorded 0 billed months (0 revenue rows)")
+
+
+def test_capture_uses_live_pricing_for_unbilled_companies(revenue_db):
+    success, row_count, message = RevenueSnapshotService.capture()
+    assert success, message
+    assert _revenue(RevenueSnapshotService.trend(CURRENT, CURRENT)) == [(CURRENT, 250.0, 2, True)]
+    assert {row.source for row in RevenueSnapshot.query} == {'pricing'}
+
+    # Closing the month from bills keeps the live rows of unbilled companies
+    _bill(1, CURRENT, [(1, 90)])
+    db.session.commit()
+    success, row_count, message = RevenueSnapshotService.capture(CURRENT, include_live=False)
+    assert success, message
+    rows = {(row.company_id, row.module_id): (float(row.amount), row.source) for row in RevenueSnapshot.query}
+    assert rows == {(1, 1): (90.0, 'bill'), (2, 1): (100.0, 'pricing')}
+
+
+def test_month_over_month(revenue_db):
+    RevenueSnapshotService.backfill()
+
+    rows = RevenueSnapshotService.month_over_month(_month(-3), _month(-1))
+
+    assert [(row['period'], row['delta'], row['delta_pct']) for row in rows] == [
+        (_month(-3), 150.0, None),
+        (_month(-2), 30.0, 20.0),
+        (_month(-1), -180.0, -100.0),
+    ]
+
+
+def test_nightly_capture_backfills_history(revenue_db):
+    success, row_count, message = RevenueSnapshotService.capture_recent()
+    assert success, message
+
+    trend = RevenueSnapshotService.trend(_month(-3), CURRENT)
+    assert [month['revenue'] for month in trend] == [150.0, 180.0, 0.0, 250.0]
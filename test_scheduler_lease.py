@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Tests for the scheduler lease
+
+Runs SchedulerLeaseService and SchedulerCoordinator against a throwaway
+SQLite database and checks that only one process leads and that a standby
+takes over once the leader stops renewing.
+"""
+
+import time
+
+from apscheduler.schedulers.background import BackgroundScheduler
+
+from app import app
+from models import SchedulerLease
+from services.scheduler_lease_service import SchedulerCoordinator, SchedulerLeaseService
+
+
+def _coordinator():
+    # A lease of its own, apart from the app's coordinator
+    coordinator = SchedulerCoordinator(BackgroundScheduler(), app, lease_name='test_scheduler')
+    coordinator.lease_seconds = 1
+    coordinator.scheduler.start(paused=True)
+    return coordinator
+
+
+def test_only_one_holder_until_the_lease_expires(temp_db):
+    assert SchedulerLeaseService.acquire('jobs', 'worker-1', 1)
+    assert not SchedulerLeaseService.acquire('jobs', 'worker-2', 1)
+    assert SchedulerLeaseService.acquire('jobs', 'worker-1', 1)
+
+    time.sleep(1.1)
+    assert SchedulerLeaseService.acquire('jobs', 'worker-2', 1)
+    assert not SchedulerLeaseService.acquire('jobs', 'worker-1', 1)
+
+    assert SchedulerLeaseService.release('jobs', 'worker-2')
+    assert SchedulerLeaseService.acquire('jobs', 'worker-1', 1)
+    assert SchedulerLease.query.filter_by(name='jobs').count() == 1
+
+
+def test_standby_takes_over_from_a_silent_leader(temp_db):
+    leader, standby = _coordinator(), _coordinator()
+
+    try:
+        assert leader.heartbeat()
+        assert not standby.heartbeat()
+        assert leader.scheduler.state != standby.scheduler.state
+
+        # The leader stops renewing; the standby takes over and the leader pauses
+        time.sleep(1.1)
+        assert standby.heartbeat()
+        assert not leader.heartbeat()
+        assert SchedulerLeaseService.current('test_scheduler').holder == standby.holder
+    finally:
+        leader.scheduler.shutdown(wait=False)
+        standby.scheduler.shutdown(wait=False)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Tests for scrape checkpoints
+
+Runs ScrapeCheckpointService against a throwaway SQLite database and checks
+change detection against a municipality's checkpoint and resuming an
+interrupted sweep.
+"""
+
+from models import ScrapeRun, ScrapeCheckpoint
+from services.scrape_checkpoint_service import ScrapeCheckpointService
+
+LISTING_URL = 'https://tenders.example.com/cape-town'
+
+
+def _result(tenders, status='ok', etag='"v1"'):
+    return {
+        'municipality': 'City of Cape Town',
+        'tenders': tenders,
+        'pages': [{'url': LISTING_URL, 'status': status, 'etag': etag, 'last_modified': None}],
+        'not_modified': status == 'not_modified',
+        'errors': []
+    }
+
+
+def _tender(number, title):
+    return {'tenderNumber': number, 'title': title, 'municipality': 'City of Cape Town', 'province': 'western-cape'}
+
+
+def test_only_changed_tenders_are_saved_after_a_checkpoint(temp_db):
+    run, done = ScrapeCheckpointService.start_run(['City of Cape Town'])
+    tenders = [_tender('CT/1', 'Roads'), _tender('CT/2', 'Water')]
+
+    changed, hashes, unchanged = ScrapeCheckpointService.diff(None, _result(tenders))
+    assert (len(changed), unchanged) == (2, 0)
+    assert ScrapeCheckpointService.save(run, 'City of Cape Town', _result(tenders), hashes)
+
+    checkpoint = ScrapeCheckpointService.load(['City of Cape Town'])['City of Cape Town']
+    assert checkpoint.tender_count == 2
+    assert checkpoint.get_page_validators() == {LISTING_URL: {'etag': '"v1"', 'last_modified': None}}
+    assert ScrapeCheckpointService.page_validators({'City of Cape Town': checkpoint})[LISTING_URL]['etag'] == '"v1"'
+
+    fingerprint = checkpoint.listing_fingerprint
+    changed, hashes, unchanged = ScrapeCheckpointService.diff(checkpoint, _result(tenders))
+    assert (changed, unchanged) == ([], 2)
+    assert ScrapeCheckpointService.fingerprint(hashes) == fingerprint
+
+    edited = [_tender('CT/1', 'Roads (extended)'), _tender('CT/2', 'Water'), _tender('CT/3', 'Parks')]
+    changed, hashes, unchanged = ScrapeCheckpointService.diff(checkpoint, _result(edited))
+    assert [tender['tenderNumber'] for tender in changed] == ['CT/1', 'CT/3']
+    assert unchanged == 1
+    assert ScrapeCheckpointService.fingerprint(hashes) != fingerprint
+
+
+def test_interrupted_sweep_resumes_where_it_stopped(temp_db):
+    names = ['City of Cape Town', 'eThekwini']
+    run, done = ScrapeCheckpointService.start_run(names)
+    assert done == set()
+    ScrapeCheckpointService.save(run, 'City of Cape Town', _result([_tender('CT/1', 'Roads')]), {})
+
+    # The process stopped before eThekwini; the next sweep picks up the same run
+    resumed, done = ScrapeCheckpointService.start_run(names)
+    assert resumed.id == run.id
+    assert done == {'City of Cape Town'}
+    assert resumed.municipalities_done == 1
+
+    ScrapeCheckpointService.finish_run(resumed)
+    next_run, done = ScrapeCheckpointService.start_run(names)
+    assert next_run.id != run.id
+    assert done == set()
+    assert ScrapeRun.query.get(run.id).status == 'completed'
+    assert ScrapeCheckpoint.query.count() == 1
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""
+Tests for per-company document numbering
+
+Runs SequenceService and the tender reference numbers built on it against
+a throwaway SQLite database: continuing legacy numbers, per-worker blocks
+and concurrent reservations never handing out the same number twice.
+"""
+
+import threading
+from datetime import datetime
+
+import pytest
+
+from app import app
+from conftest import temporary_database
+from models import (
+    db, Company, User, Role, Tender, DocumentSequence, ModuleDefinition, CompanyModule,
+    AccountType, Account, JournalEntry
+)
+from services.cache_service import CacheService
+from services import TenderService
+from services.sequence_service import SequenceService
+
+
+@pytest.fixture()
+def sequence_db():
+    """Point the app at a temporary database with two companies"""
+    try:
+        with temporary_database(_seed):
+            yield
+    finally:
+        app.config.pop('SEQUENCE_BLOCK_SIZE', None)
+        SequenceService._blocks.clear()
+        CacheService.backend().clear()
+
+
+def _seed():
+    db.session.add_all([
+        Company(id=1, name='Acme Civils', email='acme@example.com'),
+        Company(id=2, name='Bravo Works', email='bravo@example.com'),
+    ])
+
+
+def _sequence(company_id, kind, year=0):
+    db.session.expire_all()
+    return DocumentSequence.query.get((company_id, kind, year))
+
+
+def test_tender_references_continue_legacy_numbers(sequence_db):
+    year = datetime.now().year
+    db.session.add(Tender(title='Legacy', reference_number=f'ACM-{year}-0007', company_id=1,
+                          category_id=1, status_id=1, created_by=1))
+    db.session.commit()
+
+    references = [TenderService.create_tender(f'Tender {i}', '', 1, 1, 1, 1)[0].reference_number
+                  for i in range(3)]
+    other, message = TenderService.create_tender('Other', '', 2, 1, 1, 1)
+
+    assert references == [f'ACM-{year}-0008', f'ACM-{year}-0009', f'ACM-{year}-0010']
+    assert other.reference_number == f'BRA-{year}-0001'
+
+
+def test_workers_reserve_blocks(sequence_db):
+    app.config['SEQUENCE_BLOCK_SIZE'] = 5
+
+    assert [SequenceService.next_value(1, 'journal_entry') for i in range(3)] == [1, 2, 3]
+    assert _sequence(1, 'journal_entry').next_value == 6
+    assert SequenceService.peek(1, 'journal_entry') == 4
+
+    # Another worker starts after this worker's block
+    SequenceService._blocks.clear()
+    assert SequenceService.peek(1, 'journal_entry') == 6
+    assert SequenceService.next_value(1, 'journal_entry') == 6
+    assert SequenceService.next_value(1, 'journal_entry') == 7
+    assert _sequence(1, 'journal_entry').next_value == 11
+
+
+def test_single_numbers_are_handed_back_on_rollback(sequence_db):
+    assert SequenceService.next_value(1, 'journal_entry', block_size=1) == 1
+    db.session.rollback()
+    assert SequenceService.next_value(1, 'journal_entry', block_size=1) == 1
+    db.session.commit()
+    assert SequenceService.next_value(1, 'journal_entry', block_size=1) == 2
+    db.session.commit()
+    assert _sequence(1, 'journal_entry').next_value == 3
+
+
+def test_concurrent_reservations_never_overlap(sequence_db):
+    reserved = []
+    errors = []
+
+    def worker():
+        with app.app_context():
+            try:
+                for i in range(10):
+                    reserved.append(SequenceService.reserve(1, 'tender_reference', 2026, count=3))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                db.session.remove()
+
+    threads = [threading.Thread(target=worker) for i in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert errors == []
+    numbers = [number for first, end in reserved for number in range(first, end)]
+    assert sorted(numbers) == list(range(1, 181))
+    assert _sequence(1, 'tender_reference', 2026).next_value == 181
+
+
+def test_rejected_journal_entries_do_not_use_numbers(sequence_db):
+    role = Role(name='User')
+    account_type = AccountType(name='Asset', category='asset', normal_balance='debit')
+    module = ModuleDefinition(module_name='accounting', display_name='Accounting')
+    db.session.add_all([role, account_type, module])
+    db.session.flush()
+    user = User(id=1, username='clerk', email='clerk@example.com', first_name='Test', last_name='Clerk',
+                company_id=1, role=role)
+    user.set_password('password')
+    accounts = [Account(company_id=1, account_number=number, account_name=number, account_type_id=account_type.id)
+                for number in ('1000', '2000')]
+    db.session.add_all([user, CompanyModule(company_id=1, module_id=module.id, is_enabled=True)] + accounts)
+    db.session.commit()
+
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = 1
+        session['company_id'] = 1
+
+    def post(credit):
+        return client.post('/accounting/journal-entries/create', data={
+            'entry_number': 'JE-99999', 'entry_date': '2026-03-01', 'description': 'Opening balance',
+            'account_id[]': [str(accounts[0].id), str(accounts[1].id)],
+            'debit[]': ['100.00', ''], 'credit[]': ['', credit], 'line_description[]': ['', '']
+        })
+
+    assert post('90.00').status_code == 302
+    assert post('100.00').status_code == 302
+    assert post('80.00').status_code == 302
+    assert post('100.00').status_code == 302
+
+    db.session.expire_all()
+    numbers = [entry.entry_number for entry in JournalEntry.query.order_by(JournalEntry.id)]
+    assert numbers == ['JE-00001', 'JE-00002']
+    assert _sequence(1, 'journal_entry').next_value == 3
+
+
+
+def test_companies_sharing_a_prefix_share_its_numbering(sequence_db):
+    year = datetime.now().year
+    db.session.add(Company(id=3, name='ACME South', email='south@example.com'))
+    db.session.add(Tender(title='Legacy', reference_number=f'ACM-{year}-0004', company_id=3,
+                          category_id=1, status_id=1, created_by=1))
+    db.session.commit()
+
+    north, message = TenderService.create_tender('North', '', 1, 1, 1, 1)
+    south, message = TenderService.create_tender('South', '', 3, 1, 1, 1)
+
+    assert north.reference_number == f'ACM-{year}-0005'
+    assert south.reference_number == f'ACM-{year}-0006'
+    assert _sequence(1, 'tender_reference:ACM', year).next_value > 6
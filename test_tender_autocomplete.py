@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Tests for tender autocomplete
+
+Checks the prefix index on its own, then TenderAutocompleteService and the
+/api/tenders/autocomplete endpoint against a throwaway SQLite database:
+lazy loading, updates on tender writes, reloading aged indexes, LRU
+eviction and that warm lookups run no tender or assignment queries.
+"""
+
+import pytest
+from sqlalchemy import event
+
+from app import app
+from conftest import temporary_database
+from models import (
+    db, Company, User, Role, Tender, TenderCategory, TenderAssignment, ModuleDefinition, CompanyModule,
+    Permission, CompanyRole, RolePermission, UserCompanyRole
+)
+from services.cache_service import CacheService
+from services import TenderService, SearchService
+from services.tender_workflow_service import TenderWorkflowService
+from services.tender_autocomplete_service import PrefixIndex, TenderAutocompleteService
+
+
+@pytest.fixture()
+def autocomplete_db():
+    """
+    Point the app at a temporary database with two companies' tenders and
+    two users of company 1: user 1 may view all tenders, user 2 only the
+    tender assigned to them
+    """
+    try:
+        with temporary_database(_seed):
+            yield
+    finally:
+        app.config.pop('TENDER_AUTOCOMPLETE_MAX_ENTRIES', None)
+        app.config.pop('TENDER_AUTOCOMPLETE_MAX_AGE', None)
+        TenderAutocompleteService._indexes.clear()
+        CacheService.backend().clear()
+
+
+def _seed():
+    db.session.add(TenderCategory(id=1, name='Construction'))
+    for company_id, reference_number, title in [
+        (1, 'CPT-2026-0001', 'Road resurfacing in Khayelitsha'),
+        (1, 'CPT-2026-0002', 'Roof repairs at civic centre'),
+        (2, 'DBN-2026-0001', 'Road markings'),
+    ]:
+        db.session.add(Tender(title=title, reference_number=reference_number, company_id=company_id,
+                              category_id=1, status_id=1, created_by=1))
+    _seed_users()
+
+
+def _seed_users():
+    role = Role(name='User')
+    company = Company(id=1, name='Cape Town', email='cpt@example.com')
+    db.session.add_all([role, company])
+    db.session.flush()
+
+    for user_id in (1, 2):
+        user = User(id=user_id, username=f'user{user_id}', email=f'user{user_id}@example.com',
+                    first_name='Test', last_name=f'User{user_id}', company_id=1, role=role)
+        user.set_password('password')
+        db.session.add(user)
+
+    module = ModuleDefinition(module_name='tender_management', display_name='Tender Management')
+    permission = Permission(name='view_all_tenders', display_name='View All Tenders')
+    company_role = CompanyRole(company_id=1, name='manager', display_name='Manager')
+    db.session.add_all([module, permission, company_role])
+    db.session.flush()
+    db.session.add_all([
+        CompanyModule(company_id=1, module_id=module.id, is_enabled=True),
+        RolePermission(role_id=company_role.id, permission_id=permission.id),
+        UserCompanyRole(user_id=1, role_id=company_role.id),
+        TenderAssignment(tender_id=2, assigned_to_id=2, assigned_by_id=1),
+    ])
+
+
+def _client(user_id):
+    client = app.test_client()
+    with client.session_transaction() as session:
+        session['user_id'] = user_id
+        session['company_id'] = 1
+    return client
+
+
+def _texts(suggestions):
+    return [suggestion['text'] for suggestion in suggestions]
+
+
+def test_prefix_index_matches_word_starts_and_shares_texts():
+    index = PrefixIndex()
+    index.add(1, [('title', 'Road resurfacing'), ('reference', 'CPT-1'), ('category', 'Construction')])
+    index.add(2, [('title', 'Water meters'), ('reference', 'CPT-2'), ('category', 'Construction')])
+
+    assert _texts(index.suggest('resurf')) == ['Road resurfacing']
+    assert _texts(index.suggest('c')) == ['Construction', 'CPT-1', 'CPT-2']
+    assert _texts(index.suggest('cpt-2')) == ['CPT-2']
+    assert _texts(index.suggest('c', kinds=('category',))) == ['Construction']
+
+    index.remove(1)
+    assert index.suggest('road') == []
+    assert _texts(index.suggest('constr')) == ['Construction']
+    index.remove(2)
+    assert len(index) == 0
+
+
+def test_suggestions_follow_tender_writes(autocomplete_db):
+    assert _texts(TenderAutocompleteService.suggest(1, 'ro')) == [
+        'Road resurfacing in Khayelitsha', 'Roof repairs at civic centre'
+    ]
+    assert _texts(TenderAutocompleteService.suggest(2, 'ro')) == ['Road markings']
+
+    tender, message = TenderService.create_tender('Stormwater drainage', '', 1, 1, 1, 1)
+    assert _texts(TenderAutocompleteService.suggest(1, 'drain')) == ['Stormwater drainage']
+
+    TenderService.update_tender(tender.id, 'Stormwater culverts', '', 1, 1)
+    assert TenderAutocompleteService.suggest(1, 'drain') == []
+
+    TenderService.delete_tender(tender.id)
+    assert TenderAutocompleteService.suggest(1, 'culv') == []
+
+
+def test_indexes_reload_once_they_reach_max_age(autocomplete_db):
+    app.config['TENDER_AUTOCOMPLETE_MAX_AGE'] = 60
+    assert TenderAutocompleteService.suggest(1, 'drain') == []
+
+    # Another worker with its own memory cache adds a tender
+    db.session.add(Tender(title='Stormwater drainage', reference_number='CPT-2026-0003', company_id=1,
+                          category_id=1, status_id=1, created_by=1))
+    db.session.commit()
+    assert TenderAutocompleteService.suggest(1, 'drain') == []
+
+    for cached in TenderAutocompleteService._indexes.values():
+        cached[2] -= 61
+    assert _texts(TenderAutocompleteService.suggest(1, 'drain')) == ['Stormwater drainage']
+
+
+def test_cold_companies_are_evicted(autocomplete_db):
+    app.config['TENDER_AUTOCOMPLETE_MAX_ENTRIES'] = 12
+    TenderAutocompleteService.suggest(1, 'ro')
+    TenderAutocompleteService.suggest(2, 'ro')
+
+    companies = [company_id for url, company_id in TenderAutocompleteService._indexes]
+    assert companies == [2]
+
+
+def test_endpoint_answers_from_memory(autocomplete_db):
+    client = _client(1)
+
+    assert client.get('/api/tenders/autocomplete?q=cpt').get_json()['suggestions'][0]['text'] == 'CPT-2026-0001'
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    engine = db.get_engine()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        response = client.get('/api/tenders/autocomplete?q=roof&limit=5')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+
+    assert response.get_json() == {'success': True, 'suggestions': [
+        {'text': 'Roof repairs at civic centre', 'type': 'title', 'tender_id': 2}
+    ]}
+    assert not [statement for statement in statements if 'tenders' in statement]
+
+
+def test_restricted_users_only_see_assigned_tenders(autocomplete_db):
+    client = _client(2)
+
+    response = client.get('/api/tenders/autocomplete?q=r')
+    assert response.get_json()['suggestions'] == [
+        {'text': 'Roof repairs at civic centre', 'type': 'title', 'tender_id': 2}
+    ]
+    assert client.get('/api/tenders/autocomplete?q=cpt').get_json()['suggestions'] == [
+        {'text': 'CPT-2026-0002', 'type': 'reference', 'tender_id': 2}
+    ]
+    assert SearchService.get_tender_suggestions('ro', 1, tender_ids={2}) == ['Roof repairs at civic centre']
+
+
+def test_restricted_users_visible_tenders_are_cached_until_reassigned(autocomplete_db):
+    client = _client(2)
+    assert _texts(client.get('/api/tenders/autocomplete?q=road').get_json()['suggestions']) == []
+
+    statements = []
+    record = lambda conn, cursor, statement, *args: statements.append(statement)
+    engine = db.get_engine()
+    event.listen(engine, 'before_cursor_execute', record)
+    try:
+        client.get('/api/tenders/autocomplete?q=roof')
+    finally:
+        event.remove(engine, 'before_cursor_execute', record)
+    assert not [statement for statement in statements if 'tender' in statement]
+
+    TenderWorkflowService.assign_tender(1, 2, 1)
+    assert _texts(client.get('/api/tenders/autocomplete?q=road').get_json()['suggestions']) == [
+        'Road resurfacing in Khayelitsha'
+    ]
+
+
+def test_endpoint_requires_tender_module(autocomplete_db):
+    CompanyModule.query.update({'is_enabled': False})
+    db.session.commit()
+    CacheService.backend().clear()
+
+    response = _client(1).get('/api/tenders/autocomplete?q=ro', headers={'X-Requested-With': 'XMLHttpRequest'})
+    assert response.status_code == 403
+
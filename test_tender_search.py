@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Tests for indexed tender search
+
+Runs TenderSearchService against a throwaway SQLite database with both the
+FTS5 and the pure-Python backends, checking prefix matching, ranking and
+index updates as tenders are created, edited and deleted.
+"""
+
+import pytest
+from sqlalchemy import text
+
+from app import app
+from models import db, Tender
+from services import TenderService
+from services.tender_search_service import TenderSearchService
+
+
+@pytest.fixture(params=['fts5', 'python'])
+def search_db(request, temp_db):
+    """Point the app at a temporary database searched with the given backend"""
+    app.config['TENDER_SEARCH_BACKEND'] = request.param
+    try:
+        yield request.param
+    finally:
+        app.config.pop('TENDER_SEARCH_BACKEND')
+
+
+def _tender(reference_number, title, description='', company_id=1):
+    tender = Tender(title=title, reference_number=reference_number, description=description,
+                    company_id=company_id, category_id=1, status_id=1, created_by=1)
+    db.session.add(tender)
+    db.session.commit()
+    return tender
+
+
+def _titles(tenders):
+    return [tender.title for tender in tenders]
+
+
+def test_search_matches_prefixes_and_ranks_titles_first(search_db):
+    # Saved before the index exists, so picked up by the backfill
+    _tender('TND-2026-0001', 'Office cleaning services', 'Includes road signage cleaning')
+    _tender('TND-2026-0002', 'Road resurfacing in Khayelitsha', 'Resurfacing of municipal roads')
+    _tender('TND-2026-0003', 'Water meter replacement', 'Smart meters', company_id=2)
+
+    assert _titles(TenderSearchService.search('road')) == [
+        'Road resurfacing in Khayelitsha', 'Office cleaning services'
+    ]
+    assert _titles(TenderSearchService.search('resurf khayel')) == ['Road resurfacing in Khayelitsha']
+    assert _titles(TenderSearchService.search('meter', company_id=1)) == []
+    assert _titles(TenderSearchService.search('tnd 2026 0003')) == ['Water meter replacement']
+
+    title_only = TenderSearchService.filter_query(Tender.query, 'signage', title_only=True)
+    assert title_only.count() == 0
+
+    condition, params = TenderSearchService.sql_condition('smart')
+    rows = db.session.execute(text(f"SELECT title FROM tenders WHERE {condition}"), params).fetchall()
+    assert [row[0] for row in rows] == ['Water meter replacement']
+
+
+def test_index_follows_tender_edits_and_deletes(search_db):
+    assert TenderSearchService.search('bridge') == []
+
+    tender, message = TenderService.create_tender('Bridge inspection', 'Annual inspection', 1, 1, 1, 1)
+    assert _titles(TenderSearchService.search('bridge')) == ['Bridge inspection']
+
+    success, message = TenderService.update_tender(tender.id, 'Culvert inspection', 'Annual inspection', 1, 1)
+    assert success, message
+    assert TenderSearchService.search('bridge') == []
+    assert _titles(TenderSearchService.search('culvert')) == ['Culvert inspection']
+
+    success, message = TenderService.delete_tender(tender.id)
+    assert success, message
+    assert TenderSearchService.search('culvert') == []
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Tests for the tender stats rollup
+
+Runs TenderStatsRollupService against a throwaway SQLite database and checks
+full rebuilds, bucket refreshes after tender writes, and that a database with
+tenders from before the rollup is built on first read even after a tender
+write has created a bucket.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+
+from conftest import temporary_database
+from models import db, Company, Tender, TenderStatus, TenderCategory, TenderStatsRollup, ProcessingWatermark
+from services import TenderService
+from services.cache_service import CacheService
+from services.tender_stats_rollup_service import TenderStatsRollupService
+
+
+@pytest.fixture()
+def rollup_db():
+    """Point the app at a temporary database with five tenders and no rollup"""
+    try:
+        with temporary_database(_seed):
+            yield
+    finally:
+        TenderStatsRollupService._built_scopes.clear()
+        CacheService.backend().clear()
+
+
+def _seed():
+    db.session.add_all([
+        Company(id=1, name='Acme Civils', email='acme@example.com'),
+        Company(id=2, name='Bravo Works', email='bravo@example.com'),
+        TenderStatus(id=1, name='Open'),
+        TenderStatus(id=2, name='Awarded'),
+        TenderCategory(id=1, name='Construction'),
+    ])
+    for i, (company_id, status_id, month, value) in enumerate([
+        (1, 1, 1, '1000'), (1, 1, 2, None), (1, 2, 2, 'R 2,500'), (1, 2, 3, None), (2, 1, 3, '400'),
+    ]):
+        db.session.add(Tender(
+            title=f'Tender {i}', reference_number=f'OLD-{i}', company_id=company_id, category_id=1,
+            status_id=status_id, created_by=1, created_at=datetime(2026, month, 10),
+            submission_deadline=datetime(2026, month, 20),
+            custom_fields=json.dumps({'estimated_value': value}) if value else None
+        ))
+
+
+def _counts(company_id=None):
+    return {row['name']: row['count'] for row in TenderStatsRollupService.get_status_breakdown(company_id)}
+
+
+def test_rebuild_counts_every_tender(rollup_db):
+    success, bucket_count, message = TenderStatsRollupService.rebuild()
+
+    assert success, message
+    assert bucket_count == 5
+    assert _counts() == {'Open': 3, 'Awarded': 2}
+    assert _counts(1) == {'Open': 2, 'Awarded': 2}
+    assert TenderStatsRollupService.get_status_breakdown(1)[1]['won'] == 2
+    values = TenderStatsRollupService.get_value_statistics(1)
+    assert (values['valued_count'], values['total_value']) == (2, 3500)
+    assert ProcessingWatermark.query.get(TenderStatsRollupService.watermark_name()) is not None
+
+
+def test_refresh_buckets_follows_tender_writes(rollup_db):
+    TenderStatsRollupService.rebuild()
+    tender = Tender.query.filter_by(title='Tender 0').one()
+
+    TenderService.update_tender(tender.id, tender.title, '', 1, 2)
+    assert _counts(1) == {'Open': 1, 'Awarded': 3}
+
+    TenderService.delete_tender(tender.id)
+    assert _counts(1) == {'Open': 1, 'Awarded': 2}
+    assert TenderStatsRollup.query.filter_by(company_id=1, period_month=datetime(2026, 1, 1).date()).count() == 0
+
+
+def test_first_write_on_existing_tenders_still_builds_the_rollup(rollup_db):
+    TenderService.create_tender('New', '', 1, 1, 1, 1)
+    assert TenderStatsRollup.query.count() == 1
+
+    assert TenderService.get_tender_stats(1)['total_tenders'] == 5
+    assert TenderService.get_tender_stats()['total_tenders'] == 6
+
+    # Built once: later reads do not rebuild the scope
+    TenderStatsRollupService._built_scopes.clear()
+    db.session.add(Tender(title='Unrolled', reference_number='OLD-9', company_id=2, category_id=1,
+                          status_id=1, created_by=1))
+    db.session.commit()
+    assert TenderService.get_tender_stats()['total_tenders'] == 6
@@ -1,18 +1,90 @@
 # utils/export_helpers.py
 import io
+import tempfile
 import xlsxwriter
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
 from reportlab.lib.units import inch
-from flask import make_response
+from flask import make_response, send_file
+from sqlalchemy.orm import Query
 from datetime import datetime
 
+# Rows fetched from the database per round trip while exporting
+EXPORT_FETCH_SIZE = 1000
+
+# Rows per PDF table; reportlab lays out (and splits) each table as a whole,
+# so one table per chunk keeps layout cost and memory flat for long reports
+PDF_TABLE_CHUNK_ROWS = 500
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+
+def iter_export_tenders(tenders):
+    """
+    Iterate tenders for an export without loading them all at once
+
+    Args:
+        tenders: Tender query (streamed with yield_per, with the streaming
+            eager-loading options) or an already loaded list
+
+    Yields:
+        Tender objects
+    """
+    if isinstance(tenders, Query):
+        from services.tender_query_options import TenderQueryOptions
+        tenders = tenders.options(*TenderQueryOptions.for_stream()).yield_per(EXPORT_FETCH_SIZE)
+
+    for tender in tenders:
+        yield tender
+
+
+def send_export_file(export_file, download_name, mimetype):
+    """
+    Stream a finished export file back as an attachment
+
+    The file is an anonymous temp file, so it disappears when the server
+    closes the response after the last chunk is sent.
+    """
+    export_file.seek(0)
+    return send_file(export_file, mimetype=mimetype, as_attachment=True, download_name=download_name)
+
+
 def export_tenders_pdf(tenders, title, user):
-    """Export tenders to PDF"""
-    buffer = io.BytesIO()
-    doc = SimpleDocTemplate(buffer, pagesize=A4)
+    """Export tenders to PDF (tenders may be a query, which is streamed)"""
+    export_file = tempfile.TemporaryFile(prefix='tender_export_', suffix='.pdf')
+    try:
+        write_tenders_pdf(export_file, tenders, title, user)
+    except Exception:
+        export_file.close()
+        raise
+    
+    return send_export_file(export_file, f'{title.replace(" ", "_")}.pdf', 'application/pdf')
+
+def export_tenders_excel(tenders, title, user):
+    """Export tenders to Excel (tenders may be a query, which is streamed)"""
+    export_file = tempfile.TemporaryFile(prefix='tender_export_', suffix='.xlsx')
+    try:
+        write_tenders_excel(export_file, tenders, title, user)
+    except Exception:
+        export_file.close()
+        raise
+    
+    return send_export_file(export_file, f'{title.replace(" ", "_")}.xlsx', XLSX_MIMETYPE)
+
+def write_tenders_pdf(export_file, tenders, title, user, progress=None):
+    """
+    Write the tender list PDF to an open binary file
+
+    Args:
+        export_file: File (or path) the PDF is written to
+        tenders: Tender query (streamed) or list
+        title: Report title
+        user: User the report is generated for
+        progress: Optional callable receiving the number of rows written so far
+    """
+    doc = SimpleDocTemplate(export_file, pagesize=A4)
     styles = getSampleStyleSheet()
     story = []
     
@@ -37,52 +109,68 @@ def export_tenders_pdf(tenders, title, user):
     story.append(Paragraph(export_date, styles['Normal']))
     story.append(Spacer(1, 20))
     
-    if not tenders:
-        story.append(Paragraph("No tenders found for this report.", styles['Normal']))
-    else:
-        # Table headers
-        headers = ['Reference', 'Title', 'Category', 'Status', 'Created Date', 'Deadline']
-        data = [headers]
-        
-        # Table data
-        for tender in tenders:
-            row = [
-                tender.reference_number,
-                tender.title[:30] + '...' if len(tender.title) > 30 else tender.title,
-                tender.category.name if tender.category else 'N/A',
-                tender.status.name if tender.status else 'N/A',
-                tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A',
-                tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A'
-            ]
-            data.append(row)
-        
-        # Create table
-        table = Table(data)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 12),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-            ('GRID', (0, 0), (-1, -1), 1, colors.black)
-        ]))
-        
+    # Table headers
+    headers = ['Reference', 'Title', 'Category', 'Status', 'Created Date', 'Deadline']
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 12),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    def add_table(rows):
+        table = Table([headers] + rows, repeatRows=1)
+        table.setStyle(table_style)
         story.append(table)
     
-    doc.build(story)
-    buffer.seek(0)
+    # Table data, one table per chunk of rows
+    rows = []
+    row_count = 0
+    for tender in iter_export_tenders(tenders):
+        rows.append([
+            tender.reference_number,
+            tender.title[:30] + '...' if len(tender.title) > 30 else tender.title,
+            tender.category.name if tender.category else 'N/A',
+            tender.status.name if tender.status else 'N/A',
+            tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A',
+            tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A'
+        ])
+        row_count += 1
+        
+        if len(rows) >= PDF_TABLE_CHUNK_ROWS:
+            add_table(rows)
+            rows = []
+            if progress:
+                progress(row_count)
     
-    response = make_response(buffer.getvalue())
-    response.headers['Content-Type'] = 'application/pdf'
-    response.headers['Content-Disposition'] = f'attachment; filename="{title.replace(" ", "_")}.pdf"'
-    return response
+    if rows:
+        add_table(rows)
+    
+    if row_count == 0:
+        story.append(Paragraph("No tenders found for this report.", styles['Normal']))
+    
+    if progress:
+        progress(row_count)
+    
+    doc.build(story)
 
-def export_tenders_excel(tenders, title, user):
-    """Export tenders to Excel"""
-    output = io.BytesIO()
-    workbook = xlsxwriter.Workbook(output)
+def write_tenders_excel(export_file, tenders, title, user, progress=None):
+    """
+    Write the tender list workbook to an open binary file
+
+    Args:
+        export_file: File (or path) the workbook is written to
+        tenders: Tender query (streamed) or list
+        title: Report title (also the sheet name)
+        user: User the report is generated for
+        progress: Optional callable receiving the number of rows written so far
+    """
+    # constant_memory flushes each row to disk once the next one starts
+    workbook = xlsxwriter.Workbook(export_file, {'constant_memory': True})
     worksheet = workbook.add_worksheet(title[:31])  # Excel sheet name limit
     
     # Formats
@@ -98,16 +186,28 @@ def export_tenders_excel(tenders, title, user):
         'text_wrap': True
     })
     
+    # Adjust column widths
+    worksheet.set_column('A:A', 15)  # Reference
+    worksheet.set_column('B:B', 30)  # Title
+    worksheet.set_column('C:C', 15)  # Category
+    worksheet.set_column('D:D', 12)  # Status
+    worksheet.set_column('E:E', 20)  # Company
+    worksheet.set_column('F:F', 12)  # Created
+    worksheet.set_column('G:G', 12)  # Deadline
+    worksheet.set_column('H:H', 12)  # Days Overdue
+    
     # Headers
     headers = ['Reference Number', 'Title', 'Category', 'Status', 'Company', 'Created Date', 'Deadline', 'Days Overdue']
     for col, header in enumerate(headers):
         worksheet.write(0, col, header, header_format)
     
-    # Data
-    for row, tender in enumerate(tenders, 1):
+    # Data (rows must be written in order in constant_memory mode)
+    now = datetime.utcnow()
+    row = 0
+    for row, tender in enumerate(iter_export_tenders(tenders), 1):
         days_overdue = ''
-        if tender.submission_deadline and tender.submission_deadline < datetime.utcnow():
-            days_overdue = (datetime.utcnow() - tender.submission_deadline).days
+        if tender.submission_deadline and tender.submission_deadline < now:
+            days_overdue = (now - tender.submission_deadline).days
         
         worksheet.write(row, 0, tender.reference_number, cell_format)
         worksheet.write(row, 1, tender.title, cell_format)
@@ -117,24 +217,14 @@ def export_tenders_excel(tenders, title, user):
         worksheet.write(row, 5, tender.created_at.strftime('%Y-%m-%d') if tender.created_at else 'N/A', cell_format)
         worksheet.write(row, 6, tender.submission_deadline.strftime('%Y-%m-%d') if tender.submission_deadline else 'N/A', cell_format)
         worksheet.write(row, 7, str(days_overdue) if days_overdue else 'N/A', cell_format)
-    
-    # Adjust column widths
-    worksheet.set_column('A:A', 15)  # Reference
-    worksheet.set_column('B:B', 30)  # Title
-    worksheet.set_column('C:C', 15)  # Category
-    worksheet.set_column('D:D', 12)  # Status
-    worksheet.set_column('E:E', 20)  # Company
-    worksheet.set_column('F:F', 12)  # Created
-    worksheet.set_column('G:G', 12)  # Deadline
-    worksheet.set_column('H:H', 12)  # Days Overdue
+        
+        if progress and row % EXPORT_FETCH_SIZE == 0:
+            progress(row)
     
     workbook.close()
-    output.seek(0)
     
-    response = make_response(output.getvalue())
-    response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-    response.headers['Content-Disposition'] = f'attachment; filename="{title.replace(" ", "_")}.xlsx"'
-    return response
+    if progress:
+        progress(row)
 
 def export_tenders_by_category_pdf(categories, user):
     """Export tenders by category to PDF"""
@@ -264,4 +354,197 @@ def export_tenders_by_category_excel(categories, user):
     response = make_response(output.getvalue())
     response.headers['Content-Type'] = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
     response.headers['Content-Disposition'] = 'attachment; filename="Tenders_by_Category_Report.xlsx"'
-    return response
\ No newline at end of file
+    return response
+
+def write_billing_report_excel(export_file, report_data, progress=None):
+    """
+    Write the billing report workbook (company summary and module revenue)
+
+    Args:
+        export_file: File (or path) the workbook is written to
+        report_data: Dictionary from BillingService.get_billing_report_data
+        progress: Optional callable receiving the number of rows written so far
+    """
+    workbook = xlsxwriter.Workbook(export_file, {'constant_memory': True})
+    
+    # Formats
+    header_format = workbook.add_format({
+        'bold': True,
+        'font_color': 'white',
+        'bg_color': '#366092',
+        'border': 1
+    })
+    
+    cell_format = workbook.add_format({
+        'border': 1
+    })
+    
+    # Billing Summary Sheet
+    summary_sheet = workbook.add_worksheet('Billing Summary')
+    summary_sheet.set_column('A:A', 25)  # Company name
+    summary_sheet.set_column('B:B', 15)  # Module count
+    summary_sheet.set_column('C:C', 15)  # Monthly cost
+    summary_sheet.set_column('D:D', 18)  # Has custom pricing
+    
+    summary_headers = ['Company', 'Active Modules', 'Monthly Cost', 'Has Custom Pricing']
+    for col, header in enumerate(summary_headers):
+        summary_sheet.write(0, col, header, header_format)
+    
+    row_count = 0
+    for row, company in enumerate(report_data['companies'], 1):
+        summary_sheet.write(row, 0, company['name'], cell_format)
+        summary_sheet.write(row, 1, company['module_count'], cell_format)
+        summary_sheet.write(row, 2, f"R {company['monthly_cost']:.2f}", cell_format)
+        summary_sheet.write(row, 3, 'Yes' if company['has_custom_pricing'] else 'No', cell_format)
+        row_count += 1
+        if progress and row_count % EXPORT_FETCH_SIZE == 0:
+            progress(row_count)
+    
+    # Module Revenue Sheet
+    module_sheet = workbook.add_worksheet('Module Revenue')
+    module_sheet.set_column('A:A', 25)   # Module name
+    module_sheet.set_column('B:B', 12)   # Category
+    module_sheet.set_column('C:C', 12)   # Base price
+    module_sheet.set_column('D:D', 12)   # Usage count
+    module_sheet.set_column('E:E', 15)   # Total revenue
+    
+    module_headers = ['Module Name', 'Category', 'Base Price', 'Usage Count', 'Total Revenue']
+    for col, header in enumerate(module_headers):
+        module_sheet.write(0, col, header, header_format)
+    
+    for row, module in enumerate(report_data['modules'], 1):
+        module_sheet.write(row, 0, module['display_name'], cell_format)
+        module_sheet.write(row, 1, module['category'].title(), cell_format)
+        module_sheet.write(row, 2, f"R {module['base_price']:.2f}", cell_format)
+        module_sheet.write(row, 3, module['usage_count'], cell_format)
+        module_sheet.write(row, 4, f"R {module['total_revenue']:.2f}", cell_format)
+        row_count += 1
+    
+    workbook.close()
+    
+    if progress:
+        progress(row_count)
+
+def write_bills_excel(export_file, bills, progress=None):
+    """
+    Write a bills list workbook
+
+    Args:
+        export_file: File (or path) the workbook is written to
+        bills: Bill dictionaries from BillingService.get_bills_with_filters
+        progress: Optional callable receiving the number of rows written so far
+    """
+    workbook = xlsxwriter.Workbook(export_file, {'constant_memory': True})
+    worksheet = workbook.add_worksheet('Bills')
+    
+    header_format = workbook.add_format({
+        'bold': True,
+        'font_color': 'white',
+        'bg_color': '#366092',
+        'border': 1
+    })
+    
+    cell_format = workbook.add_format({
+        'border': 1
+    })
+    
+    worksheet.set_column('A:A', 10)  # Bill ID
+    worksheet.set_column('B:B', 25)  # Company
+    worksheet.set_column('C:C', 12)  # Period
+    worksheet.set_column('D:D', 15)  # Amount
+    worksheet.set_column('E:G', 12)  # Status, bill date, due date
+    
+    headers = ['Bill ID', 'Company', 'Period', 'Amount', 'Status', 'Bill Date', 'Due Date']
+    for col, header in enumerate(headers):
+        worksheet.write(0, col, header, header_format)
+    
+    row = 0
+    for row, bill in enumerate(bills, 1):
+        worksheet.write(row, 0, bill['id'], cell_format)
+        worksheet.write(row, 1, bill['company_name'] or 'N/A', cell_format)
+        worksheet.write(row, 2, bill['bill_period'], cell_format)
+        worksheet.write(row, 3, bill['formatted_amount'], cell_format)
+        worksheet.write(row, 4, bill['status'].title(), cell_format)
+        worksheet.write(row, 5, (bill['bill_date'] or 'N/A')[:10], cell_format)
+        worksheet.write(row, 6, (bill['due_date'] or 'N/A')[:10], cell_format)
+        
+        if progress and row % EXPORT_FETCH_SIZE == 0:
+            progress(row)
+    
+    workbook.close()
+    
+    if progress:
+        progress(row)
+
+def write_bills_pdf(export_file, bills, progress=None):
+    """
+    Write a bills list PDF
+
+    Args:
+        export_file: File (or path) the PDF is written to
+        bills: Bill dictionaries from BillingService.get_bills_with_filters
+        progress: Optional callable receiving the number of rows written so far
+    """
+    doc = SimpleDocTemplate(export_file, pagesize=A4)
+    styles = getSampleStyleSheet()
+    story = []
+    
+    title_style = ParagraphStyle(
+        'CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=16,
+        textColor=colors.black,
+        spaceAfter=30,
+        alignment=1
+    )
+    story.append(Paragraph("Bills Report", title_style))
+    story.append(Paragraph(f"Generated on: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}", styles['Normal']))
+    story.append(Spacer(1, 20))
+    
+    headers = ['Bill ID', 'Company', 'Period', 'Amount', 'Status', 'Due Date']
+    table_style = TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('FONTSIZE', (0, 0), (-1, 0), 11),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+        ('GRID', (0, 0), (-1, -1), 1, colors.black)
+    ])
+    
+    def add_table(rows):
+        table = Table([headers] + rows, repeatRows=1)
+        table.setStyle(table_style)
+        story.append(table)
+    
+    rows = []
+    row_count = 0
+    for bill in bills:
+        company_name = bill['company_name'] or 'N/A'
+        rows.append([
+            bill['id'],
+            company_name[:30] + '...' if len(company_name) > 30 else company_name,
+            bill['bill_period'],
+            bill['formatted_amount'],
+            bill['status'].title(),
+            (bill['due_date'] or 'N/A')[:10]
+        ])
+        row_count += 1
+        
+        if len(rows) >= PDF_TABLE_CHUNK_ROWS:
+            add_table(rows)
+            rows = []
+            if progress:
+                progress(row_count)
+    
+    if rows:
+        add_table(rows)
+    
+    if row_count == 0:
+        story.append(Paragraph("No bills found for the selected filters.", styles['Normal']))
+    
+    if progress:
+        progress(row_count)
+    
+    doc.build(story)
@@ -0,0 +1,12 @@
+#!/usr/bin/env python3
+"""
+WSGI entry point
+
+Serve the app with `gunicorn wsgi:app`. Importing app on its own (CLI
+commands, scripts, tests) leaves the scheduler alone; the web workers
+started from here join the scheduler election.
+"""
+
+from app import app, start_embedded_scheduler  # noqa: F401 (gunicorn loads wsgi:app)
+
+start_embedded_scheduler()